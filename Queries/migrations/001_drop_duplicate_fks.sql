@@ -0,0 +1,15 @@
+/*
+Migration 001 - Drop duplicate foreign keys
+
+The schema dump carries two constraints on the same column in several tables.
+The ON DELETE CASCADE / SET NULL variants were added later by ALTER TABLE and
+are the ones the application relies on, so the original plain ones are dropped.
+*/
+
+ALTER TABLE Course DROP FOREIGN KEY course_ibfk_1;
+
+ALTER TABLE Assignment DROP FOREIGN KEY assignment_ibfk_1;
+
+ALTER TABLE Enrollment DROP FOREIGN KEY enrollment_ibfk_2;
+
+ALTER TABLE EnrollmentRequest DROP FOREIGN KEY enrollmentrequest_ibfk_2;
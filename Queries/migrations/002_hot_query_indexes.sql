@@ -0,0 +1,61 @@
+/*
+Migration 002 - Indexes for the hot query shapes
+
+Every index below is derived from a predicate in routes.py or procedures.sql.
+The expected plan for each is checked by `python migrate.py --explain`, which
+runs EXPLAIN on the same statements and reports the key MySQL picks.
+*/
+
+-- User(Role, Active)
+-- admin_dashboard stats:  WHERE Role = 'student' AND Active = 1
+-- get_professors:         WHERE Role = 'professor' AND Active = 1
+-- admin_create_course / edit_course instructor check
+-- EXPLAIN before: type=ALL, key=NULL (full scan of User)
+-- EXPLAIN after:  type=ref, key=idx_user_role_active, ref=const,const
+ALTER TABLE User ADD INDEX idx_user_role_active (Role, Active);
+
+-- EnrollmentRequest(Status, RequestDate)
+-- admin_dashboard: WHERE er.Status = 'pending' ORDER BY er.RequestDate DESC
+-- EXPLAIN before: type=ALL, Extra=Using where; Using filesort
+-- EXPLAIN after:  type=ref, key=idx_request_status_date, Extra=Backward index scan
+ALTER TABLE EnrollmentRequest ADD INDEX idx_request_status_date (Status, RequestDate);
+
+-- Enrollment(CourseID, Status)
+-- upload_assignment notifications, GetCourseDetails, get_course_full_details:
+--   WHERE e.CourseID = ? AND e.Status = 'active'
+-- Replaces enrollment_course_fk as the index backing the CourseID foreign key.
+-- EXPLAIN before: type=ref, key=enrollment_course_fk, Extra=Using where
+-- EXPLAIN after:  type=ref, key=idx_enrollment_course_status, ref=const,const
+ALTER TABLE Enrollment
+    ADD INDEX idx_enrollment_course_status (CourseID, Status),
+    DROP INDEX enrollment_course_fk;
+
+-- Submission(StudentID, AssignmentID) UNIQUE
+-- submit_assignment relies on INSERT ... ON DUPLICATE KEY UPDATE, which never
+-- fired because no unique key covered the pair. Older duplicate rows are
+-- removed first, keeping the most recent submission per student/assignment.
+-- migrate.py refuses to run this migration while any of the rows to be
+-- removed is graded and lists them (MIGRATION_CHECKS), so no grade is lost
+-- silently; resolve those by hand, then migrate again.
+-- GetStudentDashboard: LEFT JOIN Submission s ON s.AssignmentID = a.AssignmentID
+--   AND s.StudentID = ?
+-- EXPLAIN before: type=ref, key=StudentID, Extra=Using where
+-- EXPLAIN after:  type=eq_ref, key=uq_submission_student_assignment
+DELETE older FROM Submission older
+JOIN Submission newer
+  ON newer.StudentID = older.StudentID
+ AND newer.AssignmentID = older.AssignmentID
+ AND newer.SubmissionID > older.SubmissionID;
+
+ALTER TABLE Submission
+    ADD UNIQUE KEY uq_submission_student_assignment (StudentID, AssignmentID),
+    DROP INDEX StudentID;
+
+-- Notification(UserID, Status, Timestamp)
+-- Per-user unread feed: WHERE UserID = ? AND Status = 'unread' ORDER BY Timestamp DESC
+-- Replaces the single-column UserID index backing notification_ibfk_1.
+-- EXPLAIN before: type=ref, key=UserID, Extra=Using where; Using filesort
+-- EXPLAIN after:  type=ref, key=idx_notification_user_status_time, Extra=Backward index scan
+ALTER TABLE Notification
+    ADD INDEX idx_notification_user_status_time (UserID, Status, Timestamp),
+    DROP INDEX UserID;
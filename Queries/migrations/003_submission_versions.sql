@@ -0,0 +1,57 @@
+/*
+Migration 003 - Submission version history
+
+Every upload to /assignments/<id>/submit is recorded as a SubmissionVersion.
+Identical re-uploads reuse the same stored blob (ContentHash), and text-like
+files are stored gzip-compressed (StoredSize < FileSize).
+*/
+
+CREATE TABLE SubmissionVersion (
+    VersionID INT AUTO_INCREMENT PRIMARY KEY,
+    SubmissionID INT NOT NULL,
+    VersionNumber INT NOT NULL,
+    FileName VARCHAR(255) NOT NULL,
+    BlobPath VARCHAR(2048) NOT NULL,
+    ContentHash CHAR(64) NOT NULL,
+    FileSize INT NOT NULL,
+    StoredSize INT NOT NULL,
+    SubmittedAt DATETIME DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE KEY uq_submission_version (SubmissionID, VersionNumber),
+    KEY idx_version_hash (ContentHash),
+    CONSTRAINT submissionversion_submission_fk FOREIGN KEY (SubmissionID)
+        REFERENCES Submission (SubmissionID) ON DELETE CASCADE
+);
+
+-- Resubmissions now update the existing Submission row through the upsert, so
+-- the grading trigger must only check the role when grading columns change.
+DELIMITER //
+
+DROP TRIGGER IF EXISTS before_grade_update//
+
+CREATE TRIGGER before_grade_update
+BEFORE UPDATE ON Submission
+FOR EACH ROW
+BEGIN
+    DECLARE user_role VARCHAR(20);
+
+    IF NOT (NEW.Grade <=> OLD.Grade) OR NOT (NEW.Feedback <=> OLD.Feedback) THEN
+        -- Get the role of the user trying to grade
+        SELECT Role INTO user_role
+        FROM User
+        WHERE UserID = @current_user_id;
+
+        -- Only professors can grade submissions
+        IF user_role != 'professor' THEN
+            SIGNAL SQLSTATE '45000'
+            SET MESSAGE_TEXT = 'Only professors can grade submissions';
+        END IF;
+    END IF;
+
+    -- Validate grade format (assuming grades are like A, B, C, D, F or numeric 0-100)
+    IF NEW.Grade IS NOT NULL AND NEW.Grade NOT REGEXP '^([A-F]|[0-9]|[1-9][0-9]|100)$' THEN
+        SIGNAL SQLSTATE '45000'
+        SET MESSAGE_TEXT = 'Invalid grade format';
+    END IF;
+END//
+
+DELIMITER ;
@@ -0,0 +1,17 @@
+/*
+Migration 004 - Post-upload file analysis
+
+Results of the background validation pipeline, keyed by the SHA-256 of the
+file content so identical uploads share one analysis and one preview.
+*/
+
+CREATE TABLE FileAnalysis (
+    ContentHash CHAR(64) NOT NULL PRIMARY KEY,
+    MimeType VARCHAR(255) DEFAULT NULL,
+    Valid TINYINT(1) NOT NULL,
+    Reason VARCHAR(255) DEFAULT NULL,
+    PageCount INT DEFAULT NULL,
+    PreviewPath VARCHAR(2048) DEFAULT NULL,
+    ExtractedText MEDIUMTEXT,
+    AnalyzedAt DATETIME DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,21 @@
+/*
+Migration 005 - Full-text search
+
+InnoDB FULLTEXT indexes are maintained on every INSERT/UPDATE, so the search
+index stays current without a separate indexing job. ContentHash links
+assignment handouts and course materials to the text extracted for them in
+FileAnalysis.
+*/
+
+ALTER TABLE Assignment
+    ADD COLUMN ContentHash CHAR(64) DEFAULT NULL,
+    ADD INDEX idx_assignment_hash (ContentHash),
+    ADD FULLTEXT INDEX ft_assignment_text (Title, Description);
+
+ALTER TABLE CourseMaterial
+    ADD COLUMN ContentHash CHAR(64) DEFAULT NULL,
+    ADD INDEX idx_material_hash (ContentHash),
+    ADD FULLTEXT INDEX ft_material_text (Description);
+
+ALTER TABLE FileAnalysis
+    ADD FULLTEXT INDEX ft_file_text (ExtractedText);
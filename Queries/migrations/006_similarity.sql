@@ -0,0 +1,34 @@
+/*
+Migration 006 - Submission similarity detection
+
+FileAnalysis.MinHash caches the signature per file content; SubmissionSignature
+copies it per submission so a whole assignment loads with one indexed range
+scan. SimilarityMatch holds the results of the incremental check run after
+every upload.
+*/
+
+ALTER TABLE FileAnalysis
+    ADD COLUMN MinHash VARBINARY(512) DEFAULT NULL;
+
+CREATE TABLE SubmissionSignature (
+    SubmissionID INT NOT NULL PRIMARY KEY,
+    AssignmentID INT NOT NULL,
+    Signature VARBINARY(512) NOT NULL,
+    UpdatedAt DATETIME DEFAULT CURRENT_TIMESTAMP,
+    KEY idx_signature_assignment (AssignmentID, SubmissionID),
+    CONSTRAINT submissionsignature_submission_fk FOREIGN KEY (SubmissionID)
+        REFERENCES Submission (SubmissionID) ON DELETE CASCADE
+);
+
+CREATE TABLE SimilarityMatch (
+    SubmissionID INT NOT NULL,
+    MatchedSubmissionID INT NOT NULL,
+    Similarity DECIMAL(5,4) NOT NULL,
+    DetectedAt DATETIME DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (SubmissionID, MatchedSubmissionID),
+    KEY idx_match_other (MatchedSubmissionID),
+    CONSTRAINT similaritymatch_submission_fk FOREIGN KEY (SubmissionID)
+        REFERENCES Submission (SubmissionID) ON DELETE CASCADE,
+    CONSTRAINT similaritymatch_matched_fk FOREIGN KEY (MatchedSubmissionID)
+        REFERENCES Submission (SubmissionID) ON DELETE CASCADE
+);
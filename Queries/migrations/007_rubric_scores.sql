@@ -0,0 +1,23 @@
+/*
+Migration 007 - Rubric scores
+
+Per-criterion points awarded against GradeRubric. Submission totals are rolled
+up from these rows in a single UPDATE ... JOIN by the bulk scoring route.
+*/
+
+CREATE TABLE RubricScore (
+    SubmissionID INT NOT NULL,
+    RubricID INT NOT NULL,
+    Points INT NOT NULL,
+    Comment TEXT,
+    GradedBy INT DEFAULT NULL,
+    GradedAt DATETIME DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (SubmissionID, RubricID),
+    KEY idx_rubricscore_rubric (RubricID),
+    CONSTRAINT rubricscore_submission_fk FOREIGN KEY (SubmissionID)
+        REFERENCES Submission (SubmissionID) ON DELETE CASCADE,
+    CONSTRAINT rubricscore_rubric_fk FOREIGN KEY (RubricID)
+        REFERENCES GradeRubric (RubricID) ON DELETE CASCADE,
+    CONSTRAINT rubricscore_grader_fk FOREIGN KEY (GradedBy)
+        REFERENCES User (UserID) ON DELETE SET NULL
+);
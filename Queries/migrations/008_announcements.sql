@@ -0,0 +1,22 @@
+/*
+Migration 008 - Course announcements
+
+Announcements are stored once and linked to their course through Has; each
+user's feed is assembled at read time from the courses they belong to. The
+(CourseID, AnnouncementID) primary key of Has gives every course an ordered
+index to page through, and AnnouncementWatermark remembers the newest
+announcement each user has seen instead of copying read flags per user.
+*/
+
+ALTER TABLE Announcement
+    ADD COLUMN CreatedBy INT DEFAULT NULL,
+    ADD CONSTRAINT announcement_creator_fk FOREIGN KEY (CreatedBy)
+        REFERENCES User (UserID) ON DELETE SET NULL;
+
+CREATE TABLE AnnouncementWatermark (
+    UserID INT NOT NULL PRIMARY KEY,
+    LastSeenAnnouncementID INT NOT NULL DEFAULT 0,
+    UpdatedAt DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    CONSTRAINT announcementwatermark_user_fk FOREIGN KEY (UserID)
+        REFERENCES User (UserID) ON DELETE CASCADE
+);
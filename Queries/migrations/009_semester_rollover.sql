@@ -0,0 +1,126 @@
+/*
+Migration 009 - Semester rollover
+
+ClonedFromID records which row a rolled-over Course, Assignment or
+CourseMaterial was copied from. The unique keys make every clone step of a
+rollover idempotent, so an interrupted job can simply be run again: a course
+is cloned at most once per term, and an assignment or material at most once
+per cloned course.
+
+RolloverJob holds the parameters and progress of each job; RolloverCourse
+lists the source courses it clones.
+*/
+
+ALTER TABLE Course
+    ADD COLUMN ClonedFromID INT DEFAULT NULL,
+    ADD UNIQUE KEY uq_course_clone (ClonedFromID, Year, Semester);
+
+ALTER TABLE Assignment
+    ADD COLUMN ClonedFromID INT DEFAULT NULL,
+    ADD UNIQUE KEY uq_assignment_clone (CourseID, ClonedFromID);
+
+ALTER TABLE CourseMaterial
+    ADD COLUMN ClonedFromID INT DEFAULT NULL,
+    ADD UNIQUE KEY uq_material_clone (CourseID, ClonedFromID);
+
+CREATE TABLE RolloverJob (
+    JobID INT AUTO_INCREMENT PRIMARY KEY,
+    TargetYear INT NOT NULL,
+    TargetSemester INT NOT NULL,
+    DueDateShiftDays INT DEFAULT NULL,  -- NULL: shift by the difference in years
+    Status ENUM('pending', 'running', 'done', 'failed') NOT NULL DEFAULT 'pending',
+    Step VARCHAR(20) NOT NULL DEFAULT 'rows',
+    LastCourseID INT NOT NULL DEFAULT 0,  -- rows cloned for source courses up to here
+    LastFileID INT NOT NULL DEFAULT 0,    -- files linked for cloned rows up to here
+    TotalCourses INT NOT NULL DEFAULT 0,
+    CoursesCloned INT NOT NULL DEFAULT 0,
+    AssignmentsCloned INT NOT NULL DEFAULT 0,
+    MaterialsCloned INT NOT NULL DEFAULT 0,
+    FilesLinked INT NOT NULL DEFAULT 0,
+    Error TEXT,
+    CreatedBy INT DEFAULT NULL,
+    CreatedAt DATETIME DEFAULT CURRENT_TIMESTAMP,
+    UpdatedAt DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    CONSTRAINT rolloverjob_creator_fk FOREIGN KEY (CreatedBy)
+        REFERENCES User (UserID) ON DELETE SET NULL
+);
+
+CREATE TABLE RolloverCourse (
+    JobID INT NOT NULL,
+    CourseID INT NOT NULL,
+    PRIMARY KEY (JobID, CourseID),
+    CONSTRAINT rollovercourse_job_fk FOREIGN KEY (JobID)
+        REFERENCES RolloverJob (JobID) ON DELETE CASCADE,
+    CONSTRAINT rollovercourse_course_fk FOREIGN KEY (CourseID)
+        REFERENCES Course (CourseID) ON DELETE CASCADE
+);
+
+-- The rollover job inserts on behalf of the courses' instructors, not of a
+-- logged-in user, so it sets @rollover_job_id and the per-user checks below
+-- are skipped for its rows. Cloned due dates are the source dates shifted by
+-- the job's offset and are not required to lie in the future.
+DELIMITER //
+
+DROP TRIGGER IF EXISTS before_course_material_insert//
+
+CREATE TRIGGER before_course_material_insert
+BEFORE INSERT ON CourseMaterial
+FOR EACH ROW
+BEGIN
+    DECLARE user_role VARCHAR(20);
+
+    IF @rollover_job_id IS NULL THEN
+        -- Get the role using the session variable
+        SELECT Role INTO user_role
+        FROM User
+        WHERE UserID = @current_user_id;
+
+        IF user_role != 'professor' THEN
+            SIGNAL SQLSTATE '45000'
+            SET MESSAGE_TEXT = 'Only professors can upload course materials';
+        END IF;
+
+        -- Also verify if professor teaches this course
+        IF NOT EXISTS (
+            SELECT 1
+            FROM Course
+            WHERE CourseID = NEW.CourseID
+            AND InstructorID = @current_user_id
+        ) THEN
+            SIGNAL SQLSTATE '45000'
+            SET MESSAGE_TEXT = 'You can only upload materials to courses you teach';
+        END IF;
+    END IF;
+END//
+
+DROP TRIGGER IF EXISTS before_course_insert//
+
+CREATE TRIGGER before_course_insert
+BEFORE INSERT ON Course
+FOR EACH ROW
+BEGIN
+    DECLARE creator_role VARCHAR(20);
+
+    IF @rollover_job_id IS NULL THEN
+        SELECT Role INTO creator_role FROM User WHERE UserID = @current_user_id;
+
+        IF creator_role != 'admin' THEN
+            SIGNAL SQLSTATE '45000'
+            SET MESSAGE_TEXT = 'Only administrators can create courses';
+        END IF;
+    END IF;
+END//
+
+DROP TRIGGER IF EXISTS before_assignment_insert//
+
+CREATE TRIGGER before_assignment_insert
+BEFORE INSERT ON Assignment
+FOR EACH ROW
+BEGIN
+    IF @rollover_job_id IS NULL AND NEW.DueDate <= NOW() THEN
+        SIGNAL SQLSTATE '45000'
+        SET MESSAGE_TEXT = 'Due date must be in the future';
+    END IF;
+END//
+
+DELIMITER ;
@@ -0,0 +1,47 @@
+/*
+Migration 010 - Term archive
+
+Submissions, enrollments and enrollment requests of closed terms are moved
+out of the hot tables into *Archive copies by term_archive.py, together
+with the submissions' versions and rubric scores; notifications are moved
+once they are old. The hot tables then only hold current data, so the
+dashboard queries stay the same size year after year.
+
+InnoDB cannot partition tables that have foreign keys, which is why closed
+terms are moved to separate tables instead. The archive tables are created
+with LIKE, so they have the same columns and indexes as their source but no
+foreign keys, and rows are copied with INSERT ... SELECT *.
+*/
+
+ALTER TABLE Course
+    ADD COLUMN Archived TINYINT(1) NOT NULL DEFAULT 0,
+    ADD INDEX idx_course_term (Year, Semester);
+
+CREATE TABLE SubmissionArchive LIKE Submission;
+
+CREATE TABLE SubmissionVersionArchive LIKE SubmissionVersion;
+
+CREATE TABLE RubricScoreArchive LIKE RubricScore;
+
+CREATE TABLE EnrollmentArchive LIKE Enrollment;
+
+CREATE TABLE EnrollmentRequestArchive LIKE EnrollmentRequest;
+
+CREATE TABLE NotificationArchive LIKE Notification;
+
+CREATE TABLE TermArchive (
+    Year INT NOT NULL,
+    Semester INT NOT NULL,
+    Status ENUM('running', 'done', 'failed') NOT NULL DEFAULT 'running',
+    SubmissionsArchived INT NOT NULL DEFAULT 0,
+    EnrollmentsArchived INT NOT NULL DEFAULT 0,
+    RequestsArchived INT NOT NULL DEFAULT 0,
+    NotificationsArchived INT NOT NULL DEFAULT 0,
+    Error TEXT,
+    CreatedBy INT DEFAULT NULL,
+    StartedAt DATETIME DEFAULT CURRENT_TIMESTAMP,
+    FinishedAt DATETIME DEFAULT NULL,
+    PRIMARY KEY (Year, Semester),
+    CONSTRAINT termarchive_creator_fk FOREIGN KEY (CreatedBy)
+        REFERENCES User (UserID) ON DELETE SET NULL
+);
@@ -0,0 +1,30 @@
+/*
+Migration 011 - Cold storage catalog
+
+Assignment directories of archived courses are packed into one zip file per
+assignment on the cold volume by cold_storage.py. ColdArchiveMember maps each
+original file path (Submission.SubmissionPath, SubmissionVersion.BlobPath,
+handouts) to its member in the archive, keyed by the SHA-256 of the path so
+lookups use a fixed-width primary key.
+*/
+
+CREATE TABLE ColdArchive (
+    AssignmentID INT NOT NULL PRIMARY KEY,
+    ArchivePath VARCHAR(2048) NOT NULL,
+    FileCount INT NOT NULL,
+    OriginalSize BIGINT NOT NULL,
+    ArchiveSize BIGINT NOT NULL,
+    CreatedAt DATETIME DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT coldarchive_assignment_fk FOREIGN KEY (AssignmentID)
+        REFERENCES Assignment (AssignmentID) ON DELETE CASCADE
+);
+
+CREATE TABLE ColdArchiveMember (
+    PathHash CHAR(64) NOT NULL PRIMARY KEY,
+    Path VARCHAR(2048) NOT NULL,
+    AssignmentID INT NOT NULL,
+    MemberName VARCHAR(1024) NOT NULL,
+    KEY idx_coldmember_assignment (AssignmentID),
+    CONSTRAINT coldarchivemember_archive_fk FOREIGN KEY (AssignmentID)
+        REFERENCES ColdArchive (AssignmentID) ON DELETE CASCADE
+);
@@ -0,0 +1,57 @@
+/*
+Migration 012 - Resumable uploads
+
+UploadSession tracks the submission uploads in progress through the tus
+routes in resumable.py: the declared length, the offset received so far
+and when the partial file expires. Sha256 is set once every byte has
+arrived, so completing an upload can be retried after a failure.
+
+A resumable upload is checked against the deadline when it is created,
+not when its last chunk arrives. The submission routes set
+@submission_started_at to the creation time while recording such an upload,
+and before_submission_deadline compares the due date with that time instead
+of NOW().
+*/
+
+CREATE TABLE UploadSession (
+    UploadID CHAR(32) NOT NULL PRIMARY KEY,
+    StudentID INT NOT NULL,
+    AssignmentID INT NOT NULL,
+    FileName VARCHAR(255) NOT NULL,
+    Length BIGINT NOT NULL,
+    UploadOffset BIGINT NOT NULL DEFAULT 0,
+    Sha256 CHAR(64) DEFAULT NULL,
+    SubmissionID INT DEFAULT NULL,
+    CreatedAt DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    ExpiresAt DATETIME NOT NULL,
+    KEY idx_uploadsession_expires (ExpiresAt),
+    CONSTRAINT uploadsession_student_fk FOREIGN KEY (StudentID)
+        REFERENCES User (UserID) ON DELETE CASCADE,
+    CONSTRAINT uploadsession_assignment_fk FOREIGN KEY (AssignmentID)
+        REFERENCES Assignment (AssignmentID) ON DELETE CASCADE
+);
+
+DELIMITER //
+
+DROP TRIGGER IF EXISTS before_submission_deadline//
+
+CREATE TRIGGER before_submission_deadline
+BEFORE INSERT ON Submission
+FOR EACH ROW
+BEGIN
+    DECLARE deadline DATETIME;
+    
+    -- Get assignment deadline
+    SELECT DueDate INTO deadline
+    FROM Assignment
+    WHERE AssignmentID = NEW.AssignmentID;
+    
+    -- Check if submission is past deadline; resumable uploads count from
+    -- when they were started
+    IF COALESCE(@submission_started_at, NOW()) > deadline THEN
+        SIGNAL SQLSTATE '45000'
+        SET MESSAGE_TEXT = 'Cannot submit assignment after deadline';
+    END IF;
+END//
+
+DELIMITER ;
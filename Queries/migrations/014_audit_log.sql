@@ -0,0 +1,57 @@
+/*
+Migration 014 - Audit log
+
+AuditLog is an append-only record of who changed what: one row per write
+made through the routes, with the actor, the action, the entity it touched,
+its values before and after, and the ID of the request. Rows are written in
+batches by the background writer in audit.py. EventID is generated when the
+change happens, so entries replayed from the local spool file after a
+database outage are inserted only once.
+
+ActorID deliberately has no foreign key: the trail must outlive the users
+it mentions. Updates and deletes are rejected by triggers.
+*/
+
+CREATE TABLE AuditLog (
+    AuditID BIGINT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    EventID CHAR(32) NOT NULL,
+    OccurredAt DATETIME(6) NOT NULL,
+    ActorID INT DEFAULT NULL,
+    ActorRole VARCHAR(20) DEFAULT NULL,
+    Action VARCHAR(64) NOT NULL,
+    EntityType VARCHAR(32) NOT NULL,
+    EntityID VARCHAR(64) DEFAULT NULL,
+    BeforeValue JSON DEFAULT NULL,
+    AfterValue JSON DEFAULT NULL,
+    RequestID VARCHAR(64) DEFAULT NULL,
+    IPAddress VARCHAR(45) DEFAULT NULL,
+    UNIQUE KEY idx_audit_event (EventID),
+    KEY idx_audit_entity (EntityType, EntityID, AuditID),
+    KEY idx_audit_actor (ActorID, AuditID),
+    KEY idx_audit_action (Action, AuditID),
+    KEY idx_audit_request (RequestID),
+    KEY idx_audit_occurred (OccurredAt)
+);
+
+DELIMITER //
+
+DROP TRIGGER IF EXISTS before_audit_update//
+DROP TRIGGER IF EXISTS before_audit_delete//
+
+CREATE TRIGGER before_audit_update
+BEFORE UPDATE ON AuditLog
+FOR EACH ROW
+BEGIN
+    SIGNAL SQLSTATE '45000'
+    SET MESSAGE_TEXT = 'The audit log is append-only';
+END//
+
+CREATE TRIGGER before_audit_delete
+BEFORE DELETE ON AuditLog
+FOR EACH ROW
+BEGIN
+    SIGNAL SQLSTATE '45000'
+    SET MESSAGE_TEXT = 'The audit log is append-only';
+END//
+
+DELIMITER ;
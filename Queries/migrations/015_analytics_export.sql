@@ -0,0 +1,42 @@
+/*
+Migration 015 - Analytics export
+
+analytics_export.py copies the rows changed since its last run to Parquet
+files for offline reporting, so it needs a change timestamp on every table
+it exports. Submission already has LastModified; User, Course, Assignment
+and Enrollment get an UpdatedAt maintained by MySQL itself, so no write path
+can forget it. Each is indexed for the export's range scan.
+
+SubmissionArchive and EnrollmentArchive get the same changes, in the same
+column position, because term_archive.py moves rows with INSERT ... SELECT *.
+
+Adding a column with a CURRENT_TIMESTAMP default rebuilds the table (online,
+writes are not blocked); existing rows get the time of the migration, so the
+first export includes them all.
+*/
+
+ALTER TABLE User
+    ADD COLUMN UpdatedAt DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    ADD INDEX idx_user_updated (UpdatedAt);
+
+ALTER TABLE Course
+    ADD COLUMN UpdatedAt DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    ADD INDEX idx_course_updated (UpdatedAt);
+
+ALTER TABLE Assignment
+    ADD COLUMN UpdatedAt DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    ADD INDEX idx_assignment_updated (UpdatedAt);
+
+ALTER TABLE Enrollment
+    ADD COLUMN UpdatedAt DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    ADD INDEX idx_enrollment_updated (UpdatedAt);
+
+ALTER TABLE EnrollmentArchive
+    ADD COLUMN UpdatedAt DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    ADD INDEX idx_enrollment_updated (UpdatedAt);
+
+ALTER TABLE Submission
+    ADD INDEX idx_submission_modified (LastModified);
+
+ALTER TABLE SubmissionArchive
+    ADD INDEX idx_submission_modified (LastModified);
@@ -0,0 +1,28 @@
+/*
+Migration 016 - Grading queue
+
+GradingLease records which grader is working on which submission, and until
+when (grading_queue.py). A row whose ExpiresAt has passed is free again, so
+leases abandoned by a closed browser tab return to the queue without a
+cleanup job. Leases go away with their submission, including when it moves
+to SubmissionArchive.
+
+idx_submission_ungraded lets the queue find an assignment's ungraded
+submissions in SubmissionID order without reading the graded ones.
+*/
+
+CREATE TABLE GradingLease (
+    SubmissionID INT NOT NULL PRIMARY KEY,
+    AssignmentID INT NOT NULL,
+    GraderID INT NOT NULL,
+    LeasedAt DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    ExpiresAt DATETIME NOT NULL,
+    KEY idx_lease_grader (AssignmentID, GraderID, ExpiresAt),
+    CONSTRAINT gradinglease_submission_fk FOREIGN KEY (SubmissionID)
+        REFERENCES Submission (SubmissionID) ON DELETE CASCADE,
+    CONSTRAINT gradinglease_grader_fk FOREIGN KEY (GraderID)
+        REFERENCES User (UserID) ON DELETE CASCADE
+);
+
+ALTER TABLE Submission
+    ADD INDEX idx_submission_ungraded (AssignmentID, Grade);
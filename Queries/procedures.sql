@@ -13,15 +13,15 @@ BEGIN
     -- Get professor stats
     SELECT 
         (SELECT COUNT(*) FROM Course 
-         WHERE InstructorID = professor_id) as active_courses,
+         WHERE InstructorID = professor_id AND Deleted = 0) as active_courses,
         (SELECT COUNT(DISTINCT e.StudentID) 
          FROM Enrollment e 
          JOIN Course c ON e.CourseID = c.CourseID 
-         WHERE c.InstructorID = professor_id) as total_students,
+         WHERE c.InstructorID = professor_id AND c.Deleted = 0) as total_students,
         (SELECT COUNT(*) FROM Submission s 
          JOIN Assignment a ON s.AssignmentID = a.AssignmentID 
          JOIN Course c ON a.CourseID = c.CourseID 
-         WHERE c.InstructorID = professor_id AND s.Grade IS NULL) as pending_assignments;
+         WHERE c.InstructorID = professor_id AND c.Deleted = 0 AND s.Grade IS NULL) as pending_assignments;
     
     -- Get teaching courses with detailed information
     SELECT 
@@ -37,7 +37,7 @@ BEGIN
          JOIN Assignment a ON s.AssignmentID = a.AssignmentID 
          WHERE a.CourseID = c.CourseID AND s.Grade IS NULL) as pending_submissions
     FROM Course c
-    WHERE c.InstructorID = professor_id
+    WHERE c.InstructorID = professor_id AND c.Deleted = 0
     ORDER BY c.Year DESC, c.Semester DESC;
     
     -- Get recent submissions
@@ -53,7 +53,7 @@ BEGIN
     JOIN Assignment a ON s.AssignmentID = a.AssignmentID
     JOIN Course c ON a.CourseID = c.CourseID
     JOIN User u ON s.StudentID = u.UserID
-    WHERE c.InstructorID = professor_id
+    WHERE c.InstructorID = professor_id AND c.Deleted = 0
     ORDER BY s.SubmissionDate DESC
     LIMIT 10;
 END//
@@ -67,7 +67,8 @@ BEGIN
            CASE WHEN e.StudentID IS NOT NULL THEN TRUE ELSE FALSE END as is_enrolled
     FROM Course c
     JOIN User u ON c.InstructorID = u.UserID
-    LEFT JOIN Enrollment e ON c.CourseID = e.CourseID AND e.StudentID = student_id;
+    LEFT JOIN Enrollment e ON c.CourseID = e.CourseID AND e.StudentID = student_id
+    WHERE c.Deleted = 0;
 
     -- Get assignments for enrolled courses
     SELECT 
@@ -90,7 +91,7 @@ BEGIN
     JOIN Enrollment e ON c.CourseID = e.CourseID
     LEFT JOIN Submission s ON a.AssignmentID = s.AssignmentID 
         AND s.StudentID = student_id
-    WHERE e.StudentID = student_id AND e.Status = 'active'
+    WHERE e.StudentID = student_id AND e.Status = 'active' AND c.Deleted = 0
     ORDER BY a.DueDate ASC;
 END//
 
@@ -107,7 +108,7 @@ BEGIN
             WHERE a.CourseID = c.CourseID 
             AND a.DueDate > NOW()) as active_assignments
     FROM Course c
-    WHERE c.CourseID = course_id AND c.InstructorID = professor_id;
+    WHERE c.CourseID = course_id AND c.InstructorID = professor_id AND c.Deleted = 0;
 
     -- Get enrolled students with progress
     SELECT 
@@ -183,7 +184,8 @@ BEGIN
     JOIN Assignment a ON c.CourseID = a.CourseID
     JOIN Submission s ON a.AssignmentID = s.AssignmentID
     WHERE s.SubmissionID = submission_id 
-    AND c.InstructorID = professor_id;
+    AND c.InstructorID = professor_id
+    AND c.Deleted = 0;
     
     IF course_id IS NULL THEN
         SET success = FALSE;
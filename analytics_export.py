@@ -0,0 +1,330 @@
+"""
+University Assignment Portal - Analytics Export
+
+Copies the reporting tables to Parquet files, so reports run on an analyst's
+machine (analytics_reports.py) instead of against MySQL:
+
+    <ANALYTICS_EXPORT_FOLDER>/Submission/term=2025-1/run-000042.parquet
+    <ANALYTICS_EXPORT_FOLDER>/User/run-000042.parquet
+    <ANALYTICS_EXPORT_FOLDER>/_keys/Submission.parquet
+    <ANALYTICS_EXPORT_FOLDER>/_state.json
+
+Each run writes only the rows changed since the previous one (UpdatedAt, or
+LastModified for submissions, from migration 015), one file per dataset and
+term of the course, with the run number in an ExportRun column. A row that
+changed again appears in several runs; readers keep its version from the
+latest run. Submissions and enrollments include their term-archive tables.
+
+All datasets are read in one consistent snapshot, from the first replica in
+DATABASE_REPLICAS if there is one, through an unbuffered cursor fetched
+ANALYTICS_EXPORT_CHUNK_SIZE rows at a time, so memory use does not grow with
+the table. The next run starts ANALYTICS_EXPORT_OVERLAP seconds before this
+run's snapshot, which catches rows committed late by transactions that began
+before it. Deleted rows are found through _keys/, a list of the primary keys
+present at the snapshot, rewritten on every run.
+
+Files are written under a temporary name and renamed once complete, and
+_state.json is updated last, so an interrupted run is simply repeated.
+`--full` exports every row again and removes the files of earlier runs,
+which also compacts the many small files left by frequent runs.
+
+    python analytics_export.py          # rows changed since the last run
+    python analytics_export.py --full   # rebuild the export
+"""
+import argparse
+import datetime
+import glob
+import json
+import logging
+import os
+import sys
+
+import mysql.connector
+
+import settings
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow not installed; the export is unavailable
+    pa = None
+
+STATE_FILE = '_state.json'
+KEYS_FOLDER = '_keys'
+RUN_COLUMN = 'ExportRun'
+
+log = logging.getLogger(__name__)
+
+
+class Dataset:
+    """An exported table: its columns, change column and the tables it is read from."""
+
+    def __init__(self, name, key, changed, columns, tables, join='', term=None):
+        self.name = name
+        self.key = key
+        self.changed = changed
+        self.columns = columns  # (column, type) pairs, type one of ARROW_TYPES
+        self.tables = tables
+        self.join = join  # joins reaching the Course as c, for the term
+        self.term = term  # (year, semester) expressions, or None for no partitions
+
+    def query(self, table, since, until):
+        """SELECT of the rows of `table` changed in [since, until), with the term last."""
+        columns = [f"t.{column}" for column, _ in self.columns]
+        if self.term:
+            columns += list(self.term)
+        conditions, params = [], []
+        if since is not None:
+            conditions.append(f"t.{self.changed} >= %s")
+            params.append(since)
+        if until is not None:
+            conditions.append(f"t.{self.changed} < %s")
+            params.append(until)
+        return f"""
+            SELECT {', '.join(columns)}
+            FROM {table} t
+            {self.join}
+            {'WHERE ' + ' AND '.join(conditions) if conditions else ''}
+        """, params
+
+
+COURSE_TERM = ('c.Year', 'c.Semester')
+
+DATASETS = [
+    # Usernames, emails and password hashes are not exported
+    Dataset('User', 'UserID', 'UpdatedAt', [
+        ('UserID', 'int'), ('FirstName', 'str'), ('LastName', 'str'), ('Role', 'str'),
+        ('Active', 'flag'), ('CreatedAt', 'datetime'), ('LastLogin', 'datetime'), ('UpdatedAt', 'datetime')
+    ], ['User']),
+    Dataset('Course', 'CourseID', 'UpdatedAt', [
+        ('CourseID', 'int'), ('CourseName', 'str'), ('CourseCode', 'str'), ('InstructorID', 'int'),
+        ('Year', 'int'), ('Semester', 'int'), ('Archived', 'flag'), ('Deleted', 'flag'),
+        ('ClonedFromID', 'int'), ('CreatedAt', 'datetime'), ('UpdatedAt', 'datetime')
+    ], ['Course'], term=('t.Year', 't.Semester')),
+    Dataset('Assignment', 'AssignmentID', 'UpdatedAt', [
+        ('AssignmentID', 'int'), ('CourseID', 'int'), ('Title', 'str'), ('DueDate', 'datetime'),
+        ('Status', 'str'), ('MaxPoints', 'int'), ('CreatedBy', 'int'), ('ClonedFromID', 'int'),
+        ('CreatedAt', 'datetime'), ('UpdatedAt', 'datetime')
+    ], ['Assignment'], join="LEFT JOIN Course c ON c.CourseID = t.CourseID", term=COURSE_TERM),
+    Dataset('Enrollment', 'EnrollmentID', 'UpdatedAt', [
+        ('EnrollmentID', 'int'), ('StudentID', 'int'), ('CourseID', 'int'), ('EnrollmentDate', 'datetime'),
+        ('Status', 'str'), ('UpdatedAt', 'datetime')
+    ], ['Enrollment', 'EnrollmentArchive'], join="LEFT JOIN Course c ON c.CourseID = t.CourseID",
+        term=COURSE_TERM),
+    Dataset('Submission', 'SubmissionID', 'LastModified', [
+        ('SubmissionID', 'int'), ('AssignmentID', 'int'), ('StudentID', 'int'), ('SubmissionDate', 'datetime'),
+        ('FileType', 'str'), ('FileSize', 'int'), ('Grade', 'str'), ('Points', 'int'),
+        ('GradedDate', 'datetime'), ('GradedAt', 'datetime'), ('GradedBy', 'int'), ('LastModified', 'datetime')
+    ], ['Submission', 'SubmissionArchive'], join="""
+        LEFT JOIN Assignment a ON a.AssignmentID = t.AssignmentID
+        LEFT JOIN Course c ON c.CourseID = a.CourseID
+    """, term=COURSE_TERM),
+]
+
+
+def _arrow_type(name):
+    return {
+        'int': pa.int64(),
+        'flag': pa.int8(),
+        'str': pa.string(),
+        'datetime': pa.timestamp('s')
+    }[name]
+
+
+def schema(dataset):
+    """Arrow schema of a dataset's files."""
+    return pa.schema([(column, _arrow_type(kind)) for column, kind in dataset.columns]
+                     + [(RUN_COLUMN, pa.int32())])
+
+
+def term_folder(year, semester):
+    if year is None or semester is None:
+        return 'term=none'
+    return f"term={year}-{semester}"
+
+
+def run_file(run):
+    return f"run-{run:06d}.parquet"
+
+
+def load_state(folder):
+    try:
+        with open(os.path.join(folder, STATE_FILE), encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {'run': 0, 'datasets': {}}
+
+
+def _save_state(folder, state):
+    path = os.path.join(folder, STATE_FILE)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+
+class _PartitionWriter:
+    """Parquet files of one dataset and run, one per term, renamed into place on close."""
+
+    def __init__(self, folder, dataset, run):
+        self.folder = os.path.join(folder, dataset.name)
+        self.dataset = dataset
+        self.run = run
+        self.schema = schema(dataset)
+        self.writers = {}  # partition folder -> (ParquetWriter, final path)
+        self.rows = 0
+
+    def write(self, rows):
+        """Write fetched rows, each ending with its course's year and semester if partitioned."""
+        width = len(self.dataset.columns)
+        partitions = {}
+        for row in rows:
+            partition = term_folder(*row[width:]) if self.dataset.term else ''
+            partitions.setdefault(partition, []).append(row[:width])
+        for partition, part_rows in partitions.items():
+            columns = list(zip(*part_rows))
+            arrays = [pa.array(values, type=field.type) for values, field in zip(columns, self.schema)]
+            arrays.append(pa.array([self.run] * len(part_rows), type=pa.int32()))
+            self._writer(partition).write_batch(pa.RecordBatch.from_arrays(arrays, schema=self.schema))
+        self.rows += len(rows)
+
+    def _writer(self, partition):
+        if partition not in self.writers:
+            path = os.path.join(self.folder, partition, run_file(self.run))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self.writers[partition] = (pq.ParquetWriter(path + '.tmp', self.schema, compression='zstd'), path)
+        return self.writers[partition][0]
+
+    def close(self):
+        for writer, path in self.writers.values():
+            writer.close()
+            os.replace(path + '.tmp', path)
+        self.writers = {}
+
+    def abort(self):
+        for writer, path in self.writers.values():
+            writer.close()
+            os.remove(path + '.tmp')
+        self.writers = {}
+
+
+def export_dataset(db, folder, dataset, run, since, until, chunk_size):
+    """Stream the dataset's rows changed in [since, until) into Parquet files. Returns the row count."""
+    writer = _PartitionWriter(folder, dataset, run)
+    try:
+        for table in dataset.tables:
+            sql, params = dataset.query(table, since, until)
+            cursor = db.cursor()  # unbuffered: rows stay on the server until fetched
+            try:
+                cursor.execute(sql, params)
+                while True:
+                    rows = cursor.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    writer.write(rows)
+            finally:
+                cursor.close()
+    except BaseException:
+        writer.abort()
+        raise
+    writer.close()
+    return writer.rows
+
+
+def export_keys(db, folder, dataset, chunk_size):
+    """Write the primary keys present in the snapshot, for spotting deleted rows."""
+    path = os.path.join(folder, KEYS_FOLDER, dataset.name + '.parquet')
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    key_schema = pa.schema([(dataset.key, pa.int64())])
+    writer = pq.ParquetWriter(path + '.tmp', key_schema, compression='zstd')
+    try:
+        for table in dataset.tables:
+            cursor = db.cursor()
+            try:
+                cursor.execute(f"SELECT {dataset.key} FROM {table}")
+                while True:
+                    rows = cursor.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    writer.write_batch(pa.RecordBatch.from_arrays(
+                        [pa.array([row[0] for row in rows], type=pa.int64())], schema=key_schema))
+            finally:
+                cursor.close()
+    finally:
+        writer.close()
+    os.replace(path + '.tmp', path)
+
+
+def _remove_earlier_runs(folder, dataset, run):
+    keep = run_file(run)
+    for path in glob.glob(os.path.join(folder, dataset.name, '**', '*.parquet*'), recursive=True):
+        if os.path.basename(path) != keep:
+            os.remove(path)
+
+
+def run_export(db_config, folder, full=False, chunk_size=5000, overlap=300):
+    """Export the rows changed since the last run (all rows if `full`). Returns {dataset: rows}."""
+    if pa is None:
+        raise RuntimeError("The analytics export needs the pyarrow package")
+    os.makedirs(folder, exist_ok=True)
+    state = load_state(folder)
+    run = state['run'] + 1
+    exported = {}
+
+    db = mysql.connector.connect(**db_config)
+    try:
+        db.start_transaction(consistent_snapshot=True, readonly=True)
+        cursor = db.cursor()
+        cursor.execute("SELECT NOW()")
+        until = cursor.fetchone()[0]
+        cursor.close()
+
+        marks = {}
+        for dataset in DATASETS:
+            previous = state['datasets'].get(dataset.name)
+            since = None
+            if previous and not full:
+                since = datetime.datetime.fromisoformat(previous['until']) - datetime.timedelta(seconds=overlap)
+            exported[dataset.name] = export_dataset(db, folder, dataset, run, since, until, chunk_size)
+            export_keys(db, folder, dataset, chunk_size)
+            marks[dataset.name] = {'until': until.isoformat(), 'run': run, 'rows': exported[dataset.name]}
+            log.info("Exported %s %s row(s) changed since %s", exported[dataset.name], dataset.name, since)
+        db.rollback()  # ends the read-only snapshot
+    finally:
+        db.close()
+
+    if full:
+        for dataset in DATASETS:
+            _remove_earlier_runs(folder, dataset, run)
+    state['run'] = run
+    state['datasets'].update(marks)
+    _save_state(folder, state)
+    return exported
+
+
+def export_db_config(config):
+    """Connection settings for the export: the first replica if configured, else the primary."""
+    db_config = settings.database_config(config)
+    if config['DATABASE_REPLICAS']:
+        db_config = {**db_config, **config['DATABASE_REPLICAS'][0]}
+    return db_config
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Export the portal's reporting tables to Parquet")
+    parser.add_argument('--full', action='store_true', help="export every row and drop earlier runs")
+    args = parser.parse_args()
+
+    config = settings.load()
+    try:
+        counts = run_export(export_db_config(config), config['ANALYTICS_EXPORT_FOLDER'], full=args.full,
+                            chunk_size=config['ANALYTICS_EXPORT_CHUNK_SIZE'],
+                            overlap=config['ANALYTICS_EXPORT_OVERLAP'])
+    except mysql.connector.Error as err:
+        print(f"Database connection failed: {err}")
+        sys.exit(1)
+    except RuntimeError as e:
+        print(e)
+        sys.exit(1)
+    for name, rows in counts.items():
+        print(f"{name}: {rows} row(s)")
+    print(f"Export written to {config['ANALYTICS_EXPORT_FOLDER']}")
@@ -0,0 +1,142 @@
+"""
+University Assignment Portal - Analytics Reports
+
+Runs reports with DuckDB over the Parquet files written by
+analytics_export.py, without touching MySQL. Each dataset is a view holding
+the latest exported version of every row whose key is still present, so the
+incremental files read like the tables themselves:
+
+    python analytics_reports.py                          # list the reports
+    python analytics_reports.py timeliness --year 2025   # run one, optionally for a term
+    python analytics_reports.py turnaround --csv turnaround.csv
+    python analytics_reports.py sql "SELECT Role, count(*) FROM User GROUP BY Role"
+"""
+import argparse
+import glob
+import os
+import sys
+
+import settings
+from analytics_export import DATASETS, KEYS_FOLDER, RUN_COLUMN
+
+try:
+    import duckdb
+except ImportError:  # duckdb not installed; reports are unavailable
+    duckdb = None
+
+TERM_FILTER = "($year IS NULL OR c.Year = $year) AND ($semester IS NULL OR c.Semester = $semester)"
+
+# name -> (title, query); queries take $year and $semester (NULL for all terms)
+REPORTS = {
+    'timeliness': ("Submission timeliness by course", f"""
+        SELECT c.Year, c.Semester, c.CourseCode, c.CourseName,
+               count(*) AS submissions,
+               round(avg(CASE WHEN s.SubmissionDate <= a.DueDate THEN 1 ELSE 0 END)
+                     FILTER (WHERE a.DueDate IS NOT NULL), 3) AS on_time_rate,
+               round(median(date_diff('minute', s.SubmissionDate, a.DueDate)) / 60, 1)
+                   AS median_hours_before_due,
+               count(*) FILTER (WHERE a.DueDate - s.SubmissionDate < INTERVAL 1 HOUR) AS last_hour
+        FROM Submission s
+        JOIN Assignment a ON a.AssignmentID = s.AssignmentID
+        JOIN Course c ON c.CourseID = a.CourseID
+        WHERE c.Deleted = 0 AND {TERM_FILTER}
+        GROUP BY ALL
+        ORDER BY c.Year DESC, c.Semester DESC, c.CourseCode
+    """),
+    # Measured from the later of submission and due date: grading starts once the deadline passes
+    'turnaround': ("Grading turnaround per professor", f"""
+        SELECT u.UserID, concat_ws(' ', u.FirstName, u.LastName) AS grader,
+               count(*) FILTER (WHERE s.Points IS NOT NULL OR s.Grade IS NOT NULL) AS graded,
+               count(*) FILTER (WHERE s.Points IS NULL AND s.Grade IS NULL) AS ungraded,
+               round(median(date_diff('minute', greatest(s.SubmissionDate, a.DueDate),
+                                      coalesce(s.GradedAt, s.GradedDate))) / 60, 1) AS median_hours,
+               round(quantile_cont(date_diff('minute', greatest(s.SubmissionDate, a.DueDate),
+                                             coalesce(s.GradedAt, s.GradedDate)), 0.9) / 60, 1) AS p90_hours
+        FROM Submission s
+        JOIN Assignment a ON a.AssignmentID = s.AssignmentID
+        JOIN Course c ON c.CourseID = a.CourseID
+        JOIN User u ON u.UserID = coalesce(s.GradedBy, c.InstructorID)
+        WHERE c.Deleted = 0 AND {TERM_FILTER}
+        GROUP BY ALL
+        ORDER BY median_hours DESC NULLS LAST
+    """),
+    'enrollment': ("Enrollment trends by semester", f"""
+        SELECT c.Year, c.Semester,
+               count(DISTINCT c.CourseID) AS courses,
+               count(e.EnrollmentID) FILTER (WHERE e.Status = 'active') AS active_enrollments,
+               count(e.EnrollmentID) FILTER (WHERE e.Status = 'dropped') AS dropped,
+               count(DISTINCT e.StudentID) AS students,
+               round(count(e.EnrollmentID) FILTER (WHERE e.Status = 'active')
+                     / count(DISTINCT c.CourseID), 1) AS per_course
+        FROM Course c
+        LEFT JOIN Enrollment e ON e.CourseID = c.CourseID
+        WHERE c.Deleted = 0 AND c.Year IS NOT NULL AND {TERM_FILTER}
+        GROUP BY ALL
+        ORDER BY c.Year, c.Semester
+    """),
+}
+
+
+def connect(folder):
+    """DuckDB connection with a view per exported dataset."""
+    if duckdb is None:
+        raise RuntimeError("Analytics reports need the duckdb package")
+    con = duckdb.connect()
+    for dataset in DATASETS:
+        pattern = os.path.join(folder, dataset.name, '**', '*.parquet')
+        keys = os.path.join(folder, KEYS_FOLDER, dataset.name + '.parquet')
+        if not glob.glob(pattern, recursive=True) or not os.path.exists(keys):
+            raise RuntimeError(f"No exported {dataset.name} data in {folder}; run analytics_export.py first")
+        hive = 'true' if dataset.term else 'false'
+        hidden = RUN_COLUMN + (', term' if dataset.term else '')
+        # The latest version of each row, minus rows deleted since it was exported
+        con.execute(f"""
+            CREATE VIEW "{dataset.name}" AS
+            SELECT * EXCLUDE ({hidden})
+            FROM read_parquet('{pattern}', hive_partitioning = {hive}, union_by_name = true)
+            WHERE {dataset.key} IN (SELECT {dataset.key} FROM read_parquet('{keys}'))
+            QUALIFY row_number() OVER (PARTITION BY {dataset.key} ORDER BY {RUN_COLUMN} DESC) = 1
+        """)
+    return con
+
+
+def run_report(con, name, year=None, semester=None):
+    """DuckDB relation with a canned report's results."""
+    _, query = REPORTS[name]
+    return con.sql(query, params={'year': year, 'semester': semester})
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run reports over the analytics export")
+    parser.add_argument('report', nargs='?', choices=[*REPORTS, 'sql'])
+    parser.add_argument('query', nargs='?', help="query to run with the sql command")
+    parser.add_argument('--year', type=int)
+    parser.add_argument('--semester', type=int)
+    parser.add_argument('--csv', help="write the results to this CSV file instead of printing them")
+    args = parser.parse_args()
+
+    if args.report is None:
+        for name, (title, _) in REPORTS.items():
+            print(f"{name:12} {title}")
+        sys.exit(0)
+    if args.report == 'sql' and not args.query:
+        parser.error("the sql command needs a query")
+
+    config = settings.load()
+    try:
+        con = connect(config['ANALYTICS_EXPORT_FOLDER'])
+        if args.report == 'sql':
+            result = con.sql(args.query)
+        else:
+            result = run_report(con, args.report, args.year, args.semester)
+    except RuntimeError as e:
+        print(e)
+        sys.exit(1)
+    except duckdb.Error as e:
+        print(f"Query failed: {e}")
+        sys.exit(1)
+    if args.csv:
+        result.write_csv(args.csv)
+        print(f"Wrote {args.csv}")
+    else:
+        result.show(max_rows=1000, max_width=200)
@@ -1,28 +1,96 @@
-import mysql.connector
-import routes  # Import the routes module
+"""
+University Assignment Portal - Application Factory
 
-from config import DATABASE_HOST, DATABASE_USER, DATABASE_PASSWORD, DATABASE_NAME
+create_app() builds the Flask app from settings.py (defaults, config.py and
+PORTAL_* environment variables). Nothing connects to MySQL at startup:
+connection pools are created by the first request that needs one, so the
+process starts quickly and still starts while the database is unavailable;
+/readyz reports when it can actually serve.
 
-try:
-    mydb = mysql.connector.connect(
-        host=DATABASE_HOST,
-        user=DATABASE_USER,
-        password=DATABASE_PASSWORD,
-        database=DATABASE_NAME
-    )
-    cursor = mydb.cursor()
+    python app.py                               # threaded server, drains on SIGTERM
+    gunicorn 'app:create_app()' --graceful-timeout 30
+    uvicorn asgi:application                    # see asgi.py
+"""
+import functools
+import os
 
-    print("Database connection successful!")
+from flask import Flask
+from werkzeug.middleware.proxy_fix import ProxyFix
 
-    # Test the connection (optional):
-    cursor.execute("SELECT VERSION()")
-    data = cursor.fetchone()
-    print("Database version:", data)
+import settings
+import db_router
+import json_provider
+import assets
+import audit
+import cold_storage
+import lifecycle
+import rate_limit
+import resumable
+import storage
+import structured_logging
+import submission_store
+import upload_pipeline
+import routes
 
-except mysql.connector.Error as err:
-    print(f"Database connection failed: {err}")
 
-app = routes.app  # Get the app instance from routes.py
+def create_app(overrides=None):
+    app = Flask(__name__)
+    settings.load(app.config)
+    if overrides:
+        app.config.update(overrides)
+    if not app.config.get('SECRET_KEY'):
+        raise RuntimeError("SECRET_KEY is not set; define it in config.py or PORTAL_SECRET_KEY")
+
+    # Behind a reverse proxy, take the client address (which rate limits are
+    # keyed by) and scheme from the X-Forwarded-* headers the proxies set
+    hops = app.config['PROXY_FIX_HOPS']
+    if hops:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops, x_host=hops, x_port=hops)
+
+    # First, so request IDs and timing also cover requests rejected by later hooks
+    structured_logging.init_app(app)
+    json_provider.install(app)
+    assets.init_app(app)
+    lifecycle.init_app(app)
+    rate_limit.init_app(app)
+    storage.init_app(app)
+
+    database = settings.database_config(app.config)
+    audit.init_app(app, database)
+    db_router.init_app(app, db_router.DatabaseRouter(
+        database,
+        replica_configs=app.config['DATABASE_REPLICAS'],
+        pool_size=app.config['DATABASE_POOL_SIZE'],
+        pool_timeout=app.config['DATABASE_POOL_TIMEOUT']
+    ))
+
+    # Validate uploads and render previews off the request path
+    pipeline = upload_pipeline.UploadPipeline(
+        os.path.join(app.config['UPLOAD_FOLDER'], 'previews'), database, app.config['UPLOAD_WORKERS'])
+    if routes.similarity is not None:
+        pipeline.hooks.append(functools.partial(routes.similarity.record_submission,
+                                                threshold=app.config['SIMILARITY_THRESHOLD']))
+    if app.extensions['storage']['s3'] is not None:
+        pipeline.storage_settings = app.extensions['storage']['s3'].settings
+    app.extensions['upload_pipeline'] = pipeline
+
+    app.register_blueprint(routes.portal)
+
+    # Prune submission versions beyond the retention limit in the background
+    submission_store.start_retention_worker(database, app.config['SUBMISSION_VERSIONS_KEPT'],
+                                            app.config['SUBMISSION_RETENTION_INTERVAL'],
+                                            storage.s3_settings(app.config))
+    # Remove resumable uploads abandoned part-way
+    resumable.start_expiry_worker(database, app.config['UPLOAD_FOLDER'], app.config['RESUMABLE_EXPIRY_INTERVAL'])
+    # Pack archived courses' assignment directories into the cold tier
+    cold_storage.start_tiering_worker(database, app.config['COLD_STORAGE_FOLDER'],
+                                      app.config['COLD_STORAGE_INTERVAL'])
+    return app
+
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    app = create_app()
+    if app.debug:
+        app.run(debug=True)
+    else:
+        lifecycle.serve(app, host=os.environ.get('HOST', '127.0.0.1'), port=int(os.environ.get('PORT', 5000)))
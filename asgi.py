@@ -0,0 +1,484 @@
+"""
+University Assignment Portal - ASGI Entry Point
+
+Serves the portal from an event loop:
+
+    uvicorn asgi:application --workers 4
+
+Hot read APIs registered with @application.route run natively on the loop
+against an aiomysql connection pool, so a request waiting on MySQL holds no
+thread. Every other request falls through to the Flask app, which runs
+unchanged on a bounded thread pool, so sync handlers keep working while
+routes are migrated one at a time.
+
+Request bodies are received on the loop before a Flask thread is taken, so
+slow uploads do not pin a worker. Bodies above SPOOL_MAX_SIZE are spooled to
+disk with the writes done on a separate file I/O pool. Resumable (tus) PATCH
+chunks are the exception: their body is passed to Flask as it arrives, so
+the bytes received before a client drops are still written (see
+resumable.py). Such a request holds its Flask thread while the chunk is sent.
+
+An async handler returns None to let Flask answer instead. This is how an
+unauthenticated request still gets the Flask redirect, and how routes keep
+working when aiomysql is not installed.
+
+Async handlers get the rate-limit policy of the Flask route with the same
+path, checked against the same buckets and keyed by the same client
+address (X-Forwarded-For is trusted for PROXY_FIX_HOPS proxies). They
+always read from the primary: they never see stale data, but do not spread
+load over DATABASE_REPLICAS the way db_router does for Flask's read-only
+routes.
+
+The Flask app is created on the first ASGI event (normally the lifespan
+startup), so importing this module needs no configuration.
+"""
+import asyncio
+import gzip
+import hashlib
+import logging
+import re
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.cookies import SimpleCookie
+from urllib.parse import parse_qsl
+
+from itsdangerous import BadSignature
+from werkzeug.exceptions import ClientDisconnected, HTTPException
+from werkzeug.http import parse_etags
+
+try:
+    import aiomysql
+    from pymysql import MySQLError
+except ImportError:  # async handlers fall back to Flask
+    aiomysql = None
+    MySQLError = Exception
+
+import routes
+import assets
+import json_provider
+import lifecycle
+import rate_limit
+import settings
+import structured_logging
+from app import create_app
+
+SPOOL_MAX_SIZE = 1024 * 1024  # request bytes kept in memory before spooling to disk
+
+log = logging.getLogger(__name__)
+
+
+class StreamedBody:
+    """wsgi.input that receives the ASGI body from the loop as the app reads it.
+
+    Reads happen on a Flask pool thread. A disconnect raises werkzeug's
+    ClientDisconnected after the bytes that did arrive have been read.
+    """
+
+    def __init__(self, receive, loop):
+        self.receive = receive
+        self.loop = loop
+        self.buffer = bytearray()
+        self.done = False
+
+    def read(self, size=-1):
+        while not self.buffer and not self.done:
+            message = asyncio.run_coroutine_threadsafe(self.receive(), self.loop).result()
+            if message['type'] == 'http.disconnect':
+                self.done = True
+                raise ClientDisconnected()
+            self.buffer += message.get('body', b'')
+            self.done = not message.get('more_body')
+        if size is None or size < 0:
+            size = len(self.buffer)
+        data = bytes(self.buffer[:size])
+        del self.buffer[:size]
+        return data
+
+
+def streams_body(scope):
+    """Whether the request is a tus PATCH, whose body Flask reads as it arrives."""
+    content_type = dict(scope.get('headers', [])).get(b'content-type', b'')
+    return scope['method'] == 'PATCH' and content_type.split(b';')[0].strip() == b'application/offset+octet-stream'
+
+
+class AsyncDatabase:
+    """An aiomysql pool created on first use."""
+
+    def __init__(self, config, maxsize):
+        self.config = config
+        self.maxsize = maxsize
+        self._pool = None
+        self._lock = None
+
+    async def pool(self):
+        if self._pool is None:
+            if self._lock is None:
+                self._lock = asyncio.Lock()
+            async with self._lock:
+                if self._pool is None:
+                    self._pool = await aiomysql.create_pool(
+                        minsize=1, maxsize=self.maxsize, autocommit=True, **self.config)
+        return self._pool
+
+    async def fetch(self, query, params=()):
+        """Run a query and return (column names, rows as tuples)."""
+        pool = await self.pool()
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(query, params)
+                rows = await cursor.fetchall()
+                return [c[0] for c in cursor.description], rows
+
+    async def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            await self._pool.wait_closed()
+            self._pool = None
+
+
+def forwarded_for(remote_addr, header, hops):
+    """The client address as ProxyFix(x_for=hops) sees it for the Flask routes."""
+    if hops and header:
+        addresses = header.split(',')
+        if len(addresses) >= hops:
+            return addresses[-hops].strip()
+    return remote_addr
+
+
+class AsyncRequest:
+    def __init__(self, app, scope, session):
+        self.app = app
+        self.scope = scope
+        self.session = session
+        self.method = scope['method']
+        self.path = scope['path']
+        self.args = dict(parse_qsl(scope['query_string'].decode('latin1')))
+        self.headers = {name.decode('latin1'): value.decode('latin1')
+                        for name, value in scope.get('headers', [])}
+        self.remote_addr = forwarded_for(scope['client'][0] if scope.get('client') else '',
+                                         self.headers.get('x-forwarded-for'),
+                                         app.flask_app.config['PROXY_FIX_HOPS'])
+        header = self.headers.get('x-request-id', '')
+        self.request_id = header if structured_logging.REQUEST_ID_PATTERN.match(header) else uuid.uuid4().hex
+
+
+class AsyncApp:
+    """ASGI application dispatching to async handlers or the Flask app."""
+
+    def __init__(self, flask_app, db=None, threads=None, io_threads=None):
+        """Thread counts default to the app's ASYNC_WORKER_THREADS and ASYNC_IO_THREADS."""
+        threads = threads or flask_app.config['ASYNC_WORKER_THREADS']
+        io_threads = io_threads or flask_app.config['ASYNC_IO_THREADS']
+        self.flask_app = flask_app
+        self.db = db
+        # Every handler thread may hold a connection at once
+        if 'db_router' in flask_app.extensions:
+            flask_app.extensions['db_router'].fit_threads(threads)
+        self.executor = ThreadPoolExecutor(threads, thread_name_prefix='wsgi')
+        self.io_executor = ThreadPoolExecutor(io_threads, thread_name_prefix='asgi-io')
+        self.routes = []
+
+    def route(self, pattern, methods=('GET',), needs_db=True):
+        """Register an async handler for a path regex; groups become arguments."""
+        def decorator(f):
+            self.routes.append((re.compile(pattern + '$'), set(methods), needs_db, f))
+            return f
+        return decorator
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+
+        for pattern, methods, needs_db, handler in self.routes:
+            match = pattern.match(scope['path'])
+            if not match or scope['method'] not in methods:
+                continue
+            if needs_db and (aiomysql is None or self.db is None):
+                break
+            request = AsyncRequest(self, scope, self._load_session(scope))
+            started = time.perf_counter()
+            limited, limit_headers = await self._rate_limit(request)
+            result = limited or await handler(request, *match.groups())
+            if result is not None:
+                await self._send_json(request, send, *result, extra_headers=limit_headers)
+                structured_logging.access_log.record(
+                    request.method, request.path, result[0], (time.perf_counter() - started) * 1000,
+                    request_id=request.request_id, user_id=request.session.get('user_id'))
+                return
+            break
+
+        await self._run_wsgi(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                # The server has stopped taking requests and finished open ones
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(None, lifecycle.drain, self.flask_app)
+                if self.db is not None:
+                    await self.db.close()
+                self.executor.shutdown(wait=True)
+                self.io_executor.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def _load_session(self, scope):
+        """Read the Flask session cookie; an invalid or missing one is an empty session."""
+        app = self.flask_app
+        cookies = SimpleCookie()
+        for name, value in scope.get('headers', []):
+            if name == b'cookie':
+                cookies.load(value.decode('latin1'))
+        morsel = cookies.get(app.config['SESSION_COOKIE_NAME'])
+        serializer = app.session_interface.get_signing_serializer(app)
+        if morsel is None or serializer is None:
+            return {}
+        try:
+            return serializer.loads(morsel.value, max_age=int(app.permanent_session_lifetime.total_seconds()))
+        except BadSignature:
+            return {}
+
+    async def _rate_limit(self, request):
+        """Apply the Flask route's rate-limit policy. Returns (429 result or None, headers)."""
+        app = self.flask_app
+        if 'rate_limit' not in app.extensions:
+            return None, []
+        try:
+            endpoint, _ = app.url_map.bind('localhost').match(request.path, request.method)
+        except HTTPException:
+            endpoint = None
+        policy = rate_limit.policy_for(app, endpoint)
+        if policy is None:
+            return None, []
+        limiter = app.extensions['rate_limit']
+        client = rate_limit.client_key(policy, request.session.get('user_id'), request.remote_addr)
+        if isinstance(limiter['store'], rate_limit.MemoryStore):
+            result = rate_limit.check(limiter, policy, client)
+        else:  # a network round trip; keep it off the loop
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self.io_executor, rate_limit.check, limiter, policy, client)
+        if result is None:
+            return None, []
+
+        allowed, remaining, full_in, retry_after = result
+        headers = [(name.lower().encode('latin1'), value.encode('latin1'))
+                   for name, value in rate_limit.headers(policy, remaining, full_in).items()]
+        if allowed:
+            return None, headers
+        headers.append((b'retry-after', str(retry_after).encode()))
+        return (429, {'message': rate_limit.LIMITED_MESSAGE, 'retry_after': retry_after}), headers
+
+    async def _send_json(self, request, send, status, body, extra_headers=()):
+        if not isinstance(body, bytes):
+            body = (self.flask_app.json.dumps(body) + '\n').encode('utf-8')
+        headers = [(b'content-type', b'application/json'), (b'vary', b'Accept-Encoding'),
+                   (b'x-request-id', request.request_id.encode()), *extra_headers]
+        if status == 200:
+            # Same weak ETag as response_cache gives the Flask handlers
+            etag = hashlib.sha1(body).hexdigest()[:20]
+            headers += [(b'etag', f'W/"{etag}"'.encode()), (b'cache-control', b'private, no-cache')]
+            if parse_etags(request.headers.get('if-none-match')).contains_weak(etag):
+                await send({'type': 'http.response.start', 'status': 304, 'headers': headers[1:]})
+                await send({'type': 'http.response.body', 'body': b''})
+                return
+        if len(body) >= self.flask_app.config['COMPRESS_MIN_SIZE'] and 'gzip' in request.headers.get('accept-encoding', ''):
+            loop = asyncio.get_running_loop()
+            body = await loop.run_in_executor(self.io_executor, gzip.compress, body, assets.DYNAMIC_GZIP_LEVEL)
+            headers.append((b'content-encoding', b'gzip'))
+        headers.append((b'content-length', str(len(body)).encode()))
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': body})
+
+    async def _send_simple(self, send, status, text):
+        await send({'type': 'http.response.start', 'status': status,
+                    'headers': [(b'content-type', b'text/plain; charset=utf-8')]})
+        await send({'type': 'http.response.body', 'body': text.encode('utf-8')})
+
+    async def _run_wsgi(self, scope, receive, send):
+        loop = asyncio.get_running_loop()
+        if streams_body(scope):
+            # Content-Length and MAX_CONTENT_LENGTH are checked by werkzeug
+            await loop.run_in_executor(self.executor, self._call_wsgi, scope,
+                                       StreamedBody(receive, loop), loop, send)
+            return
+        limit = self.flask_app.config.get('MAX_CONTENT_LENGTH')
+        body = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+        try:
+            size = 0
+            while True:
+                message = await receive()
+                if message['type'] == 'http.disconnect':
+                    return
+                chunk = message.get('body', b'')
+                size += len(chunk)
+                if limit and size > limit:
+                    await self._send_simple(send, 413, 'Request Entity Too Large')
+                    return
+                if size > SPOOL_MAX_SIZE:
+                    await loop.run_in_executor(self.io_executor, body.write, chunk)
+                else:
+                    body.write(chunk)
+                if not message.get('more_body'):
+                    break
+            body.seek(0)
+            await loop.run_in_executor(self.executor, self._call_wsgi, scope, body, loop, send)
+        finally:
+            body.close()
+
+    def _call_wsgi(self, scope, body, loop, send):
+        """Run the Flask app in a pool thread, sending its output through the loop."""
+        def sync_send(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info and response.get('started'):
+                raise exc_info[1].with_traceback(exc_info[2])
+            response['start'] = {
+                'type': 'http.response.start',
+                'status': int(status.split(' ', 1)[0]),
+                'headers': [(name.lower().encode('latin1'), value.encode('latin1'))
+                            for name, value in headers]
+            }
+
+        result = self.flask_app.wsgi_app(build_environ(scope, body), start_response)
+        try:
+            for chunk in result:
+                if not chunk:
+                    continue
+                if not response.get('started'):
+                    sync_send(response['start'])
+                    response['started'] = True
+                sync_send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            if not response.get('started'):
+                sync_send(response['start'])
+            sync_send({'type': 'http.response.body', 'body': b''})
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+
+
+def build_environ(scope, body):
+    script_name = scope.get('root_path', '')
+    path = scope['path']
+    if script_name and path.startswith(script_name):
+        path = path[len(script_name):]
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': script_name.encode('utf-8').decode('latin1'),
+        'PATH_INFO': path.encode('utf-8').decode('latin1'),
+        'QUERY_STRING': scope['query_string'].decode('latin1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': scope['client'][0] if scope.get('client') else '',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin1')
+        if name == 'content-length':
+            key = 'CONTENT_LENGTH'
+        elif name == 'content-type':
+            key = 'CONTENT_TYPE'
+        else:
+            key = 'HTTP_' + name.upper().replace('-', '_')
+        value = value.decode('latin1')
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+# (pattern, methods, needs_db, handler) of the async routes, added to the app by create_application()
+ASYNC_ROUTES = []
+
+
+def async_route(pattern, methods=('GET',), needs_db=True):
+    """Register an async handler for the portal; see AsyncApp.route()."""
+    def decorator(f):
+        ASYNC_ROUTES.append((pattern, methods, needs_db, f))
+        return f
+    return decorator
+
+
+def create_application():
+    """The portal's Flask app behind AsyncApp, with the async routes."""
+    flask_app = create_app()
+    database = settings.database_config(flask_app.config)
+    database['db'] = database.pop('database')  # aiomysql's name for it
+    app = AsyncApp(flask_app, AsyncDatabase(database, maxsize=flask_app.config['DATABASE_POOL_SIZE']))
+    for pattern, methods, needs_db, handler in ASYNC_ROUTES:
+        app.route(pattern, methods, needs_db)(handler)
+    return app
+
+
+class LazyApplication:
+    """ASGI callable that builds the real application on its first event."""
+
+    def __init__(self, factory):
+        self.factory = factory
+        self._app = None
+        self._lock = threading.Lock()
+
+    async def __call__(self, scope, receive, send):
+        if self._app is None:
+            with self._lock:
+                if self._app is None:
+                    self._app = self.factory()
+        await self._app(scope, receive, send)
+
+
+application = LazyApplication(create_application)
+
+
+# ============ Async Routes ============
+@async_route(r'/api/user/role', needs_db=False)
+async def user_role(request):
+    if 'user_id' not in request.session:
+        return None
+    return 200, {'role': request.session.get('role')}
+
+
+@async_route(r'/api/courses/(\d+)')
+async def course_details(request, course_id):
+    if 'user_id' not in request.session:
+        return None
+    try:
+        columns, rows = await request.app.db.fetch(routes.COURSE_DETAILS_QUERY, (int(course_id),))
+    except MySQLError as err:
+        log.error("Error fetching course details: %s", err, extra={'request_id': request.request_id})
+        return 500, {'message': 'Failed to fetch course details'}
+    if not rows:
+        return 404, {'message': 'Course not found'}
+    return 200, routes.course_details(dict(zip(columns, rows[0])))
+
+
+@async_route(r'/api/assignments')
+async def assignments(request):
+    if 'user_id' not in request.session:
+        return None
+    query = routes.assignments_query(request.session['user_id'], request.args.get('courseId'),
+                                     request.args.get('status'), request.args.get('sortBy', 'dueDate'))
+    try:
+        columns, rows = await request.app.db.fetch(*query)
+    except MySQLError as err:
+        log.error("Error fetching assignments: %s", err, extra={'request_id': request.request_id})
+        return 500, {'message': 'Failed to fetch assignments'}
+    with request.app.flask_app.app_context():  # the encoder falls back to app.json without orjson
+        return 200, json_provider.encode_rows(columns, rows, 'assignments')
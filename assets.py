@@ -0,0 +1,188 @@
+"""
+University Assignment Portal - Static Assets and Compression
+
+Page CSS and JavaScript live in static/ and are referenced from templates
+through asset_url(), which puts the file's content hash in its name:
+
+    {{ asset_url('js/login.js') }}  ->  /assets/js/login.3f9c2a71d0.js
+
+A fingerprinted URL always refers to the same bytes, so it is served with a
+one-year immutable Cache-Control and repeat visits do not download it again.
+Running this module as a script writes .gz (and, with the brotli package,
+.br) copies of the static files next to them at build time; /assets serves
+the best variant the client accepts.
+
+JSON and HTML responses above COMPRESS_MIN_SIZE are compressed on the fly.
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import sys
+import zlib
+
+from flask import current_app, request, url_for, send_file, abort
+
+import settings
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+STATIC_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+HASH_LENGTH = 10
+COMPRESSIBLE_TYPES = {'application/json', 'text/html', 'text/css', 'text/javascript',
+                      'application/javascript', 'image/svg+xml', 'text/plain'}
+PRECOMPRESS_EXTENSIONS = ('.css', '.js', '.svg', '.json', '.txt')
+# Quality 4 keeps on-the-fly brotli about as fast as gzip level 6
+DYNAMIC_BROTLI_QUALITY = 4
+DYNAMIC_GZIP_LEVEL = 6
+
+FINGERPRINTED = re.compile(r'^(?P<stem>.+)\.(?P<hash>[0-9a-f]{%d})(?P<ext>\.[^./]+)$' % HASH_LENGTH)
+
+_hashes = {}  # path -> (mtime, hash)
+
+
+def content_hash(path):
+    """Short content hash of a static file, recomputed when the file changes."""
+    full_path = os.path.join(STATIC_FOLDER, path)
+    mtime = os.path.getmtime(full_path)
+    cached = _hashes.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    with open(full_path, 'rb') as f:
+        digest = hashlib.sha256(f.read()).hexdigest()[:HASH_LENGTH]
+    _hashes[path] = (mtime, digest)
+    return digest
+
+
+def asset_url(path):
+    """URL of a static file with its content hash in the name."""
+    stem, ext = os.path.splitext(path)
+    return url_for('asset', filename=f"{stem}.{content_hash(path)}{ext}")
+
+
+def _accepted_encodings():
+    accepted = request.accept_encodings
+    encodings = []
+    if brotli is not None and accepted['br']:
+        encodings.append('br')
+    if accepted['gzip']:
+        encodings.append('gzip')
+    return encodings
+
+
+def serve_asset(filename):
+    match = FINGERPRINTED.match(filename)
+    path = match.group('stem') + match.group('ext') if match else filename
+    full_path = os.path.normpath(os.path.join(STATIC_FOLDER, path))
+    if not full_path.startswith(STATIC_FOLDER + os.sep) or not os.path.isfile(full_path):
+        abort(404)
+
+    # A stale fingerprint (page rendered before a deploy) still gets the
+    # current file, but must not be cached as if it were the old one
+    immutable = match is not None and match.group('hash') == content_hash(path)
+
+    served_path, encoding = full_path, None
+    for candidate in _accepted_encodings():
+        suffix = '.br' if candidate == 'br' else '.gz'
+        variant = full_path + suffix
+        if os.path.exists(variant) and os.path.getmtime(variant) >= os.path.getmtime(full_path):
+            served_path, encoding = variant, candidate
+            break
+
+    mimetype = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+    response = send_file(served_path, mimetype=mimetype, conditional=True,
+                         max_age=IMMUTABLE_MAX_AGE if immutable else 0)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    if immutable:
+        response.headers['Cache-Control'] = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    else:
+        response.headers['Cache-Control'] = 'no-cache'
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def _compress_stream(chunks):
+    compressor = zlib.compressobj(DYNAMIC_GZIP_LEVEL, zlib.DEFLATED, 31)  # 31: gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def compress_response(response):
+    """Compress JSON/HTML responses when the client accepts it."""
+    if (response.status_code < 200 or response.status_code >= 300 or response.status_code == 204
+            or response.direct_passthrough or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_TYPES or request.method == 'HEAD'):
+        return response
+
+    encodings = _accepted_encodings()
+    if not encodings:
+        return response
+
+    if response.is_streamed:
+        # Streamed listings are gzipped chunk by chunk so they keep streaming
+        if 'gzip' not in encodings:
+            return response
+        response.response = _compress_stream(response.response)
+        response.headers.pop('Content-Length', None)
+        encoding = 'gzip'
+    else:
+        data = response.get_data()
+        if len(data) < current_app.config['COMPRESS_MIN_SIZE']:
+            return response
+        encoding = encodings[0]
+        if encoding == 'br':
+            data = brotli.compress(data, quality=DYNAMIC_BROTLI_QUALITY)
+        else:
+            data = gzip.compress(data, compresslevel=DYNAMIC_GZIP_LEVEL, mtime=0)
+        response.set_data(data)
+
+    response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    # The encoded bytes differ from the original, so a strong validator no longer holds
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_app(app):
+    app.add_url_rule('/assets/<path:filename>', 'asset', serve_asset)
+    app.jinja_env.globals['asset_url'] = asset_url
+    app.after_request(compress_response)
+
+
+def build(static_folder, min_size):
+    """Write .gz and .br variants of every compressible static file of at least `min_size` bytes."""
+    written = 0
+    for root, _, files in os.walk(static_folder):
+        for name in files:
+            if not name.endswith(PRECOMPRESS_EXTENSIONS):
+                continue
+            path = os.path.join(root, name)
+            with open(path, 'rb') as f:
+                data = f.read()
+            if len(data) < min_size:
+                continue
+            variants = {'.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+            if brotli is not None:
+                variants['.br'] = brotli.compress(data, quality=11)
+            for suffix, compressed in variants.items():
+                with open(path + suffix, 'wb') as f:
+                    f.write(compressed)
+                written += 1
+            print(f"{os.path.relpath(path, static_folder)}: {len(data)} bytes -> "
+                  + ", ".join(f"{suffix[1:]} {len(c)}" for suffix, c in variants.items()))
+    return written
+
+
+if __name__ == '__main__':
+    build(sys.argv[1] if len(sys.argv) > 1 else STATIC_FOLDER, settings.load()['COMPRESS_MIN_SIZE'])
@@ -0,0 +1,288 @@
+"""
+University Assignment Portal - Audit Log
+
+Write routes call record() after a change is committed:
+
+    audit.record('course.update', 'course', course_id, before=old_row, after=new_values)
+
+The entry (actor and role from the session, the request ID from
+structured_logging.py, client IP and the time) is appended to a bounded in-memory buffer, which takes a lock and a
+deque append, and the request moves on. A background thread drains the
+buffer every AUDIT_FLUSH_INTERVAL seconds, or as soon as AUDIT_BATCH_SIZE
+entries are waiting, serializes them and inserts them into AuditLog with one
+multi-row INSERT per batch.
+
+If the database cannot be reached, batches are appended to a local spool
+file (AUDIT_SPOOL_PATH, JSON lines) and replayed once it is back. Every
+entry carries an EventID, so a replay never duplicates rows. A line that
+cannot be read back (e.g. cut short by a crash) is moved to
+AUDIT_SPOOL_PATH.bad instead of holding up the rest. A full buffer also
+spills to the spool rather than dropping or overwriting entries, and on
+shutdown the buffer is flushed.
+"""
+import atexit
+import datetime
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import Counter, deque
+
+import mysql.connector
+from flask import current_app, request, session
+
+import structured_logging
+
+COLUMNS = ('EventID', 'OccurredAt', 'ActorID', 'ActorRole', 'Action', 'EntityType', 'EntityID',
+           'BeforeValue', 'AfterValue', 'RequestID', 'IPAddress')
+RETRY_INTERVAL = 30  # seconds to keep spooling after the database failed
+
+log = logging.getLogger(__name__)
+stats = Counter()  # 'recorded' | 'written' | 'spooled' | 'replayed' | 'quarantined' -> count
+
+
+def _json(value):
+    return None if value is None else json.dumps(value, default=str, separators=(',', ':'))
+
+
+def _row(entry):
+    """INSERT parameters of a buffered entry."""
+    event_id, occurred_at, actor_id, actor_role, action, entity_type, entity_id, before, after, req_id, ip = entry
+    return (event_id, occurred_at.isoformat(sep=' '), actor_id, actor_role, action, entity_type,
+            None if entity_id is None else str(entity_id), _json(before), _json(after), req_id, ip)
+
+
+class AuditLog:
+    """Buffers audit entries and writes them to the database in batches."""
+
+    def __init__(self, db_config, spool_path, capacity=10000, batch_size=200, flush_interval=1.0):
+        self.db_config = db_config
+        self.spool_path = spool_path
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._buffer = deque()
+        self._ready = threading.Condition()
+        self._spool_lock = threading.Lock()
+        self._closed = False
+        self._db = None
+        self._retry_at = 0
+        self._worker = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+
+    def start(self):
+        self._worker.start()
+        atexit.register(self.close)
+        return self
+
+    def append(self, entry):
+        with self._ready:
+            if len(self._buffer) < self.capacity:
+                self._buffer.append(entry)
+                if len(self._buffer) >= self.batch_size:
+                    self._ready.notify()
+                return
+        # The writer is far behind; keep the entry on disk instead
+        self._spool([_row(entry)])
+
+    def close(self, timeout=10):
+        """Flush the buffer and stop the writer. Returns False if it did not finish in time."""
+        with self._ready:
+            self._closed = True
+            self._ready.notify()
+        if self._worker.is_alive():
+            self._worker.join(timeout)
+        return not self._worker.is_alive()
+
+    def _run(self):
+        while True:
+            with self._ready:
+                self._ready.wait_for(lambda: len(self._buffer) >= self.batch_size or self._closed,
+                                     timeout=self.flush_interval)
+                entries = list(self._buffer)
+                self._buffer.clear()
+                closed = self._closed
+            if entries or os.path.exists(self.spool_path):
+                try:
+                    self._write([_row(entry) for entry in entries])
+                except (OSError, ValueError) as e:
+                    log.error("Error spooling audit log: %s", e)
+            if closed:
+                self._disconnect()
+                return
+
+    def _write(self, rows):
+        if time.monotonic() < self._retry_at:
+            self._spool(rows)
+            return
+        try:
+            db = self._connect()
+            try:
+                self._replay(db)
+            except OSError as e:
+                # The spool stays for the next run; the new rows still go in
+                log.error("Error replaying audit spool: %s", e)
+            self._insert(db, rows)
+            stats['written'] += len(rows)
+        except mysql.connector.Error as err:
+            log.error("Error writing audit log, spooling: %s", err)
+            self._disconnect()
+            self._retry_at = time.monotonic() + RETRY_INTERVAL
+            self._spool(rows)
+
+    def _connect(self):
+        if self._db is None:
+            self._db = mysql.connector.connect(**self.db_config)
+        return self._db
+
+    def _disconnect(self):
+        if self._db is not None:
+            try:
+                self._db.close()
+            except mysql.connector.Error:
+                pass
+            self._db = None
+
+    def _insert(self, db, rows):
+        """Insert rows in multi-row statements and commit them together."""
+        if not rows:
+            return
+        cursor = db.cursor()
+        try:
+            placeholders = '(' + ', '.join(['%s'] * len(COLUMNS)) + ')'
+            for start in range(0, len(rows), self.batch_size):
+                batch = rows[start:start + self.batch_size]
+                # IGNORE skips entries a previous, interrupted replay already wrote
+                cursor.execute(f"""
+                    INSERT IGNORE INTO AuditLog ({', '.join(COLUMNS)})
+                    VALUES {', '.join([placeholders] * len(batch))}
+                """, [value for row in batch for value in row])
+            db.commit()
+        except mysql.connector.Error:
+            db.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    def _spool(self, rows):
+        if not rows:
+            return
+        with self._spool_lock:
+            with open(self.spool_path, 'a+b') as f:
+                # End a line cut short by a crash so it does not swallow the next one
+                if f.tell():
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b'\n':
+                        f.write(b'\n')
+                for row in rows:
+                    f.write(json.dumps(row).encode('utf-8') + b'\n')
+                f.flush()
+                os.fsync(f.fileno())
+        stats['spooled'] += len(rows)
+
+    @staticmethod
+    def _parse(line):
+        """INSERT parameters of a spooled line, or None if it cannot be used."""
+        try:
+            row = json.loads(line)
+        except ValueError:
+            return None
+        if not isinstance(row, list) or len(row) != len(COLUMNS):
+            return None
+        return tuple(row)
+
+    def _replay(self, db):
+        """Insert the entries spooled while the database was unavailable."""
+        replay_path = self.spool_path + '.replay'
+        with self._spool_lock:
+            if not os.path.exists(replay_path):
+                if not os.path.exists(self.spool_path):
+                    return
+                os.replace(self.spool_path, replay_path)
+        # A replay file left by an interrupted run is finished first
+        rows, bad = [], []
+        with open(replay_path, encoding='utf-8', errors='replace') as f:
+            for line in f:
+                if line.strip():
+                    row = self._parse(line)
+                    if row is None:
+                        bad.append(line if line.endswith('\n') else line + '\n')
+                    else:
+                        rows.append(row)
+        self._insert(db, rows)
+        if bad:
+            with open(self.spool_path + '.bad', 'a', encoding='utf-8') as f:
+                f.writelines(bad)
+            stats['quarantined'] += len(bad)
+            log.warning("Moved %s unreadable spooled audit entries to %s.bad", len(bad), self.spool_path)
+        os.remove(replay_path)
+        stats['replayed'] += len(rows)
+        log.info("Replayed %s spooled audit entries", len(rows))
+
+
+def record(action, entity_type, entity_id=None, before=None, after=None):
+    """Queue an audit entry for a change made by the current request.
+
+    `before` and `after` are serialized later by the writer thread, so pass
+    values the handler does not modify afterwards.
+    """
+    current_app.extensions['audit_log'].append((
+        uuid.uuid4().hex,
+        datetime.datetime.now(),
+        session.get('user_id'),
+        session.get('role'),
+        action,
+        entity_type,
+        entity_id,
+        before,
+        after,
+        structured_logging.request_id(),
+        request.remote_addr
+    ))
+    stats['recorded'] += 1
+
+
+def query(cursor, actor_id=None, action=None, entity_type=None, entity_id=None, request_id=None,
+          since=None, until=None, before=None, limit=50):
+    """Audit entries matching the filters, newest first; page with before=<AuditID>."""
+    conditions, params = [], []
+    for column, value in (('ActorID', actor_id), ('Action', action), ('EntityType', entity_type),
+                          ('EntityID', entity_id), ('RequestID', request_id)):
+        if value is not None:
+            conditions.append(f"{column} = %s")
+            params.append(value)
+    if since is not None:
+        conditions.append("OccurredAt >= %s")
+        params.append(since)
+    if until is not None:
+        conditions.append("OccurredAt < %s")
+        params.append(until)
+    if before is not None:
+        conditions.append("AuditID < %s")
+        params.append(before)
+
+    cursor.execute(f"""
+        SELECT AuditID, OccurredAt, ActorID, ActorRole, Action, EntityType, EntityID,
+               BeforeValue, AfterValue, RequestID, IPAddress
+        FROM AuditLog
+        {'WHERE ' + ' AND '.join(conditions) if conditions else ''}
+        ORDER BY AuditID DESC
+        LIMIT %s
+    """, (*params, limit))
+    entries = cursor.fetchall()
+    for entry in entries:
+        for column in ('BeforeValue', 'AfterValue'):
+            if isinstance(entry[column], (str, bytes)):
+                entry[column] = json.loads(entry[column])
+    return entries
+
+
+def init_app(app, db_config):
+    app.extensions['audit_log'] = AuditLog(
+        db_config,
+        app.config['AUDIT_SPOOL_PATH'],
+        capacity=app.config['AUDIT_BUFFER_SIZE'],
+        batch_size=app.config['AUDIT_BATCH_SIZE'],
+        flush_interval=app.config['AUDIT_FLUSH_INTERVAL']
+    ).start()
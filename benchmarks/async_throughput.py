@@ -0,0 +1,90 @@
+"""
+University Assignment Portal - Async Throughput Benchmark
+
+Compares a request that waits on I/O in a sync Flask handler (running on the
+ASGI entry point's bounded thread pool, like a threaded WSGI worker) with the
+same wait in a native async handler on the event loop. The wait stands in for
+a MySQL round trip, so no database is needed. Requests are driven straight
+into the ASGI application, so client and socket overhead do not blur the
+comparison.
+
+    python benchmarks/async_throughput.py [concurrency] [requests] [latency_ms]
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, jsonify
+
+import settings
+from asgi import AsyncApp
+
+def build_app(latency):
+    flask_app = Flask(__name__)
+    settings.load(flask_app.config)
+
+    @flask_app.route('/sync')
+    def sync_handler():
+        time.sleep(latency)
+        return jsonify({'ok': True})
+
+    app = AsyncApp(flask_app)
+
+    @app.route(r'/async', needs_db=False)
+    async def async_handler(request):
+        await asyncio.sleep(latency)
+        return 200, {'ok': True}
+
+    return app
+
+
+async def request(app, path):
+    scope = {'type': 'http', 'method': 'GET', 'path': path, 'query_string': b'',
+             'headers': [], 'http_version': '1.1', 'scheme': 'http'}
+    status = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+
+    await app(scope, receive, send)
+    assert status == [200], status
+
+
+async def load(app, path, concurrency, total):
+    limit = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with limit:
+            start = time.perf_counter()
+            await request(app, path)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return total / elapsed, latencies[len(latencies) // 2] * 1000, latencies[int(len(latencies) * 0.99)] * 1000
+
+
+def main():
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    total = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    latency = (int(sys.argv[3]) if len(sys.argv) > 3 else 50) / 1000
+
+    app = build_app(latency)
+    print(f"{total} requests, {concurrency} concurrent, {latency * 1000:.0f} ms I/O wait each")
+    for label, path in ((f"threaded ({app.flask_app.config['ASYNC_WORKER_THREADS']} threads)", '/sync'), ('async handler', '/async')):
+        rate, p50, p99 = asyncio.run(load(app, path, concurrency, total))
+        print(f"  {label:24} {rate:8.0f} req/s   p50 {p50:7.1f} ms   p99 {p99:7.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+University Assignment Portal - JSON Serialization Benchmark
+
+Compares the old listing path (dictionary rows through Flask's default
+provider and jsonify) with the orjson provider and stream_rows(), for a
+/api/assignments-shaped result set. Fetching is simulated with in-memory
+rows, so no database is needed; the numbers show how much of a request is
+spent building and encoding the JSON.
+
+    python benchmarks/json_serialization.py [rows]
+"""
+import datetime
+import os
+import sys
+import time
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, jsonify
+from flask.json.provider import DefaultJSONProvider
+
+import json_provider
+
+COLUMNS = ['AssignmentID', 'CourseID', 'Title', 'Description', 'DueDate', 'CreatedAt',
+           'FilePath', 'MaxPoints', 'Weight', 'Status', 'CourseName']
+
+
+def make_rows(count):
+    due = datetime.datetime(2024, 5, 1, 23, 59)
+    return [
+        (i, i % 40, f"Assignment {i}", "Implement the described solution and submit a report. " * 4,
+         due, due - datetime.timedelta(days=14), f"uploads/course_{i % 40}/assignment_{i}.pdf",
+         100, Decimal('12.50'), 'pending', f"Course {i % 40}")
+        for i in range(count)
+    ]
+
+
+class RowCursor:
+    """Stands in for an executed tuple cursor."""
+
+    def __init__(self, rows):
+        self.description = [(name,) for name in COLUMNS]
+        self._rows = rows
+        self._pos = 0
+
+    def fetchall(self):
+        rows, self._pos = self._rows[self._pos:], len(self._rows)
+        return rows
+
+    def fetchmany(self, size):
+        rows = self._rows[self._pos:self._pos + size]
+        self._pos += len(rows)
+        return rows
+
+    def close(self):
+        pass
+
+
+def build_app(rows, fast):
+    app = Flask(__name__)
+    if fast:
+        json_provider.install(app)
+    else:
+        app.json = DefaultJSONProvider(app)
+
+    @app.route('/empty')
+    def empty():
+        RowCursor(rows).fetchall()
+        return jsonify({'assignments': []}), 200
+
+    @app.route('/assignments')
+    def assignments():
+        cursor = RowCursor(rows)
+        if fast:
+            return json_provider.stream_rows(cursor, 'assignments'), 200
+        # What a dictionary cursor hands back
+        return jsonify({'assignments': [dict(zip(COLUMNS, row)) for row in cursor.fetchall()]}), 200
+
+    return app
+
+
+def timed(client, path, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.get(path)
+        response.get_data()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, len(response.get_data())
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    rows = make_rows(count)
+    print(f"{count} rows")
+    for label, fast in (('default provider, dict rows', False), ('orjson + stream_rows', True)):
+        client = build_app(rows, fast).test_client()
+        baseline, _ = timed(client, '/empty', 20)
+        total, size = timed(client, '/assignments', 10)
+        share = (total - baseline) / total * 100
+        print(f"  {label:30} {total:7.1f} ms/request  {share:4.0f}% serialization  {size / 1024:.0f} KiB")
+
+
+if __name__ == '__main__':
+    main()
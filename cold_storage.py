@@ -0,0 +1,255 @@
+"""
+University Assignment Portal - Cold Storage
+
+Once a course is archived (see term_archive.py) its assignment directories
+are never written again. This job packs each of them into a single zip file
+on the cold volume (COLD_STORAGE_FOLDER) and removes the loose files:
+
+    <COLD_STORAGE_FOLDER>/assignment_<id>.zip
+
+The zip central directory is the index: one member is read by seeking to it,
+without extracting the rest of the archive. Blobs that are already compressed
+(.gz versions, PDFs, Office files) are stored as-is; other files are deflated.
+ColdArchiveMember maps every original path to its archive member, and
+open_file()/open_blob() fall back to that catalog when a path is no longer on
+disk, so downloads keep working. Semester rollover extracts packed handouts
+with packed_files()/extract_file() when it clones an archived course.
+
+    python cold_storage.py          # pack every closed assignment not packed yet
+"""
+import gzip
+import hashlib
+import logging
+import os
+import shutil
+import sys
+import threading
+import time
+import zipfile
+
+import mysql.connector
+
+import settings
+import storage
+import submission_store
+
+# Formats that deflate would not shrink
+STORED_EXTENSIONS = {'gz', 'zip', 'pdf', 'docx', 'xlsx', 'pptx', 'png', 'jpg', 'jpeg', 'gif', 'br'}
+
+log = logging.getLogger(__name__)
+
+
+def path_hash(path):
+    return hashlib.sha256(path.encode('utf-8')).hexdigest()
+
+
+def find_member(db, path):
+    """(archive path, member name) holding a packed file, or None."""
+    cursor = db.cursor()
+    cursor.execute("""
+        SELECT ca.ArchivePath, m.MemberName
+        FROM ColdArchiveMember m
+        JOIN ColdArchive ca ON ca.AssignmentID = m.AssignmentID
+        WHERE m.PathHash = %s
+    """, (path_hash(path),))
+    row = cursor.fetchone()
+    cursor.close()
+    return row
+
+
+def open_file(db, path):
+    """Open a stored file for reading, from its storage backend or its cold archive.
+
+    Raises FileNotFoundError if it is in neither place.
+    """
+    if storage.is_remote(path):
+        return storage.for_path(path).open(path)
+    if os.path.exists(path):
+        return open(path, 'rb')
+    location = find_member(db, path)
+    if location is None:
+        raise FileNotFoundError(path)
+    archive_path, member = location
+    # The member keeps the archive file open after the ZipFile is closed
+    with zipfile.ZipFile(archive_path) as archive:
+        return archive.open(member)
+
+
+def packed_files(db, assignment_id, folder=''):
+    """[(original path, member name)] of an assignment's packed files, optionally under a subfolder."""
+    cursor = db.cursor()
+    cursor.execute("""
+        SELECT Path, MemberName FROM ColdArchiveMember
+        WHERE AssignmentID = %s AND MemberName LIKE %s
+        ORDER BY MemberName
+    """, (assignment_id, folder.rstrip('/') + '/%' if folder else '%'))
+    rows = cursor.fetchall()
+    cursor.close()
+    return rows
+
+
+def extract_file(db, path, target):
+    """Write a stored file, packed or not, to a new local path.
+
+    Returns False if the file is in neither place.
+    """
+    try:
+        source = open_file(db, path)
+    except FileNotFoundError:
+        return False
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    tmp_path = target + '.tmp'
+    with source, open(tmp_path, 'wb') as f:
+        shutil.copyfileobj(source, f)
+    os.replace(tmp_path, target)
+    return True
+
+
+def open_blob(db, blob_path):
+    """submission_store.open_blob() that also reads packed blobs."""
+    if os.path.exists(blob_path):
+        return submission_store.open_blob(blob_path)
+    f = open_file(db, blob_path)
+    if submission_store.is_compressed(blob_path):
+        return gzip.GzipFile(fileobj=f, mode='rb')
+    return f
+
+
+def pack_directory(directory, archive_path):
+    """Zip every file under `directory`. Returns {original path: member name}."""
+    members = {}
+    tmp_path = archive_path + '.tmp'
+    with zipfile.ZipFile(tmp_path, 'w', allowZip64=True) as archive:
+        for root, _, files in os.walk(directory):
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                member = os.path.relpath(path, directory).replace(os.sep, '/')
+                compression = (zipfile.ZIP_STORED if submission_store.file_extension(name) in STORED_EXTENSIONS
+                               else zipfile.ZIP_DEFLATED)
+                archive.write(path, member, compress_type=compression)
+                members[path] = member
+
+    # Check every CRC before the originals are deleted
+    with zipfile.ZipFile(tmp_path) as archive:
+        bad = archive.testzip()
+    if bad is not None:
+        os.remove(tmp_path)
+        raise OSError(f"Corrupt member {bad} in {tmp_path}")
+    with open(tmp_path, 'rb') as f:
+        os.fsync(f.fileno())
+    os.replace(tmp_path, archive_path)
+    return members
+
+
+def _directory_size(directory):
+    return sum(os.path.getsize(os.path.join(root, name))
+               for root, _, files in os.walk(directory) for name in files)
+
+
+def pack_assignment(db, assignment_id, directory, cold_folder):
+    """Move one assignment directory into the cold tier. Returns the number of files packed."""
+    os.makedirs(cold_folder, exist_ok=True)
+    archive_path = os.path.join(cold_folder, f'assignment_{assignment_id}.zip')
+    original_size = _directory_size(directory)
+    members = pack_directory(directory, archive_path)
+
+    cursor = db.cursor()
+    try:
+        cursor.execute("""
+            INSERT INTO ColdArchive (AssignmentID, ArchivePath, FileCount, OriginalSize, ArchiveSize)
+            VALUES (%s, %s, %s, %s, %s)
+        """, (assignment_id, archive_path, len(members), original_size, os.path.getsize(archive_path)))
+        cursor.executemany("""
+            INSERT INTO ColdArchiveMember (PathHash, Path, AssignmentID, MemberName)
+            VALUES (%s, %s, %s, %s)
+        """, [(path_hash(path), path, assignment_id, member) for path, member in members.items()])
+        db.commit()
+    except mysql.connector.Error:
+        db.rollback()
+        os.remove(archive_path)
+        raise
+    finally:
+        cursor.close()
+
+    # Only delete once the catalog points at the archive
+    shutil.rmtree(directory)
+    return len(members)
+
+
+def tier_closed_assignments(db, cold_folder, limit=None):
+    """Pack the directories of archived courses' assignments. Returns (assignments, files) packed."""
+    cursor = db.cursor()
+    cursor.execute(f"""
+        SELECT a.AssignmentID, a.FilePath, ca.AssignmentID IS NOT NULL
+        FROM Assignment a
+        JOIN Course c ON c.CourseID = a.CourseID
+        LEFT JOIN ColdArchive ca ON ca.AssignmentID = a.AssignmentID
+        WHERE c.Archived = 1 AND a.FilePath IS NOT NULL
+        ORDER BY a.AssignmentID
+        {'LIMIT %s' if limit else ''}
+    """, (limit,) if limit else ())
+    rows = cursor.fetchall()
+    cursor.close()
+
+    assignments = files = 0
+    for assignment_id, directory, packed in rows:
+        if not os.path.isdir(directory):
+            continue
+        if packed:
+            # Interrupted after the catalog was written
+            shutil.rmtree(directory)
+            continue
+        try:
+            files += pack_assignment(db, assignment_id, directory, cold_folder)
+            assignments += 1
+        except (OSError, mysql.connector.Error) as e:
+            log.error("Error packing assignment %s: %s", assignment_id, e)
+    return assignments, files
+
+
+def run_tiering(db_config, cold_folder):
+    """One tiering run, skipped if another process holds the lock. Returns (assignments, files)."""
+    db = mysql.connector.connect(**db_config)
+    try:
+        cursor = db.cursor()
+        cursor.execute("SELECT GET_LOCK('cold_storage', 0)")
+        if not cursor.fetchone()[0]:
+            cursor.close()
+            return 0, 0
+        try:
+            return tier_closed_assignments(db, cold_folder)
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK('cold_storage')")
+            cursor.fetchall()
+            cursor.close()
+    finally:
+        db.close()
+
+
+def _tiering_loop(db_config, cold_folder, interval):
+    while True:
+        time.sleep(interval)
+        try:
+            assignments, files = run_tiering(db_config, cold_folder)
+            if assignments:
+                log.info("Moved %s assignment(s), %s file(s) to cold storage", assignments, files)
+        except mysql.connector.Error as err:
+            log.error("Error moving assignments to cold storage: %s", err)
+
+
+def start_tiering_worker(db_config, cold_folder, interval):
+    """Start the daemon thread that packs closed assignments every `interval` seconds."""
+    worker = threading.Thread(target=_tiering_loop, args=(db_config, cold_folder, interval),
+                              name='cold-storage', daemon=True)
+    worker.start()
+    return worker
+
+
+if __name__ == '__main__':
+    config = settings.load()
+    try:
+        assignments, files = run_tiering(settings.database_config(config), config['COLD_STORAGE_FOLDER'])
+    except mysql.connector.Error as err:
+        print(f"Database connection failed: {err}")
+        sys.exit(1)
+    print(f"Moved {assignments} assignment(s), {files} file(s) to cold storage")
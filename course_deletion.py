@@ -0,0 +1,344 @@
+"""
+University Assignment Portal - Course Deletion
+
+Deleting a course first marks it Deleted, in one short transaction that also
+notifies its students and instructor. From then on every query skips it. A
+background job then removes what belongs to it, one step at a time and in
+batches of COURSE_DELETE_BATCH_SIZE rows per transaction, dependents first:
+
+    requests, enrollments, announcements, submissions (with versions, rubric
+    scores and similarity rows), archived rows, materials, assignments and
+    finally the course row itself
+
+Files go with their rows: material files, assignment directories (handouts
+and submission blobs), cold-storage zips and partial uploads are deleted just
+before the batch that references them is committed. Each step deletes only
+what is left, so a job interrupted at any point can simply be run again.
+CourseDeletion records the current step and the counts.
+
+    python course_deletion.py <course_id>    # resume an interrupted deletion
+"""
+import logging
+import os
+import sys
+import threading
+
+import mysql.connector
+
+import resumable
+import settings
+import storage
+
+# step -> (query selecting the next batch of IDs, tables to delete them from
+# in order, key column)
+ROW_STEPS = {
+    'requests': ("""
+        SELECT RequestID FROM EnrollmentRequest
+        WHERE CourseID = %s ORDER BY RequestID LIMIT %s
+    """, ['EnrollmentRequest'], 'RequestID'),
+    'enrollments': ("""
+        SELECT EnrollmentID FROM Enrollment
+        WHERE CourseID = %s ORDER BY EnrollmentID LIMIT %s
+    """, ['Enrollment'], 'EnrollmentID'),
+    # Versions, rubric scores and similarity rows go with ON DELETE CASCADE
+    'submissions': ("""
+        SELECT s.SubmissionID
+        FROM Submission s
+        JOIN Assignment a ON a.AssignmentID = s.AssignmentID
+        WHERE a.CourseID = %s
+        ORDER BY s.SubmissionID
+        LIMIT %s
+    """, ['Submission'], 'SubmissionID'),
+    # The archive tables have no foreign keys, so dependents are deleted explicitly
+    'archived_submissions': ("""
+        SELECT s.SubmissionID
+        FROM SubmissionArchive s
+        JOIN Assignment a ON a.AssignmentID = s.AssignmentID
+        WHERE a.CourseID = %s
+        ORDER BY s.SubmissionID
+        LIMIT %s
+    """, ['SubmissionVersionArchive', 'RubricScoreArchive', 'SubmissionArchive'], 'SubmissionID'),
+    'archived_enrollments': ("""
+        SELECT EnrollmentID FROM EnrollmentArchive
+        WHERE CourseID = %s ORDER BY EnrollmentID LIMIT %s
+    """, ['EnrollmentArchive'], 'EnrollmentID'),
+    'archived_requests': ("""
+        SELECT RequestID FROM EnrollmentRequestArchive
+        WHERE CourseID = %s ORDER BY RequestID LIMIT %s
+    """, ['EnrollmentRequestArchive'], 'RequestID'),
+}
+
+STEPS = ['requests', 'enrollments', 'announcements', 'submissions', 'archived_submissions',
+         'archived_enrollments', 'archived_requests', 'materials', 'assignments', 'course', 'done']
+
+log = logging.getLogger(__name__)
+
+
+class _Files:
+    """Deletes stored files on local disk or in S3, outside of an app context."""
+
+    def __init__(self, upload_folder, storage_settings=None):
+        self.upload_folder = upload_folder
+        self.storage_settings = storage_settings
+        self._s3 = None
+
+    def s3(self):
+        if self._s3 is None:
+            self._s3 = storage.S3Storage(**self.storage_settings)
+        return self._s3
+
+    def backend(self, path):
+        return self.s3() if storage.is_remote(path) else storage.local_files
+
+    def delete(self, path):
+        if storage.is_remote(path) or os.path.exists(path):
+            self.backend(path).delete(path)
+            return 1
+        return 0
+
+    def delete_tree(self, path):
+        return self.backend(path).delete_tree(path)
+
+
+def mark_deleted(db, course_id, created_by=None):
+    """Hide a course, notify its members and record a deletion job.
+
+    Returns the course name, or None if there is no such (undeleted) course.
+    """
+    cursor = db.cursor()
+    try:
+        cursor.execute("SELECT CourseName FROM Course WHERE CourseID = %s AND Deleted = 0 FOR UPDATE",
+                       (course_id,))
+        row = cursor.fetchone()
+        if not row:
+            db.rollback()
+            return None
+        course_name = row[0]
+
+        cursor.execute("UPDATE Course SET Deleted = 1 WHERE CourseID = %s", (course_id,))
+        # Notify members while their enrollments still exist
+        cursor.execute("""
+            INSERT INTO Notification (UserID, Message, Timestamp)
+            SELECT StudentID, CONCAT('Course "', %s, '" has been deleted'), NOW()
+            FROM Enrollment WHERE CourseID = %s AND Status = 'active'
+            UNION
+            SELECT InstructorID, CONCAT('Course "', %s, '" has been deleted'), NOW()
+            FROM Course WHERE CourseID = %s AND InstructorID IS NOT NULL
+        """, (course_name, course_id, course_name, course_id))
+        cursor.execute("""
+            INSERT INTO CourseDeletion (CourseID, CourseName, CreatedBy) VALUES (%s, %s, %s)
+        """, (course_id, course_name, created_by))
+        db.commit()
+        return course_name
+    finally:
+        cursor.close()
+
+
+def get_job(db, course_id):
+    cursor = db.cursor(dictionary=True)
+    cursor.execute("SELECT * FROM CourseDeletion WHERE CourseID = %s", (course_id,))
+    job = cursor.fetchone()
+    cursor.close()
+    return job
+
+
+def _delete_rows(cursor, step, course_id, batch_size, files):
+    select, tables, key = ROW_STEPS[step]
+    cursor.execute(select, (course_id, batch_size))
+    ids = [row[0] for row in cursor.fetchall()]
+    rows = 0
+    if ids:
+        placeholders = ', '.join(['%s'] * len(ids))
+        for table in tables:
+            cursor.execute(f"DELETE FROM {table} WHERE {key} IN ({placeholders})", ids)
+            rows += cursor.rowcount
+    return rows, 0
+
+
+def _delete_announcements(cursor, course_id, batch_size, files):
+    cursor.execute("""
+        SELECT AnnouncementID FROM Has
+        WHERE CourseID = %s ORDER BY AnnouncementID LIMIT %s
+    """, (course_id, batch_size))
+    ids = [row[0] for row in cursor.fetchall()]
+    if not ids:
+        return 0, 0
+    placeholders = ', '.join(['%s'] * len(ids))
+    cursor.execute(f"DELETE FROM Has WHERE CourseID = %s AND AnnouncementID IN ({placeholders})",
+                   (course_id, *ids))
+    rows = cursor.rowcount
+    # Announcements that were posted to other courses as well stay
+    cursor.execute(f"""
+        DELETE FROM Announcement
+        WHERE AnnouncementID IN ({placeholders})
+          AND NOT EXISTS (SELECT 1 FROM Has h WHERE h.AnnouncementID = Announcement.AnnouncementID)
+    """, ids)
+    return rows + cursor.rowcount, 0
+
+
+def _delete_materials(cursor, course_id, batch_size, files):
+    cursor.execute("""
+        SELECT MaterialID, FilePath FROM CourseMaterial
+        WHERE CourseID = %s ORDER BY MaterialID LIMIT %s
+    """, (course_id, batch_size))
+    materials = cursor.fetchall()
+    if not materials:
+        return 0, 0
+    deleted = sum(files.delete(path) for _, path in materials if path)
+    placeholders = ', '.join(['%s'] * len(materials))
+    cursor.execute(f"DELETE FROM CourseMaterial WHERE MaterialID IN ({placeholders})",
+                   [material_id for material_id, _ in materials])
+    return cursor.rowcount, deleted
+
+
+def _delete_assignments(cursor, course_id, batch_size, files):
+    # Assignments carry whole directories, so they go a few at a time
+    cursor.execute("""
+        SELECT a.AssignmentID, a.FilePath, ca.ArchivePath
+        FROM Assignment a
+        LEFT JOIN ColdArchive ca ON ca.AssignmentID = a.AssignmentID
+        WHERE a.CourseID = %s
+        ORDER BY a.AssignmentID
+        LIMIT %s
+    """, (course_id, max(1, batch_size // 100)))
+    assignments = cursor.fetchall()
+    if not assignments:
+        return 0, 0
+    ids = [assignment_id for assignment_id, _, _ in assignments]
+    placeholders = ', '.join(['%s'] * len(ids))
+
+    deleted = 0
+    for _, directory, archive_path in assignments:
+        if directory:
+            deleted += files.delete_tree(directory)
+        if archive_path:
+            deleted += files.delete(archive_path)
+    cursor.execute(f"SELECT UploadID FROM UploadSession WHERE AssignmentID IN ({placeholders})", ids)
+    for (upload_id,) in cursor.fetchall():
+        deleted += files.delete(resumable.partial_path(files.upload_folder, upload_id))
+
+    rows = 0
+    # ColdArchive and UploadSession rows go with ON DELETE CASCADE
+    for table in ('Defines', 'GradeRubric', 'Assignment'):
+        cursor.execute(f"DELETE FROM {table} WHERE AssignmentID IN ({placeholders})", ids)
+        rows += cursor.rowcount
+    return rows, deleted
+
+
+def _delete_course(cursor, course_id, batch_size, files):
+    # Material files not referenced by any row, in whichever backend holds them
+    deleted = files.delete_tree(os.path.join(files.upload_folder, f'course_{course_id}'))
+    if files.storage_settings:
+        deleted += files.delete_tree(files.s3().path(f'course_{course_id}'))
+    cursor.execute("DELETE FROM Course WHERE CourseID = %s", (course_id,))
+    return cursor.rowcount, deleted
+
+
+BATCHES = {
+    'announcements': _delete_announcements,
+    'materials': _delete_materials,
+    'assignments': _delete_assignments,
+    'course': _delete_course,
+}
+
+
+def run_job(db_config, course_id, upload_folder, storage_settings, batch_size):
+    """Run or resume the deletion of a course, `batch_size` rows per transaction.
+
+    Returns False if it is already running.
+    """
+    db = mysql.connector.connect(**db_config)
+    cursor = db.cursor()
+    files = _Files(upload_folder, storage_settings)
+    try:
+        cursor.execute("SELECT GET_LOCK(%s, 0)", (f'course_deletion_{course_id}',))
+        if not cursor.fetchone()[0]:
+            return False
+        try:
+            cursor.execute("SELECT Step FROM CourseDeletion WHERE CourseID = %s", (course_id,))
+            row = cursor.fetchone()
+            if row is None or row[0] == 'done':
+                return True
+
+            for step in STEPS[STEPS.index(row[0]):-1]:
+                cursor.execute("""
+                    UPDATE CourseDeletion SET Step = %s, Status = 'running', Error = NULL
+                    WHERE CourseID = %s
+                """, (step, course_id))
+                db.commit()
+                while True:
+                    if step in ROW_STEPS:
+                        rows, deleted = _delete_rows(cursor, step, course_id, batch_size, files)
+                    else:
+                        rows, deleted = BATCHES[step](cursor, course_id, batch_size, files)
+                    if not rows:
+                        break
+                    cursor.execute("""
+                        UPDATE CourseDeletion
+                        SET RowsDeleted = RowsDeleted + %s, FilesDeleted = FilesDeleted + %s
+                        WHERE CourseID = %s
+                    """, (rows, deleted, course_id))
+                    db.commit()
+
+            cursor.execute("""
+                UPDATE CourseDeletion SET Step = 'done', Status = 'done', FinishedAt = NOW()
+                WHERE CourseID = %s
+            """, (course_id,))
+            db.commit()
+            return True
+        except (mysql.connector.Error, OSError) as err:
+            log.error("Error deleting course %s: %s", course_id, err)
+            db.rollback()
+            cursor.execute("UPDATE CourseDeletion SET Status = 'failed', Error = %s WHERE CourseID = %s",
+                           (str(err), course_id))
+            db.commit()
+            return True
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (f'course_deletion_{course_id}',))
+            cursor.fetchall()
+    finally:
+        cursor.close()
+        db.close()
+
+
+def _run_in_background(db_config, course_id, upload_folder, storage_settings, batch_size):
+    try:
+        run_job(db_config, course_id, upload_folder, storage_settings, batch_size)
+    except mysql.connector.Error as err:
+        log.error("Error deleting course %s: %s", course_id, err)
+
+
+def start_job(db_config, course_id, upload_folder, storage_settings, batch_size):
+    """Run a deletion on a daemon thread with its own connection."""
+    worker = threading.Thread(target=_run_in_background,
+                              args=(db_config, course_id, upload_folder, storage_settings, batch_size),
+                              name=f'course-deletion-{course_id}', daemon=True)
+    worker.start()
+    return worker
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 2 or not sys.argv[1].isdigit():
+        print("Usage: python course_deletion.py <course_id>")
+        sys.exit(2)
+
+    config = settings.load()
+    db_config = settings.database_config(config)
+    course_id = int(sys.argv[1])
+    try:
+        if not run_job(db_config, course_id, config['UPLOAD_FOLDER'], storage.s3_settings(config),
+                       config['COURSE_DELETE_BATCH_SIZE']):
+            print(f"Deletion of course {course_id} is already running")
+            sys.exit(1)
+        db = mysql.connector.connect(**db_config)
+        job = get_job(db, course_id)
+        db.close()
+    except mysql.connector.Error as err:
+        print(f"Database connection failed: {err}")
+        sys.exit(1)
+    if job is None:
+        print(f"No deletion recorded for course {course_id}")
+        sys.exit(1)
+    print(f"Course {course_id} ({job['CourseName']}): {job['Status']} at step {job['Step']} - "
+          f"{job['RowsDeleted']} rows, {job['FilesDeleted']} files deleted")
+    sys.exit(0 if job['Status'] == 'done' else 1)
@@ -0,0 +1,304 @@
+"""
+University Assignment Portal - Database Routing
+
+Hands every request a pooled connection: handlers marked @read_only go to a
+replica, everything else goes to the primary. The connection records the
+time the request spends in MySQL for the access log (structured_logging.py).
+
+Read-your-writes: after a request writes through the primary, the session
+records the primary's executed GTID set and a deadline. Until the deadline,
+that session's reads only use a replica that has already applied those
+transactions (WAIT_FOR_EXECUTED_GTID_SET with a zero timeout); otherwise
+they stay on the primary. Replicas that lag beyond the limit or fail are
+skipped for a cool-down period, so reads fall back to the primary.
+
+When every pooled connection is in use, a request waits up to pool_timeout
+seconds for one to be returned instead of failing at once. Servers running
+more handler threads than DATABASE_POOL_SIZE grow the pools to match with
+fit_threads().
+"""
+import itertools
+import logging
+import threading
+import time
+
+import mysql.connector
+from mysql.connector import pooling
+from flask import g, request, session, current_app
+
+WRITE_METHODS = {'POST', 'PUT', 'PATCH', 'DELETE'}
+POOL_RETRY_DELAY = 0.05  # longest sleep between attempts at an exhausted pool
+TIMED_CURSOR_METHODS = {'execute', 'executemany', 'callproc', 'fetchone', 'fetchall', 'fetchmany', 'stored_results'}
+
+log = logging.getLogger(__name__)
+
+
+def read_only(f):
+    """Mark a route handler as safe to serve from a replica."""
+    f.read_only = True
+    return f
+
+
+class Replica:
+    """A replica connection pool with cached health and lag state."""
+
+    def __init__(self, name, config):
+        self.name = name
+        self.config = config
+        self.pool = None
+        self.down_until = 0.0
+        self.lag_checked_at = 0.0
+        self.lag = None
+
+    def available(self, now):
+        return now >= self.down_until
+
+
+class DatabaseRouter:
+    def __init__(self, primary_config, replica_configs=(), pool_size=10, pool_timeout=10,
+                 sticky_seconds=5, max_lag_seconds=10, lag_check_interval=2, cooldown_seconds=30):
+        self.primary_config = primary_config
+        self.replica_configs = list(replica_configs)
+        self.pool_size = pool_size
+        self.pool_timeout = pool_timeout
+        self.sticky_seconds = sticky_seconds
+        self.max_lag_seconds = max_lag_seconds
+        self.lag_check_interval = lag_check_interval
+        self.cooldown_seconds = cooldown_seconds
+        self._primary_pool = None
+        self._replicas = None
+        self._cycle = None
+        self._lock = threading.Lock()
+
+    # Pools are created on first use so importing the app never needs the database
+    def _ensure_pools(self):
+        with self._lock:
+            if self._primary_pool is not None:
+                return
+            self._primary_pool = pooling.MySQLConnectionPool(
+                pool_name='primary', pool_size=self.pool_size, **self.primary_config)
+            replicas = [Replica(f"replica{i}", {**self.primary_config, **config})
+                        for i, config in enumerate(self.replica_configs)]
+            self._replicas = replicas
+            self._cycle = itertools.cycle(range(len(replicas))) if replicas else None
+
+    def fit_threads(self, threads):
+        """Give each of `threads` handler threads its own connection, up to the pool maximum.
+
+        Only takes effect before the pools are created.
+        """
+        with self._lock:
+            if self._primary_pool is None:
+                self.pool_size = min(max(self.pool_size, threads), pooling.CNX_POOL_MAXSIZE)
+
+    def _get_connection(self, pool):
+        """A connection from the pool, waiting up to pool_timeout for one to be returned."""
+        deadline = time.monotonic() + self.pool_timeout
+        delay = 0.001
+        while True:
+            try:
+                return pool.get_connection()
+            except pooling.PoolError:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise
+                time.sleep(min(delay, remaining))
+                delay = min(delay * 2, POOL_RETRY_DELAY)
+
+    @property
+    def has_replicas(self):
+        return bool(self.replica_configs)
+
+    def primary_connection(self):
+        self._ensure_pools()
+        return self._get_connection(self._primary_pool)
+
+    def _mark_down(self, replica, reason):
+        log.warning("Replica %s disabled for %ss: %s", replica.name, self.cooldown_seconds, reason)
+        replica.down_until = time.time() + self.cooldown_seconds
+
+    def _lag_ok(self, replica, conn, now):
+        """Check replication lag, at most once per lag_check_interval."""
+        if now - replica.lag_checked_at < self.lag_check_interval:
+            return replica.lag is not None and replica.lag <= self.max_lag_seconds
+
+        cursor = conn.cursor(dictionary=True)
+        try:
+            try:
+                cursor.execute("SHOW REPLICA STATUS")
+                status = cursor.fetchone()
+                lag = status and status.get('Seconds_Behind_Source')
+            except mysql.connector.Error:
+                # MySQL before 8.0.22
+                cursor.execute("SHOW SLAVE STATUS")
+                status = cursor.fetchone()
+                lag = status and status.get('Seconds_Behind_Master')
+        finally:
+            cursor.close()
+
+        replica.lag = lag
+        replica.lag_checked_at = now
+        return lag is not None and lag <= self.max_lag_seconds
+
+    def _caught_up(self, conn, gtid_set):
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT WAIT_FOR_EXECUTED_GTID_SET(%s, 0)", (gtid_set,))
+            return cursor.fetchone()[0] == 0
+        finally:
+            cursor.close()
+
+    def replica_connection(self, gtid_set=None):
+        """Return a healthy replica connection, or None to fall back to the primary.
+
+        When gtid_set is given, only a replica that has applied it qualifies.
+        """
+        self._ensure_pools()
+        if not self._replicas:
+            return None
+
+        now = time.time()
+        with self._lock:
+            order = [next(self._cycle) for _ in self._replicas]
+
+        for index in order:
+            replica = self._replicas[index]
+            if not replica.available(now):
+                continue
+            try:
+                if replica.pool is None:
+                    replica.pool = pooling.MySQLConnectionPool(
+                        pool_name=replica.name, pool_size=self.pool_size, **replica.config)
+                conn = replica.pool.get_connection()
+            except pooling.PoolError:
+                continue  # busy, not down; try another replica or the primary
+            except mysql.connector.Error as err:
+                self._mark_down(replica, err)
+                continue
+            try:
+                if not self._lag_ok(replica, conn, now):
+                    self._mark_down(replica, f"lag {replica.lag}")
+                elif gtid_set and not self._caught_up(conn, gtid_set):
+                    pass  # healthy but behind this session's writes
+                else:
+                    return conn
+            except mysql.connector.Error as err:
+                self._mark_down(replica, err)
+            conn.close()
+        return None
+
+    def executed_gtid_set(self, conn):
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT @@GLOBAL.gtid_executed")
+            row = cursor.fetchone()
+            return row[0] if row and row[0] else None
+        finally:
+            cursor.close()
+
+
+class TimedConnection:
+    """A request's connection, adding the time spent in MySQL to `elapsed`.
+
+    Everything else is passed through to the pooled connection.
+    """
+
+    def __init__(self, conn, elapsed=0.0):
+        self._conn = conn
+        self.elapsed = elapsed
+        self.queries = 0
+
+    def _timed(self, method):
+        def call(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.elapsed += time.perf_counter() - started
+        return call
+
+    def cursor(self, *args, **kwargs):
+        return _TimedCursor(self._conn.cursor(*args, **kwargs), self)
+
+    def commit(self):
+        self._timed(self._conn.commit)()
+
+    def rollback(self):
+        self._timed(self._conn.rollback)()
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+class _TimedCursor:
+    def __init__(self, cursor, conn):
+        self._cursor = cursor
+        self._conn = conn
+
+    def __getattr__(self, name):
+        attr = getattr(self._cursor, name)
+        if name not in TIMED_CURSOR_METHODS:
+            return attr
+        if name in ('execute', 'executemany', 'callproc'):
+            self._conn.queries += 1
+        return self._conn._timed(attr)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+
+def _choose_connection(router):
+    view = current_app.view_functions.get(request.endpoint)
+    if not (router.has_replicas and getattr(view, 'read_only', False)):
+        return router.primary_connection(), 'primary'
+
+    gtid_set = None
+    if session.get('primary_until', 0) > time.time():
+        gtid_set = session.get('primary_gtid')
+        if not gtid_set:
+            # Without GTIDs there is no position to compare, so wait out the window
+            return router.primary_connection(), 'primary'
+
+    conn = router.replica_connection(gtid_set)
+    if conn is None:
+        return router.primary_connection(), 'primary'
+    return conn, 'replica'
+
+
+def get_connection():
+    """Connection for the current request, chosen on first use."""
+    if 'db' not in g:
+        # Waiting for a pooled connection counts as database time
+        started = time.perf_counter()
+        conn, g.db_role = _choose_connection(current_app.extensions['db_router'])
+        g.db = TimedConnection(conn, time.perf_counter() - started)
+    return g.db
+
+
+def _record_write(response):
+    """After a successful write, pin this session's reads to the primary."""
+    router = current_app.extensions['db_router']
+    if (router.has_replicas and g.get('db_role') == 'primary'
+            and request.method in WRITE_METHODS and response.status_code < 400):
+        try:
+            session['primary_gtid'] = router.executed_gtid_set(g.db)
+        except mysql.connector.Error:
+            session['primary_gtid'] = None
+        session['primary_until'] = time.time() + router.sticky_seconds
+    return response
+
+
+def _release_connection(exc):
+    conn = g.pop('db', None)
+    g.pop('db_role', None)
+    if conn is not None:
+        try:
+            conn.close()  # returns it to the pool
+        except mysql.connector.Error as err:
+            log.error("Error releasing database connection: %s", err)
+
+
+def init_app(app, router):
+    app.extensions['db_router'] = router
+    app.after_request(_record_write)
+    app.teardown_appcontext(_release_connection)
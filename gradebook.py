@@ -0,0 +1,229 @@
+"""
+University Assignment Portal - Gradebook Analytics
+
+Loads a course's grades in one bulk query into a students x assignments
+NumPy matrix and computes distribution statistics per assignment and
+weighted totals, z-scores and outlier flags per student.
+
+Grade is a varchar that holds either points ("87") or a letter ("B"); letters
+are converted to a fraction of the assignment's MaxPoints. Results are cached
+per course for up to GRADEBOOK_CACHE_TTL seconds (settings.py). Routes that write grades
+call invalidate(); writes made by other processes or background jobs are
+caught by a cheap version query (latest change and row count of the course's
+submissions, assignments and enrollments) checked on every read.
+"""
+import threading
+import time
+import warnings
+
+import numpy as np
+
+LETTER_GRADES = {'A': 0.95, 'B': 0.85, 'C': 0.75, 'D': 0.65, 'E': 0.55, 'F': 0.40}
+PERCENTILES = [10, 25, 50, 75, 90]
+HISTOGRAM_BINS = np.linspace(0, 100, 11)
+OUTLIER_Z = 2.0
+
+_cache = {}  # course ID -> (version, expiry, analytics)
+_generations = {}  # bumped on every invalidation so in-flight computes are not cached
+_cache_lock = threading.Lock()
+
+
+def invalidate(course_id):
+    """Drop the cached analytics of a course after its grades change."""
+    course_id = int(course_id)
+    with _cache_lock:
+        _cache.pop(course_id, None)
+        _generations[course_id] = _generations.get(course_id, 0) + 1
+
+
+def version(cursor, course_id):
+    """Changes to a course's gradebook data since an earlier call show up as a different value."""
+    cursor.execute("""
+        SELECT (SELECT CONCAT_WS('/', MAX(s.LastModified), COUNT(*))
+                FROM Submission s JOIN Assignment a ON s.AssignmentID = a.AssignmentID
+                WHERE a.CourseID = %s),
+               (SELECT CONCAT_WS('/', MAX(UpdatedAt), COUNT(*)) FROM Assignment WHERE CourseID = %s),
+               (SELECT CONCAT_WS('/', MAX(UpdatedAt), COUNT(*)) FROM Enrollment WHERE CourseID = %s)
+    """, (course_id, course_id, course_id))
+    return tuple(cursor.fetchone())
+
+
+def _parse_grade(grade):
+    """Read a stored grade as (points, letter fraction); unreadable grades are NaN."""
+    if grade is None:
+        return np.nan, np.nan
+    grade = grade.strip().upper()
+    if grade in LETTER_GRADES:
+        return np.nan, LETTER_GRADES[grade]
+    try:
+        return float(grade), np.nan
+    except ValueError:
+        return np.nan, np.nan
+
+
+def load(cursor, course_id):
+    """Fetch the raw gradebook of a course. Expects a tuple cursor."""
+    cursor.execute("""
+        SELECT AssignmentID, Title, COALESCE(MaxPoints, 100), DueDate
+        FROM Assignment
+        WHERE CourseID = %s
+        ORDER BY DueDate, AssignmentID
+    """, (course_id,))
+    assignments = cursor.fetchall()
+
+    cursor.execute("""
+        SELECT u.UserID, CONCAT(u.FirstName, ' ', u.LastName)
+        FROM Enrollment e
+        JOIN User u ON e.StudentID = u.UserID
+        WHERE e.CourseID = %s AND e.Status = 'active'
+        ORDER BY u.UserID
+    """, (course_id,))
+    students = cursor.fetchall()
+
+    cursor.execute("""
+        SELECT s.StudentID, s.AssignmentID, s.Grade, s.Points,
+               s.SubmissionDate > a.DueDate AS late
+        FROM Submission s
+        JOIN Assignment a ON s.AssignmentID = a.AssignmentID
+        WHERE a.CourseID = %s
+    """, (course_id,))
+    submissions = cursor.fetchall()
+    return assignments, students, submissions
+
+
+def compute(assignments, students, submissions):
+    """Compute course analytics from the raw rows returned by load()."""
+    assignment_index = {row[0]: i for i, row in enumerate(assignments)}
+    student_index = {row[0]: i for i, row in enumerate(students)}
+    max_points = np.array([row[2] for row in assignments], dtype=float)
+
+    shape = (len(students), len(assignments))
+    scores = np.full(shape, np.nan)
+    submitted = np.zeros(shape, dtype=bool)
+    late = np.zeros(shape, dtype=bool)
+
+    if submissions:
+        student_ids, assignment_ids, grades, points, is_late = zip(*submissions)
+        count = len(submissions)
+        rows = np.fromiter((student_index.get(s, -1) for s in student_ids), dtype=np.int64, count=count)
+        cols = np.fromiter((assignment_index.get(a, -1) for a in assignment_ids), dtype=np.int64, count=count)
+        known = (rows >= 0) & (cols >= 0)  # skips dropped students and stale rows
+
+        # Only a handful of distinct grade strings exist, so parse each once
+        parsed = {grade: _parse_grade(grade) for grade in set(grades)}
+        grade_points = np.array([parsed[grade] for grade in grades], dtype=float).reshape(count, 2)
+        explicit = np.array([np.nan if p is None else p for p in points], dtype=float)
+
+        cell_max = max_points[np.where(known, cols, 0)]
+        value = np.where(np.isnan(grade_points[:, 0]), grade_points[:, 1] * cell_max, grade_points[:, 0])
+        value = np.where(np.isnan(explicit), value, explicit)
+
+        rows, cols = rows[known], cols[known]
+        submitted[rows, cols] = True
+        late[rows, cols] = np.array(is_late, dtype=bool)[known]
+        scores[rows, cols] = value[known]
+
+    percent = scores / np.where(max_points > 0, max_points, np.nan) * 100
+    graded = ~np.isnan(percent)
+
+    graded_count = graded.sum(axis=0)
+    submitted_count = submitted.sum(axis=0)
+    late_count = late.sum(axis=0)
+    with np.errstate(invalid='ignore'), warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # all-NaN columns
+        means = np.nanmean(percent, axis=0)
+        stdevs = np.nanstd(percent, axis=0)
+        mins = np.nanmin(percent, axis=0) if percent.size else means
+        maxs = np.nanmax(percent, axis=0) if percent.size else means
+        quantiles = np.nanpercentile(percent, PERCENTILES, axis=0) if percent.size else None
+
+    assignment_stats = []
+    for j, (assignment_id, title, max_pts, due_date) in enumerate(assignments):
+        stats = {
+            'assignment_id': assignment_id,
+            'title': title,
+            'max_points': int(max_pts),
+            'due_date': due_date,
+            'submitted': int(submitted_count[j]),
+            'graded': int(graded_count[j]),
+            'missing': len(students) - int(submitted_count[j]),
+            'late_rate': float(late_count[j] / submitted_count[j]) if submitted_count[j] else 0.0,
+            'histogram': np.histogram(percent[graded[:, j], j], bins=HISTOGRAM_BINS)[0].tolist()
+        }
+        if graded_count[j]:
+            stats.update({
+                'mean': float(means[j]),
+                'median': float(quantiles[PERCENTILES.index(50), j]),
+                'stdev': float(stdevs[j]),
+                'min': float(mins[j]),
+                'max': float(maxs[j]),
+                'percentiles': dict(zip(map(str, PERCENTILES), quantiles[:, j].tolist()))
+            })
+        assignment_stats.append(stats)
+
+    # Weighted totals: points earned over points available for graded work,
+    # so assignments weigh in proportion to their MaxPoints
+    earned = np.nansum(scores, axis=1)
+    available = (graded * max_points).sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        totals = np.where(available > 0, earned / available * 100, np.nan)
+
+    has_total = ~np.isnan(totals)
+    z_scores = np.full(len(students), np.nan)
+    if has_total.sum() > 1 and totals[has_total].std() > 0:
+        z_scores[has_total] = (totals[has_total] - totals[has_total].mean()) / totals[has_total].std()
+
+    submitted_per_student = submitted.sum(axis=1)
+    late_per_student = late.sum(axis=1)
+
+    student_stats = []
+    for i, (student_id, name) in enumerate(students):
+        z = z_scores[i]
+        student_stats.append({
+            'student_id': student_id,
+            'name': name,
+            'weighted_total': None if np.isnan(totals[i]) else float(totals[i]),
+            'z_score': None if np.isnan(z) else float(z),
+            'outlier': bool(not np.isnan(z) and abs(z) >= OUTLIER_Z),
+            'submitted': int(submitted_per_student[i]),
+            'late': int(late_per_student[i]),
+            'late_rate': float(late_per_student[i] / submitted_per_student[i])
+                         if submitted_per_student[i] else 0.0
+        })
+
+    total_submitted = int(submitted.sum())
+    return {
+        'student_count': len(students),
+        'assignment_count': len(assignments),
+        'course_mean': float(totals[has_total].mean()) if has_total.any() else None,
+        'late_rate': float(late.sum() / total_submitted) if total_submitted else 0.0,
+        'assignments': assignment_stats,
+        'students': student_stats
+    }
+
+
+def course_analytics(db, course_id, ttl):
+    """Return cached analytics for a course, computing them on a miss and keeping them `ttl` seconds."""
+    course_id = int(course_id)
+    with _cache_lock:
+        cached = _cache.get(course_id)
+        generation = _generations.get(course_id, 0)
+
+    cursor = db.cursor()
+    try:
+        current = version(cursor, course_id)
+        if cached is not None:
+            cached_version, expiry, result = cached
+            if cached_version == current and time.monotonic() < expiry:
+                return result
+        result = compute(*load(cursor, course_id))
+    finally:
+        cursor.close()
+
+    now = time.monotonic()
+    with _cache_lock:
+        for key in [key for key, (_, expiry, _) in _cache.items() if expiry <= now]:
+            del _cache[key]
+        if _generations.get(course_id, 0) == generation:
+            _cache[course_id] = (current, now + ttl, result)
+    return result
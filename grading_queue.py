@@ -0,0 +1,132 @@
+"""
+University Assignment Portal - Grading Queue
+
+Several graders working through one assignment each ask for the next
+ungraded submissions instead of picking from a shared list:
+
+    POST /grading/next?assignment=<id>&count=5
+
+The call leases up to `count` submissions to the grader for
+GRADING_LEASE_SECONDS, handing back the grader's own live leases first (so a
+reload does not lose them) and extending them. A lease is a GradingLease row
+(migration 016). It disappears when the submission is graded or handed back,
+and an expired lease simply counts as free, so abandoned work returns to the
+queue without a cleanup job.
+
+Claiming is one short READ COMMITTED transaction. SELECT ... FOR UPDATE
+SKIP LOCKED picks candidates that no concurrent claim is looking at, so
+graders never wait on each other. The lease upsert then only replaces leases
+that have expired: a candidate another grader leased between our read and
+our lock is left alone and not returned.
+"""
+import mysql.connector
+
+MAX_PREFETCH = 25  # submissions one call may lease
+
+
+def claim(cursor, assignment_id, grader_id, count, lease_seconds):
+    """Lease up to `count` ungraded submissions of an assignment to a grader and commit.
+
+    Returns the leased SubmissionIDs, oldest first, including the grader's
+    existing live leases.
+    """
+    # No gap locks, so claims never hold up new submissions or each other
+    cursor.execute("SET TRANSACTION ISOLATION LEVEL READ COMMITTED")
+    cursor.execute("START TRANSACTION")
+    try:
+        cursor.execute("""
+            SELECT l.SubmissionID
+            FROM GradingLease l
+            JOIN Submission s ON s.SubmissionID = l.SubmissionID
+            WHERE l.AssignmentID = %s AND l.GraderID = %s AND l.ExpiresAt > NOW() AND s.Grade IS NULL
+            ORDER BY l.SubmissionID
+            FOR UPDATE
+        """, (assignment_id, grader_id))
+        held = [row['SubmissionID'] for row in cursor.fetchall()]
+
+        candidates = []
+        if len(held) < count:
+            cursor.execute("""
+                SELECT s.SubmissionID
+                FROM Submission s
+                LEFT JOIN GradingLease l ON l.SubmissionID = s.SubmissionID AND l.ExpiresAt > NOW()
+                WHERE s.AssignmentID = %s AND s.Grade IS NULL AND l.SubmissionID IS NULL
+                ORDER BY s.SubmissionID
+                LIMIT %s
+                FOR UPDATE OF s SKIP LOCKED
+            """, (assignment_id, count - len(held)))
+            candidates = [row['SubmissionID'] for row in cursor.fetchall()]
+
+        leased = held + candidates
+        if leased:
+            # ExpiresAt is assigned last: the conditions above it must see the old value
+            cursor.execute(f"""
+                INSERT INTO GradingLease (SubmissionID, AssignmentID, GraderID, ExpiresAt)
+                VALUES {', '.join(['(%s, %s, %s, NOW() + INTERVAL %s SECOND)'] * len(leased))}
+                ON DUPLICATE KEY UPDATE
+                GraderID = IF(ExpiresAt <= NOW() OR GraderID = VALUES(GraderID), VALUES(GraderID), GraderID),
+                LeasedAt = IF(ExpiresAt <= NOW(), NOW(), LeasedAt),
+                ExpiresAt = IF(GraderID = VALUES(GraderID), VALUES(ExpiresAt), ExpiresAt)
+            """, [value for submission_id in leased
+                  for value in (submission_id, assignment_id, grader_id, lease_seconds)])
+
+            # Which leases were won, read under the locks the upsert took
+            placeholders = ', '.join(['%s'] * len(leased))
+            cursor.execute(f"""
+                SELECT SubmissionID FROM GradingLease
+                WHERE SubmissionID IN ({placeholders}) AND GraderID = %s AND ExpiresAt > NOW()
+                ORDER BY SubmissionID
+                FOR UPDATE
+            """, (*leased, grader_id))
+            leased = [row['SubmissionID'] for row in cursor.fetchall()]
+        cursor.execute("COMMIT")
+        return leased
+    except mysql.connector.Error:
+        cursor.execute("ROLLBACK")
+        raise
+
+
+def leased_submissions(cursor, submission_ids):
+    """Details of leased submissions for the grader, in the order given."""
+    if not submission_ids:
+        return []
+    placeholders = ', '.join(['%s'] * len(submission_ids))
+    cursor.execute(f"""
+        SELECT s.SubmissionID, s.StudentID, CONCAT(u.FirstName, ' ', u.LastName) as student_name,
+               s.SubmissionDate, s.FileType, s.FileSize, a.MaxPoints, l.ExpiresAt
+        FROM Submission s
+        JOIN User u ON s.StudentID = u.UserID
+        JOIN Assignment a ON s.AssignmentID = a.AssignmentID
+        JOIN GradingLease l ON l.SubmissionID = s.SubmissionID
+        WHERE s.SubmissionID IN ({placeholders})
+    """, tuple(submission_ids))
+    rows = {row['SubmissionID']: row for row in cursor.fetchall()}
+    return [rows[submission_id] for submission_id in submission_ids if submission_id in rows]
+
+
+def remaining(cursor, assignment_id):
+    """Ungraded submissions of an assignment that nobody holds a live lease on."""
+    cursor.execute("""
+        SELECT COUNT(*) as count
+        FROM Submission s
+        LEFT JOIN GradingLease l ON l.SubmissionID = s.SubmissionID AND l.ExpiresAt > NOW()
+        WHERE s.AssignmentID = %s AND s.Grade IS NULL AND l.SubmissionID IS NULL
+    """, (assignment_id,))
+    return cursor.fetchone()['count']
+
+
+def release(cursor, submission_ids, grader_id=None):
+    """Drop leases, e.g. once graded or handed back (only the grader's own if grader_id is given).
+
+    Runs in the caller's transaction. Returns the number of leases dropped.
+    """
+    if not submission_ids:
+        return 0
+    placeholders = ', '.join(['%s'] * len(submission_ids))
+    params = list(submission_ids)
+    condition = ''
+    if grader_id is not None:
+        condition = 'AND GraderID = %s'
+        params.append(grader_id)
+    cursor.execute(f"DELETE FROM GradingLease WHERE SubmissionID IN ({placeholders}) {condition}", params)
+    return cursor.rowcount
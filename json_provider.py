@@ -0,0 +1,114 @@
+"""
+University Assignment Portal - Fast JSON Serialization
+
+OrjsonProvider replaces Flask's JSON provider with orjson, which encodes
+datetime, date, UUID and NumPy values natively and is several times faster
+than the standard library encoder on large listings. The output matches the
+default provider: dates and datetimes are sent in the HTTP date format
+(RFC 822, naive values taken as UTC) and Decimal values as strings. Without
+orjson installed the default provider is kept.
+
+stream_rows() sends a tuple cursor's result set as a JSON array, encoding a
+batch of rows at a time, so a large listing never holds a dict for every row
+or the whole payload in memory at once.
+"""
+import datetime
+import decimal
+import json
+
+from flask import current_app, stream_with_context
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.http import http_date
+
+try:
+    import orjson
+except ImportError:  # fall back to Flask's default provider
+    orjson = None
+
+STREAM_BATCH_SIZE = 500
+
+
+def _default(o):
+    """Types orjson does not encode itself, or not the way Flask's default provider does."""
+    if isinstance(o, datetime.date):  # also datetime
+        return http_date(o)
+    if isinstance(o, decimal.Decimal):
+        return str(o)
+    if isinstance(o, (set, frozenset)):
+        return list(o)
+    if isinstance(o, datetime.timedelta):  # MySQL TIME columns
+        return str(o)
+    if isinstance(o, bytes):
+        return o.decode('utf-8', 'replace')
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    # Datetimes go through _default, keeping Flask's format instead of orjson's ISO 8601
+    ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    class OrjsonProvider(DefaultJSONProvider):
+        def dumps(self, obj, **kwargs):
+            return orjson.dumps(obj, default=_default, option=ORJSON_OPTIONS).decode('utf-8')
+
+        def loads(self, s, **kwargs):
+            return orjson.loads(s)
+
+        def response(self, *args, **kwargs):
+            obj = self._prepare_response_obj(args, kwargs)
+            option = ORJSON_OPTIONS | orjson.OPT_APPEND_NEWLINE
+            if self.compact is False or (self.compact is None and self._app.debug):
+                option |= orjson.OPT_INDENT_2
+            return self._app.response_class(
+                orjson.dumps(obj, default=_default, option=option), mimetype=self.mimetype)
+
+
+def install(app):
+    """Switch the app to the orjson provider when orjson is available."""
+    if orjson is not None:
+        app.json = OrjsonProvider(app)
+
+
+def _encode_batch(columns, rows):
+    """Encode rows as comma-separated JSON objects, without the enclosing brackets."""
+    objects = [dict(zip(columns, row)) for row in rows]
+    if orjson is not None:
+        return orjson.dumps(objects, default=_default, option=ORJSON_OPTIONS)[1:-1]
+    return current_app.json.dumps(objects)[1:-1].encode('utf-8')
+
+
+def encode_rows(columns, rows, key):
+    """Encode fetched tuple rows as {"<key>": [{...}, ...]}, the same bytes stream_rows() sends."""
+    body = [b'{' + json.dumps(key).encode('utf-8') + b':[']
+    for start in range(0, len(rows), STREAM_BATCH_SIZE):
+        if start:
+            body.append(b',')
+        body.append(_encode_batch(columns, rows[start:start + STREAM_BATCH_SIZE]))
+    body.append(b']}\n')
+    return b''.join(body)
+
+
+def stream_rows(cursor, key, batch_size=STREAM_BATCH_SIZE):
+    """Stream an executed tuple cursor's rows as {"<key>": [{...}, ...]}.
+
+    The cursor is closed once the last row has been sent.
+    """
+    columns = [c[0] for c in cursor.description]
+
+    def generate():
+        try:
+            yield b'{' + json.dumps(key).encode('utf-8') + b':['
+            first = True
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                if not first:
+                    yield b','
+                yield _encode_batch(columns, rows)
+                first = False
+            yield b']}\n'
+        finally:
+            cursor.close()
+
+    return current_app.response_class(stream_with_context(generate()), mimetype='application/json')
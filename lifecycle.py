@@ -0,0 +1,164 @@
+"""
+University Assignment Portal - Health Probes and Graceful Shutdown
+
+/healthz answers as long as the process can serve requests (liveness).
+/readyz also checks that a database connection can be taken from the pool
+and that the upload folder is writable, and fails while the app is draining,
+so a load balancer stops sending new traffic before shutdown.
+
+drain() marks the app as draining, waits for in-flight requests (including
+uploads still being written) to finish, lets queued upload analyses complete,
+flushes the audit log and writes out the queued log records. serve() runs
+the threaded server for `python app.py` and drains on SIGTERM; under uvicorn
+the ASGI lifespan shutdown in asgi.py does the same.
+"""
+import logging
+import os
+import signal
+import tempfile
+import threading
+import time
+
+import mysql.connector
+from flask import current_app, jsonify
+from werkzeug.serving import make_server
+from werkzeug.wsgi import ClosingIterator
+
+import structured_logging
+
+log = logging.getLogger(__name__)
+
+
+class Lifecycle:
+    """In-flight request count and draining flag of one app."""
+
+    def __init__(self):
+        self.draining = False
+        self.in_flight = 0
+        self._idle = threading.Condition()
+
+    def begin_request(self):
+        with self._idle:
+            self.in_flight += 1
+
+    def end_request(self):
+        with self._idle:
+            self.in_flight -= 1
+            if self.in_flight == 0:
+                self._idle.notify_all()
+
+    def wait_idle(self, timeout):
+        with self._idle:
+            return self._idle.wait_for(lambda: self.in_flight == 0, timeout=timeout)
+
+
+class _RequestTracker:
+    """WSGI middleware counting requests until their response has been fully sent."""
+
+    def __init__(self, wsgi_app, state):
+        self.wsgi_app = wsgi_app
+        self.state = state
+
+    def __call__(self, environ, start_response):
+        self.state.begin_request()
+        try:
+            result = self.wsgi_app(environ, start_response)
+        except BaseException:
+            self.state.end_request()
+            raise
+        return ClosingIterator(result, [self.state.end_request])
+
+
+def healthz():
+    return jsonify({'status': 'ok'}), 200
+
+
+def _check_database():
+    conn = current_app.extensions['db_router'].primary_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1")
+        cursor.fetchall()
+        cursor.close()
+    finally:
+        conn.close()
+
+
+def _check_uploads():
+    folder = current_app.config['UPLOAD_FOLDER']
+    os.makedirs(folder, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=folder, prefix='.readyz-'):
+        pass
+
+
+def readyz():
+    state = current_app.extensions['lifecycle']
+    checks = {}
+    if state.draining:
+        checks['draining'] = 'shutting down'
+
+    try:
+        _check_database()
+        checks['database'] = 'ok'
+    except mysql.connector.Error as err:
+        checks['database'] = str(err)
+
+    try:
+        _check_uploads()
+        checks['uploads'] = 'ok'
+    except OSError as e:
+        checks['uploads'] = str(e)
+
+    ready = all(value == 'ok' for value in checks.values())
+    return jsonify({'ready': ready, 'checks': checks}), 200 if ready else 503
+
+
+def init_app(app):
+    state = Lifecycle()
+    app.extensions['lifecycle'] = state
+    app.wsgi_app = _RequestTracker(app.wsgi_app, state)
+    app.add_url_rule('/healthz', 'healthz', healthz)
+    app.add_url_rule('/readyz', 'readyz', readyz)
+
+
+def drain(app, timeout=None):
+    """Stop reporting ready and wait for in-flight work. Returns False on timeout."""
+    timeout = app.config['DRAIN_TIMEOUT'] if timeout is None else timeout
+    deadline = time.monotonic() + timeout
+    state = app.extensions['lifecycle']
+    state.draining = True
+    idle = state.wait_idle(timeout)
+    if not idle:
+        log.warning("Drain timed out with %s request(s) still running", state.in_flight)
+
+    pipeline = app.extensions.get('upload_pipeline')
+    if pipeline is not None:
+        # Finishes analyses that were already queued
+        waiter = threading.Thread(target=pipeline.shutdown, daemon=True)
+        waiter.start()
+        waiter.join(max(deadline - time.monotonic(), 0))
+        idle = idle and not waiter.is_alive()
+
+    audit_log = app.extensions.get('audit_log')
+    if audit_log is not None:
+        # Writes what is still buffered, or spools it
+        idle = audit_log.close(max(deadline - time.monotonic(), 0)) and idle
+
+    structured_logging.shutdown()
+    return idle
+
+
+def serve(app, host='127.0.0.1', port=5000):
+    """Run the threaded WSGI server until SIGTERM or Ctrl+C, then drain and exit."""
+    server = make_server(host, port, app, threaded=True)
+
+    def stop(signum, frame):
+        log.info("Shutting down, waiting for in-flight requests...")
+        # Keep serving while draining so in-flight uploads can complete;
+        # shutdown() must run outside the serving thread
+        threading.Thread(target=lambda: (drain(app), server.shutdown()), daemon=True).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    log.info("Serving on http://%s:%s", host, port)
+    server.serve_forever()
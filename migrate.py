@@ -0,0 +1,224 @@
+"""
+University Assignment Portal - Schema Migrations
+
+Applies the versioned SQL files in Queries/migrations/ in order and records
+each one in a SchemaMigration table so it only ever runs once. A migration
+that would destroy data needing a human decision has a check query in
+MIGRATION_CHECKS; while it returns rows, the migration is not applied and
+the rows are listed instead.
+
+Usage:
+    python migrate.py            # apply pending migrations
+    python migrate.py --status   # list applied and pending migrations
+    python migrate.py --explain  # show the index chosen for each hot query
+"""
+import hashlib
+import os
+import re
+import sys
+
+import mysql.connector
+
+import settings
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Queries', 'migrations')
+MIGRATION_FILE = re.compile(r'^(\d{3})_([a-z0-9_]+)\.sql$')
+
+# Hot queries from routes.py / procedures.sql and the index each should use
+# once 002_hot_query_indexes.sql has been applied.
+EXPLAIN_CHECKS = [
+    ("admin_dashboard student count",
+     "SELECT COUNT(*) FROM User WHERE Role = 'student' AND Active = 1",
+     'User', 'idx_user_role_active'),
+    ("get_professors",
+     "SELECT UserID, FirstName, LastName, Email FROM User "
+     "WHERE Role = 'professor' AND Active = 1 ORDER BY FirstName, LastName",
+     'User', 'idx_user_role_active'),
+    ("admin_dashboard pending requests",
+     "SELECT RequestID FROM EnrollmentRequest er "
+     "WHERE er.Status = 'pending' ORDER BY er.RequestDate DESC",
+     'er', 'idx_request_status_date'),
+    ("active enrollments of a course",
+     "SELECT e.StudentID FROM Enrollment e WHERE e.CourseID = 1 AND e.Status = 'active'",
+     'e', 'idx_enrollment_course_status'),
+    ("student submission lookup",
+     "SELECT SubmissionPath FROM Submission WHERE StudentID = 1 AND AssignmentID = 1",
+     'Submission', 'uq_submission_student_assignment'),
+    ("unread notifications",
+     "SELECT NotificationID FROM Notification "
+     "WHERE UserID = 1 AND Status = 'unread' ORDER BY Timestamp DESC",
+     'Notification', 'idx_notification_user_status_time'),
+]
+
+
+# version -> (what the rows are, query listing rows that block the migration)
+MIGRATION_CHECKS = {
+    2: ("graded submissions that 002 would delete as older duplicates", """
+        SELECT older.SubmissionID, older.StudentID, older.AssignmentID, older.Grade, older.Points,
+               MAX(newer.SubmissionID) AS KeptSubmissionID
+        FROM Submission older
+        JOIN Submission newer
+          ON newer.StudentID = older.StudentID
+         AND newer.AssignmentID = older.AssignmentID
+         AND newer.SubmissionID > older.SubmissionID
+        WHERE older.Grade IS NOT NULL OR older.Points IS NOT NULL
+        GROUP BY older.SubmissionID, older.StudentID, older.AssignmentID, older.Grade, older.Points
+        ORDER BY older.SubmissionID
+    """),
+}
+
+
+class MigrationBlocked(Exception):
+    """A migration's check found rows it would destroy."""
+
+    def __init__(self, version, name, description, columns, rows):
+        super().__init__(f"Migration {version:03d}_{name} blocked: {len(rows)} {description}")
+        self.columns = columns
+        self.rows = rows
+
+
+def get_connection():
+    return mysql.connector.connect(**settings.database_config(settings.load()))
+
+
+def split_statements(sql):
+    """Split a SQL script into statements, honouring DELIMITER directives."""
+    statements = []
+    delimiter = ';'
+    buffer = []
+    for line in sql.splitlines():
+        stripped = line.strip()
+        if stripped.upper().startswith('DELIMITER '):
+            delimiter = stripped.split(None, 1)[1]
+            continue
+        buffer.append(line)
+        if stripped.endswith(delimiter):
+            statement = '\n'.join(buffer).rstrip()
+            statement = statement[:-len(delimiter)].strip()
+            if statement:
+                statements.append(statement)
+            buffer = []
+    remainder = '\n'.join(buffer).strip()
+    if remainder:
+        statements.append(remainder)
+    # Drop statements that are nothing but comments
+    return [s for s in statements if re.sub(r'/\*.*?\*/|--[^\n]*', '', s, flags=re.S).strip()]
+
+
+def load_migrations():
+    """Return (version, name, path, checksum) for every migration file, in order."""
+    migrations = []
+    for filename in sorted(os.listdir(MIGRATIONS_DIR)):
+        match = MIGRATION_FILE.match(filename)
+        if not match:
+            continue
+        path = os.path.join(MIGRATIONS_DIR, filename)
+        with open(path, 'rb') as f:
+            checksum = hashlib.sha256(f.read()).hexdigest()
+        migrations.append((int(match.group(1)), match.group(2), path, checksum))
+    return migrations
+
+
+def ensure_migration_table(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS SchemaMigration (
+            Version INT NOT NULL PRIMARY KEY,
+            Name VARCHAR(255) NOT NULL,
+            Checksum CHAR(64) NOT NULL,
+            AppliedAt DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def applied_versions(cursor):
+    cursor.execute("SELECT Version, Checksum FROM SchemaMigration")
+    return dict(cursor.fetchall())
+
+
+def migrate(db):
+    """Apply every pending migration. Returns the list of versions applied."""
+    cursor = db.cursor()
+    ensure_migration_table(cursor)
+    applied = applied_versions(cursor)
+    done = []
+
+    for version, name, path, checksum in load_migrations():
+        if version in applied:
+            if applied[version] != checksum:
+                print(f"Warning: migration {version:03d}_{name} changed after it was applied")
+            continue
+
+        if version in MIGRATION_CHECKS:
+            description, query = MIGRATION_CHECKS[version]
+            cursor.execute(query)
+            rows = cursor.fetchall()
+            if rows:
+                raise MigrationBlocked(version, name, description,
+                                       [column[0] for column in cursor.description], rows)
+
+        with open(path, encoding='utf-8') as f:
+            statements = split_statements(f.read())
+
+        print(f"Applying {version:03d}_{name} ({len(statements)} statements)")
+        # MySQL commits DDL implicitly, so a failure part-way leaves the
+        # earlier statements applied; the version is only recorded on success.
+        for statement in statements:
+            cursor.execute(statement)
+        cursor.execute("""
+            INSERT INTO SchemaMigration (Version, Name, Checksum)
+            VALUES (%s, %s, %s)
+        """, (version, name, checksum))
+        db.commit()
+        done.append(version)
+
+    cursor.close()
+    return done
+
+
+def status(db):
+    cursor = db.cursor()
+    ensure_migration_table(cursor)
+    applied = applied_versions(cursor)
+    for version, name, _, _ in load_migrations():
+        state = 'applied' if version in applied else 'pending'
+        print(f"{version:03d}_{name}: {state}")
+    cursor.close()
+
+
+def explain(db):
+    """Run EXPLAIN on each hot query and compare the chosen key with the expected one."""
+    cursor = db.cursor(dictionary=True)
+    ok = True
+    for label, query, table, expected_key in EXPLAIN_CHECKS:
+        cursor.execute("EXPLAIN " + query)
+        rows = cursor.fetchall()
+        row = next((r for r in rows if r['table'] == table), rows[0])
+        matched = row['key'] == expected_key
+        ok = ok and matched
+        print(f"[{'ok' if matched else 'MISS'}] {label}: type={row['type']} "
+              f"key={row['key']} rows={row['rows']} extra={row['Extra']}")
+    cursor.close()
+    return ok
+
+
+if __name__ == '__main__':
+    try:
+        db = get_connection()
+    except mysql.connector.Error as err:
+        print(f"Database connection failed: {err}")
+        sys.exit(1)
+
+    if '--status' in sys.argv:
+        status(db)
+    elif '--explain' in sys.argv:
+        sys.exit(0 if explain(db) else 1)
+    else:
+        try:
+            applied = migrate(db)
+        except MigrationBlocked as e:
+            print(e)
+            print('  '.join(e.columns))
+            for row in e.rows:
+                print('  '.join(str(value) for value in row))
+            sys.exit(1)
+        print(f"Applied {len(applied)} migration(s)")
@@ -0,0 +1,208 @@
+"""
+University Assignment Portal - Rate Limiting
+
+Token-bucket limits per client, checked before every request. A route picks
+its policy with @limit; everything else gets RATE_LIMIT_DEFAULT.
+
+    @limit('5/minute', burst=5, key='ip')
+
+Clients are keyed by user ID when logged in, otherwise by IP ('user'), or
+always by IP ('ip'). Buckets are implemented with GCRA: each key stores only
+the time at which its bucket would be full again, so a check is a dict lookup
+and a little arithmetic.
+
+MemoryStore keeps buckets in this process without locks. Two concurrent
+requests for the same key can occasionally both pass, which is acceptable
+for abuse protection. RedisStore shares buckets between workers through an
+atomic script; it is used when RATE_LIMIT_STORAGE_URL is set, and any object
+with the same hit() method (e.g. a local stand-in in development) can take
+its place.
+
+Responses carry X-RateLimit-Limit/Remaining/Reset headers, rejected ones a
+429 with Retry-After. Allowed/limited counts per policy are kept in `stats`.
+"""
+import logging
+import math
+import time
+from collections import Counter
+
+from flask import current_app, g, jsonify, request, session
+
+try:
+    import redis
+except ImportError:  # shared store unavailable; buckets stay per process
+    redis = None
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+SWEEP_INTERVAL = 60  # seconds between removals of full (idle) buckets
+EXEMPT_ENDPOINTS = {'healthz', 'readyz', 'asset', 'static'}
+
+log = logging.getLogger(__name__)
+stats = Counter()  # (policy, 'allowed' | 'limited') -> count
+
+
+def parse_rate(rate):
+    """'10/minute' -> (10, 60)."""
+    count, _, period = rate.partition('/')
+    return int(count), PERIODS[period.strip().rstrip('s')]
+
+
+class Policy:
+    def __init__(self, rate, burst=None, key='user', name=None):
+        count, period = parse_rate(rate)
+        self.rate = rate
+        self.burst = burst or count
+        self.key = key
+        self.name = name or rate
+        self.interval = period / count            # seconds per token
+        self.window = self.interval * self.burst  # how far the bucket may run ahead
+
+
+def limit(rate, burst=None, key='user', name=None):
+    """Give a route handler its own rate-limit policy."""
+    def decorator(f):
+        f.rate_limit = Policy(rate, burst, key, name or f.__name__)
+        return f
+    return decorator
+
+
+class MemoryStore:
+    """In-process GCRA buckets."""
+
+    def __init__(self):
+        self._tat = {}
+        self._swept_at = time.monotonic()
+
+    def hit(self, key, interval, window):
+        """Take a token. Returns (allowed, theoretical arrival time, now)."""
+        now = time.monotonic()
+        tat = max(self._tat.get(key, now), now) + interval
+        allowed = tat - now <= window
+        if allowed:
+            self._tat[key] = tat
+        if now - self._swept_at > SWEEP_INTERVAL:
+            self._sweep(now)
+        return allowed, tat if allowed else tat - interval, now
+
+    def _sweep(self, now):
+        self._swept_at = now
+        for key, tat in list(self._tat.items()):
+            if tat <= now:
+                self._tat.pop(key, None)
+
+
+class RedisStore:
+    """GCRA buckets shared by all workers through Redis."""
+
+    SCRIPT = """
+    local now = tonumber(ARGV[1])
+    local interval = tonumber(ARGV[2])
+    local window = tonumber(ARGV[3])
+    local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+    tat = math.max(tat, now) + interval
+    if tat - now > window then
+        return {0, tostring(tat - interval)}
+    end
+    redis.call('SET', KEYS[1], tostring(tat), 'PX', math.ceil((tat - now) * 1000))
+    return {1, tostring(tat)}
+    """
+
+    def __init__(self, url, prefix='ratelimit:'):
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self._hit = self.client.register_script(self.SCRIPT)
+
+    def hit(self, key, interval, window):
+        now = time.time()  # wall clock: shared between hosts
+        allowed, tat = self._hit(keys=[self.prefix + key], args=[now, interval, window])
+        return bool(allowed), float(tat), now
+
+
+def client_key(policy, user_id, remote_addr):
+    if policy.key == 'user' and user_id is not None:
+        return f"user:{user_id}"
+    return f"ip:{remote_addr}"
+
+
+def policy_for(app, endpoint):
+    """The policy applied to an endpoint, or None if it is not limited."""
+    if endpoint in EXEMPT_ENDPOINTS or not app.config['RATE_LIMIT_ENABLED']:
+        return None
+    view = app.view_functions.get(endpoint)
+    return getattr(view, 'rate_limit', None) or app.extensions['rate_limit']['default']
+
+
+def check(limiter, policy, client):
+    """Take a token from a client's bucket.
+
+    Returns (allowed, remaining, seconds until full, retry after), or None if
+    the store failed. Shared with the native async routes in asgi.py.
+    """
+    try:
+        allowed, tat, now = limiter['store'].hit(f"{policy.name}:{client}", policy.interval, policy.window)
+    except Exception as e:  # a shared store outage must not take the site down
+        log.exception("Error checking rate limit: %s", e)
+        return None
+
+    remaining = max(int((policy.window - (tat - now)) / policy.interval), 0)
+    stats[(policy.name, 'allowed' if allowed else 'limited')] += 1
+    retry_after = max(math.ceil(tat + policy.interval - policy.window - now), 1)
+    return allowed, remaining, tat - now, retry_after
+
+
+def headers(policy, remaining, full_in):
+    return {
+        'X-RateLimit-Limit': str(policy.burst),
+        'X-RateLimit-Remaining': str(remaining),
+        'X-RateLimit-Reset': str(max(math.ceil(full_in), 0))
+    }
+
+
+LIMITED_MESSAGE = 'Too many requests, please slow down'
+
+
+def _check():
+    policy = policy_for(current_app, request.endpoint)
+    if policy is None:
+        return None
+    result = check(current_app.extensions['rate_limit'], policy, client_key(policy, session.get('user_id'), request.remote_addr))
+    if result is None:
+        return None
+
+    allowed, remaining, full_in, retry_after = result
+    g.rate_limit = (policy, remaining, full_in)
+    if allowed:
+        return None
+
+    response = jsonify({'message': LIMITED_MESSAGE, 'retry_after': retry_after})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
+
+def _add_headers(response):
+    info = g.get('rate_limit')
+    if info is not None:
+        response.headers.update(headers(*info))
+    return response
+
+
+def snapshot():
+    """Allowed/limited counts per policy."""
+    result = {}
+    for (name, outcome), count in list(stats.items()):
+        result.setdefault(name, {'allowed': 0, 'limited': 0})[outcome] = count
+    return result
+
+
+def init_app(app):
+    url = app.config.get('RATE_LIMIT_STORAGE_URL')
+    if url and redis is None:
+        log.warning("RATE_LIMIT_STORAGE_URL is set but the redis package is missing; using in-process buckets")
+    store = RedisStore(url) if url and redis is not None else MemoryStore()
+    app.extensions['rate_limit'] = {
+        'store': store,
+        'default': Policy(app.config['RATE_LIMIT_DEFAULT'], key='user', name='default')
+    }
+    app.before_request(_check)
+    app.after_request(_add_headers)
@@ -0,0 +1,194 @@
+"""
+University Assignment Portal - JSON Response Cache
+
+@cached keeps successful JSON responses for a short TTL, keyed by endpoint,
+URL arguments and the caller's scope. Every entry records the data version
+counters it was built from; write routes decorated with @invalidates bump the
+counters of the data they change, so affected entries are dropped at once
+instead of waiting for the TTL.
+
+Responses carry a weak ETag of their body. While an entry is fresh, a request
+whose If-None-Match matches gets 304 Not Modified without the handler
+running, and after a rebuild an unchanged body keeps its ETag. Concurrent
+misses for the same key wait for the first one instead of each querying the
+database.
+
+Streamed responses (json_provider.stream_rows) are never buffered: their
+ETag is computed as the body goes out and only the ETag is kept, so a later
+matching If-None-Match still gets a 304 while other requests stream again.
+
+Version counters live in this process, so in a multi-worker deployment a write
+handled by one worker reaches the others' caches only when their TTL expires.
+"""
+import hashlib
+import threading
+import time
+from functools import wraps
+
+from flask import request, session, current_app
+
+COALESCE_TIMEOUT = 30  # seconds a request waits for another one's miss
+MAX_ENTRIES = 2048
+
+_versions = {}
+_entries = {}
+_inflight = {}
+_lock = threading.Lock()
+
+
+def bump(*topics):
+    """Mark data as changed, invalidating responses that depend on it."""
+    with _lock:
+        for topic in topics:
+            _versions[topic] = _versions.get(topic, 0) + 1
+
+
+def clear():
+    with _lock:
+        _entries.clear()
+
+
+def _store(key, entry):
+    """Insert an entry, evicting expired and then oldest entries when full. Caller holds _lock."""
+    _entries.pop(key, None)
+    if len(_entries) >= MAX_ENTRIES:
+        now = time.monotonic()
+        for stale in [k for k, e in _entries.items() if e['expires'] <= now]:
+            del _entries[stale]
+        while len(_entries) >= MAX_ENTRIES:
+            del _entries[next(iter(_entries))]
+    _entries[key] = entry
+
+
+def _scope_value(scope):
+    if scope == 'user':
+        return session.get('user_id')
+    if scope == 'role':
+        return session.get('role')
+    return None
+
+
+def _respond(entry):
+    if request.if_none_match.contains_weak(entry['etag']):
+        response = current_app.response_class(status=304)
+    else:
+        response = current_app.response_class(entry['body'], mimetype=entry['mimetype'])
+    response.set_etag(entry['etag'], weak=True)
+    # Browsers must revalidate, and shared caches must not store per-user data
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def _stream(response, key, version, ttl, topics, known):
+    """Pass a streamed response through, recording the ETag of its body once sent."""
+    if known is not None:
+        response.set_etag(known['etag'], weak=True)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    chunks = response.response
+    digest = hashlib.sha1()
+
+    def generate():
+        try:
+            for chunk in chunks:
+                digest.update(chunk if isinstance(chunk, bytes) else chunk.encode('utf-8'))
+                yield chunk
+        finally:
+            if hasattr(chunks, 'close'):
+                chunks.close()  # e.g. closes the cursor of a stream cut short
+        entry = {
+            'version': version,
+            'expires': time.monotonic() + ttl,
+            'etag': digest.hexdigest()[:20],
+            'body': None,
+            'mimetype': response.mimetype
+        }
+        with _lock:
+            if tuple(_versions.get(topic, 0) for topic in topics) == version:
+                _store(key, entry)
+
+    response.response = generate()
+    return response
+
+
+class _Flight:
+    """A miss being computed; other requests for the key wait on it."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.entry = None
+
+
+def cached(ttl, topics=(), scope='user'):
+    """Cache a JSON GET handler for `ttl` seconds.
+
+    topics: data version counters the response depends on.
+    scope:  'user' (per user), 'role' (shared by a role) or 'global'.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            key = (request.endpoint,
+                   tuple(sorted(kwargs.items())),
+                   tuple(sorted(request.args.items(multi=True))),
+                   _scope_value(scope))
+
+            with _lock:
+                version = tuple(_versions.get(topic, 0) for topic in topics)
+                entry = _entries.get(key)
+                streamed = None
+                if entry and entry['version'] == version and entry['expires'] > time.monotonic():
+                    if entry['body'] is not None or request.if_none_match.contains_weak(entry['etag']):
+                        return _respond(entry)
+                    streamed = entry  # only the ETag of a streamed body is kept
+                flight = _inflight.get(key)
+                leader = flight is None
+                if leader:
+                    flight = _inflight[key] = _Flight()
+
+            if not leader:
+                flight.done.wait(timeout=COALESCE_TIMEOUT)
+                if flight.entry is not None:
+                    return _respond(flight.entry)
+                # The leader failed or returned an error; answer this request directly
+                return f(*args, **kwargs)
+
+            entry = None
+            try:
+                response = current_app.make_response(f(*args, **kwargs))
+                if response.status_code != 200 or not response.is_json:
+                    return response
+                if response.is_streamed:
+                    return _stream(response, key, version, ttl, topics, streamed)
+                body = response.get_data()
+                entry = {
+                    'version': version,
+                    'expires': time.monotonic() + ttl,
+                    'etag': hashlib.sha1(body).hexdigest()[:20],
+                    'body': body,
+                    'mimetype': response.mimetype
+                }
+                with _lock:
+                    # Skip storing if a write landed while the handler ran
+                    if tuple(_versions.get(topic, 0) for topic in topics) == version:
+                        _store(key, entry)
+            finally:
+                flight.entry = entry
+                with _lock:
+                    _inflight.pop(key, None)
+                flight.done.set()
+            return _respond(entry)
+        return decorated_function
+    return decorator
+
+
+def invalidates(*topics):
+    """Bump the given data versions after a successful write."""
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            response = current_app.make_response(f(*args, **kwargs))
+            if response.status_code < 400:
+                bump(*topics)
+            return response
+        return decorated_function
+    return decorator
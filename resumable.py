@@ -0,0 +1,239 @@
+"""
+University Assignment Portal - Resumable Uploads
+
+Submissions can be uploaded in pieces following the core tus protocol
+(https://tus.io) with its creation, checksum, expiration and termination
+extensions:
+
+    POST   /assignments/<id>/uploads   Upload-Length, Upload-Metadata: filename <base64>
+    HEAD   /uploads/<upload_id>        -> Upload-Offset, Upload-Length
+    PATCH  /uploads/<upload_id>        Upload-Offset, optional Upload-Checksum: sha256 <base64>
+    DELETE /uploads/<upload_id>
+
+Each PATCH is written in place at its offset in one partial file under
+UPLOAD_FOLDER/partial, so a retry only re-sends the bytes the server does not
+have yet (HEAD reports the offset). Without a checksum, the bytes received
+before a dropped connection are kept (asgi.py passes PATCH bodies to Flask
+as they arrive for this). With one, a chunk is kept only if it matches
+and a mismatch answers 460. The SHA-256 of the whole file is
+computed as the chunks arrive, and the finished file is moved into storage,
+so assembly never reads the file again. Uploads not finished within
+RESUMABLE_UPLOAD_TTL seconds of their last chunk are removed by a background
+worker.
+
+The deadline applies to the time the upload was created: an upload started
+before the due date may finish after it, but only within
+RESUMABLE_UPLOAD_GRACE seconds of the due date and RESUMABLE_UPLOAD_TTL
+seconds of its creation. Chunks extend the expiry up to that cap and no
+further, so an upload cannot be kept open to finish with later work. The
+RESUMABLE_* settings are in settings.py.
+"""
+import base64
+import binascii
+import contextlib
+import hashlib
+import logging
+import os
+import threading
+import time
+
+import mysql.connector
+from flask import current_app
+from werkzeug.exceptions import ClientDisconnected
+
+TUS_VERSION = '1.0.0'
+CHECKSUM_MISMATCH = 460
+CHUNK_SIZE = 1024 * 1024
+
+# upload ID -> (offset, SHA-256 of the bytes before it), for this process
+_hashes = {}
+_hashes_lock = threading.Lock()
+
+log = logging.getLogger(__name__)
+
+
+def expiry_sql(created_at='u.CreatedAt', due_date='a.DueDate'):
+    """SQL for an upload's expiry after new activity, capped by its creation time and the due date.
+
+    Reads RESUMABLE_UPLOAD_TTL and RESUMABLE_UPLOAD_GRACE from the app's config.
+    """
+    ttl = int(current_app.config['RESUMABLE_UPLOAD_TTL'])
+    grace = int(current_app.config['RESUMABLE_UPLOAD_GRACE'])
+    return (f"LEAST(NOW() + INTERVAL {ttl} SECOND, "
+            f"{created_at} + INTERVAL {ttl} SECOND, "
+            f"{due_date} + INTERVAL {grace} SECOND)")
+
+
+@contextlib.contextmanager
+def upload_lock(cursor, upload_id):
+    """Hold the MySQL named lock for one upload's chunks; yields whether it was acquired.
+
+    A PATCH holds it while its body streams into the partial file, so chunks
+    of an upload are serialized without a row lock and the transaction only
+    spans the offset update. Does not wait for another PATCH of the same
+    upload. Expects a dictionary cursor.
+    """
+    name = f"upload_{upload_id}"
+    cursor.execute("SELECT GET_LOCK(%s, 0) AS acquired", (name,))
+    acquired = cursor.fetchone()['acquired'] == 1
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (name,))
+            cursor.fetchall()
+
+
+def partial_path(upload_folder, upload_id):
+    return os.path.join(upload_folder, 'partial', upload_id)
+
+
+def parse_metadata(header):
+    """Decode an Upload-Metadata header ("key base64value, key2 ...") into a dict."""
+    metadata = {}
+    for pair in (header or '').split(','):
+        parts = pair.strip().split(' ')
+        if not parts[0]:
+            continue
+        try:
+            metadata[parts[0]] = base64.b64decode(parts[1]).decode('utf-8') if len(parts) > 1 else ''
+        except (binascii.Error, UnicodeDecodeError):
+            raise ValueError(f"Invalid Upload-Metadata value for {parts[0]}")
+    return metadata
+
+
+def parse_checksum(header):
+    """Expected SHA-256 digest from an Upload-Checksum header, or None if absent.
+
+    Raises ValueError for other algorithms or a malformed value.
+    """
+    if not header:
+        return None
+    algorithm, _, value = header.partition(' ')
+    if algorithm != 'sha256':
+        raise ValueError("Only sha256 checksums are supported")
+    try:
+        return base64.b64decode(value, validate=True)
+    except binascii.Error:
+        raise ValueError("Invalid Upload-Checksum value")
+
+
+def running_hash(upload_id, path, offset):
+    """SHA-256 object for the first `offset` bytes of a partial upload.
+
+    Continues from this process's last state for the upload, hashing from
+    disk only the bytes that another process received since then.
+    """
+    with _hashes_lock:
+        known_offset, digest = _hashes.get(upload_id, (0, None))
+    if digest is None or known_offset > offset:
+        known_offset, digest = 0, hashlib.sha256()
+    else:
+        digest = digest.copy()
+    if known_offset < offset:
+        with open(path, 'rb') as f:
+            f.seek(known_offset)
+            remaining = offset - known_offset
+            while remaining:
+                chunk = f.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    raise OSError(f"Partial upload {path} is shorter than its recorded offset")
+                digest.update(chunk)
+                remaining -= len(chunk)
+    return digest
+
+
+def remember_hash(upload_id, offset, digest):
+    with _hashes_lock:
+        _hashes[upload_id] = (offset, digest)
+
+
+def forget_hash(upload_id):
+    with _hashes_lock:
+        _hashes.pop(upload_id, None)
+
+
+def write_chunk(path, offset, stream, max_length, digest, expected_checksum=None):
+    """Write a PATCH body into the partial file at `offset`.
+
+    Returns (bytes kept, error), where error is None, 'too_long', 'checksum'
+    or 'disconnected'. Without a checksum, the bytes received before a
+    disconnect are kept; otherwise a failed chunk is truncated away. `digest`
+    is updated with every byte written and is only valid if some were kept.
+    """
+    chunk_digest = hashlib.sha256()
+    received = 0
+    error = None
+    with open(path, 'r+b') as f:
+        f.seek(offset)
+        try:
+            while True:
+                data = stream.read(CHUNK_SIZE)
+                if not data:
+                    break
+                if received + len(data) > max_length:
+                    error = 'too_long'
+                    break
+                f.write(data)
+                digest.update(data)
+                chunk_digest.update(data)
+                received += len(data)
+        except ClientDisconnected:
+            error = 'disconnected'
+
+        if error is None and expected_checksum is not None and chunk_digest.digest() != expected_checksum:
+            error = 'checksum'
+        if error in ('too_long', 'checksum') or (error and expected_checksum is not None):
+            received = 0
+
+        f.truncate(offset + received)
+        f.flush()
+        # The offset recorded afterwards must never run ahead of the disk
+        os.fsync(f.fileno())
+    return received, error
+
+
+def expire_uploads(db, upload_folder):
+    """Delete uploads past their expiry time and their partial files. Returns the number removed."""
+    cursor = db.cursor()
+    cursor.execute("SELECT UploadID FROM UploadSession WHERE ExpiresAt < NOW()")
+    upload_ids = [row[0] for row in cursor.fetchall()]
+    for upload_id in upload_ids:
+        try:
+            os.remove(partial_path(upload_folder, upload_id))
+        except FileNotFoundError:
+            pass
+        cursor.execute("DELETE FROM UploadSession WHERE UploadID = %s", (upload_id,))
+    db.commit()
+
+    # Also drop hash states of uploads that another process expired or finished
+    cursor.execute("SELECT UploadID FROM UploadSession")
+    live = {row[0] for row in cursor.fetchall()}
+    cursor.close()
+    with _hashes_lock:
+        for upload_id in [upload_id for upload_id in _hashes if upload_id not in live]:
+            del _hashes[upload_id]
+    return len(upload_ids)
+
+
+def _expiry_loop(db_config, upload_folder, interval):
+    while True:
+        time.sleep(interval)
+        try:
+            db = mysql.connector.connect(**db_config)
+            try:
+                expired = expire_uploads(db, upload_folder)
+                if expired:
+                    log.info("Removed %s expired resumable upload(s)", expired)
+            finally:
+                db.close()
+        except mysql.connector.Error as err:
+            log.error("Error expiring resumable uploads: %s", err)
+
+
+def start_expiry_worker(db_config, upload_folder, interval):
+    """Start the daemon thread that removes abandoned partial uploads every `interval` seconds."""
+    worker = threading.Thread(target=_expiry_loop, args=(db_config, upload_folder, interval),
+                              name='resumable-expiry', daemon=True)
+    worker.start()
+    return worker
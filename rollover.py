@@ -0,0 +1,467 @@
+"""
+University Assignment Portal - Semester Rollover
+
+Clones a set of courses into a new term together with their assignments
+(due dates shifted), rubrics and course materials. Rows are copied with
+INSERT ... SELECT, a batch of source courses per transaction, and the files
+behind them are hardlinked rather than copied, so a full catalog rollover
+costs a few statements per batch plus one link per file. Files in S3 are
+cloned within the bucket with a server-side copy, and handouts of archived
+assignments already packed into cold storage are extracted from their zip.
+
+Due dates move by the job's DueDateShiftDays. Without it they move by whole
+years, which is only right when every course stays in the same semester, so
+create_job() refuses other jobs without an explicit shift.
+
+A job runs in two steps:
+
+1. rows   - clone Course, Assignment, GradeRubric and CourseMaterial rows
+2. files  - link each cloned assignment's handouts and each cloned material
+
+Progress is recorded in RolloverJob after every batch, in the same
+transaction as the batch itself. Every step skips what is already cloned
+(ClonedFromID), so a job interrupted by a crash or restart is resumed by
+running it again:
+
+    python rollover.py <job_id>
+"""
+import errno
+import logging
+import os
+import shutil
+import sys
+import threading
+
+import mysql.connector
+
+import cold_storage
+import settings
+import storage
+
+FILE_BATCH_SIZE = 500  # cloned rows whose files are linked per progress update
+
+log = logging.getLogger(__name__)
+
+
+def create_job(db, target_year, target_semester, course_ids=None, source_year=None,
+               source_semester=None, due_shift_days=None, created_by=None):
+    """Record a rollover job and the source courses it clones.
+
+    Courses are picked by ID or by source term. Without `due_shift_days`,
+    due dates move by the difference between the source and target years;
+    that needs every course to be in the target semester already, otherwise
+    ValueError is raised. Returns (job_id, number of courses).
+    """
+    cursor = db.cursor()
+    conditions, params = ["Deleted = 0"], []
+    if course_ids:
+        conditions.append(f"CourseID IN ({', '.join(['%s'] * len(course_ids))})")
+        params.extend(course_ids)
+    if source_year is not None:
+        conditions.append("Year = %s")
+        params.append(source_year)
+    if source_semester is not None:
+        conditions.append("Semester = %s")
+        params.append(source_semester)
+    # Never clone a course into the term it already belongs to
+    conditions.append("NOT (Year <=> %s AND Semester <=> %s)")
+    params.extend([target_year, target_semester])
+
+    if due_shift_days is None:
+        # Semesters have no dates to shift between, only years do
+        cursor.execute(f"""
+            SELECT COUNT(*) FROM Course
+            WHERE {' AND '.join(conditions)}
+              AND NOT (Semester <=> %s AND Year IS NOT NULL)
+        """, (*params, target_semester))
+        if cursor.fetchone()[0]:
+            cursor.close()
+            raise ValueError("due_shift_days is required to roll courses into a different semester")
+
+    cursor.execute("""
+        INSERT INTO RolloverJob (TargetYear, TargetSemester, DueDateShiftDays, CreatedBy)
+        VALUES (%s, %s, %s, %s)
+    """, (target_year, target_semester, due_shift_days, created_by))
+    job_id = cursor.lastrowid
+
+    cursor.execute(f"""
+        INSERT INTO RolloverCourse (JobID, CourseID)
+        SELECT %s, CourseID FROM Course
+        WHERE {' AND '.join(conditions)}
+    """, (job_id, *params))
+    total = cursor.rowcount
+    cursor.execute("UPDATE RolloverJob SET TotalCourses = %s WHERE JobID = %s", (total, job_id))
+    db.commit()
+    cursor.close()
+    return job_id, total
+
+
+def get_job(db, job_id):
+    cursor = db.cursor(dictionary=True)
+    cursor.execute("SELECT * FROM RolloverJob WHERE JobID = %s", (job_id,))
+    job = cursor.fetchone()
+    cursor.close()
+    return job
+
+
+def _roots(upload_folder, storage_settings):
+    """(local root, S3 root) that cloned files go under, each ending in its separator.
+
+    A clone stays in the backend of its source, so copying never crosses
+    backends; without S3 settings, S3 sources have nowhere to go but disk.
+    """
+    local = os.path.join(upload_folder, '')
+    return local, storage.s3_root(storage_settings) if storage_settings else local
+
+
+def _clone_rows(cursor, job, roots, first_id, last_id):
+    """Clone the rows of the job's source courses with IDs in [first_id, last_id].
+
+    Returns (courses, assignments, materials) inserted.
+    """
+    job_id = job['JobID']
+    year, semester = job['TargetYear'], job['TargetSemester']
+
+    cursor.execute("""
+        INSERT INTO Course (CourseName, CourseCode, InstructorID, Year, Semester, ClonedFromID)
+        SELECT c.CourseName, c.CourseCode, c.InstructorID, %s, %s, c.CourseID
+        FROM RolloverCourse rc
+        JOIN Course c ON c.CourseID = rc.CourseID
+        WHERE rc.JobID = %s AND rc.CourseID BETWEEN %s AND %s
+          AND NOT EXISTS (
+              SELECT 1 FROM Course t
+              WHERE t.ClonedFromID = c.CourseID AND t.Year = %s AND t.Semester = %s
+          )
+    """, (year, semester, job_id, first_id, last_id, year, semester))
+    courses = cursor.rowcount
+
+    # Source course c, its clone t in the target term
+    clones = """
+        FROM RolloverCourse rc
+        JOIN Course c ON c.CourseID = rc.CourseID
+        JOIN Course t ON t.ClonedFromID = c.CourseID AND t.Year = %s AND t.Semester = %s
+    """
+    clone_params = (year, semester)
+
+    if job['DueDateShiftDays'] is None:
+        # Same semester, checked by create_job()
+        due_date = "DATE_ADD(a.DueDate, INTERVAL COALESCE(t.Year - c.Year, 0) YEAR)"
+        due_params = ()
+    else:
+        due_date = "DATE_ADD(a.DueDate, INTERVAL %s DAY)"
+        due_params = (job['DueDateShiftDays'],)
+
+    # Each clone gets its own assignment directory (student submissions are
+    # stored inside it), in the same backend as the source; the handouts are
+    # linked or copied into it in the files step
+    local_root, s3_root = roots
+    cursor.execute(f"""
+        INSERT INTO Assignment
+            (CourseID, Title, Description, DueDate, Status, MaxPoints, FilePath,
+             ContentHash, CreatedBy, CreatedAt, ClonedFromID)
+        SELECT t.CourseID, a.Title, a.Description, {due_date}, 'active', a.MaxPoints,
+               IF(a.FilePath IS NULL, NULL,
+                  CONCAT(IF(a.FilePath LIKE %s, %s, %s), 'assignment_course', t.CourseID, '_from', a.AssignmentID)),
+               a.ContentHash, a.CreatedBy, NOW(), a.AssignmentID
+        {clones}
+        JOIN Assignment a ON a.CourseID = c.CourseID
+        WHERE rc.JobID = %s AND rc.CourseID BETWEEN %s AND %s
+          AND NOT EXISTS (
+              SELECT 1 FROM Assignment x
+              WHERE x.CourseID = t.CourseID AND x.ClonedFromID = a.AssignmentID
+          )
+    """, (*due_params, storage.S3_SCHEME + '%', s3_root + 'assignments/',
+          os.path.join(local_root, 'assignments', ''), *clone_params, job_id, first_id, last_id))
+    assignments = cursor.rowcount
+
+    cursor.execute(f"""
+        INSERT INTO GradeRubric (AssignmentID, Criteria, Points)
+        SELECT na.AssignmentID, r.Criteria, r.Points
+        {clones}
+        JOIN Assignment na ON na.CourseID = t.CourseID
+        JOIN GradeRubric r ON r.AssignmentID = na.ClonedFromID
+        WHERE rc.JobID = %s AND rc.CourseID BETWEEN %s AND %s
+          AND NOT EXISTS (SELECT 1 FROM GradeRubric x WHERE x.AssignmentID = na.AssignmentID)
+        ORDER BY r.RubricID
+    """, (*clone_params, job_id, first_id, last_id))
+
+    # Materials keep their file name in the new course's directory
+    cursor.execute(f"""
+        INSERT INTO CourseMaterial (CourseID, FilePath, Description, ContentHash, UploadDate, ClonedFromID)
+        SELECT t.CourseID,
+               IF(m.FilePath LIKE %s,
+                  CONCAT(%s, t.CourseID, '/', SUBSTRING_INDEX(m.FilePath, '/', -1)),
+                  CONCAT(%s, t.CourseID, %s, SUBSTRING_INDEX(m.FilePath, %s, -1))),
+               m.Description, m.ContentHash, NOW(), m.MaterialID
+        {clones}
+        JOIN CourseMaterial m ON m.CourseID = c.CourseID
+        WHERE rc.JobID = %s AND rc.CourseID BETWEEN %s AND %s
+          AND NOT EXISTS (
+              SELECT 1 FROM CourseMaterial x
+              WHERE x.CourseID = t.CourseID AND x.ClonedFromID = m.MaterialID
+          )
+    """, (storage.S3_SCHEME + '%', s3_root + 'course_', os.path.join(local_root, 'course_'), os.sep, os.sep,
+          *clone_params, job_id, first_id, last_id))
+    materials = cursor.rowcount
+
+    return courses, assignments, materials
+
+
+def link_file(source, target):
+    """Hardlink `source` to `target`, copying across filesystems.
+
+    Returns True if a file was created, False if it already existed or the
+    source is missing.
+    """
+    if os.path.exists(target):
+        return False
+    if not os.path.exists(source):
+        log.warning("Rollover source file missing: %s", source)
+        return False
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    try:
+        os.link(source, target)
+    except FileExistsError:
+        return False
+    except OSError as e:
+        if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK):
+            raise
+        shutil.copy2(source, target)
+    return True
+
+
+def link_assignment(source_dir, target_dir):
+    """Link an assignment's handouts into its clone's directory."""
+    linked = 0
+    upload_dir = os.path.join(source_dir, 'professor_upload')
+    if os.path.isdir(upload_dir):
+        for name in os.listdir(upload_dir):
+            source = os.path.join(upload_dir, name)
+            if os.path.isfile(source):
+                linked += link_file(source, os.path.join(target_dir, 'professor_upload', name))
+    os.makedirs(os.path.join(target_dir, 'student_submissions'), exist_ok=True)
+    return linked
+
+
+class _Files:
+    """Clones stored files on local disk, in cold storage or in S3, outside of an app context."""
+
+    def __init__(self, db, storage_settings=None):
+        self.db = db
+        self.storage_settings = storage_settings
+        self._s3 = None
+
+    def s3(self):
+        if self._s3 is None:
+            if self.storage_settings is None:
+                raise OSError("Rollover found files in S3, but S3 storage is not configured")
+            self._s3 = storage.S3Storage(**self.storage_settings)
+        return self._s3
+
+    def copy(self, source, target):
+        """Clone one file. Returns True if a file was created."""
+        if not storage.is_remote(source):
+            if os.path.exists(source) or os.path.exists(target):
+                return link_file(source, target)
+            # Packed into cold storage since
+            if not cold_storage.extract_file(self.db, source, target):
+                log.warning("Rollover source file missing: %s", source)
+                return False
+            return True
+        s3 = self.s3()
+        if s3.exists(target):
+            return False
+        try:
+            s3.copy(source, target)
+        except FileNotFoundError:
+            log.warning("Rollover source file missing: %s", source)
+            return False
+        return True
+
+    def copy_assignment(self, source_id, source_dir, target_dir):
+        """Clone an assignment's handouts into its clone's directory. Returns the number of files created."""
+        if not storage.is_remote(source_dir):
+            if os.path.isdir(source_dir):
+                return link_assignment(source_dir, target_dir)
+            linked = 0
+            for source, member in cold_storage.packed_files(self.db, source_id, 'professor_upload'):
+                linked += self.copy(source, os.path.join(target_dir, *member.split('/')))
+            os.makedirs(os.path.join(target_dir, 'student_submissions'), exist_ok=True)
+            return linked
+        linked = 0
+        for source in self.s3().list(source_dir + '/professor_upload'):
+            linked += self.copy(source, f"{target_dir}/professor_upload/{source.rsplit('/', 1)[-1]}")
+        return linked
+
+
+# Cloned rows (new ID, new path, source path, source ID) made by a job, after a given ID
+FILE_QUERIES = {
+    'assignment_files': """
+        SELECT na.AssignmentID, na.FilePath, a.FilePath, a.AssignmentID
+        FROM RolloverCourse rc
+        JOIN Course t ON t.ClonedFromID = rc.CourseID
+        JOIN Assignment na ON na.CourseID = t.CourseID
+        JOIN Assignment a ON a.AssignmentID = na.ClonedFromID
+        WHERE rc.JobID = %s AND t.Year = %s AND t.Semester = %s
+          AND na.AssignmentID > %s AND na.FilePath IS NOT NULL
+        ORDER BY na.AssignmentID
+        LIMIT %s
+    """,
+    'material_files': """
+        SELECT nm.MaterialID, nm.FilePath, m.FilePath, m.MaterialID
+        FROM RolloverCourse rc
+        JOIN Course t ON t.ClonedFromID = rc.CourseID
+        JOIN CourseMaterial nm ON nm.CourseID = t.CourseID
+        JOIN CourseMaterial m ON m.MaterialID = nm.ClonedFromID
+        WHERE rc.JobID = %s AND t.Year = %s AND t.Semester = %s
+          AND nm.MaterialID > %s
+        ORDER BY nm.MaterialID
+        LIMIT %s
+    """
+}
+STEPS = ['rows', 'assignment_files', 'material_files', 'done']
+
+
+def _run_rows(db, cursor, job, roots, batch_size):
+    last_id = job['LastCourseID']
+    while True:
+        cursor.execute("""
+            SELECT CourseID FROM RolloverCourse
+            WHERE JobID = %s AND CourseID > %s
+            ORDER BY CourseID
+            LIMIT %s
+        """, (job['JobID'], last_id, batch_size))
+        ids = [row[0] for row in cursor.fetchall()]
+        if not ids:
+            return
+        courses, assignments, materials = _clone_rows(cursor, job, roots, ids[0], ids[-1])
+        last_id = ids[-1]
+        cursor.execute("""
+            UPDATE RolloverJob
+            SET LastCourseID = %s,
+                CoursesCloned = CoursesCloned + %s,
+                AssignmentsCloned = AssignmentsCloned + %s,
+                MaterialsCloned = MaterialsCloned + %s
+            WHERE JobID = %s
+        """, (last_id, courses, assignments, materials, job['JobID']))
+        db.commit()
+
+
+def _run_files(db, cursor, job, step, files):
+    last_id = job['LastFileID']
+    while True:
+        cursor.execute(FILE_QUERIES[step], (job['JobID'], job['TargetYear'], job['TargetSemester'],
+                                            last_id, FILE_BATCH_SIZE))
+        rows = cursor.fetchall()
+        if not rows:
+            return
+        linked = 0
+        for row_id, target, source, source_id in rows:
+            if step == 'assignment_files':
+                if source:
+                    linked += files.copy_assignment(source_id, source, target)
+            else:
+                linked += files.copy(source, target)
+            last_id = row_id
+        cursor.execute("""
+            UPDATE RolloverJob SET LastFileID = %s, FilesLinked = FilesLinked + %s
+            WHERE JobID = %s
+        """, (last_id, linked, job['JobID']))
+        db.commit()
+
+
+def run_job(db_config, job_id, upload_folder, storage_settings, batch_size):
+    """Run (or resume) a job to completion. Returns False if another process is running it.
+
+    `storage_settings` are the S3Storage arguments, needed if any file is in S3;
+    `batch_size` is the number of source courses cloned per transaction.
+    """
+    db = mysql.connector.connect(**db_config)
+    cursor = db.cursor()
+    lock = f"rollover_job_{job_id}"
+    try:
+        cursor.execute("SELECT GET_LOCK(%s, 0)", (lock,))
+        if not cursor.fetchone()[0]:
+            return False
+        try:
+            job = get_job(db, job_id)
+            if job is None or job['Status'] == 'done':
+                return True
+
+            cursor.execute("SET @rollover_job_id = %s", (job_id,))
+            cursor.execute("UPDATE RolloverJob SET Status = 'running', Error = NULL WHERE JobID = %s",
+                           (job_id,))
+            db.commit()
+
+            for step in STEPS[STEPS.index(job['Step']):-1]:
+                if step == 'rows':
+                    _run_rows(db, cursor, job, _roots(upload_folder, storage_settings), batch_size)
+                else:
+                    _run_files(db, cursor, job, step, _Files(db, storage_settings))
+                next_step = STEPS[STEPS.index(step) + 1]
+                cursor.execute("UPDATE RolloverJob SET Step = %s, LastFileID = 0 WHERE JobID = %s",
+                               (next_step, job_id))
+                db.commit()
+                job['LastFileID'] = 0
+
+            cursor.execute("UPDATE RolloverJob SET Status = 'done' WHERE JobID = %s", (job_id,))
+            db.commit()
+            return True
+        except (mysql.connector.Error, OSError) as e:
+            log.error("Error running rollover job %s: %s", job_id, e)
+            db.rollback()
+            cursor.execute("UPDATE RolloverJob SET Status = 'failed', Error = %s WHERE JobID = %s",
+                           (str(e), job_id))
+            db.commit()
+            return True
+        finally:
+            cursor.execute("SET @rollover_job_id = NULL")
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (lock,))
+            cursor.fetchall()
+    finally:
+        cursor.close()
+        db.close()
+
+
+def _run_in_background(db_config, job_id, upload_folder, storage_settings, batch_size):
+    try:
+        run_job(db_config, job_id, upload_folder, storage_settings, batch_size)
+    except mysql.connector.Error as err:
+        log.error("Error running rollover job %s: %s", job_id, err)
+
+
+def start_job(db_config, job_id, upload_folder, storage_settings, batch_size):
+    """Run a job on a daemon thread with its own connection."""
+    worker = threading.Thread(target=_run_in_background,
+                              args=(db_config, job_id, upload_folder, storage_settings, batch_size),
+                              name=f'rollover-{job_id}', daemon=True)
+    worker.start()
+    return worker
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 2 or not sys.argv[1].isdigit():
+        print("Usage: python rollover.py <job_id>")
+        sys.exit(2)
+
+    config = settings.load()
+    db_config = settings.database_config(config)
+    job_id = int(sys.argv[1])
+    try:
+        if not run_job(db_config, job_id, config['UPLOAD_FOLDER'], storage.s3_settings(config),
+                       config['ROLLOVER_BATCH_SIZE']):
+            print(f"Rollover job {job_id} is already running")
+            sys.exit(1)
+        db = mysql.connector.connect(**db_config)
+        job = get_job(db, job_id)
+        db.close()
+    except mysql.connector.Error as err:
+        print(f"Database connection failed: {err}")
+        sys.exit(1)
+    if job is None:
+        print(f"Rollover job {job_id} not found")
+        sys.exit(1)
+    print(f"Rollover job {job_id}: {job['Status']} - {job['CoursesCloned']}/{job['TotalCourses']} courses, "
+          f"{job['AssignmentsCloned']} assignments, {job['MaterialsCloned']} materials, "
+          f"{job['FilesLinked']} files linked")
+    sys.exit(0 if job['Status'] == 'done' else 1)
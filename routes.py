@@ -1,28 +1,56 @@
-from flask import Flask, request, jsonify, session, redirect, url_for, send_from_directory, render_template
+from flask import Blueprint, current_app, request, jsonify, session, redirect, url_for, send_from_directory, send_file, render_template
 from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.http import http_date
 from werkzeug.utils import secure_filename
+from werkzeug.local import LocalProxy
 import mysql.connector
-from config import (SECRET_KEY, DATABASE_HOST, DATABASE_USER, DATABASE_PASSWORD, 
-                   DATABASE_NAME, UPLOAD_FOLDER, ALLOWED_EXTENSIONS)
 import datetime
+import hashlib
+import logging
 import os
+import re
+import time
+import uuid
 from functools import wraps
-
-app = Flask(__name__)
-app.secret_key = SECRET_KEY  # Set a strong secret key!
-app.config['UPLOAD_FOLDER'] = r'C:\Users\hassa\OneDrive\Documents\Academics\Semester 5\Assignment Portal\uploads'
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max-limit
-
-# Database connection 
-mydb = mysql.connector.connect(
-    host=DATABASE_HOST,
-    user=DATABASE_USER,
-    password=DATABASE_PASSWORD,
-    database=DATABASE_NAME
-)
+import submission_store
+import audit
+import cold_storage
+import course_deletion
+import search
+import db_router
+import grading_queue
+import response_cache
+import json_provider
+import rate_limit
+import resumable
+import rollover
+import settings
+import storage
+import term_archive
+
+try:
+    import similarity
+    import gradebook
+except ImportError:  # NumPy not installed; similarity and gradebook analytics are disabled
+    similarity = None
+    gradebook = None
+
+portal = Blueprint('portal', __name__)
+log = logging.getLogger(__name__)
+
+# Set up by create_app() in app.py: a pooled connection per request, routed
+# to a replica for @read_only handlers and to the primary otherwise, and the
+# background upload analysis pipeline
+mydb = LocalProxy(db_router.get_connection)
+pipeline = LocalProxy(lambda: current_app.extensions['upload_pipeline'])
 
 def allowed_file(filename):
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in current_app.config['ALLOWED_EXTENSIONS']
+
+def invalidate_gradebook(course_id):
+    """Drop cached gradebook analytics after grades, submissions or enrollments change."""
+    if gradebook is not None and course_id is not None:
+        gradebook.invalidate(course_id)
 
 """
 University Assignment Portal - Route Definitions
@@ -47,55 +75,206 @@ def login_required(f):
     return decorated_function
 
 # Modify the root route to handle role-based redirection
-@app.route('/')
+@portal.route('/')
 def index():
     if 'user_id' in session:
         role = session.get('role')
         if role == 'admin':
-            return redirect(url_for('admin_dashboard_page'))
+            return redirect(url_for('.admin_dashboard_page'))
         elif role == 'professor':
-            return redirect(url_for('professor_dashboard_page'))
+            return redirect(url_for('.professor_dashboard_page'))
         else:
-            return redirect(url_for('student_dashboard_page'))
-    return redirect(url_for('login_page'))
+            return redirect(url_for('.student_dashboard_page'))
+    return redirect(url_for('.login_page'))
 
 # Add new routes for serving HTML pages
-@app.route('/login', methods=['GET'])
+@portal.route('/login', methods=['GET'])
 def login_page():
     if 'user_id' in session:
-        return redirect(url_for('index'))
+        return redirect(url_for('.index'))
     return render_template('login.html')
 
-@app.route('/register', methods=['GET'])
+@portal.route('/register', methods=['GET'])
 def register_page():
     if 'user_id' in session:
-        return redirect(url_for('index'))
+        return redirect(url_for('.index'))
     return render_template('register.html')
 
 # Add new routes for serving dashboard pages
-@app.route('/admin-dashboard-page')
+@portal.route('/admin-dashboard-page')
 @login_required
 def admin_dashboard_page():
     if session.get('role') != 'admin':
-        return redirect(url_for('index'))
+        return redirect(url_for('.index'))
     return render_template('admin_dashboard.html')
 
-@app.route('/professor-dashboard-page')
+@portal.route('/professor-dashboard-page')
 @login_required
 def professor_dashboard_page():
     if session.get('role') != 'professor':
-        return redirect(url_for('index'))
+        return redirect(url_for('.index'))
     return render_template('professor_dashboard.html')
 
-@app.route('/student-dashboard-page')
+@portal.route('/student-dashboard-page')
 @login_required
 def student_dashboard_page():
     if session.get('role') != 'student':
-        return redirect(url_for('index'))
+        return redirect(url_for('.index'))
     return render_template('student_dashboard.html')
 
-@app.route('/api/assignments/upload', methods=['POST'])
+# Recording of stored uploads, shared by the multipart upload routes and the
+# direct-to-storage routes (/api/uploads/presign and /api/uploads/complete)
+def _assignment_dir_name(title):
+    """Unique directory name for a new assignment."""
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    safe_title = "".join(c for c in title if c.isalnum() or c in (' ', '-', '_')).rstrip()
+    return f'assignment_{timestamp}_{safe_title}'
+
+def _record_assignment(cursor, course_id, title, description, due_date, assignment_dir,
+                       file_path, filename, content_hash):
+    """Insert a new assignment whose handout is stored, notify students, queue analysis."""
+    # Save assignment record with the assignment directory path
+    cursor.execute("""
+        INSERT INTO Assignment (CourseID, Title, Description, DueDate, FilePath, ContentHash, CreatedBy, CreatedAt)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, NOW())
+    """, (course_id, title, description, due_date, assignment_dir, content_hash, session['user_id']))
+    assignment_id = cursor.lastrowid
+    
+    mydb.commit()
+    audit.record('assignment.create', 'assignment', assignment_id, after={
+        'CourseID': course_id, 'Title': title, 'DueDate': due_date,
+        'FilePath': file_path, 'ContentHash': content_hash
+    })
+
+    # Create notification for enrolled students
+    cursor.execute("""
+        INSERT INTO Notification (UserID, Message, Timestamp)
+        SELECT e.StudentID, 
+               CONCAT('New assignment posted in ', c.CourseName, ': ', %s),
+               NOW()
+        FROM Enrollment e
+        JOIN Course c ON e.CourseID = c.CourseID
+        WHERE e.CourseID = %s AND e.Status = 'active'
+    """, (title, course_id))
+    
+    mydb.commit()
+    invalidate_gradebook(course_id)
+
+    # Extract the handout text for search
+    try:
+        pipeline.submit(mydb, file_path, filename, content_hash)
+    except Exception as e:
+        log.exception("Error queueing assignment analysis: %s", e)
+    return assignment_id
+
+def _record_material(cursor, course_id, file_path, description, filename, content_hash):
+    """Insert a stored course material and queue its analysis."""
+    # Set current user for the trigger
+    cursor.execute("SET @current_user_id = %s", (session['user_id'],))
+    
+    # Record the material in database
+    cursor.execute("""
+        INSERT INTO CourseMaterial (CourseID, FilePath, Description, ContentHash, UploadDate)
+        VALUES (%s, %s, %s, %s, NOW())
+    """, (course_id, file_path, description, content_hash))
+    material_id = cursor.lastrowid
+    mydb.commit()
+    audit.record('material.upload', 'course_material', material_id, after={
+        'CourseID': course_id, 'FilePath': file_path, 'Description': description, 'ContentHash': content_hash
+    })
+
+    # Extract the material text for search
+    try:
+        pipeline.submit(mydb, file_path, filename, content_hash)
+    except Exception as e:
+        log.exception("Error queueing material analysis: %s", e)
+
+def _submission_dir(assignment):
+    return os.path.join(assignment['FilePath'], 'student_submissions', f'student_{session["user_id"]}')
+
+def _check_submission_target(cursor, assignment_id):
+    """Return (assignment, None) if the student may submit to it, else (None, error response)."""
+    # Verify assignment exists and is still accepting submissions
+    cursor.execute("""
+        SELECT a.*, c.CourseID, c.Archived
+        FROM Assignment a
+        JOIN Course c ON a.CourseID = c.CourseID
+        WHERE a.AssignmentID = %s AND c.Deleted = 0
+    """, (assignment_id,))
+    
+    assignment = cursor.fetchone()
+    if not assignment:
+        return None, (jsonify({'success': False, 'message': 'Assignment not found'}), 404)
+    if assignment['Archived']:
+        return None, (jsonify({'success': False, 'message': 'This course has been archived'}), 403)
+
+    # Verify student is enrolled in the course
+    cursor.execute("""
+        SELECT 1 FROM Enrollment 
+        WHERE StudentID = %s AND CourseID = %s AND Status = 'active'
+    """, (session['user_id'], assignment['CourseID']))
+    
+    if not cursor.fetchone():
+        return None, (jsonify({'success': False, 'message': 'You are not enrolled in this course'}), 403)
+    return assignment, None
+
+def _record_submission(cursor, assignment, filename, version):
+    """Record a stored submission version. Returns (submission_id, version_number)."""
+    # Record the submission in database; LAST_INSERT_ID(SubmissionID)
+    # makes lastrowid return the existing row on resubmission
+    cursor.execute("""
+        INSERT INTO Submission 
+        (AssignmentID, StudentID, SubmissionPath, FileType, FileSize, SubmissionDate) 
+        VALUES (%s, %s, %s, %s, %s, NOW())
+        ON DUPLICATE KEY UPDATE 
+        SubmissionID = LAST_INSERT_ID(SubmissionID),
+        SubmissionPath = VALUES(SubmissionPath),
+        FileType = VALUES(FileType),
+        FileSize = VALUES(FileSize),
+        SubmissionDate = NOW()
+    """, (assignment['AssignmentID'], session['user_id'], version['path'],
+          version['file_type'], version['size']))
+    submission_id = cursor.lastrowid
+
+    # Add a history entry unless the content is unchanged
+    cursor.execute("""
+        SELECT VersionNumber, ContentHash
+        FROM SubmissionVersion
+        WHERE SubmissionID = %s
+        ORDER BY VersionNumber DESC
+        LIMIT 1
+    """, (submission_id,))
+    latest = cursor.fetchone()
+
+    if latest and latest['ContentHash'] == version['hash']:
+        version_number = latest['VersionNumber']
+    else:
+        version_number = (latest['VersionNumber'] if latest else 0) + 1
+        cursor.execute("""
+            INSERT INTO SubmissionVersion
+            (SubmissionID, VersionNumber, FileName, BlobPath, ContentHash, FileSize, StoredSize)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+        """, (submission_id, version_number, filename, version['path'],
+              version['hash'], version['size'], version['stored_size']))
+    
+    mydb.commit()
+    invalidate_gradebook(assignment['CourseID'])
+    audit.record('submission.submit', 'submission', submission_id, after={
+        'AssignmentID': assignment['AssignmentID'], 'FileName': filename, 'Version': version_number,
+        'ContentHash': version['hash'], 'FileSize': version['size']
+    })
+
+    # Queue format validation and preview generation
+    try:
+        pipeline.submit(mydb, version['path'], filename, version['hash'], submission_id)
+    except Exception as e:
+        log.exception("Error queueing submission analysis: %s", e)
+    return submission_id, version_number
+
+@portal.route('/api/assignments/upload', methods=['POST'])
+@rate_limit.limit('10/minute', burst=5)
 @login_required
+@response_cache.invalidates('assignments')
 def upload_assignment():
     """Handle assignment file uploads from professors."""
     if session.get('role') != 'professor':
@@ -123,7 +302,7 @@ def upload_assignment():
         # Verify professor teaches this course
         cursor.execute("""
             SELECT 1 FROM Course 
-            WHERE CourseID = %s AND InstructorID = %s
+            WHERE CourseID = %s AND InstructorID = %s AND Deleted = 0
         """, (course_id, session['user_id']))
         
         if not cursor.fetchone():
@@ -131,77 +310,44 @@ def upload_assignment():
 
         if file and allowed_file(file.filename):
             try:
-                # Create paths for professor uploads
-                assignment_base_dir = os.path.join(
-                    app.config['UPLOAD_FOLDER'],
-                    'assignments'  # Base directory for all assignments
-                )
-                
-                # Create unique assignment directory
-                timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-                safe_title = "".join(c for c in title if c.isalnum() or c in (' ', '-', '_')).rstrip()
-                assignment_dir = os.path.join(
-                    assignment_base_dir,
-                    f'assignment_{timestamp}_{safe_title}'  # Unique assignment directory
-                )
-                
-                # Create professor uploads directory within assignment directory
-                professor_upload_dir = os.path.join(assignment_dir, 'professor_upload')
-                os.makedirs(professor_upload_dir, exist_ok=True)
-                
+                # Unique assignment directory in the configured storage backend
+                assignment_dir = storage.default().path('assignments', _assignment_dir_name(title))
+
                 # Save professor's file
                 filename = secure_filename(file.filename)
-                file_path = os.path.join(professor_upload_dir, filename)
-                file.save(file_path)
-
-                # Create directory for student submissions
-                student_submissions_dir = os.path.join(assignment_dir, 'student_submissions')
-                os.makedirs(student_submissions_dir, exist_ok=True)
-
-                # Save assignment record with the assignment directory path
-                cursor.execute("""
-                    INSERT INTO Assignment (CourseID, Title, Description, DueDate, FilePath, CreatedBy, CreatedAt)
-                    VALUES (%s, %s, %s, %s, %s, %s, NOW())
-                """, (course_id, title, description, due_date, assignment_dir, session['user_id']))
-                
-                mydb.commit()
-
-                # Create notification for enrolled students
-                cursor.execute("""
-                    INSERT INTO Notification (UserID, Message, Timestamp)
-                    SELECT e.StudentID, 
-                           CONCAT('New assignment posted in ', c.CourseName, ': ', %s),
-                           NOW()
-                    FROM Enrollment e
-                    JOIN Course c ON e.CourseID = c.CourseID
-                    WHERE e.CourseID = %s AND e.Status = 'active'
-                """, (title, course_id))
-                
-                mydb.commit()
+                file_path = os.path.join(assignment_dir, 'professor_upload', filename)
+                content = file.read()
+                storage.default().write(file_path, content)
+
+                assignment_id = _record_assignment(
+                    cursor, course_id, title, description, due_date, assignment_dir,
+                    file_path, filename, hashlib.sha256(content).hexdigest())
                 
                 return jsonify({
                     'success': True,
                     'message': 'Assignment uploaded successfully',
-                    'assignment_id': cursor.lastrowid
+                    'assignment_id': assignment_id
                 }), 201
             
             except OSError as e:
-                print(f"OS error: {e}")
+                log.error("OS error: %s", e)
                 return jsonify({'success': False, 'message': 'Failed to save file'}), 500
         
         return jsonify({'success': False, 'message': 'Invalid file type'}), 400
 
     except mysql.connector.Error as err:
-        print(f"Database error: {err}")
+        log.error("Database error: %s", err)
         return jsonify({'success': False, 'message': 'Database error occurred'}), 500
     except Exception as e:
-        print(f"Error uploading assignment: {e}")
+        log.exception("Error uploading assignment: %s", e)
         return jsonify({'success': False, 'message': 'Failed to upload assignment'}), 500
 
 
 # ============ Common Routes ============
 # Modify existing register route to handle both form and API requests
-@app.route('/register', methods=['POST'])
+@portal.route('/register', methods=['POST'])
+@rate_limit.limit('5/hour', key='ip')
+@response_cache.invalidates('users')
 def register():
     """Handle new user registration for all roles."""
     if request.is_json:
@@ -227,16 +373,20 @@ def register():
         cursor.execute("INSERT INTO User (Username, Password, FirstName, LastName, Email, Role) VALUES (%s, %s, %s, %s, %s, %s)",
                        (username, hashed_password, first_name, last_name, email, role))
         mydb.commit()
+        audit.record('user.register', 'user', cursor.lastrowid, after={
+            'Username': username, 'FirstName': first_name, 'LastName': last_name, 'Email': email, 'Role': role
+        })
         
         if request.is_json:
             return jsonify({'message': 'User registered successfully'}), 201
-        return redirect(url_for('login_page'))
+        return redirect(url_for('.login_page'))
     except mysql.connector.Error as err:
-        print(f"Error during registration: {err}")
+        log.error("Error during registration: %s", err)
         return jsonify({'message': 'Registration failed'}), 500
 
 # Modify login route to handle proper redirections
-@app.route('/login', methods=['POST'])
+@portal.route('/login', methods=['POST'])
+@rate_limit.limit('5/minute', key='ip')
 def login():
     """Authenticate users and create session."""
     if request.is_json:
@@ -259,40 +409,46 @@ def login():
             session['user_id'] = user['UserID']
             session['role'] = user['Role']
             session['username'] = user['Username']
+            audit.record('user.login', 'user', user['UserID'])
 
             # Redirect based on role
             if user['Role'] == 'admin':
-                return redirect(url_for('admin_dashboard_page'))
+                return redirect(url_for('.admin_dashboard_page'))
             elif user['Role'] == 'professor':
-                return redirect(url_for('professor_dashboard_page'))
+                return redirect(url_for('.professor_dashboard_page'))
             else:
-                return redirect(url_for('student_dashboard_page'))
+                return redirect(url_for('.student_dashboard_page'))
         else:
+            audit.record('user.login_failed', 'user', user['UserID'] if user else None,
+                         after={'Username': username})
             return jsonify({'message': 'Invalid credentials'}), 401
     except mysql.connector.Error as err:
-        print(f"Error during login: {err}")
+        log.error("Error during login: %s", err)
         return jsonify({'message': 'Login failed'}), 500
 
 # Modify logout route to redirect to login page
-@app.route('/logout')
+@portal.route('/logout')
 @login_required
 def logout():
     """End user session and logout."""
     session.clear()
-    return redirect(url_for('login_page'))
+    return redirect(url_for('.login_page'))
 
 # Add error handlers
-@app.errorhandler(404)
+@portal.app_errorhandler(404)
 def not_found_error(error):
     return render_template('errors/404.html'), 404
 
-@app.errorhandler(500)
+@portal.app_errorhandler(500)
 def internal_error(error):
     return render_template('errors/500.html'), 500
 
 # ============ Admin Routes ============
-@app.route('/admin-dashboard')
+@portal.route('/admin-dashboard')
+@rate_limit.limit('30/minute', burst=10)
 @login_required
+@db_router.read_only
+@response_cache.cached(ttl=15, topics=('users', 'courses', 'enrollments', 'assignments'))
 def admin_dashboard():
     """Admin dashboard data API endpoint."""
     if session.get('role') != 'admin':
@@ -305,7 +461,7 @@ def admin_dashboard():
             SELECT 
                 (SELECT COUNT(*) FROM User WHERE Role = 'student' AND Active = 1) as student_count,
                 (SELECT COUNT(*) FROM User WHERE Role = 'professor' AND Active = 1) as professor_count,
-                (SELECT COUNT(*) FROM Course) as active_courses,
+                (SELECT COUNT(*) FROM Course WHERE Deleted = 0) as active_courses,
                 (SELECT COUNT(*) FROM Assignment 
                  WHERE DueDate > CURRENT_TIMESTAMP 
                  AND Status = 'active') as active_assignments
@@ -325,6 +481,7 @@ def admin_dashboard():
             FROM Course c
             LEFT JOIN User u ON c.InstructorID = u.UserID
             LEFT JOIN Enrollment e ON c.CourseID = e.CourseID
+            WHERE c.Deleted = 0
             GROUP BY c.CourseID, c.CourseCode, c.CourseName, c.Year, c.Semester, 
                      u.FirstName, u.LastName
             ORDER BY c.CourseCode
@@ -341,7 +498,7 @@ def admin_dashboard():
                 c.CourseCode,
                 CONCAT(u.FirstName, ' ', u.LastName) as StudentName
             FROM EnrollmentRequest er
-            JOIN Course c ON er.CourseID = c.CourseID
+            JOIN Course c ON er.CourseID = c.CourseID AND c.Deleted = 0
             JOIN User u ON er.StudentID = u.UserID
             WHERE er.Status = 'pending'  # Add this condition
             ORDER BY er.RequestDate DESC
@@ -356,11 +513,13 @@ def admin_dashboard():
         }), 200
 
     except mysql.connector.Error as err:
-        print(f"Error fetching dashboard data: {err}")
+        log.error("Error fetching dashboard data: %s", err)
         return jsonify({'message': 'Error fetching dashboard data'}), 500
 
-@app.route('/api/professors')
+@portal.route('/api/professors')
 @login_required
+@db_router.read_only
+@response_cache.cached(ttl=60, topics=('users',), scope='role')
 def get_professors():
     """Get list of all professors for admin dashboard."""
     if session.get('role') != 'admin':
@@ -377,12 +536,63 @@ def get_professors():
         professors = cursor.fetchall()
         return jsonify({'professors': professors}), 200
     except mysql.connector.Error as err:
-        print(f"Error fetching professors: {err}")
+        log.error("Error fetching professors: %s", err)
         return jsonify({'message': 'Failed to fetch professors'}), 500
 
+@portal.route('/admin/rate-limits')
+@login_required
+def get_rate_limit_stats():
+    """Allowed and rejected request counts per rate-limit policy in this worker."""
+    if session.get('role') != 'admin':
+        return jsonify({'message': 'Unauthorized access'}), 403
+    return jsonify({'policies': rate_limit.snapshot()}), 200
+
+AUDIT_PAGE_SIZE = 50
+
+@portal.route('/admin/audit')
+@login_required
+@db_router.read_only
+def get_audit_log():
+    """Search the audit log, newest first; page with ?before=<next_cursor>.
+
+    Filters: actor_id, action, entity_type, entity_id, request_id, and since/until
+    as ISO dates or timestamps.
+    """
+    if session.get('role') != 'admin':
+        return jsonify({'message': 'Unauthorized access'}), 403
+
+    try:
+        since = request.args.get('since')
+        until = request.args.get('until')
+        filters = {
+            'actor_id': request.args.get('actor_id', type=int),
+            'action': request.args.get('action'),
+            'entity_type': request.args.get('entity_type'),
+            'entity_id': request.args.get('entity_id'),
+            'request_id': request.args.get('request_id'),
+            'since': datetime.datetime.fromisoformat(since) if since else None,
+            'until': datetime.datetime.fromisoformat(until) if until else None,
+            'before': request.args.get('before', type=int)
+        }
+        limit = min(max(int(request.args.get('limit', AUDIT_PAGE_SIZE)), 1), 200)
+    except ValueError:
+        return jsonify({'message': 'Invalid since, until or limit'}), 400
+
+    cursor = mydb.cursor(dictionary=True)
+    try:
+        entries = audit.query(cursor, limit=limit, **filters)
+        return jsonify({
+            'entries': entries,
+            'next_cursor': entries[-1]['AuditID'] if len(entries) == limit else None
+        }), 200
+    except mysql.connector.Error as err:
+        log.error("Error fetching audit log: %s", err)
+        return jsonify({'message': 'Failed to fetch audit log'}), 500
+
 # Update the existing admin_create_course route
-@app.route('/admin/courses/create', methods=['POST'])
+@portal.route('/admin/courses/create', methods=['POST'])
 @login_required
+@response_cache.invalidates('courses')
 def admin_create_course():
     """Create new courses and assign professors."""
     if session.get('role') != 'admin':
@@ -437,30 +647,41 @@ def admin_create_course():
             data['year'],
             semester  # Now using the validated integer value
         ))
+        course_id = cursor.lastrowid
         
         mydb.commit()
+        audit.record('course.create', 'course', course_id, after={
+            'CourseName': data['course_name'], 'CourseCode': data['course_code'],
+            'InstructorID': data['instructor_id'], 'Year': data['year'], 'Semester': semester
+        })
         
         return jsonify({
             'success': True,
             'message': 'Course created successfully',
-            'course_id': cursor.lastrowid
+            'course_id': course_id
         }), 201
 
     except mysql.connector.Error as err:
-        print(f"Error creating course: {err}")
+        log.error("Error creating course: %s", err)
         return jsonify({
             'success': False,
             'message': 'Failed to create course'
         }), 500
 
-@app.route('/admin/enrollment/approve/<int:request_id>', methods=['POST'])
+@portal.route('/admin/enrollment/approve/<int:request_id>', methods=['POST'])
 @login_required
+@response_cache.invalidates('enrollments')
 def approve_enrollment(request_id):
     if session.get('role') != 'admin':
         return jsonify({'success': False, 'message': 'Only admins can approve enrollments'}), 403
 
     cursor = mydb.cursor(dictionary=True)
     try:
+        cursor.execute("""
+            SELECT StudentID, CourseID, Status FROM EnrollmentRequest WHERE RequestID = %s
+        """, (request_id,))
+        pending = cursor.fetchone()
+
         # Call ProcessEnrollmentRequest procedure
         args = [request_id, session['user_id'], 'approve', 0, '']  # Last two are OUT parameters
         result = cursor.callproc('ProcessEnrollmentRequest', args)
@@ -469,20 +690,26 @@ def approve_enrollment(request_id):
         message = result[4]  # Fifth parameter (OUT message)
         
         mydb.commit()
+
+        if success:
+            invalidate_gradebook(pending['CourseID'] if pending else None)
+            audit.record('enrollment.approve', 'enrollment_request', request_id,
+                         before=pending, after={'Status': 'approved'})
         return jsonify({
             'success': success,
             'message': message
         }), 200 if success else 400
 
     except mysql.connector.Error as err:
-        print(f"Error processing enrollment: {err}")
+        log.error("Error processing enrollment: %s", err)
         return jsonify({
             'success': False,
             'message': 'Failed to process enrollment request'
         }), 500
 
-@app.route('/admin/enrollment/reject/<int:request_id>', methods=['POST'])
+@portal.route('/admin/enrollment/reject/<int:request_id>', methods=['POST'])
 @login_required
+@response_cache.invalidates('enrollments')
 def reject_enrollment(request_id):
     """Reject student enrollment request."""
     if session.get('role') != 'admin':
@@ -500,86 +727,97 @@ def reject_enrollment(request_id):
             return jsonify({'success': False, 'message': 'Request not found or already processed'}), 404
         
         mydb.commit()
+        audit.record('enrollment.reject', 'enrollment_request', request_id,
+                     before={'Status': 'pending'}, after={'Status': 'rejected'})
         return jsonify({'success': True, 'message': 'Enrollment request rejected successfully'}), 200
 
     except mysql.connector.Error as err:
-        print(f"Error rejecting enrollment: {err}")
+        log.error("Error rejecting enrollment: %s", err)
         return jsonify({'success': False, 'message': 'Failed to reject enrollment request'}), 500
 
 # Add course deletion route
-@app.route('/admin/courses/<int:course_id>/delete', methods=['POST'])
+@portal.route('/admin/courses/<int:course_id>/delete', methods=['POST'])
 @login_required
+@response_cache.invalidates('courses', 'enrollments', 'assignments', 'submissions')
 def delete_course(course_id):
+    """Hide a course at once and delete its rows and files as a background job."""
     if session.get('role') != 'admin':
         return jsonify({
             'success': False,
             'message': 'Only admins can delete courses'
         }), 403
 
-    cursor = mydb.cursor(dictionary=True)
     try:
-        # Start transaction
-        cursor.execute("START TRANSACTION")
-        
-        # Check if course exists
-        cursor.execute("SELECT CourseID, CourseName FROM Course WHERE CourseID = %s", (course_id,))
-        course = cursor.fetchone()
-        
-        if not course:
-            cursor.execute("ROLLBACK")
-            return jsonify({
-                'success': False,
-                'message': 'Course not found'
-            }), 404
-
-        # Delete enrollments first
-        cursor.execute("DELETE FROM Enrollment WHERE CourseID = %s", (course_id,))
-        
-        # Delete enrollment requests
-        cursor.execute("DELETE FROM EnrollmentRequest WHERE CourseID = %s", (course_id,))
-        
-        # Delete assignments and their submissions
-        cursor.execute("""
-            DELETE s FROM Submission s
-            INNER JOIN Assignment a ON s.AssignmentID = a.AssignmentID
-            WHERE a.CourseID = %s
-        """, (course_id,))
-        
-        cursor.execute("DELETE FROM Assignment WHERE CourseID = %s", (course_id,))
-        
-        # Finally delete the course
-        cursor.execute("DELETE FROM Course WHERE CourseID = %s", (course_id,))
-        
-        # Create notification for affected users
-        cursor.execute("""
-            INSERT INTO Notification (UserID, Message, Timestamp)
-            SELECT DISTINCT u.UserID, 
-                   CONCAT('Course "', %s, '" has been deleted'),
-                   NOW()
-            FROM User u
-            WHERE u.UserID IN (
-                SELECT StudentID FROM Enrollment WHERE CourseID = %s
-                UNION
-                SELECT InstructorID FROM Course WHERE CourseID = %s
-            )
-        """, (course['CourseName'], course_id, course_id))
-        
-        cursor.execute("COMMIT")
-        return jsonify({
-            'success': True,
-            'message': 'Course deleted successfully'
-        }), 200
-
+        course_name = course_deletion.mark_deleted(mydb, course_id, session['user_id'])
     except mysql.connector.Error as err:
-        cursor.execute("ROLLBACK")
-        print(f"Error deleting course: {err}")
+        log.error("Error deleting course: %s", err)
         return jsonify({
             'success': False,
             'message': f'Failed to delete course: {str(err)}'
         }), 500
 
-@app.route('/admin/courses/<int:course_id>/edit', methods=['POST'])
+    if course_name is None:
+        return jsonify({
+            'success': False,
+            'message': 'Course not found'
+        }), 404
+
+    invalidate_gradebook(course_id)
+    audit.record('course.delete', 'course', course_id,
+                 before={'CourseName': course_name, 'Deleted': 0}, after={'Deleted': 1})
+    course_deletion.start_job(settings.database_config(current_app.config), course_id,
+                              current_app.config['UPLOAD_FOLDER'], storage.s3_settings(current_app.config),
+                              current_app.config['COURSE_DELETE_BATCH_SIZE'])
+    return jsonify({
+        'success': True,
+        'message': 'Course deleted successfully',
+        'status_url': url_for('.get_course_deletion', course_id=course_id)
+    }), 202
+
+@portal.route('/admin/courses/<int:course_id>/deletion')
+@login_required
+def get_course_deletion(course_id):
+    """Progress of a course deletion job."""
+    if session.get('role') != 'admin':
+        return jsonify({'message': 'Unauthorized access'}), 403
+
+    try:
+        job = course_deletion.get_job(mydb, course_id)
+    except mysql.connector.Error as err:
+        log.error("Error fetching course deletion: %s", err)
+        return jsonify({'message': 'Failed to fetch course deletion'}), 500
+    if not job:
+        return jsonify({'message': 'Course deletion not found'}), 404
+    return jsonify(job), 200
+
+@portal.route('/admin/courses/<int:course_id>/deletion/resume', methods=['POST'])
+@login_required
+def resume_course_deletion(course_id):
+    """Restart an interrupted or failed course deletion where it stopped."""
+    if session.get('role') != 'admin':
+        return jsonify({'message': 'Only admins can delete courses'}), 403
+
+    try:
+        job = course_deletion.get_job(mydb, course_id)
+    except mysql.connector.Error as err:
+        log.error("Error fetching course deletion: %s", err)
+        return jsonify({'message': 'Failed to fetch course deletion'}), 500
+    if not job:
+        return jsonify({'message': 'Course deletion not found'}), 404
+    if job['Status'] == 'done':
+        return jsonify({'message': 'Course deletion already finished'}), 409
+
+    # run_job() takes a per-course database lock, so resuming a deletion
+    # that is still running elsewhere is a no-op
+    audit.record('course.deletion_resume', 'course', course_id, before={'Status': job['Status'], 'Step': job['Step']})
+    course_deletion.start_job(settings.database_config(current_app.config), course_id,
+                              current_app.config['UPLOAD_FOLDER'], storage.s3_settings(current_app.config),
+                              current_app.config['COURSE_DELETE_BATCH_SIZE'])
+    return jsonify({'success': True, 'course_id': course_id}), 202
+
+@portal.route('/admin/courses/<int:course_id>/edit', methods=['POST'])
 @login_required
+@response_cache.invalidates('courses')
 def edit_course(course_id):
     """Edit existing course details."""
     if session.get('role') != 'admin':
@@ -626,6 +864,19 @@ def edit_course(course_id):
                 'message': 'Selected instructor is not valid'
             }), 400
 
+        cursor.execute("""
+            SELECT CourseName, CourseCode, InstructorID, Year, Semester
+            FROM Course
+            WHERE CourseID = %s AND Deleted = 0
+            FOR UPDATE
+        """, (course_id,))
+        before = cursor.fetchone()
+        if not before:
+            return jsonify({
+                'success': False,
+                'message': 'Course not found'
+            }), 404
+
         # Update the course
         cursor.execute("""
             UPDATE Course 
@@ -634,7 +885,7 @@ def edit_course(course_id):
                 InstructorID = %s, 
                 Year = %s, 
                 Semester = %s
-            WHERE CourseID = %s
+            WHERE CourseID = %s AND Deleted = 0
         """, (
             data['course_name'],
             data['course_code'],
@@ -645,6 +896,10 @@ def edit_course(course_id):
         ))
         
         mydb.commit()
+        audit.record('course.update', 'course', course_id, before=before, after={
+            'CourseName': data['course_name'], 'CourseCode': data['course_code'],
+            'InstructorID': data['instructor_id'], 'Year': data['year'], 'Semester': semester
+        })
         
         return jsonify({
             'success': True,
@@ -652,15 +907,113 @@ def edit_course(course_id):
         }), 200
 
     except mysql.connector.Error as err:
-        print(f"Error updating course: {err}")
+        log.error("Error updating course: %s", err)
         return jsonify({
             'success': False,
             'message': 'Failed to update course'
         }), 500
 
+@portal.route('/admin/rollover', methods=['POST'])
+@login_required
+def start_rollover():
+    """Clone courses into a new term as a background job."""
+    if session.get('role') != 'admin':
+        return jsonify({'message': 'Only admins can roll over courses'}), 403
+
+    data = request.get_json() or {}
+    if 'target_year' not in data or 'target_semester' not in data:
+        return jsonify({'success': False, 'message': 'Missing required fields'}), 400
+    if not data.get('course_ids') and 'source_year' not in data:
+        return jsonify({'success': False, 'message': 'Select courses by course_ids or source_year'}), 400
+
+    try:
+        target_year = int(data['target_year'])
+        target_semester = int(data['target_semester'])
+        source_year = int(data['source_year']) if data.get('source_year') is not None else None
+        source_semester = int(data['source_semester']) if data.get('source_semester') is not None else None
+        course_ids = [int(course_id) for course_id in data.get('course_ids') or []]
+        due_shift_days = int(data['due_shift_days']) if data.get('due_shift_days') is not None else None
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'message': 'Invalid rollover parameters'}), 400
+    if not 1 <= target_semester <= 8:
+        return jsonify({'success': False, 'message': 'Semester must be between 1 and 8'}), 400
+
+    try:
+        job_id, total = rollover.create_job(
+            mydb, target_year, target_semester, course_ids=course_ids,
+            source_year=source_year, source_semester=source_semester,
+            due_shift_days=due_shift_days, created_by=session['user_id'])
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except mysql.connector.Error as err:
+        log.error("Error creating rollover job: %s", err)
+        return jsonify({'success': False, 'message': 'Failed to create rollover job'}), 500
+
+    if total == 0:
+        return jsonify({'success': False, 'job_id': job_id, 'message': 'No courses to roll over'}), 400
+
+    audit.record('rollover.start', 'rollover_job', job_id, after={
+        'TargetYear': target_year, 'TargetSemester': target_semester, 'CourseIDs': course_ids,
+        'SourceYear': source_year, 'SourceSemester': source_semester, 'DueShiftDays': due_shift_days,
+        'TotalCourses': total
+    })
+    rollover.start_job(settings.database_config(current_app.config), job_id,
+                       current_app.config['UPLOAD_FOLDER'], storage.s3_settings(current_app.config),
+                       current_app.config['ROLLOVER_BATCH_SIZE'])
+    return jsonify({
+        'success': True,
+        'job_id': job_id,
+        'total_courses': total,
+        'status_url': url_for('.get_rollover', job_id=job_id)
+    }), 202
+
+@portal.route('/admin/rollover/<int:job_id>')
+@login_required
+def get_rollover(job_id):
+    """Progress of a rollover job."""
+    if session.get('role') != 'admin':
+        return jsonify({'message': 'Unauthorized access'}), 403
+
+    try:
+        job = rollover.get_job(mydb, job_id)
+    except mysql.connector.Error as err:
+        log.error("Error fetching rollover job: %s", err)
+        return jsonify({'message': 'Failed to fetch rollover job'}), 500
+    if not job:
+        return jsonify({'message': 'Rollover job not found'}), 404
+    return jsonify(job), 200
+
+@portal.route('/admin/rollover/<int:job_id>/resume', methods=['POST'])
+@login_required
+def resume_rollover(job_id):
+    """Restart an interrupted or failed rollover job where it stopped."""
+    if session.get('role') != 'admin':
+        return jsonify({'message': 'Only admins can roll over courses'}), 403
+
+    try:
+        job = rollover.get_job(mydb, job_id)
+    except mysql.connector.Error as err:
+        log.error("Error fetching rollover job: %s", err)
+        return jsonify({'message': 'Failed to fetch rollover job'}), 500
+    if not job:
+        return jsonify({'message': 'Rollover job not found'}), 404
+    if job['Status'] == 'done':
+        return jsonify({'message': 'Rollover job already finished'}), 409
+
+    # run_job() takes a per-job database lock, so resuming a job that is
+    # still running elsewhere is a no-op
+    audit.record('rollover.resume', 'rollover_job', job_id, before={'Status': job['Status']})
+    rollover.start_job(settings.database_config(current_app.config), job_id,
+                       current_app.config['UPLOAD_FOLDER'], storage.s3_settings(current_app.config),
+                       current_app.config['ROLLOVER_BATCH_SIZE'])
+    return jsonify({'success': True, 'job_id': job_id}), 202
+
 # ============ Professor Routes ============
-@app.route('/professor-dashboard')
+@portal.route('/professor-dashboard')
+@rate_limit.limit('30/minute', burst=10)
 @login_required
+@db_router.read_only
+@response_cache.cached(ttl=15, topics=('courses', 'enrollments', 'assignments', 'submissions'))
 def professor_dashboard():
     if session.get('role') != 'professor':
         return jsonify({'message': 'Only professors can access this route'}), 403
@@ -688,11 +1041,12 @@ def professor_dashboard():
         }), 200
         
     except mysql.connector.Error as err:
-        print(f"Error fetching dashboard data: {err}")
+        log.error("Error fetching dashboard data: %s", err)
         return jsonify({'message': 'Error fetching dashboard data'}), 500
 
-@app.route('/submissions/<int:submission_id>/grade', methods=['POST'])
+@portal.route('/submissions/<int:submission_id>/grade', methods=['POST'])
 @login_required
+@response_cache.invalidates('submissions')
 def grade_submission(submission_id):
     if session.get('role') != 'professor':
         return jsonify({'success': False, 'message': 'Only professors can grade submissions'}), 403
@@ -706,25 +1060,44 @@ def grade_submission(submission_id):
 
     cursor = mydb.cursor(dictionary=True)
     try:
+        cursor.execute("""
+            SELECT s.Grade, s.Feedback, a.CourseID FROM Submission s
+            JOIN Assignment a ON s.AssignmentID = a.AssignmentID
+            WHERE s.SubmissionID = %s
+        """, (submission_id,))
+        previous = cursor.fetchone()
+
         # Call GradeSubmission procedure
         args = [submission_id, session['user_id'], grade, feedback, 0, '']  # Last two are OUT parameters
         result = cursor.callproc('GradeSubmission', args)
         
         success = result[4]  # Fifth parameter (OUT success)
         message = result[5]  # Sixth parameter (OUT message)
+        if success:
+            grading_queue.release(cursor, [submission_id])
         
         mydb.commit()
+
+        if success:
+            invalidate_gradebook(previous['CourseID'] if previous else None)
+            audit.record('submission.grade', 'submission', submission_id,
+                         before={'Grade': previous['Grade'], 'Feedback': previous['Feedback']} if previous else None,
+                         after={'Grade': grade, 'Feedback': feedback})
+
         return jsonify({
             'success': success,
             'message': message
         }), 200 if success else 400
 
     except mysql.connector.Error as err:
-        print(f"Error grading submission: {err}")
+        log.error("Error grading submission: %s", err)
         return jsonify({'success': False, 'message': 'Failed to grade submission'}), 500
 
-@app.route('/student-dashboard')
+@portal.route('/student-dashboard')
+@rate_limit.limit('30/minute', burst=10)
 @login_required
+@db_router.read_only
+@response_cache.cached(ttl=15, topics=('courses', 'enrollments', 'assignments', 'submissions'))
 def student_dashboard():
     if session.get('role') != 'student':
         return jsonify({'message': 'Only students can access this route'}), 403
@@ -748,11 +1121,12 @@ def student_dashboard():
             'student_name': session.get('username')
         }), 200
     except mysql.connector.Error as err:
-        print(f"Error fetching dashboard data: {err}")
+        log.error("Error fetching dashboard data: %s", err)
         return jsonify({'message': 'Error fetching dashboard data'}), 500
 
-@app.route('/api/courses/<int:course_id>/details')
+@portal.route('/api/courses/<int:course_id>/details')
 @login_required
+@db_router.read_only
 def get_course_full_details(course_id):
     if session.get('role') != 'professor':
         return jsonify({'message': 'Unauthorized access'}), 403
@@ -767,7 +1141,7 @@ def get_course_full_details(course_id):
             FROM Course c
             LEFT JOIN Enrollment e ON c.CourseID = c.CourseID
             LEFT JOIN Assignment a ON c.CourseID = a.CourseID
-            WHERE c.CourseID = %s AND c.InstructorID = %s
+            WHERE c.CourseID = %s AND c.InstructorID = %s AND c.Deleted = 0
             GROUP BY c.CourseID
         """, (course_id, session['user_id']))
         
@@ -820,315 +1194,1676 @@ def get_course_full_details(course_id):
         }), 200
 
     except mysql.connector.Error as err:
-        print(f"Error fetching course details: {err}")
+        log.error("Error fetching course details: %s", err)
         return jsonify({'message': 'Failed to fetch course details'}), 500
 
-# ============ Student Routes ============
-@app.route('/assignments/<int:assignment_id>/submit', methods=['POST'])
+def _professor_assignment(cursor, assignment_id):
+    """Fetch an assignment if it belongs to a course the current professor teaches."""
+    cursor.execute("""
+        SELECT a.AssignmentID, a.CourseID, a.MaxPoints
+        FROM Assignment a
+        JOIN Course c ON a.CourseID = c.CourseID
+        WHERE a.AssignmentID = %s AND c.InstructorID = %s AND c.Deleted = 0
+    """, (assignment_id, session['user_id']))
+    return cursor.fetchone()
+
+
+def _professor_criterion(cursor, rubric_id):
+    """The current professor's rubric criterion, locked for the transaction, or None."""
+    cursor.execute("""
+        SELECT r.AssignmentID, r.Criteria, r.Points, a.CourseID, a.MaxPoints
+        FROM GradeRubric r
+        JOIN Assignment a ON r.AssignmentID = a.AssignmentID
+        JOIN Course c ON a.CourseID = c.CourseID
+        WHERE r.RubricID = %s AND c.InstructorID = %s AND c.Deleted = 0
+        FOR UPDATE
+    """, (rubric_id, session['user_id']))
+    return cursor.fetchone()
+
+
+def _rubric_points(cursor, assignment_id, exclude=None):
+    """Sum of an assignment's criterion points (minus one criterion), locking the rubric."""
+    cursor.execute("""
+        SELECT COALESCE(SUM(Points), 0) as total FROM GradeRubric
+        WHERE AssignmentID = %s AND RubricID <> %s
+        FOR UPDATE
+    """, (assignment_id, exclude or 0))
+    return int(cursor.fetchone()['total'])
+
+
+def _retotal_rubric(cursor, submission_ids, grader_id=None):
+    """Roll submissions' rubric scores up into Submission in one set-based statement.
+
+    The total goes to Points. Grade gets it as a percentage of MaxPoints so the
+    submission counts as graded and fits the Grade format; a submission left
+    with no scores is ungraded again.
+    """
+    if not submission_ids:
+        return
+    placeholders = ', '.join(['%s'] * len(submission_ids))
+    cursor.execute(f"""
+        UPDATE Submission s
+        JOIN Assignment a ON s.AssignmentID = a.AssignmentID
+        LEFT JOIN (
+            SELECT SubmissionID, SUM(Points) as total
+            FROM RubricScore
+            WHERE SubmissionID IN ({placeholders})
+            GROUP BY SubmissionID
+        ) t ON s.SubmissionID = t.SubmissionID
+        SET s.Points = t.total,
+            s.Grade = CAST(LEAST(100, ROUND(100 * t.total / NULLIF(COALESCE(a.MaxPoints, 100), 0))) AS CHAR),
+            s.GradedDate = IF(t.total IS NULL, NULL, COALESCE(s.GradedDate, NOW())),
+            s.GradedAt = IF(t.total IS NULL, NULL, NOW()),
+            s.GradedBy = COALESCE(%s, s.GradedBy)
+        WHERE s.SubmissionID IN ({placeholders})
+    """, (*submission_ids, grader_id, *submission_ids))
+
+
+@portal.route('/assignments/<int:assignment_id>/rubric')
 @login_required
-def submit_assignment(assignment_id):
-    """Submit assignment files for grading."""
-    if session.get('role') != 'student':
-        return jsonify({'success': False, 'message': 'Only students can submit assignments'}), 403
-
-    if 'file' not in request.files:
-        return jsonify({'success': False, 'message': 'No file part'}), 400
-
-    file = request.files['file']
-    if file.filename == '':
-        return jsonify({'success': False, 'message': 'No selected file'}), 400
-
+@db_router.read_only
+def get_rubric(assignment_id):
+    """List the grading criteria of an assignment."""
     cursor = mydb.cursor(dictionary=True)
     try:
-        # Verify assignment exists and is still accepting submissions
         cursor.execute("""
-            SELECT a.*, c.CourseID 
-            FROM Assignment a
+            SELECT 1 FROM Assignment a
             JOIN Course c ON a.CourseID = c.CourseID
-            WHERE a.AssignmentID = %s
-        """, (assignment_id,))
-        
-        assignment = cursor.fetchone()
-        if not assignment:
-            return jsonify({'success': False, 'message': 'Assignment not found'}), 404
-
-        # Verify student is enrolled in the course
-        cursor.execute("""
-            SELECT 1 FROM Enrollment 
-            WHERE StudentID = %s AND CourseID = %s AND Status = 'active'
-        """, (session['user_id'], assignment['CourseID']))
-        
+            LEFT JOIN Enrollment e ON e.CourseID = c.CourseID
+                AND e.StudentID = %s AND e.Status = 'active'
+            WHERE a.AssignmentID = %s AND c.Deleted = 0
+              AND (c.InstructorID = %s OR e.StudentID IS NOT NULL)
+        """, (session['user_id'], assignment_id, session['user_id']))
         if not cursor.fetchone():
-            return jsonify({'success': False, 'message': 'You are not enrolled in this course'}), 403
+            return jsonify({'message': 'Assignment not found or unauthorized'}), 404
 
-        if file and allowed_file(file.filename):
-            try:
-                # Create submission directory if it doesn't exist
-                submission_dir = os.path.join(
-                    assignment['FilePath'],
-                    'student_submissions',
-                    f'student_{session["user_id"]}'
-                )
-                os.makedirs(submission_dir, exist_ok=True)
+        cursor.execute("""
+            SELECT RubricID, Criteria, Points
+            FROM GradeRubric
+            WHERE AssignmentID = %s
+            ORDER BY RubricID
+        """, (assignment_id,))
+        return jsonify({'rubric': cursor.fetchall()}), 200
+    except mysql.connector.Error as err:
+        log.error("Error fetching rubric: %s", err)
+        return jsonify({'message': 'Failed to fetch rubric'}), 500
 
-                # Create unique filename with timestamp
-                timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-                filename = secure_filename(f"{timestamp}_{file.filename}")
-                file_path = os.path.join(submission_dir, filename)
-                
-                # Save the file
-                file.save(file_path)
-
-                # Record the submission in database
-                cursor.execute("""
-                    INSERT INTO Submission 
-                    (AssignmentID, StudentID, SubmissionPath, SubmissionDate) 
-                    VALUES (%s, %s, %s, NOW())
-                    ON DUPLICATE KEY UPDATE 
-                    SubmissionPath = VALUES(SubmissionPath),
-                    SubmissionDate = NOW()
-                """, (assignment_id, session['user_id'], file_path))
-                
-                mydb.commit()
+@portal.route('/assignments/<int:assignment_id>/rubric', methods=['POST'])
+@login_required
+@response_cache.invalidates('submissions')
+def create_rubric_criteria(assignment_id):
+    """Add one or more grading criteria to an assignment."""
+    if session.get('role') != 'professor':
+        return jsonify({'success': False, 'message': 'Only professors can edit rubrics'}), 403
+
+    data = request.get_json() or {}
+    criteria = data.get('criteria')
+    if not isinstance(criteria, list) or not criteria:
+        return jsonify({'success': False, 'message': 'At least one criterion is required'}), 400
+
+    rows = []
+    for item in criteria:
+        try:
+            points = int(item['points'])
+        except (KeyError, TypeError, ValueError):
+            return jsonify({'success': False, 'message': 'Each criterion needs integer points'}), 400
+        if not item.get('criteria') or points <= 0:
+            return jsonify({'success': False, 'message': 'Each criterion needs a description and positive points'}), 400
+        rows.append((assignment_id, item['criteria'], points))
 
-                return jsonify({
-                    'success': True,
-                    'message': 'Assignment submitted successfully'
-                }), 200
+    cursor = mydb.cursor(dictionary=True)
+    try:
+        assignment = _professor_assignment(cursor, assignment_id)
+        if not assignment:
+            return jsonify({'success': False, 'message': 'Assignment not found or unauthorized'}), 404
+
+        max_points = assignment['MaxPoints'] or 100
+        total = _rubric_points(cursor, assignment_id) + sum(points for _, _, points in rows)
+        if total > max_points:
+            mydb.rollback()
+            return jsonify({'success': False, 'message': f'Rubric criteria would total {total} points, more than the assignment\'s {max_points}'}), 400
+
+        cursor.executemany("""
+            INSERT INTO GradeRubric (AssignmentID, Criteria, Points)
+            VALUES (%s, %s, %s)
+        """, rows)
+        mydb.commit()
+        audit.record('rubric.create', 'assignment', assignment_id, after={
+            'Criteria': [{'Criteria': criterion, 'Points': points} for _, criterion, points in rows]
+        })
+        return jsonify({'success': True, 'message': 'Rubric criteria added successfully'}), 201
+    except mysql.connector.Error as err:
+        mydb.rollback()
+        log.error("Error creating rubric criteria: %s", err)
+        return jsonify({'success': False, 'message': 'Failed to add rubric criteria'}), 500
 
-            except Exception as e:
-                print(f"Error saving submission: {e}")
-                return jsonify({
-                    'success': False,
-                    'message': 'Failed to save submission'
-                }), 500
+@portal.route('/rubric/<int:rubric_id>/edit', methods=['POST'])
+@login_required
+@response_cache.invalidates('submissions')
+def edit_rubric_criterion(rubric_id):
+    """Update the description or points of a grading criterion."""
+    if session.get('role') != 'professor':
+        return jsonify({'success': False, 'message': 'Only professors can edit rubrics'}), 403
 
-        return jsonify({
-            'success': False,
-            'message': 'Invalid file type'
-        }), 400
+    data = request.get_json() or {}
+    try:
+        points = int(data['points'])
+    except (KeyError, TypeError, ValueError):
+        return jsonify({'success': False, 'message': 'Points must be an integer'}), 400
+    if not data.get('criteria') or points <= 0:
+        return jsonify({'success': False, 'message': 'Criterion needs a description and positive points'}), 400
 
+    cursor = mydb.cursor(dictionary=True)
+    try:
+        criterion = _professor_criterion(cursor, rubric_id)
+        if not criterion:
+            mydb.rollback()
+            return jsonify({'success': False, 'message': 'Criterion not found or unauthorized'}), 404
+        max_points = criterion['MaxPoints'] or 100
+        total = _rubric_points(cursor, criterion['AssignmentID'], exclude=rubric_id) + points
+        if total > max_points:
+            mydb.rollback()
+            return jsonify({'success': False, 'message': f'Rubric criteria would total {total} points, more than the assignment\'s {max_points}'}), 400
+
+        cursor.execute("SET @current_user_id = %s", (session['user_id'],))
+        cursor.execute("""
+            UPDATE GradeRubric SET Criteria = %s, Points = %s WHERE RubricID = %s
+        """, (data['criteria'], points, rubric_id))
+        # Scores above a lowered maximum come down to it, and their totals with them
+        cursor.execute("""
+            SELECT SubmissionID FROM RubricScore
+            WHERE RubricID = %s AND Points > %s
+            FOR UPDATE
+        """, (rubric_id, points))
+        rescored = [row['SubmissionID'] for row in cursor.fetchall()]
+        if rescored:
+            cursor.execute("""
+                UPDATE RubricScore SET Points = %s WHERE RubricID = %s AND Points > %s
+            """, (points, rubric_id, points))
+            _retotal_rubric(cursor, rescored)
+        mydb.commit()
+        invalidate_gradebook(criterion['CourseID'])
+        audit.record('rubric.update', 'rubric', rubric_id,
+                     before={'Criteria': criterion['Criteria'], 'Points': criterion['Points']},
+                     after={'Criteria': data['criteria'], 'Points': points, 'Rescored': rescored or None})
+        return jsonify({'success': True, 'message': 'Rubric criterion updated successfully',
+                        'rescored_submissions': len(rescored)}), 200
     except mysql.connector.Error as err:
-        print(f"Database error: {err}")
-        return jsonify({
-            'success': False,
-            'message': 'Database error occurred'
-        }), 500
+        mydb.rollback()
+        log.error("Error updating rubric criterion: %s", err)
+        if err.errno == 1644:  # Custom error from trigger, e.g. the grade lock
+            return jsonify({'success': False, 'message': str(err)}), 400
+        return jsonify({'success': False, 'message': 'Failed to update rubric criterion'}), 500
 
-@app.route('/student/courses/request/<int:course_id>', methods=['POST'])
+@portal.route('/rubric/<int:rubric_id>/delete', methods=['POST'])
 @login_required
-def request_enrollment(course_id):
-    """Request enrollment in a course."""
-    if session.get('role') != 'student':
-        return jsonify({'message': 'Only students can access this route'}), 403
+@response_cache.invalidates('submissions')
+def delete_rubric_criterion(rubric_id):
+    """Remove a grading criterion and the scores given against it."""
+    if session.get('role') != 'professor':
+        return jsonify({'success': False, 'message': 'Only professors can edit rubrics'}), 403
 
-    if 'user_id' not in session or session.get('role') != 'student':
-        return jsonify({'message': 'Unauthorized'}), 401
-    
     cursor = mydb.cursor(dictionary=True)
     try:
-        # Check if already enrolled or requested
-        cursor.execute("""
-            SELECT 1 FROM EnrollmentRequest 
-            WHERE StudentID = %s AND CourseID = %s AND Status = 'pending'
-        """, (session['user_id'], course_id))
-        if cursor.fetchone():
-            return jsonify({'message': 'Enrollment request already pending'}), 400
+        criterion = _professor_criterion(cursor, rubric_id)
+        if not criterion:
+            mydb.rollback()
+            return jsonify({'success': False, 'message': 'Criterion not found or unauthorized'}), 404
 
+        # Submissions scored against it, re-totalled once its scores cascade away
         cursor.execute("""
-            INSERT INTO EnrollmentRequest (StudentID, CourseID, RequestDate, Status)
-            VALUES (%s, %s, NOW(), 'pending')
-        """, (session['user_id'], course_id))
+            SELECT SubmissionID FROM RubricScore WHERE RubricID = %s FOR UPDATE
+        """, (rubric_id,))
+        rescored = [row['SubmissionID'] for row in cursor.fetchall()]
+
+        cursor.execute("SET @current_user_id = %s", (session['user_id'],))
+        cursor.execute("DELETE FROM GradeRubric WHERE RubricID = %s", (rubric_id,))
+        _retotal_rubric(cursor, rescored)
         mydb.commit()
-        return jsonify({'message': 'Enrollment request submitted successfully'}), 201
+        invalidate_gradebook(criterion['CourseID'])
+        audit.record('rubric.delete', 'rubric', rubric_id,
+                     before={'Criteria': criterion['Criteria'], 'Points': criterion['Points']},
+                     after={'Rescored': rescored} if rescored else None)
+        return jsonify({'success': True, 'message': 'Rubric criterion deleted successfully',
+                        'rescored_submissions': len(rescored)}), 200
     except mysql.connector.Error as err:
-        return jsonify({'message': 'Error submitting enrollment request'}), 500
+        mydb.rollback()
+        log.error("Error deleting rubric criterion: %s", err)
+        if err.errno == 1644:  # Custom error from trigger, e.g. the grade lock
+            return jsonify({'success': False, 'message': str(err)}), 400
+        return jsonify({'success': False, 'message': 'Failed to delete rubric criterion'}), 500
 
-# Add @login_required to all remaining routes and add role checks
-@app.route('/courses/<int:course_id>/materials', methods=['POST'])
+@portal.route('/assignments/<int:assignment_id>/rubric/scores', methods=['POST'])
 @login_required
-def upload_course_material(course_id):
+@response_cache.invalidates('submissions')
+def score_rubric(assignment_id):
+    """Record per-criterion scores for any number of submissions in one transaction.
+
+    Expects {"scores": [{"submission_id", "rubric_id", "points", "comment"}, ...]}.
+    Submission totals are rolled up from RubricScore in a single statement.
+    """
     if session.get('role') != 'professor':
-        return jsonify({'message': 'Only professors can access this route'}), 403
+        return jsonify({'success': False, 'message': 'Only professors can grade submissions'}), 403
 
-    if 'user_id' not in session or session.get('role') != 'professor':
-        return jsonify({'message': 'Unauthorized'}), 401
+    data = request.get_json() or {}
+    scores = data.get('scores')
+    if not isinstance(scores, list) or not scores:
+        return jsonify({'success': False, 'message': 'No scores provided'}), 400
 
     cursor = mydb.cursor(dictionary=True)
     try:
-        if 'file' not in request.files:
-            return jsonify({'message': 'No file part'}), 400
-        
-        file = request.files['file']
-        description = request.form.get('description', '')
+        assignment = _professor_assignment(cursor, assignment_id)
+        if not assignment:
+            return jsonify({'success': False, 'message': 'Assignment not found or unauthorized'}), 404
 
-        if file.filename == '':
-            return jsonify({'message': 'No selected file'}), 400
+        cursor.execute("""
+            SELECT RubricID, Points FROM GradeRubric WHERE AssignmentID = %s
+        """, (assignment_id,))
+        max_points = {row['RubricID']: row['Points'] for row in cursor.fetchall()}
 
-        if file and allowed_file(file.filename):
-            # Create materials directory if it doesn't exist
-            materials_dir = os.path.join(app.config['UPLOAD_FOLDER'], f'course_{course_id}')
-            os.makedirs(materials_dir, exist_ok=True)
-            
-            filename = secure_filename(file.filename)
-            file_path = os.path.join(materials_dir, filename)
-            file.save(file_path)
+        cursor.execute("""
+            SELECT SubmissionID FROM Submission WHERE AssignmentID = %s
+        """, (assignment_id,))
+        submission_ids = {row['SubmissionID'] for row in cursor.fetchall()}
 
+        rows = []
+        for item in scores:
             try:
-                # Set current user for the trigger
-                cursor.execute("SET @current_user_id = %s", (session['user_id'],))
-                
-                # Record the material in database
-                cursor.execute("""
-                    INSERT INTO CourseMaterial (CourseID, FilePath, Description, UploadDate)
-                    VALUES (%s, %s, %s, NOW())
-                """, (course_id, file_path, description))
-                mydb.commit()
-                return jsonify({'message': 'Material uploaded successfully'}), 201
-            except mysql.connector.Error as err:
-                if (err.errno == 1644):  # Custom error from trigger
-                    return jsonify({'message': str(err)}), 403
-                print(f"Error recording material: {err}")
-                return jsonify({'message': 'Failed to record material'}), 500
+                submission_id = int(item['submission_id'])
+                rubric_id = int(item['rubric_id'])
+                points = int(item['points'])
+            except (KeyError, TypeError, ValueError):
+                return jsonify({'success': False, 'message': 'Each score needs submission_id, rubric_id and points'}), 400
+            if submission_id not in submission_ids:
+                return jsonify({'success': False, 'message': f'Submission {submission_id} is not part of this assignment'}), 400
+            if rubric_id not in max_points:
+                return jsonify({'success': False, 'message': f'Criterion {rubric_id} is not part of this rubric'}), 400
+            if not 0 <= points <= max_points[rubric_id]:
+                return jsonify({'success': False, 'message': f'Points for criterion {rubric_id} must be between 0 and {max_points[rubric_id]}'}), 400
+            rows.append((submission_id, rubric_id, points, item.get('comment'), session['user_id']))
+
+        graded_ids = sorted({row[0] for row in rows})
+        placeholders = ', '.join(['%s'] * len(graded_ids))
+
+        # Set current user for the grading triggers
+        cursor.execute("SET @current_user_id = %s", (session['user_id'],))
+        cursor.execute("START TRANSACTION")
 
-        return jsonify({'message': 'File type not allowed'}), 400
+        # Scores being replaced, for the audit log
+        cursor.execute(f"""
+            SELECT SubmissionID, RubricID, Points, Comment FROM RubricScore
+            WHERE SubmissionID IN ({placeholders})
+            FOR UPDATE
+        """, tuple(graded_ids))
+        previous = {(row['SubmissionID'], row['RubricID']): row for row in cursor.fetchall()}
+
+        # executemany sends a single multi-row INSERT
+        cursor.executemany("""
+            INSERT INTO RubricScore (SubmissionID, RubricID, Points, Comment, GradedBy)
+            VALUES (%s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+            Points = VALUES(Points),
+            Comment = VALUES(Comment),
+            GradedBy = VALUES(GradedBy),
+            GradedAt = NOW()
+        """, rows)
+
+        _retotal_rubric(cursor, graded_ids, session['user_id'])
+        grading_queue.release(cursor, graded_ids)
+
+        cursor.execute("COMMIT")
+        invalidate_gradebook(assignment['CourseID'])
+        for graded_id in graded_ids:
+            before, after = {}, {}
+            for submission_id, rubric_id, points, comment, _ in rows:
+                if submission_id != graded_id:
+                    continue
+                old = previous.get((submission_id, rubric_id))
+                if old:
+                    before[rubric_id] = {'Points': old['Points'], 'Comment': old['Comment']}
+                after[rubric_id] = {'Points': points, 'Comment': comment}
+            audit.record('submission.rubric_score', 'submission', graded_id, before=before or None, after=after)
+
+        return jsonify({
+            'success': True,
+            'message': 'Rubric scores saved successfully',
+            'graded_submissions': len(graded_ids)
+        }), 200
 
     except mysql.connector.Error as err:
-        print(f"Error uploading material: {err}")
-        return jsonify({'message': 'Failed to upload material'}), 500
+        cursor.execute("ROLLBACK")
+        log.error("Error saving rubric scores: %s", err)
+        if err.errno == 1644:  # Custom error from trigger, e.g. the grade lock
+            return jsonify({'success': False, 'message': str(err)}), 400
+        return jsonify({'success': False, 'message': 'Failed to save rubric scores'}), 500
 
-@app.route('/submissions/<int:submission_id>/download', methods=['GET'])
+@portal.route('/assignments/<int:assignment_id>/rubric/summary')
 @login_required
-def download_submission(submission_id):
+@response_cache.cached(ttl=30, topics=('submissions',))
+def get_rubric_summary(assignment_id):
+    """Per-criterion class averages for an assignment."""
     if session.get('role') != 'professor':
         return jsonify({'message': 'Only professors can access this route'}), 403
 
-    if 'user_id' not in session or session.get('role') != 'professor':
-        return jsonify({'message': 'Unauthorized'}), 401
-
     cursor = mydb.cursor(dictionary=True)
     try:
-        # Get submission file path and verify authorization
+        if not _professor_assignment(cursor, assignment_id):
+            return jsonify({'message': 'Assignment not found or unauthorized'}), 404
+
         cursor.execute("""
-            SELECT s.SubmissionPath, s.AssignmentID
-            FROM Submission s
+            SELECT r.RubricID, r.Criteria, r.Points as max_points,
+                   COUNT(rs.SubmissionID) as scored,
+                   AVG(rs.Points) as average,
+                   MIN(rs.Points) as min,
+                   MAX(rs.Points) as max
+            FROM GradeRubric r
+            LEFT JOIN RubricScore rs ON rs.RubricID = r.RubricID
+            WHERE r.AssignmentID = %s
+            GROUP BY r.RubricID, r.Criteria, r.Points
+            ORDER BY r.RubricID
+        """, (assignment_id,))
+        return jsonify({'criteria': cursor.fetchall()}), 200
+    except mysql.connector.Error as err:
+        log.error("Error fetching rubric summary: %s", err)
+        return jsonify({'message': 'Failed to fetch rubric summary'}), 500
+
+@portal.route('/api/courses/<int:course_id>/gradebook')
+@login_required
+def get_course_gradebook(course_id):
+    """Grade distributions per assignment and standing per student for a course."""
+    if session.get('role') not in ('professor', 'admin'):
+        return jsonify({'message': 'Unauthorized access'}), 403
+    if gradebook is None:
+        return jsonify({'message': 'Gradebook analytics are not available'}), 503
+
+    cursor = mydb.cursor(dictionary=True)
+    try:
+        if session.get('role') == 'professor':
+            cursor.execute("""
+                SELECT 1 FROM Course WHERE CourseID = %s AND InstructorID = %s AND Deleted = 0
+            """, (course_id, session['user_id']))
+        else:
+            cursor.execute("SELECT 1 FROM Course WHERE CourseID = %s AND Deleted = 0", (course_id,))
+        if not cursor.fetchone():
+            return jsonify({'message': 'Course not found or unauthorized'}), 404
+
+        return jsonify(gradebook.course_analytics(mydb, course_id, current_app.config['GRADEBOOK_CACHE_TTL'])), 200
+    except mysql.connector.Error as err:
+        log.error("Error computing gradebook: %s", err)
+        return jsonify({'message': 'Failed to compute gradebook'}), 500
+
+@portal.route('/grading/next', methods=['POST'])
+@login_required
+def next_submissions_to_grade():
+    """Lease the next ungraded submissions of an assignment to the current grader.
+
+    Takes ?assignment=<id>&count=<n>. Returns the leased submissions, the
+    grader's unexpired leases first, and how many are still unclaimed.
+    """
+    if session.get('role') != 'professor':
+        return jsonify({'message': 'Only professors can grade submissions'}), 403
+    assignment_id = request.args.get('assignment', type=int)
+    if assignment_id is None:
+        return jsonify({'message': 'assignment is required'}), 400
+    count = request.args.get('count', current_app.config['GRADING_PREFETCH'], type=int)
+    count = min(max(count, 1), grading_queue.MAX_PREFETCH)
+
+    cursor = mydb.cursor(dictionary=True)
+    try:
+        if not _professor_assignment(cursor, assignment_id):
+            return jsonify({'message': 'Assignment not found or unauthorized'}), 404
+        mydb.commit()  # claim() sets the isolation level, which needs a new transaction
+
+        leased = grading_queue.claim(cursor, assignment_id, session['user_id'], count,
+                                     current_app.config['GRADING_LEASE_SECONDS'])
+        submissions = grading_queue.leased_submissions(cursor, leased)
+        for submission in submissions:
+            submission['download_url'] = url_for('portal.download_submission',
+                                                 submission_id=submission['SubmissionID'])
+        return jsonify({
+            'submissions': submissions,
+            'remaining': grading_queue.remaining(cursor, assignment_id),
+            'lease_seconds': current_app.config['GRADING_LEASE_SECONDS']
+        }), 200
+    except mysql.connector.Error as err:
+        log.error("Error leasing submissions to grade: %s", err)
+        return jsonify({'message': 'Failed to fetch submissions to grade'}), 500
+
+@portal.route('/grading/leases/<int:submission_id>', methods=['DELETE'])
+@login_required
+def release_grading_lease(submission_id):
+    """Hand a leased submission back to the queue ungraded."""
+    cursor = mydb.cursor()
+    try:
+        released = grading_queue.release(cursor, [submission_id], session['user_id'])
+        mydb.commit()
+        if not released:
+            return jsonify({'success': False, 'message': 'You hold no lease on this submission'}), 404
+        return jsonify({'success': True, 'message': 'Submission returned to the queue'}), 200
+    except mysql.connector.Error as err:
+        log.error("Error releasing grading lease: %s", err)
+        return jsonify({'success': False, 'message': 'Failed to release the submission'}), 500
+
+# ============ Announcement Routes ============
+ANNOUNCEMENT_PAGE_SIZE = 20
+
+def _member_course_ids(cursor):
+    """Courses whose announcements appear in the current user's feed."""
+    if session.get('role') == 'professor':
+        cursor.execute("SELECT CourseID FROM Course WHERE InstructorID = %s AND Deleted = 0", (session['user_id'],))
+    else:
+        cursor.execute("""
+            SELECT CourseID FROM Enrollment
+            WHERE StudentID = %s AND Status = 'active'
+        """, (session['user_id'],))
+    return [row['CourseID'] for row in cursor.fetchall()]
+
+@portal.route('/courses/<int:course_id>/announcements', methods=['POST'])
+@login_required
+def post_announcement(course_id):
+    """Post an announcement to a course; stored once regardless of class size."""
+    if session.get('role') not in ('professor', 'admin'):
+        return jsonify({'success': False, 'message': 'Only professors and admins can post announcements'}), 403
+
+    data = request.get_json() or {}
+    message = (data.get('message') or '').strip()
+    if not message:
+        return jsonify({'success': False, 'message': 'Message is required'}), 400
+
+    cursor = mydb.cursor(dictionary=True)
+    try:
+        if session.get('role') == 'professor':
+            cursor.execute("""
+                SELECT 1 FROM Course WHERE CourseID = %s AND InstructorID = %s AND Deleted = 0
+            """, (course_id, session['user_id']))
+        else:
+            cursor.execute("SELECT 1 FROM Course WHERE CourseID = %s AND Deleted = 0", (course_id,))
+        if not cursor.fetchone():
+            return jsonify({'success': False, 'message': 'Course not found or unauthorized'}), 404
+
+        cursor.execute("START TRANSACTION")
+        cursor.execute("""
+            INSERT INTO Announcement (Message, Timestamp, CreatedBy)
+            VALUES (%s, NOW(), %s)
+        """, (message, session['user_id']))
+        announcement_id = cursor.lastrowid
+        cursor.execute("""
+            INSERT INTO Has (CourseID, AnnouncementID) VALUES (%s, %s)
+        """, (course_id, announcement_id))
+        cursor.execute("COMMIT")
+        audit.record('announcement.create', 'announcement', announcement_id,
+                     after={'CourseID': course_id, 'Message': message})
+
+        return jsonify({
+            'success': True,
+            'message': 'Announcement posted successfully',
+            'announcement_id': announcement_id
+        }), 201
+    except mysql.connector.Error as err:
+        cursor.execute("ROLLBACK")
+        log.error("Error posting announcement: %s", err)
+        return jsonify({'success': False, 'message': 'Failed to post announcement'}), 500
+
+@portal.route('/api/announcements')
+@login_required
+@db_router.read_only
+def get_announcements():
+    """Announcement feed across the user's courses, newest first.
+
+    Pages with keyset pagination: pass the returned next_cursor as ?before=.
+    """
+    try:
+        before = request.args.get('before', type=int)
+        limit = min(max(int(request.args.get('limit', ANNOUNCEMENT_PAGE_SIZE)), 1), 100)
+    except ValueError:
+        return jsonify({'message': 'Invalid limit'}), 400
+
+    cursor = mydb.cursor(dictionary=True)
+    try:
+        course_ids = _member_course_ids(cursor)
+
+        cursor.execute("""
+            SELECT LastSeenAnnouncementID FROM AnnouncementWatermark WHERE UserID = %s
+        """, (session['user_id'],))
+        watermark = cursor.fetchone()
+        last_seen = watermark['LastSeenAnnouncementID'] if watermark else 0
+
+        if not course_ids:
+            return jsonify({'announcements': [], 'next_cursor': None, 'unread_count': 0}), 200
+
+        # Merge the newest `limit` rows of each course; every branch is a
+        # short backward scan of the Has primary key
+        branch = """
+            (SELECT CourseID, AnnouncementID FROM Has
+             WHERE CourseID = %s AND AnnouncementID < %s
+             ORDER BY AnnouncementID DESC LIMIT %s)
+        """
+        upper = before if before is not None else 2147483647
+        params = []
+        for course_id in course_ids:
+            params.extend([course_id, upper, limit])
+
+        cursor.execute(f"""
+            SELECT an.AnnouncementID, an.Message, an.Timestamp,
+                   c.CourseID, c.CourseName, c.CourseCode,
+                   CONCAT(u.FirstName, ' ', u.LastName) as author
+            FROM ({' UNION ALL '.join([branch] * len(course_ids))}) h
+            JOIN Announcement an ON h.AnnouncementID = an.AnnouncementID
+            JOIN Course c ON h.CourseID = c.CourseID AND c.Deleted = 0
+            LEFT JOIN User u ON an.CreatedBy = u.UserID
+            ORDER BY an.AnnouncementID DESC
+            LIMIT %s
+        """, (*params, limit))
+        announcements = cursor.fetchall()
+        for announcement in announcements:
+            announcement['unread'] = announcement['AnnouncementID'] > last_seen
+
+        placeholders = ', '.join(['%s'] * len(course_ids))
+        cursor.execute(f"""
+            SELECT COUNT(DISTINCT AnnouncementID) as unread_count FROM Has
+            WHERE CourseID IN ({placeholders}) AND AnnouncementID > %s
+        """, (*course_ids, last_seen))
+        unread_count = cursor.fetchone()['unread_count']
+
+        return jsonify({
+            'announcements': announcements,
+            'next_cursor': announcements[-1]['AnnouncementID'] if len(announcements) == limit else None,
+            'unread_count': unread_count
+        }), 200
+    except mysql.connector.Error as err:
+        log.error("Error fetching announcements: %s", err)
+        return jsonify({'message': 'Failed to fetch announcements'}), 500
+
+@portal.route('/api/announcements/seen', methods=['POST'])
+@login_required
+def mark_announcements_seen():
+    """Advance the user's read watermark; defaults to everything in their feed."""
+    data = request.get_json(silent=True) or {}
+    cursor = mydb.cursor(dictionary=True)
+    try:
+        announcement_id = data.get('announcement_id')
+        if announcement_id is None:
+            course_ids = _member_course_ids(cursor)
+            if not course_ids:
+                return jsonify({'success': True, 'last_seen': 0}), 200
+            placeholders = ', '.join(['%s'] * len(course_ids))
+            cursor.execute(f"""
+                SELECT COALESCE(MAX(AnnouncementID), 0) as latest FROM Has
+                WHERE CourseID IN ({placeholders})
+            """, tuple(course_ids))
+            announcement_id = cursor.fetchone()['latest']
+
+        # Watermarks only ever move forward
+        cursor.execute("""
+            INSERT INTO AnnouncementWatermark (UserID, LastSeenAnnouncementID)
+            VALUES (%s, %s)
+            ON DUPLICATE KEY UPDATE
+            LastSeenAnnouncementID = GREATEST(LastSeenAnnouncementID, VALUES(LastSeenAnnouncementID))
+        """, (session['user_id'], int(announcement_id)))
+        mydb.commit()
+        return jsonify({'success': True, 'last_seen': int(announcement_id)}), 200
+    except (ValueError, TypeError):
+        return jsonify({'success': False, 'message': 'Invalid announcement_id'}), 400
+    except mysql.connector.Error as err:
+        log.error("Error updating announcement watermark: %s", err)
+        return jsonify({'success': False, 'message': 'Failed to update announcements'}), 500
+
+# ============ Direct Upload Routes ============
+SHA256_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+def _teaches_course(cursor, course_id):
+    cursor.execute("""
+        SELECT 1 FROM Course WHERE CourseID = %s AND InstructorID = %s AND Deleted = 0
+    """, (course_id, session['user_id']))
+    return cursor.fetchone() is not None
+
+@portal.route('/api/uploads/presign', methods=['POST'])
+@rate_limit.limit('10/minute', burst=5)
+@login_required
+def presign_upload():
+    """Reserve a storage location and return a presigned PUT for uploading straight to it."""
+    data = request.get_json() or {}
+    kind = data.get('kind')
+    filename = secure_filename(data.get('filename') or '')
+    size = data.get('size')
+    sha256 = (data.get('sha256') or '').lower()
+
+    if kind not in ('submission', 'assignment', 'material'):
+        return jsonify({'success': False, 'message': "kind must be 'submission', 'assignment' or 'material'"}), 400
+    if not filename or not allowed_file(filename):
+        return jsonify({'success': False, 'message': 'Invalid file type'}), 400
+    if not isinstance(size, int) or size <= 0 or size > current_app.config['MAX_CONTENT_LENGTH']:
+        return jsonify({'success': False, 'message': 'Invalid file size'}), 400
+    if not SHA256_PATTERN.match(sha256):
+        return jsonify({'success': False, 'message': 'sha256 must be the hex SHA-256 of the file'}), 400
+
+    upload = {'kind': kind, 'user_id': session['user_id'], 'filename': filename, 'size': size, 'sha256': sha256}
+    cursor = mydb.cursor(dictionary=True)
+    try:
+        if kind == 'submission':
+            if session.get('role') != 'student':
+                return jsonify({'success': False, 'message': 'Only students can submit assignments'}), 403
+            assignment, error = _check_submission_target(cursor, data.get('assignment_id'))
+            if error:
+                return error
+            submission_dir = _submission_dir(assignment)
+            upload['assignment_id'] = assignment['AssignmentID']
+            # Identical content already stored: complete without uploading
+            upload['path'] = submission_store.find_blob(submission_dir, filename, sha256,
+                                                        storage.for_path(submission_dir))
+            if upload['path']:
+                return jsonify({'success': True, 'token': storage.sign(upload), 'upload': None}), 200
+            upload['path'] = os.path.join(submission_dir, submission_store.blob_name(sha256, filename, False))
+
+        elif session.get('role') != 'professor':
+            return jsonify({'success': False, 'message': 'Only professors can upload course files'}), 403
+
+        elif kind == 'assignment':
+            upload.update({field: data.get(field) for field in ('course_id', 'title', 'description', 'due_date')})
+            if not all(upload[field] for field in ('course_id', 'title', 'description', 'due_date')):
+                return jsonify({'success': False, 'message': 'Missing required fields'}), 400
+            if not _teaches_course(cursor, upload['course_id']):
+                return jsonify({'success': False, 'message': 'You can only upload assignments to your courses'}), 403
+            upload['assignment_dir'] = storage.default().path('assignments', _assignment_dir_name(upload['title']))
+            upload['path'] = os.path.join(upload['assignment_dir'], 'professor_upload', filename)
+
+        else:
+            upload['course_id'] = data.get('course_id')
+            upload['description'] = data.get('description', '')
+            if not _teaches_course(cursor, upload['course_id']):
+                return jsonify({'success': False, 'message': 'You can only upload materials to your courses'}), 403
+            upload['path'] = storage.default().path(f"course_{upload['course_id']}", filename)
+
+        return jsonify({
+            'success': True,
+            'token': storage.sign(upload),
+            'upload': storage.for_path(upload['path']).presign_upload(upload['path'], size, sha256)
+        }), 200
+    except mysql.connector.Error as err:
+        log.error("Error presigning upload: %s", err)
+        return jsonify({'success': False, 'message': 'Database error occurred'}), 500
+
+@portal.route('/api/uploads/complete', methods=['POST'])
+@login_required
+@response_cache.invalidates('assignments', 'submissions')
+def complete_upload():
+    """Record a file uploaded through /api/uploads/presign once it is in storage."""
+    data = request.get_json() or {}
+    # Leaves time to finish a PUT started just before its URL expired
+    upload = storage.unsign(data.get('token', ''), current_app.config['STORAGE_PRESIGN_EXPIRY'] * 2)
+    if upload is None or upload['user_id'] != session['user_id']:
+        return jsonify({'success': False, 'message': 'Invalid or expired upload token'}), 403
+
+    path = upload['path']
+    backend = storage.for_path(path)
+    if not backend.exists(path):
+        return jsonify({'success': False, 'message': 'File has not been uploaded yet'}), 409
+    stored_size = backend.size(path)
+    # Deduplicated submissions may point at an existing compressed blob
+    if stored_size != upload['size'] and not submission_store.is_compressed(path):
+        return jsonify({'success': False, 'message': 'Uploaded file does not match the declared size'}), 409
+
+    cursor = mydb.cursor(dictionary=True)
+    try:
+        if upload['kind'] == 'submission':
+            assignment, error = _check_submission_target(cursor, upload['assignment_id'])
+            if error:
+                return error
+            version = {
+                'path': path,
+                'hash': upload['sha256'],
+                'file_type': submission_store.file_extension(upload['filename']),
+                'size': upload['size'],
+                'stored_size': stored_size
+            }
+            with submission_store.blob_lock(cursor, upload['sha256']):
+                # A deduplicated blob may have been pruned since the token was issued
+                if not backend.exists(path):
+                    return jsonify({'success': False, 'message': 'File has not been uploaded yet'}), 409
+                submission_id, version_number = _record_submission(cursor, assignment, upload['filename'], version)
+            return jsonify({
+                'success': True,
+                'message': 'Assignment submitted successfully',
+                'submission_id': submission_id,
+                'version': version_number
+            }), 200
+
+        if upload['kind'] == 'assignment':
+            if not _teaches_course(cursor, upload['course_id']):
+                return jsonify({'success': False, 'message': 'You can only upload assignments to your courses'}), 403
+            assignment_id = _record_assignment(
+                cursor, upload['course_id'], upload['title'], upload['description'], upload['due_date'],
+                upload['assignment_dir'], path, upload['filename'], upload['sha256'])
+            return jsonify({
+                'success': True,
+                'message': 'Assignment uploaded successfully',
+                'assignment_id': assignment_id
+            }), 201
+
+        _record_material(cursor, upload['course_id'], path, upload['description'],
+                         upload['filename'], upload['sha256'])
+        return jsonify({'success': True, 'message': 'Material uploaded successfully'}), 201
+    except mysql.connector.Error as err:
+        if err.errno == 1644:  # Custom error from trigger
+            return jsonify({'success': False, 'message': str(err)}), 403
+        log.error("Error completing upload: %s", err)
+        return jsonify({'success': False, 'message': 'Database error occurred'}), 500
+
+# ============ History Routes ============
+# Closed terms are moved into the *Archive tables by term_archive.py; these
+# routes are the read-only view of them.
+
+HISTORY_PAGE_SIZE = 50
+
+@portal.route('/admin/archive/terms', methods=['POST'])
+@login_required
+def start_term_archive():
+    """Move a closed term's submissions and enrollments to the archive tables."""
+    if session.get('role') != 'admin':
+        return jsonify({'message': 'Only admins can archive terms'}), 403
+
+    data = request.get_json() or {}
+    try:
+        year = int(data['year'])
+        semester = int(data['semester'])
+    except (KeyError, TypeError, ValueError):
+        return jsonify({'success': False, 'message': 'year and semester are required'}), 400
+
+    audit.record('term.archive', 'term', f'{year}/{semester}')
+    term_archive.start_archive(settings.database_config(current_app.config), year, semester,
+                               current_app.config['ARCHIVE_BATCH_SIZE'],
+                               current_app.config['NOTIFICATION_ARCHIVE_DAYS'],
+                               created_by=session['user_id'])
+    return jsonify({'success': True, 'message': f'Archiving term {year}/{semester}'}), 202
+
+@portal.route('/admin/archive/terms')
+@login_required
+@db_router.read_only
+def get_archived_terms():
+    """Archived terms and the progress of the current archive job."""
+    if session.get('role') != 'admin':
+        return jsonify({'message': 'Unauthorized access'}), 403
+
+    cursor = mydb.cursor(dictionary=True)
+    try:
+        cursor.execute("SELECT * FROM TermArchive ORDER BY Year DESC, Semester DESC")
+        return jsonify({'terms': cursor.fetchall()}), 200
+    except mysql.connector.Error as err:
+        log.error("Error fetching archived terms: %s", err)
+        return jsonify({'message': 'Failed to fetch archived terms'}), 500
+
+@portal.route('/api/history/courses')
+@login_required
+@db_router.read_only
+def get_course_history():
+    """Archived courses the user took, taught or (for admins) all of them."""
+    role = session.get('role')
+    cursor = mydb.cursor(dictionary=True)
+    try:
+        columns = "c.CourseID, c.CourseName, c.CourseCode, c.Year, c.Semester"
+        if role == 'student':
+            cursor.execute(f"""
+                SELECT {columns}, e.EnrollmentDate, e.Status as EnrollmentStatus
+                FROM EnrollmentArchive e
+                JOIN Course c ON e.CourseID = c.CourseID AND c.Deleted = 0
+                WHERE e.StudentID = %s
+                ORDER BY c.Year DESC, c.Semester DESC, c.CourseName
+            """, (session['user_id'],))
+        elif role == 'professor':
+            cursor.execute(f"""
+                SELECT {columns} FROM Course c
+                WHERE c.InstructorID = %s AND c.Archived = 1 AND c.Deleted = 0
+                ORDER BY c.Year DESC, c.Semester DESC, c.CourseName
+            """, (session['user_id'],))
+        else:
+            cursor.execute(f"""
+                SELECT {columns} FROM Course c
+                WHERE c.Archived = 1
+                ORDER BY c.Year DESC, c.Semester DESC, c.CourseName
+            """)
+        return jsonify({'courses': cursor.fetchall()}), 200
+    except mysql.connector.Error as err:
+        log.error("Error fetching course history: %s", err)
+        return jsonify({'message': 'Failed to fetch course history'}), 500
+
+@portal.route('/api/history/courses/<int:course_id>/submissions')
+@login_required
+@db_router.read_only
+def get_submission_history(course_id):
+    """Archived submissions of a course: a student's own, or all for its instructor."""
+    role = session.get('role')
+    conditions = ["a.CourseID = %s", "c.Deleted = 0"]
+    params = [course_id]
+    if role == 'student':
+        conditions.append("s.StudentID = %s")
+        params.append(session['user_id'])
+    elif role == 'professor':
+        conditions.append("c.InstructorID = %s")
+        params.append(session['user_id'])
+
+    cursor = mydb.cursor(dictionary=True)
+    try:
+        cursor.execute(f"""
+            SELECT s.SubmissionID, s.AssignmentID, a.Title, a.DueDate, a.MaxPoints,
+                   s.StudentID, CONCAT(u.FirstName, ' ', u.LastName) as student_name,
+                   s.SubmissionDate, s.FileType, s.FileSize, s.Grade, s.Points, s.Feedback, s.GradedDate
+            FROM SubmissionArchive s
             JOIN Assignment a ON s.AssignmentID = a.AssignmentID
             JOIN Course c ON a.CourseID = c.CourseID
-            WHERE s.SubmissionID = %s AND c.InstructorID = %s
-        """, (submission_id, session['user_id']))
+            JOIN User u ON s.StudentID = u.UserID
+            WHERE {' AND '.join(conditions)}
+            ORDER BY a.DueDate, a.AssignmentID, student_name
+        """, params)
+        return jsonify({'submissions': cursor.fetchall()}), 200
+    except mysql.connector.Error as err:
+        log.error("Error fetching submission history: %s", err)
+        return jsonify({'message': 'Failed to fetch submission history'}), 500
+
+@portal.route('/api/history/notifications')
+@login_required
+@db_router.read_only
+def get_notification_history():
+    """Archived notifications, newest first; page with ?before=<next_cursor>."""
+    try:
+        before = request.args.get('before', type=int)
+        limit = min(max(int(request.args.get('limit', HISTORY_PAGE_SIZE)), 1), 100)
+    except ValueError:
+        return jsonify({'message': 'Invalid limit'}), 400
+
+    cursor = mydb.cursor(dictionary=True)
+    try:
+        cursor.execute("""
+            SELECT NotificationID, Message, Timestamp, Status
+            FROM NotificationArchive
+            WHERE UserID = %s AND NotificationID < %s
+            ORDER BY NotificationID DESC
+            LIMIT %s
+        """, (session['user_id'], before if before is not None else 2147483647, limit))
+        notifications = cursor.fetchall()
+        return jsonify({
+            'notifications': notifications,
+            'next_cursor': notifications[-1]['NotificationID'] if len(notifications) == limit else None
+        }), 200
+    except mysql.connector.Error as err:
+        log.error("Error fetching notification history: %s", err)
+        return jsonify({'message': 'Failed to fetch notification history'}), 500
+
+# ============ Student Routes ============
+@portal.route('/assignments/<int:assignment_id>/submit', methods=['POST'])
+@rate_limit.limit('10/minute', burst=5)
+@login_required
+@response_cache.invalidates('submissions')
+def submit_assignment(assignment_id):
+    """Submit assignment files for grading."""
+    if session.get('role') != 'student':
+        return jsonify({'success': False, 'message': 'Only students can submit assignments'}), 403
+
+    if 'file' not in request.files:
+        return jsonify({'success': False, 'message': 'No file part'}), 400
+
+    file = request.files['file']
+    if file.filename == '':
+        return jsonify({'success': False, 'message': 'No selected file'}), 400
+
+    cursor = mydb.cursor(dictionary=True)
+    try:
+        assignment, error = _check_submission_target(cursor, assignment_id)
+        if error:
+            return error
+
+        if file and allowed_file(file.filename):
+            try:
+                # Store the version as a content-addressed blob (deduplicated,
+                # compressed for text-like files) next to the assignment
+                submission_dir = _submission_dir(assignment)
+                filename = secure_filename(file.filename)
+                content = file.read()
+                content_hash = hashlib.sha256(content).hexdigest()
+                with submission_store.blob_lock(cursor, content_hash):
+                    version = submission_store.save_version(submission_dir, filename, content,
+                                                            storage.for_path(submission_dir), content_hash)
+                    submission_id, version_number = _record_submission(cursor, assignment, filename, version)
+
+                return jsonify({
+                    'success': True,
+                    'message': 'Assignment submitted successfully',
+                    'submission_id': submission_id,
+                    'version': version_number
+                }), 200
+
+            except Exception as e:
+                log.exception("Error saving submission: %s", e)
+                return jsonify({
+                    'success': False,
+                    'message': 'Failed to save submission'
+                }), 500
+
+        return jsonify({
+            'success': False,
+            'message': 'Invalid file type'
+        }), 400
+
+    except mysql.connector.Error as err:
+        log.error("Database error: %s", err)
+        return jsonify({
+            'success': False,
+            'message': 'Database error occurred'
+        }), 500
+
+# Resumable (tus) submission uploads; see resumable.py
+def _tus_headers(upload=None):
+    headers = {'Tus-Resumable': resumable.TUS_VERSION, 'Cache-Control': 'no-store'}
+    if upload:
+        headers['Upload-Offset'] = str(upload['UploadOffset'])
+        headers['Upload-Length'] = str(upload['Length'])
+        headers['Upload-Expires'] = http_date(time.time() + upload['ExpiresIn'])
+    return headers
+
+def _get_upload(cursor, upload_id):
+    """The current student's unexpired upload."""
+    cursor.execute("""
+        SELECT u.*, TIMESTAMPDIFF(SECOND, NOW(), u.ExpiresAt) as ExpiresIn
+        FROM UploadSession u
+        WHERE u.UploadID = %s AND u.StudentID = %s
+    """, (upload_id, session['user_id']))
+    upload = cursor.fetchone()
+    if upload and upload['ExpiresIn'] < 0:
+        return None
+    return upload
+
+def _finish_upload(cursor, upload):
+    """Record a fully received resumable upload as a submission version."""
+    if upload['SubmissionID']:
+        return jsonify({
+            'success': True,
+            'message': 'Assignment submitted successfully',
+            'submission_id': upload['SubmissionID']
+        }), 200, _tus_headers(upload)
+
+    assignment, error = _check_submission_target(cursor, upload['AssignmentID'])
+    if error:
+        return error
+
+    # Move the assembled file into storage, unless identical content is there already
+    submission_dir = _submission_dir(assignment)
+    backend = storage.for_path(submission_dir)
+    path = resumable.partial_path(current_app.config['UPLOAD_FOLDER'], upload['UploadID'])
+    with submission_store.blob_lock(cursor, upload['Sha256']):
+        blob_path = submission_store.find_blob(submission_dir, upload['FileName'], upload['Sha256'], backend)
+        if blob_path is None:
+            blob_path = os.path.join(submission_dir,
+                                     submission_store.blob_name(upload['Sha256'], upload['FileName'], False))
+            backend.put_file(path, blob_path)
+        elif os.path.exists(path):
+            os.remove(path)
+
+        version = {
+            'path': blob_path,
+            'hash': upload['Sha256'],
+            'file_type': submission_store.file_extension(upload['FileName']),
+            'size': upload['Length'],
+            'stored_size': backend.size(blob_path)
+        }
+        # The deadline trigger checks the time the upload was started
+        cursor.execute("SET @submission_started_at = %s", (upload['CreatedAt'],))
+        try:
+            submission_id, version_number = _record_submission(cursor, assignment, upload['FileName'], version)
+        finally:
+            cursor.execute("SET @submission_started_at = NULL")
+    cursor.execute("UPDATE UploadSession SET SubmissionID = %s WHERE UploadID = %s",
+                   (submission_id, upload['UploadID']))
+    mydb.commit()
+    resumable.forget_hash(upload['UploadID'])
+
+    return jsonify({
+        'success': True,
+        'message': 'Assignment submitted successfully',
+        'submission_id': submission_id,
+        'version': version_number
+    }), 200, _tus_headers(upload)
+
+@portal.route('/assignments/<int:assignment_id>/uploads', methods=['POST'])
+@rate_limit.limit('10/minute', burst=5)
+@login_required
+def create_upload(assignment_id):
+    """Start a resumable submission upload (tus creation)."""
+    if session.get('role') != 'student':
+        return jsonify({'success': False, 'message': 'Only students can submit assignments'}), 403
+
+    try:
+        length = int(request.headers.get('Upload-Length', ''))
+        metadata = resumable.parse_metadata(request.headers.get('Upload-Metadata'))
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Upload-Length and Upload-Metadata must be valid'}), 400, _tus_headers()
+    if length <= 0 or length > current_app.config['MAX_CONTENT_LENGTH']:
+        return jsonify({'success': False, 'message': 'Invalid file size'}), 413, _tus_headers()
+
+    filename = secure_filename(metadata.get('filename', ''))
+    if not filename or not allowed_file(filename):
+        return jsonify({'success': False, 'message': 'Invalid file type'}), 400, _tus_headers()
+
+    cursor = mydb.cursor(dictionary=True)
+    try:
+        assignment, error = _check_submission_target(cursor, assignment_id)
+        if error:
+            return error
+
+        # The deadline is checked here; chunks may still arrive after it, up to the
+        # expiry cap (resumable.expiry_sql), after which the upload is gone
+        upload_id = uuid.uuid4().hex
+        cursor.execute(f"""
+            INSERT INTO UploadSession (UploadID, StudentID, AssignmentID, FileName, Length, ExpiresAt)
+            SELECT %s, %s, AssignmentID, %s, %s, {resumable.expiry_sql('NOW()', 'DueDate')}
+            FROM Assignment
+            WHERE AssignmentID = %s AND DueDate >= NOW()
+        """, (upload_id, session['user_id'], filename, length, assignment_id))
+        if cursor.rowcount == 0:
+            return jsonify({'success': False, 'message': 'Cannot submit assignment after deadline'}), 403
+        mydb.commit()
+        audit.record('upload.create', 'upload', upload_id,
+                     after={'AssignmentID': assignment_id, 'FileName': filename, 'Length': length})
+
+        path = resumable.partial_path(current_app.config['UPLOAD_FOLDER'], upload_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        open(path, 'wb').close()
+
+        headers = _tus_headers(_get_upload(cursor, upload_id))
+        headers['Location'] = url_for('.upload_status', upload_id=upload_id)
+        return jsonify({'success': True, 'upload_id': upload_id}), 201, headers
+    except mysql.connector.Error as err:
+        log.error("Error creating upload: %s", err)
+        return jsonify({'success': False, 'message': 'Database error occurred'}), 500
+
+@portal.route('/uploads/<upload_id>', methods=['HEAD'])
+@login_required
+def upload_status(upload_id):
+    """Report how many bytes of a resumable upload have been received."""
+    cursor = mydb.cursor(dictionary=True)
+    try:
+        upload = _get_upload(cursor, upload_id)
+    except mysql.connector.Error as err:
+        log.error("Error fetching upload: %s", err)
+        return '', 500
+    if not upload:
+        return '', 404, _tus_headers()
+    return '', 200, _tus_headers(upload)
+
+@portal.route('/uploads/<upload_id>', methods=['PATCH'])
+@rate_limit.limit('120/minute', burst=30)
+@login_required
+@response_cache.invalidates('submissions')
+def upload_chunk(upload_id):
+    """Write a chunk of a resumable upload at its current offset (tus PATCH)."""
+    if request.mimetype != 'application/offset+octet-stream':
+        return jsonify({'success': False, 'message': 'Content-Type must be application/offset+octet-stream'}), 415, _tus_headers()
+    try:
+        offset = int(request.headers.get('Upload-Offset', ''))
+        checksum = resumable.parse_checksum(request.headers.get('Upload-Checksum'))
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Upload-Offset and Upload-Checksum must be valid'}), 400, _tus_headers()
+
+    cursor = mydb.cursor(dictionary=True)
+    try:
+        with resumable.upload_lock(cursor, upload_id) as acquired:
+            if not acquired:
+                return jsonify({'success': False, 'message': 'Another chunk of this upload is in progress'}), 423, _tus_headers()
+            upload = _get_upload(cursor, upload_id)
+            # No transaction stays open while the body streams
+            mydb.commit()
+            if not upload:
+                return jsonify({'success': False, 'message': 'Upload not found or expired'}), 404, _tus_headers()
+            if offset != upload['UploadOffset']:
+                return jsonify({'success': False, 'message': 'Upload-Offset does not match the bytes received'}), 409, _tus_headers(upload)
+
+            if upload['UploadOffset'] < upload['Length']:
+                path = resumable.partial_path(current_app.config['UPLOAD_FOLDER'], upload_id)
+                digest = resumable.running_hash(upload_id, path, offset)
+                received, error = resumable.write_chunk(path, offset, request.stream,
+                                                        upload['Length'] - offset, digest, checksum)
+                if received:
+                    upload['UploadOffset'] += received
+                    if upload['UploadOffset'] == upload['Length']:
+                        upload['Sha256'] = digest.hexdigest()
+                    # Never extended past the cap, so a late finish is impossible. The offset
+                    # check fails only if the upload was cancelled or expired meanwhile.
+                    cursor.execute(f"""
+                        UPDATE UploadSession u
+                        JOIN Assignment a ON a.AssignmentID = u.AssignmentID
+                        SET u.UploadOffset = %s, u.Sha256 = %s, u.ExpiresAt = {resumable.expiry_sql()}
+                        WHERE u.UploadID = %s AND u.UploadOffset = %s
+                    """, (upload['UploadOffset'], upload['Sha256'], upload_id, offset))
+                    if cursor.rowcount == 0:
+                        mydb.rollback()
+                        resumable.forget_hash(upload_id)
+                        return jsonify({'success': False, 'message': 'Upload not found or expired'}), 404, _tus_headers()
+                    cursor.execute("""
+                        SELECT TIMESTAMPDIFF(SECOND, NOW(), ExpiresAt) as ExpiresIn
+                        FROM UploadSession WHERE UploadID = %s
+                    """, (upload_id,))
+                    upload['ExpiresIn'] = cursor.fetchone()['ExpiresIn']
+                    mydb.commit()
+                    resumable.remember_hash(upload_id, upload['UploadOffset'], digest)
+
+                if error == 'checksum':
+                    return jsonify({'success': False, 'message': 'Chunk does not match Upload-Checksum'}), resumable.CHECKSUM_MISMATCH, _tus_headers(upload)
+                if error == 'too_long':
+                    return jsonify({'success': False, 'message': 'Chunk runs past Upload-Length'}), 413, _tus_headers(upload)
+                if error == 'disconnected':
+                    return jsonify({'success': False, 'message': 'Upload interrupted'}), 400, _tus_headers(upload)
+                if upload['UploadOffset'] < upload['Length']:
+                    return '', 204, _tus_headers(upload)
+
+            return _finish_upload(cursor, upload)
+    except mysql.connector.Error as err:
+        if err.errno == 1644:  # Custom error from trigger
+            return jsonify({'success': False, 'message': str(err)}), 403
+        log.error("Error receiving upload chunk: %s", err)
+        return jsonify({'success': False, 'message': 'Database error occurred'}), 500
+    except OSError as e:
+        log.error("Error writing upload chunk: %s", e)
+        return jsonify({'success': False, 'message': 'Failed to save submission'}), 500
+
+@portal.route('/uploads/<upload_id>', methods=['DELETE'])
+@login_required
+def cancel_upload(upload_id):
+    """Abandon a resumable upload and discard the bytes received (tus termination)."""
+    cursor = mydb.cursor(dictionary=True)
+    try:
+        cursor.execute("DELETE FROM UploadSession WHERE UploadID = %s AND StudentID = %s",
+                       (upload_id, session['user_id']))
+        if cursor.rowcount == 0:
+            return jsonify({'success': False, 'message': 'Upload not found'}), 404, _tus_headers()
+        mydb.commit()
+        audit.record('upload.cancel', 'upload', upload_id)
+    except mysql.connector.Error as err:
+        log.error("Error cancelling upload: %s", err)
+        return jsonify({'success': False, 'message': 'Database error occurred'}), 500
+
+    try:
+        os.remove(resumable.partial_path(current_app.config['UPLOAD_FOLDER'], upload_id))
+    except FileNotFoundError:
+        pass
+    resumable.forget_hash(upload_id)
+    return '', 204, _tus_headers()
+
+@portal.route('/student/courses/request/<int:course_id>', methods=['POST'])
+@login_required
+@response_cache.invalidates('enrollments')
+def request_enrollment(course_id):
+    """Request enrollment in a course."""
+    if session.get('role') != 'student':
+        return jsonify({'message': 'Only students can access this route'}), 403
+
+    if 'user_id' not in session or session.get('role') != 'student':
+        return jsonify({'message': 'Unauthorized'}), 401
+    
+    cursor = mydb.cursor(dictionary=True)
+    try:
+        cursor.execute("SELECT Archived FROM Course WHERE CourseID = %s AND Deleted = 0", (course_id,))
+        course = cursor.fetchone()
+        if not course:
+            return jsonify({'message': 'Course not found'}), 404
+        if course['Archived']:
+            return jsonify({'message': 'This course has been archived'}), 400
+
+        # Check if already enrolled or requested
+        cursor.execute("""
+            SELECT 1 FROM EnrollmentRequest 
+            WHERE StudentID = %s AND CourseID = %s AND Status = 'pending'
+        """, (session['user_id'], course_id))
+        if cursor.fetchone():
+            return jsonify({'message': 'Enrollment request already pending'}), 400
+
+        cursor.execute("""
+            INSERT INTO EnrollmentRequest (StudentID, CourseID, RequestDate, Status)
+            VALUES (%s, %s, NOW(), 'pending')
+        """, (session['user_id'], course_id))
+        mydb.commit()
+        audit.record('enrollment.request', 'enrollment_request', cursor.lastrowid,
+                     after={'StudentID': session['user_id'], 'CourseID': course_id, 'Status': 'pending'})
+        return jsonify({'message': 'Enrollment request submitted successfully'}), 201
+    except mysql.connector.Error as err:
+        return jsonify({'message': 'Error submitting enrollment request'}), 500
+
+# Add @login_required to all remaining routes and add role checks
+@portal.route('/courses/<int:course_id>/materials', methods=['POST'])
+@rate_limit.limit('10/minute', burst=5)
+@login_required
+def upload_course_material(course_id):
+    if session.get('role') != 'professor':
+        return jsonify({'message': 'Only professors can access this route'}), 403
+
+    if 'user_id' not in session or session.get('role') != 'professor':
+        return jsonify({'message': 'Unauthorized'}), 401
+
+    cursor = mydb.cursor(dictionary=True)
+    try:
+        if 'file' not in request.files:
+            return jsonify({'message': 'No file part'}), 400
         
-        submission = cursor.fetchone()
+        file = request.files['file']
+        description = request.form.get('description', '')
+
+        if file.filename == '':
+            return jsonify({'message': 'No selected file'}), 400
+
+        if file and allowed_file(file.filename):
+            filename = secure_filename(file.filename)
+            file_path = storage.default().path(f'course_{course_id}', filename)
+            content = file.read()
+            storage.default().write(file_path, content)
+
+            try:
+                _record_material(cursor, course_id, file_path, description, filename,
+                                 hashlib.sha256(content).hexdigest())
+                return jsonify({'message': 'Material uploaded successfully'}), 201
+            except mysql.connector.Error as err:
+                if (err.errno == 1644):  # Custom error from trigger
+                    return jsonify({'message': str(err)}), 403
+                log.error("Error recording material: %s", err)
+                return jsonify({'message': 'Failed to record material'}), 500
+
+        return jsonify({'message': 'File type not allowed'}), 400
+
+    except mysql.connector.Error as err:
+        log.error("Error uploading material: %s", err)
+        return jsonify({'message': 'Failed to upload material'}), 500
+
+@portal.route('/submissions/<int:submission_id>/download', methods=['GET'])
+@login_required
+def download_submission(submission_id):
+    if session.get('role') != 'professor':
+        return jsonify({'message': 'Only professors can access this route'}), 403
+
+    if 'user_id' not in session or session.get('role') != 'professor':
+        return jsonify({'message': 'Unauthorized'}), 401
+
+    cursor = mydb.cursor(dictionary=True)
+    try:
+        # Get submission file path and verify authorization; submissions of
+        # archived terms are looked up in the archive tables
+        for submissions, versions in (('Submission', 'SubmissionVersion'),
+                                      ('SubmissionArchive', 'SubmissionVersionArchive')):
+            cursor.execute(f"""
+                SELECT s.SubmissionPath, s.AssignmentID,
+                       (SELECT v.FileName FROM {versions} v
+                        WHERE v.SubmissionID = s.SubmissionID
+                        ORDER BY v.VersionNumber DESC LIMIT 1) as FileName
+                FROM {submissions} s
+                JOIN Assignment a ON s.AssignmentID = a.AssignmentID
+                JOIN Course c ON a.CourseID = c.CourseID
+                WHERE s.SubmissionID = %s AND c.InstructorID = %s AND c.Deleted = 0
+            """, (submission_id, session['user_id']))
+            submission = cursor.fetchone()
+            if submission:
+                break
+
         if not submission:
             return jsonify({'message': 'Submission not found or unauthorized'}), 404
 
-        return send_from_directory(
-            directory=os.path.dirname(submission['SubmissionPath']),
-            path=os.path.basename(submission['SubmissionPath'])
+        # Submissions made before version history have no FileName and are
+        # stored as plain files
+        if not submission['FileName']:
+            if os.path.exists(submission['SubmissionPath']):
+                return send_from_directory(
+                    directory=os.path.dirname(submission['SubmissionPath']),
+                    path=os.path.basename(submission['SubmissionPath'])
+                )
+            return send_file(
+                cold_storage.open_file(mydb, submission['SubmissionPath']),
+                as_attachment=True,
+                download_name=os.path.basename(submission['SubmissionPath'])
+            )
+
+        # Objects in S3 are fetched by the client straight from the bucket
+        url = storage.download_url(submission['SubmissionPath'], submission['FileName'])
+        if url:
+            return redirect(url)
+
+        return send_file(
+            cold_storage.open_blob(mydb, submission['SubmissionPath']),
+            as_attachment=True,
+            download_name=submission['FileName']
         )
     except mysql.connector.Error as err:
-        print(f"Error downloading submission: {err}")
+        log.error("Error downloading submission: %s", err)
         return jsonify({'message': 'Failed to download submission'}), 500
+    except OSError as e:
+        log.error("Error reading submission: %s", e)
+        return jsonify({'message': 'Submission file is no longer available'}), 410
+
+def _can_view_submission(cursor, submission_id):
+    """Check the current user is the submitting student or the course instructor."""
+    cursor.execute("""
+        SELECT 1
+        FROM Submission s
+        JOIN Assignment a ON s.AssignmentID = a.AssignmentID
+        JOIN Course c ON a.CourseID = c.CourseID
+        WHERE s.SubmissionID = %s AND c.Deleted = 0 AND (s.StudentID = %s OR c.InstructorID = %s)
+    """, (submission_id, session['user_id'], session['user_id']))
+    return cursor.fetchone() is not None
+
+def _get_submission_analysis(cursor, submission_id):
+    """Fetch the pipeline analysis of a submission's current file, if the caller may view it."""
+    cursor.execute("""
+        SELECT s.SubmissionID, lv.ContentHash,
+               fa.MimeType, fa.Valid, fa.Reason, fa.PageCount, fa.PreviewPath
+        FROM Submission s
+        JOIN Assignment a ON s.AssignmentID = a.AssignmentID
+        JOIN Course c ON a.CourseID = c.CourseID
+        LEFT JOIN SubmissionVersion lv ON lv.SubmissionID = s.SubmissionID
+            AND lv.BlobPath = s.SubmissionPath
+        LEFT JOIN FileAnalysis fa ON fa.ContentHash = lv.ContentHash
+        WHERE s.SubmissionID = %s AND c.Deleted = 0 AND (s.StudentID = %s OR c.InstructorID = %s)
+        LIMIT 1
+    """, (submission_id, session['user_id'], session['user_id']))
+    return cursor.fetchone()
+
+@portal.route('/assignments/<int:assignment_id>/similarity')
+@login_required
+@db_router.read_only
+def assignment_similarity_report(assignment_id):
+    """Report pairs of near-duplicate submissions for an assignment."""
+    if session.get('role') != 'professor':
+        return jsonify({'message': 'Only professors can access this route'}), 403
+    if similarity is None:
+        return jsonify({'message': 'Similarity detection is not available'}), 503
+
+    try:
+        threshold = float(request.args.get('threshold', current_app.config['SIMILARITY_THRESHOLD']))
+    except ValueError:
+        return jsonify({'message': 'Invalid threshold'}), 400
 
-@app.route('/course/<int:course_id>')
+    cursor = mydb.cursor(dictionary=True)
+    try:
+        cursor.execute("""
+            SELECT 1 FROM Assignment a
+            JOIN Course c ON a.CourseID = c.CourseID
+            WHERE a.AssignmentID = %s AND c.InstructorID = %s AND c.Deleted = 0
+        """, (assignment_id, session['user_id']))
+        if not cursor.fetchone():
+            return jsonify({'message': 'Assignment not found or unauthorized'}), 404
+
+        signature_cursor = mydb.cursor()
+        ids, signatures = similarity.load_signatures(signature_cursor, assignment_id)
+        signature_cursor.close()
+        pairs = similarity.similar_pairs(ids, signatures, threshold)
+
+        cursor.execute("""
+            SELECT s.SubmissionID, CONCAT(u.FirstName, ' ', u.LastName) as student_name
+            FROM Submission s
+            JOIN User u ON s.StudentID = u.UserID
+            WHERE s.AssignmentID = %s
+        """, (assignment_id,))
+        names = {row['SubmissionID']: row['student_name'] for row in cursor.fetchall()}
+        recorded = similarity.recorded_matches(cursor, assignment_id, threshold)
+
+        return jsonify({
+            'analysed_submissions': len(ids),
+            'threshold': threshold,
+            'pairs': [{
+                'submission_a': a,
+                'student_a': names.get(a),
+                'submission_b': b,
+                'student_b': names.get(b),
+                'similarity': round(score, 4)
+            } for a, b, score in sorted(pairs, key=lambda p: p[2], reverse=True)],
+            # Flagged by the check run after each upload, latest upload first
+            'flagged_on_upload': [{
+                'submission': row['SubmissionID'],
+                'student': names.get(row['SubmissionID']),
+                'matched_submission': row['MatchedSubmissionID'],
+                'matched_student': names.get(row['MatchedSubmissionID']),
+                'similarity': float(row['Similarity']),
+                'detected_at': row['DetectedAt']
+            } for row in recorded]
+        }), 200
+    except mysql.connector.Error as err:
+        log.error("Error building similarity report: %s", err)
+        return jsonify({'message': 'Failed to build similarity report'}), 500
+
+@portal.route('/submissions/<int:submission_id>/preview')
+@login_required
+def get_submission_preview(submission_id):
+    """Get validation status, page count and preview link for a submission."""
+    cursor = mydb.cursor(dictionary=True)
+    try:
+        analysis = _get_submission_analysis(cursor, submission_id)
+        if not analysis:
+            return jsonify({'message': 'Submission not found or unauthorized'}), 404
+
+        if analysis['Valid'] is None:
+            status = 'pending' if analysis['ContentHash'] else 'unavailable'
+        else:
+            status = 'valid' if analysis['Valid'] else 'rejected'
+
+        return jsonify({
+            'status': status,
+            'mime_type': analysis['MimeType'],
+            'page_count': analysis['PageCount'],
+            'reason': analysis['Reason'],
+            'preview_url': url_for('.get_submission_preview_image', submission_id=submission_id)
+                           if analysis['PreviewPath'] else None
+        }), 200
+    except mysql.connector.Error as err:
+        log.error("Error fetching submission preview: %s", err)
+        return jsonify({'message': 'Failed to fetch submission preview'}), 500
+
+@portal.route('/submissions/<int:submission_id>/preview/image')
+@login_required
+def get_submission_preview_image(submission_id):
+    """Serve the first-page preview image of a submission."""
+    cursor = mydb.cursor(dictionary=True)
+    try:
+        analysis = _get_submission_analysis(cursor, submission_id)
+        if not analysis or not analysis['PreviewPath']:
+            return jsonify({'message': 'Preview not available'}), 404
+
+        # Removed by cleanup, or rendered on another server
+        if not os.path.exists(analysis['PreviewPath']):
+            return jsonify({'message': 'Preview not available'}), 404
+        return send_file(analysis['PreviewPath'], max_age=86400)
+    except mysql.connector.Error as err:
+        log.error("Error fetching submission preview: %s", err)
+        return jsonify({'message': 'Failed to fetch submission preview'}), 500
+
+@portal.route('/submissions/<int:submission_id>/versions')
+@login_required
+@db_router.read_only
+def list_submission_versions(submission_id):
+    """List the stored versions of a submission, newest first."""
+    cursor = mydb.cursor(dictionary=True)
+    try:
+        if not _can_view_submission(cursor, submission_id):
+            return jsonify({'message': 'Submission not found or unauthorized'}), 404
+
+        cursor.execute("""
+            SELECT VersionNumber, FileName, FileSize, StoredSize, SubmittedAt
+            FROM SubmissionVersion
+            WHERE SubmissionID = %s
+            ORDER BY VersionNumber DESC
+        """, (submission_id,))
+        return jsonify({'versions': cursor.fetchall()}), 200
+    except mysql.connector.Error as err:
+        log.error("Error fetching submission versions: %s", err)
+        return jsonify({'message': 'Failed to fetch submission versions'}), 500
+
+@portal.route('/submissions/<int:submission_id>/versions/<int:version_number>/download')
+@login_required
+def download_submission_version(submission_id, version_number):
+    """Download a specific earlier version of a submission."""
+    cursor = mydb.cursor(dictionary=True)
+    try:
+        if not _can_view_submission(cursor, submission_id):
+            return jsonify({'message': 'Submission not found or unauthorized'}), 404
+
+        cursor.execute("""
+            SELECT FileName, BlobPath
+            FROM SubmissionVersion
+            WHERE SubmissionID = %s AND VersionNumber = %s
+        """, (submission_id, version_number))
+        version = cursor.fetchone()
+        if not version:
+            return jsonify({'message': 'Version not found'}), 404
+
+        url = storage.download_url(version['BlobPath'], version['FileName'])
+        if url:
+            return redirect(url)
+
+        return send_file(
+            cold_storage.open_blob(mydb, version['BlobPath']),
+            as_attachment=True,
+            download_name=version['FileName']
+        )
+    except mysql.connector.Error as err:
+        log.error("Error downloading submission version: %s", err)
+        return jsonify({'message': 'Failed to download submission version'}), 500
+    except OSError as e:
+        log.error("Error reading submission version: %s", e)
+        return jsonify({'message': 'Submission file is no longer available'}), 410
+
+@portal.route('/course/<int:course_id>')
 @login_required
 def course_page(course_id):
     """Serve the course details page."""
     return render_template('course.html')
 
-@app.route('/api/courses/<int:course_id>')
+# Shared with the async handlers in asgi.py
+COURSE_DETAILS_QUERY = """
+    SELECT c.*, 
+           u.FirstName, u.LastName,
+           COUNT(DISTINCT e.StudentID) as enrolled_count
+    FROM Course c
+    JOIN User u ON c.InstructorID = u.UserID
+    LEFT JOIN Enrollment e ON c.CourseID = e.CourseID
+    WHERE c.CourseID = %s AND c.Deleted = 0
+    GROUP BY c.CourseID
+"""
+
+def course_details(course):
+    return {
+        'name': course['CourseName'],
+        'code': course['CourseCode'],
+        'instructor': f"{course['FirstName']} {course['LastName']}",
+        'semester': course['Semester'],
+        'year': course['Year'],
+        'enrolled_count': course['enrolled_count']
+    }
+
+@portal.route('/api/courses/<int:course_id>')
 @login_required
+@db_router.read_only
+@response_cache.cached(ttl=60, topics=('courses', 'enrollments', 'users'), scope='global')
 def get_course_details(course_id):
     """Get detailed course information."""
     cursor = mydb.cursor(dictionary=True)
     try:
-        cursor.execute("""
-            SELECT c.*, 
-                   u.FirstName, u.LastName,
-                   COUNT(DISTINCT e.StudentID) as enrolled_count
-            FROM Course c
-            JOIN User u ON c.InstructorID = u.UserID
-            LEFT JOIN Enrollment e ON c.CourseID = e.CourseID
-            WHERE c.CourseID = %s
-            GROUP BY c.CourseID
-        """, (course_id,))
+        cursor.execute(COURSE_DETAILS_QUERY, (course_id,))
         
         course = cursor.fetchone()
         if not course:
             return jsonify({'message': 'Course not found'}), 404
 
-        return jsonify({
-            'name': course['CourseName'],
-            'code': course['CourseCode'],
-            'instructor': f"{course['FirstName']} {course['LastName']}",
-            'semester': course['Semester'],
-            'year': course['Year'],
-            'enrolled_count': course['enrolled_count']
-        }), 200
+        return jsonify(course_details(course)), 200
 
     except mysql.connector.Error as err:
-        print(f"Error fetching course details: {err}")
+        log.error("Error fetching course details: %s", err)
         return jsonify({'message': 'Failed to fetch course details'}), 500
 
-@app.route('/api/user/role')
+@portal.route('/api/user/role')
 @login_required
+@response_cache.cached(ttl=300, scope='role')
 def get_user_role():
     """Get the current user's role."""
     return jsonify({'role': session.get('role')}), 200
 
-@app.route('/assignments')
+@portal.route('/assignments')
 @login_required
 def assignments_page():
     """Serve the assignments listing page."""
     return render_template('assignments.html')
 
-@app.route('/api/assignments')
+def assignments_query(user_id, course_id, status, sort_by):
+    """Build the filtered assignment listing query; shared with asgi.py."""
+    query = """
+        SELECT a.*, c.CourseName, 
+               COALESCE(s.Status, 'pending') as Status
+        FROM Assignment a
+        JOIN Course c ON a.CourseID = c.CourseID
+        LEFT JOIN Submission s ON a.AssignmentID = s.AssignmentID 
+            AND s.StudentID = %s
+        WHERE c.Deleted = 0
+    """
+    params = [user_id]
+
+    if course_id:
+        query += " AND a.CourseID = %s"
+        params.append(course_id)
+    
+    if status:
+        query += " AND COALESCE(s.Status, 'pending') = %s"
+        params.append(status)
+
+    # Add sorting
+    if sort_by == 'dueDate':
+        query += " ORDER BY a.DueDate"
+    elif sort_by == 'title':
+        query += " ORDER BY a.Title"
+    elif sort_by == 'status':
+        query += " ORDER BY COALESCE(s.Status, 'pending')"
+
+    return query, tuple(params)
+
+@portal.route('/api/assignments')
 @login_required
+@db_router.read_only
+@response_cache.cached(ttl=30, topics=('courses', 'assignments', 'submissions'))
 def get_assignments():
     """Get filtered and sorted assignments."""
     course_id = request.args.get('courseId')
     status = request.args.get('status')
     sort_by = request.args.get('sortBy', 'dueDate')
 
-    cursor = mydb.cursor(dictionary=True)
+    # Tuple cursor: rows are streamed to the client in batches
+    cursor = mydb.cursor()
     try:
-        # Build the query based on filters
-        query = """
-            SELECT a.*, c.CourseName, 
-                   COALESCE(s.Status, 'pending') as Status
-            FROM Assignment a
-            JOIN Course c ON a.CourseID = c.CourseID
-            LEFT JOIN Submission s ON a.AssignmentID = s.AssignmentID 
-                AND s.StudentID = %s
-            WHERE 1=1
-        """
-        params = [session['user_id']]
+        cursor.execute(*assignments_query(session['user_id'], course_id, status, sort_by))
+        return json_provider.stream_rows(cursor, 'assignments'), 200
+    except mysql.connector.Error as err:
+        log.error("Error fetching assignments: %s", err)
+        return jsonify({'message': 'Failed to fetch assignments'}), 500
 
-        if course_id:
-            query += " AND a.CourseID = %s"
-            params.append(course_id)
-        
-        if status:
-            query += " AND COALESCE(s.Status, 'pending') = %s"
-            params.append(status)
-
-        # Add sorting
-        if sort_by == 'dueDate':
-            query += " ORDER BY a.DueDate"
-        elif sort_by == 'title':
-            query += " ORDER BY a.Title"
-        elif sort_by == 'status':
-            query += " ORDER BY COALESCE(s.Status, 'pending')"
-
-        cursor.execute(query, tuple(params))
-        assignments = cursor.fetchall()
+@portal.route('/api/search')
+@login_required
+@db_router.read_only
+def search_documents():
+    """Full-text search over assignments, course materials and submissions."""
+    query = request.args.get('q', '').strip()
+    if len(query) < 3:
+        return jsonify({'message': 'Search query must be at least 3 characters'}), 400
+
+    types = request.args.get('types')
+    try:
+        limit = int(request.args.get('limit', 20))
+        offset = int(request.args.get('offset', 0))
+    except ValueError:
+        return jsonify({'message': 'Invalid limit or offset'}), 400
 
-        return jsonify({'assignments': assignments}), 200
+    cursor = mydb.cursor(dictionary=True)
+    try:
+        results = search.search(
+            cursor, session['user_id'], session.get('role'), query,
+            types=types.split(',') if types else None,
+            limit=max(limit, 1), offset=max(offset, 0)
+        )
+        return jsonify({'results': results}), 200
     except mysql.connector.Error as err:
-        print(f"Error fetching assignments: {err}")
-        return jsonify({'message': 'Failed to fetch assignments'}), 500
+        log.error("Error searching: %s", err)
+        return jsonify({'message': 'Search failed'}), 500
 
-@app.route('/student/courses/exit/<int:course_id>', methods=['POST'])
+@portal.route('/student/courses/exit/<int:course_id>', methods=['POST'])
 @login_required
+@response_cache.invalidates('enrollments')
 def exit_course(course_id):
     """Handle student's request to exit a course."""
     if session.get('role') != 'student':
@@ -1165,6 +2900,9 @@ def exit_course(course_id):
         """, (session['user_id'], course_id))
         
         cursor.execute("COMMIT")
+        invalidate_gradebook(course_id)
+        audit.record('enrollment.exit', 'course', course_id,
+                     before={'StudentID': session['user_id'], 'Status': 'active'})
         return jsonify({
             'success': True,
             'message': 'Successfully exited from the course'
@@ -1172,14 +2910,15 @@ def exit_course(course_id):
 
     except mysql.connector.Error as err:
         cursor.execute("ROLLBACK")
-        print(f"Error exiting course: {err}")
+        log.error("Error exiting course: %s", err)
         return jsonify({
             'success': False,
             'message': 'Failed to exit course'
         }), 500
 
-@app.route('/admin/enrollment/<action>/<int:request_id>', methods=['POST'])
+@portal.route('/admin/enrollment/<action>/<int:request_id>', methods=['POST'])
 @login_required
+@response_cache.invalidates('enrollments')
 def handle_enrollment(action, request_id):
     if session.get('role') != 'admin':
         return jsonify({'success': False, 'message': 'Only admins can process enrollments'}), 403
@@ -1206,6 +2945,14 @@ def handle_enrollment(action, request_id):
         success, message = cursor.fetchone()
         
         mydb.commit()
+
+        if success and action == 'approve':
+            cursor.execute("SELECT CourseID FROM EnrollmentRequest WHERE RequestID = %s", (request_id,))
+            processed = cursor.fetchone()
+            invalidate_gradebook(processed[0] if processed else None)
+        if success:
+            audit.record(f'enrollment.{action}', 'enrollment_request', request_id,
+                         before={'Status': 'pending'}, after={'Status': 'approved' if action == 'approve' else 'rejected'})
         
         return jsonify({
             'success': bool(success),
@@ -1213,13 +2960,10 @@ def handle_enrollment(action, request_id):
         }), 200
 
     except mysql.connector.Error as err:
-        print(f"Error processing enrollment: {err}")
+        log.error("Error processing enrollment: %s", err)
         return jsonify({
             'success': False,
             'message': f'Database error: {str(err)}'
         }), 500
     finally:
         cursor.close()
-
-if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,113 @@
+"""
+University Assignment Portal - Full-text Search
+
+Ranks assignments, course materials and submissions against a query using
+the MySQL FULLTEXT indexes from migration 005. Each source is matched
+separately so every MATCH can use its own index, then scores for the same
+document are summed and the result is limited to the caller's courses.
+"""
+
+MAX_RESULTS = 50
+
+# Statements per result type. Each takes the query twice and selects
+# type, id, CourseID, title and score.
+SOURCES = {
+    'assignment': [
+        """
+        SELECT 'assignment' AS type, a.AssignmentID AS id, a.CourseID, a.Title AS title,
+               MATCH(a.Title, a.Description) AGAINST (%s IN NATURAL LANGUAGE MODE) AS score
+        FROM Assignment a
+        WHERE MATCH(a.Title, a.Description) AGAINST (%s IN NATURAL LANGUAGE MODE)
+        """,
+        """
+        SELECT 'assignment' AS type, a.AssignmentID AS id, a.CourseID, a.Title AS title,
+               MATCH(fa.ExtractedText) AGAINST (%s IN NATURAL LANGUAGE MODE) AS score
+        FROM FileAnalysis fa
+        JOIN Assignment a ON a.ContentHash = fa.ContentHash
+        WHERE MATCH(fa.ExtractedText) AGAINST (%s IN NATURAL LANGUAGE MODE)
+        """,
+    ],
+    'material': [
+        """
+        SELECT 'material' AS type, cm.MaterialID AS id, cm.CourseID,
+               COALESCE(NULLIF(cm.Description, ''), SUBSTRING_INDEX(cm.FilePath, '/', -1)) AS title,
+               MATCH(cm.Description) AGAINST (%s IN NATURAL LANGUAGE MODE) AS score
+        FROM CourseMaterial cm
+        WHERE MATCH(cm.Description) AGAINST (%s IN NATURAL LANGUAGE MODE)
+        """,
+        """
+        SELECT 'material' AS type, cm.MaterialID AS id, cm.CourseID,
+               COALESCE(NULLIF(cm.Description, ''), SUBSTRING_INDEX(cm.FilePath, '/', -1)) AS title,
+               MATCH(fa.ExtractedText) AGAINST (%s IN NATURAL LANGUAGE MODE) AS score
+        FROM FileAnalysis fa
+        JOIN CourseMaterial cm ON cm.ContentHash = fa.ContentHash
+        WHERE MATCH(fa.ExtractedText) AGAINST (%s IN NATURAL LANGUAGE MODE)
+        """,
+    ],
+    'submission': [
+        """
+        SELECT 'submission' AS type, s.SubmissionID AS id, a.CourseID,
+               CONCAT(a.Title, ' - ', u.FirstName, ' ', u.LastName) AS title,
+               MATCH(fa.ExtractedText) AGAINST (%s IN NATURAL LANGUAGE MODE) AS score
+        FROM FileAnalysis fa
+        JOIN SubmissionVersion v ON v.ContentHash = fa.ContentHash
+        JOIN Submission s ON s.SubmissionID = v.SubmissionID AND s.SubmissionPath = v.BlobPath
+        JOIN Assignment a ON s.AssignmentID = a.AssignmentID
+        JOIN User u ON s.StudentID = u.UserID
+        WHERE MATCH(fa.ExtractedText) AGAINST (%s IN NATURAL LANGUAGE MODE)
+        """,
+    ],
+}
+
+
+def scoped_course_ids(cursor, user_id, role):
+    """Return the course IDs the user may search, or None for no restriction."""
+    if role == 'admin':
+        return None
+    if role == 'professor':
+        cursor.execute("SELECT CourseID FROM Course WHERE InstructorID = %s AND Deleted = 0", (user_id,))
+    else:
+        cursor.execute("""
+            SELECT CourseID FROM Enrollment
+            WHERE StudentID = %s AND Status = 'active'
+        """, (user_id,))
+    return [row[0] if isinstance(row, tuple) else row['CourseID'] for row in cursor.fetchall()]
+
+
+def search(cursor, user_id, role, query, types=None, limit=20, offset=0):
+    """Run a ranked full-text search scoped to the user's courses."""
+    course_ids = scoped_course_ids(cursor, user_id, role)
+    if course_ids == []:
+        return []
+
+    types = [t for t in (types or SOURCES) if t in SOURCES]
+    parts = []
+    params = []
+    for source_type in types:
+        for sql in SOURCES[source_type]:
+            clause = sql
+            source_params = [query, query]
+            if course_ids is not None:
+                clause += " AND {}.CourseID IN ({})".format(
+                    'cm' if source_type == 'material' else 'a',
+                    ', '.join(['%s'] * len(course_ids)))
+                source_params.extend(course_ids)
+            # Students only ever see their own submissions
+            if source_type == 'submission' and role == 'student':
+                clause += " AND s.StudentID = %s"
+                source_params.append(user_id)
+            parts.append(clause)
+            params.extend(source_params)
+
+    if not parts:
+        return []
+
+    cursor.execute(f"""
+        SELECT r.type, r.id, r.CourseID, c.CourseName, r.title, SUM(r.score) AS score
+        FROM ({' UNION ALL '.join(parts)}) r
+        JOIN Course c ON r.CourseID = c.CourseID AND c.Deleted = 0
+        GROUP BY r.type, r.id, r.CourseID, c.CourseName, r.title
+        ORDER BY score DESC
+        LIMIT %s OFFSET %s
+    """, (*params, min(limit, MAX_RESULTS), offset))
+    return cursor.fetchall()
@@ -0,0 +1,95 @@
+"""
+University Assignment Portal - Settings
+
+Builds the portal's configuration from three layers, later ones winning:
+
+1. DEFAULTS below
+2. config.py, if present
+3. PORTAL_* environment variables, e.g. PORTAL_DATABASE_HOST=db.internal.
+   Values are parsed as JSON when possible, so PORTAL_DATABASE_POOL_SIZE=20
+   is a number and PORTAL_DATABASE_REPLICAS='[{"host": "replica1"}]' a list.
+"""
+import os
+
+from flask import Config
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ENV_PREFIX = 'PORTAL'
+
+DEFAULTS = {
+    'DATABASE_HOST': 'localhost',
+    'DATABASE_USER': 'root',
+    'DATABASE_PASSWORD': '',
+    'DATABASE_NAME': 'assignment_portal',
+    'DATABASE_REPLICAS': [],
+    'DATABASE_POOL_SIZE': 10,
+    'DATABASE_POOL_TIMEOUT': 10,  # seconds a request waits for a pooled connection
+    'UPLOAD_FOLDER': os.path.join(BASE_DIR, 'uploads'),
+    'COLD_STORAGE_FOLDER': os.path.join(BASE_DIR, 'cold_storage'),  # zip archives of closed assignments
+    'COLD_STORAGE_INTERVAL': 24 * 3600,  # seconds between cold storage runs
+    'ALLOWED_EXTENSIONS': {'pdf', 'doc', 'docx', 'txt', 'zip'},
+    'MAX_CONTENT_LENGTH': 16 * 1024 * 1024,  # 16MB max-limit
+    'SUBMISSION_VERSIONS_KEPT': 5,  # versions kept per submission; older ones are pruned
+    'SUBMISSION_RETENTION_INTERVAL': 3600,  # seconds between pruning runs
+    'RESUMABLE_UPLOAD_TTL': 24 * 3600,  # seconds an unfinished upload is kept after its last chunk
+    'RESUMABLE_UPLOAD_GRACE': 3600,  # seconds after the due date an upload started in time may finish
+    'RESUMABLE_EXPIRY_INTERVAL': 3600,  # seconds between removals of abandoned uploads
+    'UPLOAD_WORKERS': 2,  # processes validating uploads and rendering previews
+    'SIMILARITY_THRESHOLD': 0.5,  # estimated Jaccard similarity at which submissions are flagged
+    'GRADEBOOK_CACHE_TTL': 300,  # seconds a course's gradebook analytics are reused
+    'DRAIN_TIMEOUT': 30,  # seconds to let in-flight requests finish on SIGTERM
+    'ASYNC_WORKER_THREADS': 32,  # threads running sync Flask handlers under asgi.py
+    'ASYNC_IO_THREADS': 4,  # threads for spooling request bodies and compression under asgi.py
+    'COMPRESS_MIN_SIZE': 1024,  # bytes below which responses are sent uncompressed
+    'RATE_LIMIT_ENABLED': True,
+    'RATE_LIMIT_DEFAULT': '20/second',  # per user (or IP when logged out) on routes without @limit
+    'RATE_LIMIT_STORAGE_URL': None,  # e.g. redis://localhost:6379/0 to share limits between workers
+    'PROXY_FIX_HOPS': 0,  # reverse proxies in front of the app whose X-Forwarded-* headers are trusted
+    'STORAGE_BACKEND': 'local',  # or 's3' to store new uploads in STORAGE_S3_BUCKET
+    'STORAGE_S3_BUCKET': None,
+    'STORAGE_S3_PREFIX': '',
+    'STORAGE_S3_ENDPOINT_URL': None,  # e.g. http://localhost:9000 for MinIO
+    'STORAGE_S3_REGION': None,
+    'STORAGE_PRESIGN_EXPIRY': 900,  # seconds a presigned upload/download URL stays valid
+    'AUDIT_SPOOL_PATH': os.path.join(BASE_DIR, 'audit_spool.jsonl'),  # audit entries waiting for the database
+    'AUDIT_BUFFER_SIZE': 10000,  # entries held in memory before spilling to the spool file
+    'AUDIT_BATCH_SIZE': 200,  # rows per multi-row INSERT
+    'AUDIT_FLUSH_INTERVAL': 1.0,  # seconds between audit writes
+    'LOG_LEVEL': 'INFO',
+    'LOG_QUEUE_SIZE': 10000,  # log records waiting for the writer thread before new ones are dropped
+    'LOG_ACCESS_SAMPLE_RATE': 0.1,  # share of fast successful reads written to the access log
+    'LOG_SLOW_REQUEST_MS': 1000,  # requests at least this slow are always logged
+    'ANALYTICS_EXPORT_FOLDER': os.path.join(BASE_DIR, 'analytics'),  # Parquet files for offline reports
+    'ANALYTICS_EXPORT_CHUNK_SIZE': 5000,  # rows fetched from MySQL at a time
+    'ANALYTICS_EXPORT_OVERLAP': 300,  # seconds each export re-reads before the previous snapshot
+    'COURSE_DELETE_BATCH_SIZE': 500,  # rows deleted per transaction when a course is deleted
+    'ROLLOVER_BATCH_SIZE': 200,  # source courses cloned per transaction by a rollover job
+    'ARCHIVE_BATCH_SIZE': 1000,  # rows moved per transaction when archiving a term
+    'NOTIFICATION_ARCHIVE_DAYS': 180,  # notifications older than this are archived with a term
+    'GRADING_LEASE_SECONDS': 900,  # how long a grader keeps a submission from /grading/next
+    'GRADING_PREFETCH': 5,  # submissions leased per /grading/next call by default
+}
+
+
+def load(config=None):
+    """Return the layered settings, filling `config` (a flask.Config) if given."""
+    if config is None:
+        config = Config(BASE_DIR)
+    config.update(DEFAULTS)
+    try:
+        config.from_object('config')
+    except ImportError:
+        pass  # environment-only deployment
+    config.from_prefixed_env(ENV_PREFIX)
+    config['ALLOWED_EXTENSIONS'] = {ext.lower() for ext in config['ALLOWED_EXTENSIONS']}
+    return config
+
+
+def database_config(config):
+    """mysql.connector keyword arguments for the primary database."""
+    return {
+        'host': config['DATABASE_HOST'],
+        'user': config['DATABASE_USER'],
+        'password': config['DATABASE_PASSWORD'],
+        'database': config['DATABASE_NAME']
+    }
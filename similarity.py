@@ -0,0 +1,217 @@
+"""
+University Assignment Portal - Submission Similarity
+
+Flags near-duplicate submissions with MinHash signatures and LSH banding:
+
+1. Extracted submission text is split into overlapping word shingles.
+2. A MinHash signature (NUM_PERM uint32 values) is computed with NumPy and
+   stored per SubmissionID in SubmissionSignature.
+3. Signatures are cut into BANDS bands of ROWS values; submissions sharing a
+   band bucket become candidate pairs, so only likely matches are compared
+   instead of every pair.
+
+The estimated Jaccard similarity of a pair is the fraction of equal
+signature values.
+"""
+import re
+import zlib
+
+import numpy as np
+
+SHINGLE_SIZE = 5   # words per shingle
+NUM_PERM = 128     # signature length
+BANDS = 32
+ROWS = NUM_PERM // BANDS
+PRIME = np.uint64(4294967291)  # largest prime below 2**32
+CHUNK = 4096       # shingles hashed per step, bounds memory for long texts
+
+# Fixed seed: signatures must stay comparable across processes and restarts
+_rng = np.random.RandomState(20240101)
+_A = _rng.randint(1, 2 ** 31, size=NUM_PERM).astype(np.uint64)
+_B = _rng.randint(0, 2 ** 31, size=NUM_PERM).astype(np.uint64)
+
+WORD = re.compile(r'\w+')
+
+
+def shingle_hashes(text):
+    """Hash every SHINGLE_SIZE-word window of the text to a uint32."""
+    tokens = WORD.findall(text.lower())
+    if not tokens:
+        return np.empty(0, dtype=np.uint64)
+    token_hashes = np.fromiter((zlib.crc32(t.encode('utf-8')) for t in tokens),
+                               dtype=np.uint64, count=len(tokens))
+    if len(tokens) < SHINGLE_SIZE:
+        return np.unique(token_hashes)
+
+    # Polynomial rolling combination of the token hashes in each window
+    windows = len(tokens) - SHINGLE_SIZE + 1
+    combined = np.zeros(windows, dtype=np.uint64)
+    for offset in range(SHINGLE_SIZE):
+        combined = (combined * np.uint64(1000003) + token_hashes[offset:offset + windows]) % PRIME
+    return np.unique(combined)
+
+
+def minhash_signature(text):
+    """Return the MinHash signature of the text, or None if it has no words."""
+    shingles = shingle_hashes(text)
+    if shingles.size == 0:
+        return None
+    signature = np.full(NUM_PERM, np.iinfo(np.uint64).max, dtype=np.uint64)
+    for start in range(0, shingles.size, CHUNK):
+        chunk = shingles[start:start + CHUNK, None]
+        # a * x + b stays below 2**63 since a, b < 2**31 and x < 2**32
+        hashed = (_A * chunk + _B) % PRIME
+        np.minimum(signature, hashed.min(axis=0), out=signature)
+    return signature.astype(np.uint32)
+
+
+def signature_to_bytes(signature):
+    return signature.astype('<u4').tobytes()
+
+
+def signature_from_bytes(data):
+    return np.frombuffer(data, dtype='<u4')
+
+
+def candidate_pairs(signatures):
+    """Find candidate pairs among an (n, NUM_PERM) signature matrix using LSH banding.
+
+    Returns an (m, 2) array of row indices with i < j.
+    """
+    n = signatures.shape[0]
+    if n < 2:
+        return np.empty((0, 2), dtype=np.int64)
+
+    pairs = set()
+    for band in range(BANDS):
+        block = np.ascontiguousarray(signatures[:, band * ROWS:(band + 1) * ROWS])
+        # View each band row as a single opaque value so np.unique can bucket it
+        keys = block.view(np.dtype((np.void, block.dtype.itemsize * ROWS))).ravel()
+        _, bucket, counts = np.unique(keys, return_inverse=True, return_counts=True)
+        shared = np.flatnonzero(counts[bucket] > 1)
+        if shared.size == 0:
+            continue
+        order = shared[np.argsort(bucket[shared], kind='stable')]
+        boundaries = np.flatnonzero(np.diff(bucket[order])) + 1
+        for members in np.split(order, boundaries):
+            for i in range(len(members)):
+                for j in range(i + 1, len(members)):
+                    pairs.add((members[i], members[j]))
+
+    if not pairs:
+        return np.empty((0, 2), dtype=np.int64)
+    return np.array(sorted(pairs), dtype=np.int64)
+
+
+def similar_pairs(ids, signatures, threshold):
+    """Return (id_a, id_b, similarity) for every candidate pair at or above the threshold."""
+    candidates = candidate_pairs(signatures)
+    if candidates.size == 0:
+        return []
+    estimates = (signatures[candidates[:, 0]] == signatures[candidates[:, 1]]).mean(axis=1)
+    keep = estimates >= threshold
+    return [
+        (ids[i], ids[j], float(score))
+        for (i, j), score in zip(candidates[keep], estimates[keep])
+    ]
+
+
+def matches_for(signature, ids, signatures, threshold):
+    """Compare one signature against existing ones (incremental mode)."""
+    if len(ids) == 0:
+        return []
+    banded = signatures.reshape(len(ids), BANDS, ROWS)
+    target = signature.reshape(BANDS, ROWS)
+    candidates = np.flatnonzero((banded == target).all(axis=2).any(axis=1))
+    if candidates.size == 0:
+        return []
+    estimates = (signatures[candidates] == signature).mean(axis=1)
+    return [
+        (ids[i], float(score))
+        for i, score in zip(candidates, estimates) if score >= threshold
+    ]
+
+
+def load_signatures(cursor, assignment_id, exclude=None):
+    """Load every stored signature of an assignment as (ids, matrix)."""
+    cursor.execute("""
+        SELECT SubmissionID, Signature
+        FROM SubmissionSignature
+        WHERE AssignmentID = %s AND SubmissionID <> %s
+        ORDER BY SubmissionID
+    """, (assignment_id, exclude or 0))
+    rows = cursor.fetchall()
+    ids = [row[0] for row in rows]
+    if not rows:
+        return ids, np.empty((0, NUM_PERM), dtype=np.uint32)
+    return ids, np.vstack([signature_from_bytes(row[1]) for row in rows])
+
+
+def recorded_matches(cursor, assignment_id, threshold):
+    """Matches stored by the incremental check for an assignment, newest first.
+
+    Expects a dictionary cursor.
+    """
+    cursor.execute("""
+        SELECT m.SubmissionID, m.MatchedSubmissionID, m.Similarity, m.DetectedAt
+        FROM SimilarityMatch m
+        JOIN Submission s ON s.SubmissionID = m.SubmissionID
+        WHERE s.AssignmentID = %s AND m.Similarity >= %s
+        ORDER BY m.DetectedAt DESC, m.Similarity DESC
+    """, (assignment_id, threshold))
+    return cursor.fetchall()
+
+
+def record_submission(db, content_hash, submission_id, threshold):
+    """Store the signature for a submission and check it against its assignment.
+
+    Called by the upload pipeline once the file's text has been analysed.
+    Matches at or above `threshold` are written to SimilarityMatch,
+    replacing every earlier match involving the submission in either
+    direction, since its old content no longer applies.
+
+    Analyses can finish out of order, so nothing is recorded unless
+    `content_hash` is still the submission's current content; the
+    submission row stays locked until the matches are committed.
+    """
+    if submission_id is None:
+        return []
+    cursor = db.cursor()
+    cursor.execute("""
+        SELECT s.AssignmentID, fa.MinHash
+        FROM Submission s
+        JOIN SubmissionVersion v ON v.SubmissionID = s.SubmissionID
+            AND v.BlobPath = s.SubmissionPath AND v.ContentHash = %s
+        JOIN FileAnalysis fa ON fa.ContentHash = v.ContentHash
+        WHERE s.SubmissionID = %s
+        LIMIT 1
+        FOR UPDATE OF s
+    """, (content_hash, submission_id))
+    row = cursor.fetchone()
+    if not row or row[1] is None:
+        db.commit()  # releases the row lock
+        cursor.close()
+        return []
+    assignment_id, data = row
+
+    cursor.execute("""
+        INSERT INTO SubmissionSignature (SubmissionID, AssignmentID, Signature)
+        VALUES (%s, %s, %s)
+        ON DUPLICATE KEY UPDATE Signature = VALUES(Signature), UpdatedAt = NOW()
+    """, (submission_id, assignment_id, data))
+
+    ids, signatures = load_signatures(cursor, assignment_id, exclude=submission_id)
+    matches = matches_for(signature_from_bytes(data), ids, signatures, threshold)
+
+    cursor.execute("""
+        DELETE FROM SimilarityMatch
+        WHERE SubmissionID = %s OR MatchedSubmissionID = %s
+    """, (submission_id, submission_id))
+    if matches:
+        cursor.executemany("""
+            INSERT INTO SimilarityMatch (SubmissionID, MatchedSubmissionID, Similarity)
+            VALUES (%s, %s, %s)
+        """, [(submission_id, other, round(score, 4)) for other, score in matches])
+    db.commit()
+    cursor.close()
+    return matches
@@ -0,0 +1,282 @@
+// Fetch dashboard data on page load
+document.addEventListener('DOMContentLoaded', function() {
+    fetchDashboardData();
+});
+
+function fetchDashboardData() {
+    fetch('/admin-dashboard')
+        .then(response => response.json())
+        .then(data => {
+            console.log('Dashboard data:', data); // Debug log
+            updateStats(data.stats);
+            updateCoursesTable(data.courses);
+            updateEnrollmentRequests(data.enrollment_requests); // Add this line
+        })
+        .catch(error => console.error('Error:', error));
+}
+
+function updateStats(stats) {
+    // Fix the IDs to match the HTML
+    document.getElementById('studentCount').textContent = stats.student_count;
+    document.getElementById('professorCount').textContent = stats.professor_count;
+    document.getElementById('activeCourses').textContent = stats.active_courses;
+    document.getElementById('activeAssignments').textContent = stats.active_assignments;
+}
+
+function openModal(modalId) {
+    document.getElementById(modalId).style.display = 'block';
+    if (modalId === 'createCourseModal') {
+        loadProfessors();
+    }
+}
+
+function closeModal(modalId) {
+    document.getElementById(modalId).style.display = 'none';
+}
+
+// Handle course creation form submission
+document.getElementById('createCourseForm').addEventListener('submit', function(e) {
+    e.preventDefault();
+
+    const formData = {
+        course_name: document.getElementById('courseName').value,
+        course_code: document.getElementById('courseCode').value,
+        instructor_id: document.getElementById('instructor').value,
+        year: document.getElementById('year').value,
+        semester: document.getElementById('semester').value
+    };
+
+    fetch('/admin/courses/create', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json'
+        },
+        body: JSON.stringify(formData)
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            closeModal('createCourseModal');
+            fetchDashboardData();
+            alert('Course created successfully');
+        } else {
+            alert(data.message || 'Failed to create course');
+        }
+    })
+    .catch(error => {
+        console.error('Error:', error);
+        alert('An error occurred while creating the course');
+    });
+});
+
+// Close modal when clicking outside
+window.onclick = function(event) {
+    if (event.target.className === 'modal') {
+        event.target.style.display = 'none';
+    }
+}
+
+// Update dashboard data every 5 seconds
+function updateDashboardData() {
+    fetch('/admin-dashboard')
+        .then(response => response.json())
+        .then(data => {
+            // Update statistics with animation
+            updateStatWithAnimation('studentCount', data.stats.student_count);
+            updateStatWithAnimation('professorCount', data.stats.professor_count);
+            updateStatWithAnimation('activeCourses', data.stats.active_courses);
+            updateStatWithAnimation('activeAssignments', data.stats.active_assignments);
+        })
+        .catch(error => console.error('Error:', error));
+}
+
+function updateStatWithAnimation(elementId, newValue) {
+    const element = document.getElementById(elementId);
+    const currentValue = parseInt(element.textContent);
+
+    if (currentValue !== newValue) {
+        element.classList.add('number-changing');
+        element.textContent = newValue;
+
+        setTimeout(() => {
+            element.classList.remove('number-changing');
+        }, 500);
+    }
+}
+
+// Call immediately and set interval
+updateDashboardData();
+setInterval(updateDashboardData, 5000); // Update every 5 seconds
+
+function loadProfessors() {
+    fetch('/api/professors')
+        .then(response => response.json())
+        .then(data => {
+            const instructorSelect = document.getElementById('instructor');
+            instructorSelect.innerHTML = '<option value="">Select an instructor</option>';
+            data.professors.forEach(professor => {
+                instructorSelect.innerHTML += `
+                    <option value="${professor.UserID}">
+                        ${professor.FirstName} ${professor.LastName} (${professor.Email})
+                    </option>
+                `;
+            });
+            })
+        .catch(error => console.error('Error:', error));
+}
+
+function updateCoursesTable(courses) {
+    const tbody = document.querySelector('#coursesTable tbody');
+    if (!courses || courses.length === 0) {
+        tbody.innerHTML = '<tr><td colspan="5">No courses found</td></tr>';
+        return;
+    }
+
+    tbody.innerHTML = courses.map(course => `
+        <tr>
+            <td>${course.CourseCode || ''}</td>
+            <td>${course.CourseName || ''}</td>
+            <td>${course.InstructorName || 'No instructor assigned'}</td>
+            <td>${course.EnrolledCount || 0}</td>
+            <td>
+                <button class="btn btn-primary" onclick="editCourse(${course.CourseID})">Edit</button>
+                <button class="btn btn-primary" onclick="deleteCourse(${course.CourseID})">Delete</button>
+            </td>
+        </tr>
+    `).join('');
+}
+
+function editCourse(courseId) {
+    fetch(`/api/courses/${courseId}`)
+        .then(response => response.json())
+        .then(data => {
+            document.getElementById('editCourseId').value = courseId;
+            document.getElementById('editCourseName').value = data.name;
+            document.getElementById('editCourseCode').value = data.code;
+            document.getElementById('editYear').value = data.year;
+            document.getElementById('editSemester').value = data.semester;
+
+            // Load professors and set the selected instructor
+            fetch('/api/professors')
+                .then(response => response.json())
+                .then(profData => {
+                    const instructorSelect = document.getElementById('editInstructor');
+                    instructorSelect.innerHTML = '<option value="">Select an instructor</option>';
+                    profData.professors.forEach(professor => {
+                        instructorSelect.innerHTML += `
+                            <option value="${professor.UserID}" ${professor.UserID === data.instructor_id ? 'selected' : ''}>
+                                ${professor.FirstName} ${professor.LastName} (${professor.Email})
+                            </option>
+                        `;
+                    });
+                });
+
+            openModal('editCourseModal');
+        })
+        .catch(error => console.error('Error:', error));
+}
+
+document.getElementById('editCourseForm').addEventListener('submit', function(e) {
+    e.preventDefault();
+
+    const courseId = document.getElementById('editCourseId').value;
+    const formData = {
+        course_name: document.getElementById('editCourseName').value,
+        course_code: document.getElementById('editCourseCode').value,
+        instructor_id: document.getElementById('editInstructor').value,
+        year: document.getElementById('editYear').value,
+        semester: document.getElementById('editSemester').value
+    };
+
+    fetch(`/admin/courses/${courseId}/edit`, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json'
+        },
+        body: JSON.stringify(formData)
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            closeModal('editCourseModal');
+            fetchDashboardData();
+            alert('Course updated successfully');
+        } else {
+            alert(data.message || 'Failed to update course');
+        }
+    })
+    .catch(error => {
+        console.error('Error:', error);
+        alert('An error occurred while updating the course');
+    });
+});
+
+function viewEnrollments(courseId) {
+    // Implement enrollment viewing functionality
+    console.log('Viewing enrollments for course:', courseId);
+}
+
+function deleteCourse(courseId) {
+    if (confirm('Are you sure you want to delete this course?')) {
+        fetch(`/admin/courses/${courseId}/delete`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            }
+        })
+        .then(response => response.json())
+        .then(data => {
+            if (data.success) {
+                fetchDashboardData();
+                alert('Course deleted successfully');
+            } else {
+                alert(data.message || 'Failed to delete course');
+            }
+        })
+        .catch(error => console.error('Error:', error));
+    }
+}
+
+function updateEnrollmentRequests(requests) {
+    const tbody = document.querySelector('#enrollmentRequestsTable tbody');
+    if (!requests || requests.length === 0) {
+        tbody.innerHTML = '<tr><td colspan="5">No pending enrollment requests</td></tr>';
+        return;
+    }
+
+    tbody.innerHTML = requests.map(request => `
+        <tr>
+            <td>${request.StudentName}</td>
+            <td>${request.CourseName} (${request.CourseCode})</td>
+            <td>${new Date(request.RequestDate).toLocaleString()}</td>
+            <td>${request.Status}</td>
+            <td>
+                ${request.Status === 'pending' ? `
+                    <button class="btn btn-primary" onclick="handleEnrollment(${request.RequestID}, 'approve')">Approve</button>
+                    <button class="btn btn-primary" onclick="handleEnrollment(${request.RequestID}, 'reject')">Reject</button>
+                ` : ''}
+            </td>
+        </tr>
+    `).join('');
+}
+
+function handleEnrollment(requestId, action) {
+    fetch(`/admin/enrollment/${action}/${requestId}`, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json'
+        }
+    })
+    .then(response => response.json())
+    .then(data => {
+        // Show success message regardless of success flag since the operation completed
+        alert(data.message || `Enrollment request ${action}ed successfully`);
+        // Refresh dashboard data to update the tables
+        fetchDashboardData();
+    })
+    .catch(error => {
+        console.error('Error:', error);
+        //alert(`An error occurred while ${action}ing enrollment`);
+        fetchDashboardData();
+    });
+}
@@ -0,0 +1,55 @@
+document.addEventListener('DOMContentLoaded', function() {
+    loadAssignments();
+    setupFilters();
+});
+
+function loadAssignments() {
+    const courseId = new URLSearchParams(window.location.search).get('courseId');
+    const status = document.getElementById('statusFilter').value;
+    const sortBy = document.getElementById('sortBy').value;
+
+    fetch(`/api/assignments?courseId=${courseId || ''}&status=${status}&sortBy=${sortBy}`)
+        .then(response => response.json())
+        .then(data => {
+            displayAssignments(data.assignments);
+        })
+        .catch(error => console.error('Error:', error));
+}
+
+function displayAssignments(assignments) {
+    const grid = document.getElementById('assignmentsGrid');
+
+    if (assignments.length === 0) {
+        grid.innerHTML = `
+            <div class="empty-state">
+                <h2>No assignments found</h2>
+                <p>There are no assignments matching your filters.</p>
+            </div>
+        `;
+        return;
+    }
+
+    grid.innerHTML = assignments.map(assignment => `
+        <div class="assignment-card">
+            <h3>${assignment.Title}</h3>
+            <p>${assignment.Description}</p>
+            <div class="due-date">Due: ${new Date(assignment.DueDate).toLocaleString()}</div>
+            <div class="assignment-status status-${assignment.Status.toLowerCase()}">
+                ${assignment.Status}
+            </div>
+            <button onclick="viewAssignment(${assignment.AssignmentID})" class="btn btn-primary">
+                ${assignment.Status === 'pending' ? 'Submit' : 'View Details'}
+            </button>
+        </div>
+    `).join('');
+}
+
+function setupFilters() {
+    ['courseFilter', 'statusFilter', 'sortBy'].forEach(filterId => {
+        document.getElementById(filterId).addEventListener('change', loadAssignments);
+    });
+}
+
+function viewAssignment(assignmentId) {
+    window.location.href = `/assignment/${assignmentId}`;
+}
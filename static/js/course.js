@@ -0,0 +1,61 @@
+document.addEventListener('DOMContentLoaded', function() {
+    const courseId = new URLSearchParams(window.location.search).get('id');
+    if (!courseId) {
+        window.location.href = '/dashboard';
+        return;
+    }
+
+    loadCourseData(courseId);
+    setupTabNavigation();
+    loadUserSpecificUI();
+});
+
+function loadCourseData(courseId) {
+    fetch(`/api/courses/${courseId}`)
+        .then(response => response.json())
+        .then(data => {
+            document.getElementById('courseName').textContent = data.name;
+            document.getElementById('courseCode').textContent = data.code;
+            document.getElementById('instructorName').textContent = data.instructor;
+            document.getElementById('courseSemester').textContent = `${data.semester} ${data.year}`;
+
+            loadAssignments(courseId);
+            loadMaterials(courseId);
+            loadStudents(courseId);
+        })
+        .catch(error => console.error('Error:', error));
+}
+
+function setupTabNavigation() {
+    document.querySelectorAll('.tab-button').forEach(button => {
+        button.addEventListener('click', () => {
+            // Hide all tab contents
+            document.querySelectorAll('.tab-content').forEach(content => {
+                content.classList.remove('active');
+            });
+
+            // Remove active class from all buttons
+            document.querySelectorAll('.tab-button').forEach(btn => {
+                btn.classList.remove('active');
+            });
+
+            // Show selected tab content
+            button.classList.add('active');
+            document.getElementById(button.dataset.tab).classList.add('active');
+        });
+    });
+}
+
+function loadUserSpecificUI() {
+    fetch('/api/user/role')
+        .then(response => response.json())
+        .then(data => {
+            if (data.role === 'professor') {
+                document.getElementById('createAssignmentBtn').style.display = 'block';
+                document.getElementById('uploadMaterialBtn').style.display = 'block';
+            }
+        })
+        .catch(error => console.error('Error:', error));
+}
+
+// Add more functions for handling assignments, materials, and students
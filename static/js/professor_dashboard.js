@@ -0,0 +1,498 @@
+document.addEventListener('DOMContentLoaded', function() {
+    fetchProfessorDashboard();
+    setupEventListeners();
+});
+
+function fetchProfessorDashboard() {
+    fetch('/professor-dashboard')
+        .then(response => response.json())
+        .then(data => {
+            updateDashboardStats(data.stats);
+            displayTeachingCourses(data.courses);
+            displaySubmissions(data.submissions); // Add this line
+            document.getElementById('professorName').textContent = `Welcome, ${data.professor_name}`;
+        })
+        .catch(error => console.error('Error:', error));
+}
+
+// Remove duplicate displayTeachingCourses function
+// Keep only one version with all the stats displayed
+function displayTeachingCourses(courses) {
+    const container = document.getElementById('teachingCourses');
+    if (!courses || courses.length === 0) {
+        container.innerHTML = '<p class="empty-message">No courses assigned yet.</p>';
+        return;
+    }
+
+    container.innerHTML = courses.map(course => `
+        <div class="course-card">
+            <h3>${course.CourseName}</h3>
+            <p class="course-code">${course.CourseCode}</p>
+            <p class="semester">Semester ${course.Semester} - ${course.Year}</p>
+
+            <div class="course-stats">
+                <div class="course-stat">
+                    <h4>Students</h4>
+                    <p>${course.enrolled_students}</p>
+                </div>
+                <div class="course-stat">
+                    <h4>Assignments</h4>
+                    <p>${course.assignment_count}</p>
+                </div>
+                <div class="course-stat">
+                    <h4>Pending</h4>
+                    <p>${course.pending_submissions}</p>
+                </div>
+            </div>
+
+            <div class="course-actions">
+                <button class="btn btn-primary" onclick="viewCourseDetails(${course.CourseID})">
+                    View Details
+                </button>
+                <button class="btn btn-primary" onclick="openAssignmentModal(${course.CourseID})">
+                    Upload Assignment
+                </button>
+            </div>
+        </div>
+    `).join('');
+}
+
+// Fix the displayAssignmentsList function 
+function displayAssignmentsList(assignments) {
+    const tbody = document.getElementById('assignmentsList');
+    tbody.innerHTML = assignments.map(assignment => `
+        <tr>
+            <td>${assignment.title}</td>
+            <td>${new Date(assignment.due_date).toLocaleString()}</td>
+            <td>${assignment.submission_count}/${assignment.total_students}</td>
+            <td>
+                <button class="btn btn-primary" onclick="startGradingQueue(${assignment.id})">
+                    Grade queue
+                </button>
+                <button class="btn btn-danger" onclick="deleteAssignment(${assignment.id}, '${assignment.title}')">
+                    Delete
+                </button>
+            </td>
+        </tr>
+    `).join('');
+}
+
+function setupEventListeners() {
+    document.getElementById('createAssignmentForm').addEventListener('submit', handleAssignmentCreation);
+    document.getElementById('gradeForm').addEventListener('submit', handleGradeSubmission);
+    document.getElementById('assignmentUploadForm').addEventListener('submit', function(e) {
+        e.preventDefault();
+        const formData = new FormData(this);
+
+        fetch('/api/assignments/upload', {
+            method: 'POST',
+            body: formData
+        })
+        .then(response => response.json())
+        .then(data => {
+            if (data.success) {
+                alert('Assignment uploaded successfully');
+                closeModal('assignmentUploadModal');
+                fetchProfessorDashboard();  // Refresh the dashboard
+            } else {
+                alert(data.message || 'Failed to upload assignment');
+            }
+        })
+        .catch(error => {
+            console.error('Error:', error);
+            alert('An error occurred while uploading the assignment');
+        });
+    });
+}
+
+function handleAssignmentCreation(e) {
+    e.preventDefault();
+    const formData = new FormData(e.target);
+
+    fetch('/courses/' + formData.get('course_id') + '/assignments', {
+        method: 'POST',
+        body: formData
+    })
+    .then(response => response.json())
+    .then(data => {
+        alert(data.message);
+        if (data.message.includes('successfully')) {
+            closeModal('createAssignmentModal');
+            fetchProfessorDashboard();
+        }
+    })
+    .catch(error => console.error('Error:', error));
+}
+
+function handleGradeSubmission(e) {
+    e.preventDefault();
+    const submissionId = document.getElementById('submissionId').value;
+    const grade = document.getElementById('grade').value;
+    const feedback = document.getElementById('feedback').value;
+
+    const data = {
+        grade: parseInt(grade),
+        feedback: feedback
+    };
+
+    fetch(`/submissions/${submissionId}/grade`, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json'
+        },
+        body: JSON.stringify(data)
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success && gradingQueue) {
+            gradingQueue.submissions = gradingQueue.submissions.filter(s => s.SubmissionID != submissionId);
+            gradeNextInQueue();
+        } else if (data.success) {
+            alert('Grade submitted successfully');
+            closeModal('gradeModal');
+            fetchProfessorDashboard(); // Refresh the dashboard
+        } else {
+            alert(data.message || 'Failed to submit grade');
+        }
+    })
+    .catch(error => {
+        console.error('Error:', error);
+        alert('An error occurred while submitting the grade');
+    });
+}
+
+// Modal functions
+function openModal(modalId) {
+    document.getElementById(modalId).style.display = 'block';
+}
+
+function closeModal(modalId) {
+    document.getElementById(modalId).style.display = 'none';
+    if (modalId === 'gradeModal' && gradingQueue) {
+        stopGradingQueue();
+    }
+}
+
+// Close modals when clicking outside
+window.onclick = function(event) {
+    if (event.target.className === 'modal') {
+        event.target.style.display = 'none';
+    }
+};
+
+// Add live update functionality
+function updateDashboardStats() {
+    fetch('/professor-dashboard')
+        .then(response => response.json())
+        .then(data => {
+            updateStatWithAnimation('activeCourses', data.stats.active_courses);
+            updateStatWithAnimation('totalStudents', data.stats.total_students);
+            updateStatWithAnimation('pendingAssignments', data.stats.pending_assignments);
+        })
+        .catch(error => console.error('Error:', error));
+}
+
+function updateStatWithAnimation(elementId, newValue) {
+    const element = document.getElementById(elementId);
+    const currentValue = parseInt(element.textContent);
+
+    if (currentValue !== newValue) {
+        element.classList.add('number-changing');
+        element.textContent = newValue;
+
+        setTimeout(() => {
+            element.classList.remove('number-changing');
+        }, 500);
+    }
+}
+
+// Initial load and set interval for live updates
+updateDashboardStats();
+setInterval(updateDashboardStats, 5000); // Update every 5 seconds
+
+// Add to your existing script
+let currentCourseId = null;
+
+function viewCourseDetails(courseId) {
+    currentCourseId = courseId;
+    fetch(`/api/courses/${courseId}/details`)
+        .then(response => {
+            if (!response.ok) {
+                throw new Error('Network response was not ok');
+            }
+            return response.json();
+        })
+        .then(data => {
+            // Update course details modal content
+            document.getElementById('courseDetailsTitle').textContent = data.name;
+            document.getElementById('detailCourseCode').textContent = data.code;
+            document.getElementById('detailSemester').textContent = `Semester ${data.semester} - ${data.year}`;
+            document.getElementById('detailStudents').textContent = data.enrolled_count;
+            document.getElementById('detailAssignments').textContent = data.active_assignments;
+
+            // Update students list
+            updateStudentsList(data.students);
+
+            // Update assignments list
+            updateAssignmentsList(data.assignments);
+
+            // Show the modal
+            openModal('courseDetailsModal');
+
+            // Activate first tab
+            document.querySelector('.tab-btn[data-tab="overview"]').click();
+        })
+        .catch(error => {
+            console.error('Error fetching course details:', error);
+            alert('Failed to load course details');
+        });
+}
+
+function updateStudentsList(students) {
+    const tbody = document.getElementById('studentsList');
+    if (!students || students.length === 0) {
+        tbody.innerHTML = '<tr><td colspan="4">No students enrolled</td></tr>';
+        return;
+    }
+
+    tbody.innerHTML = students.map(student => {
+        const progress = (student.completed_assignments / student.total_assignments) * 100 || 0;
+        const gradeClass = student.average_grade >= 80 ? 'grade-good' : 
+                         student.average_grade >= 60 ? 'grade-average' : 'grade-poor';
+
+        return `
+            <tr>
+                <td>${student.name}</td>
+                <td>
+                    <div class="progress-bar">
+                        <div class="progress-fill" style="width: ${progress}%"></div>
+                    </div>
+                    <small>${progress.toFixed(1)}%</small>
+                </td>
+                <td>${student.completed_assignments || 0}/${student.total_assignments || 0}</td>
+                <td><span class="grade-badge ${gradeClass}">${student.average_grade?.toFixed(1) || 'N/A'}</span></td>
+            </tr>
+        `;
+    }).join('');
+}
+
+function updateAssignmentsList(assignments) {
+    const tbody = document.getElementById('assignmentsList');
+    if (!assignments || assignments.length === 0) {
+        tbody.innerHTML = '<tr><td colspan="4">No assignments created yet</td></tr>';
+        return;
+    }
+
+    tbody.innerHTML = assignments.map(assignment => `
+        <tr>
+            <td>${assignment.title}</td>
+            <td>${new Date(assignment.due_date).toLocaleString()}</td>
+            <td>${assignment.submission_count}/${assignment.total_students}</td>
+            <td>
+                <button class="btn btn-primary" onclick="startGradingQueue(${assignment.id})">
+                    Grade queue
+                </button>
+                <button class="btn btn-danger" onclick="deleteAssignment(${assignment.id}, '${assignment.title}')">
+                    Delete
+                </button>
+            </td>
+        </tr>
+    `).join('');
+}
+
+// Add tab switching functionality
+document.querySelectorAll('.tab-btn').forEach(button => {
+    button.addEventListener('click', (e) => {
+        // Remove active class from all tabs and contents
+        document.querySelectorAll('.tab-btn').forEach(btn => btn.classList.remove('active'));
+        document.querySelectorAll('.tab-content').forEach(content => content.classList.remove('active'));
+
+        // Add active class to clicked tab and corresponding content
+        button.classList.add('active');
+        document.getElementById(button.dataset.tab).classList.add('active');
+    });
+});
+
+function openAssignmentModal(courseId) {
+    document.getElementById('assignmentCourseId').value = courseId;
+    openModal('assignmentUploadModal');
+
+    // Setup dropzone functionality
+    const dropzone = document.getElementById('assignmentDropzone');
+    const fileInput = document.getElementById('assignmentFile');
+
+    dropzone.onclick = () => fileInput.click();
+
+    dropzone.ondragover = (e) => {
+        e.preventDefault();
+        dropzone.classList.add('drag-over');
+    };
+
+    dropzone.ondragleave = () => dropzone.classList.remove('drag-over');
+
+    dropzone.ondrop = (e) => {
+        e.preventDefault();
+        dropzone.classList.remove('drag-over');
+        if (e.dataTransfer.files.length) {
+            fileInput.files = e.dataTransfer.files;
+            updateDropzoneText(e.dataTransfer.files[0].name);
+        }
+    };
+
+    fileInput.onchange = () => {
+        if (fileInput.files.length) {
+            updateDropzoneText(fileInput.files[0].name);
+        }
+    };
+}
+
+function updateDropzoneText(filename) {
+    document.querySelector('#assignmentDropzone p').textContent = `Selected file: ${filename}`;
+}
+
+function deleteAssignment(assignmentId, title) {
+    if (!confirm(`Are you sure you want to delete assignment "${title}"? This cannot be undone.`)) {
+        return;
+    }
+
+    fetch(`/api/assignments/${assignmentId}/delete`, {
+        method: 'POST'
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            alert('Assignment deleted successfully');
+            // Refresh the current course details
+            viewCourseDetails(currentCourseId);
+            // Also refresh the main dashboard to update stats
+            fetchProfessorDashboard();
+        } else {
+            alert(data.message || 'Failed to delete assignment');
+        }
+    })
+    .catch(error => {
+        console.error('Error:', error);
+        alert('An error occurred while deleting the assignment');
+    });
+}
+
+// Add this new function
+function displaySubmissions(submissions) {
+    const tbody = document.querySelector('#submissionsTable tbody');
+    if (!submissions || submissions.length === 0) {
+        tbody.innerHTML = '<tr><td colspan="6" class="text-center">No recent submissions</td></tr>';
+        return;
+    }
+
+    tbody.innerHTML = submissions.map(submission => {
+        const submissionDate = new Date(submission.SubmissionDate).toLocaleString();
+        const gradeDisplay = submission.Grade 
+            ? `<span class="grade-badge">${submission.Grade}/${submission.MaxPoints}</span>`
+            : `<button class="btn btn-primary" onclick="openGradeModal(${submission.SubmissionID}, ${submission.MaxPoints})">
+                Grade
+               </button>`;
+
+        return `
+            <tr>
+                <td>${submission.student_name}</td>
+                <td>${submission.assignment_title}</td>
+                <td>${submission.course_name}</td>
+                <td>${submissionDate}</td>
+                <td>${gradeDisplay}</td>
+                <td>
+                    <button class="btn btn-primary" onclick="downloadSubmission(${submission.SubmissionID})">
+                        Download
+                    </button>
+                </td>
+            </tr>
+        `;
+    }).join('');
+}
+
+function openGradeModal(submissionId, maxPoints) {
+    document.getElementById('submissionId').value = submissionId;
+    document.getElementById('maxPoints').textContent = maxPoints;
+    document.getElementById('grade').max = maxPoints;
+    document.getElementById('gradeForm').reset();
+    loadSubmissionPreview(submissionId);
+    openModal('gradeModal');
+}
+
+function loadSubmissionPreview(submissionId) {
+    const preview = document.getElementById('submissionPreview');
+    preview.innerHTML = 'Loading preview...';
+    fetch(`/submissions/${submissionId}/preview`)
+        .then(response => response.json())
+        .then(data => {
+            if (data.status === 'rejected') {
+                preview.innerHTML = `<strong>Rejected:</strong> ${data.reason}`;
+                return;
+            }
+            if (data.status !== 'valid') {
+                preview.innerHTML = 'Preview not available yet';
+                return;
+            }
+            const image = data.preview_url ? `<img src="${data.preview_url}" alt="First page preview">` : '';
+            const pages = data.page_count ? `${data.page_count} page(s), ` : '';
+            preview.innerHTML = `${image}${pages}${data.mime_type}`;
+        })
+        .catch(() => {
+            preview.innerHTML = 'Preview not available';
+        });
+}
+
+function downloadSubmission(submissionId) {
+    window.location.href = `/submissions/${submissionId}/download`;
+}
+
+// Grading queue: submissions leased from /grading/next and graded one after another,
+// so several graders on one assignment never get the same submission
+let gradingQueue = null;
+
+function startGradingQueue(assignmentId) {
+    gradingQueue = {assignmentId: assignmentId, submissions: []};
+    closeModal('courseDetailsModal');
+    gradeNextInQueue();
+}
+
+function gradeNextInQueue() {
+    const queue = gradingQueue;
+    // Fetching again before the last one also renews the leases still held
+    if (queue.submissions.length > 1) {
+        openGradeModal(queue.submissions[0].SubmissionID, queue.submissions[0].MaxPoints);
+        return;
+    }
+    fetch(`/grading/next?assignment=${queue.assignmentId}`, {method: 'POST'})
+        .then(response => response.json())
+        .then(data => {
+            if (gradingQueue !== queue) {
+                return;
+            }
+            if (!data.submissions) {
+                alert(data.message || 'Failed to fetch submissions to grade');
+                gradingQueue = null;
+            } else if (data.submissions.length === 0) {
+                alert('No submissions left to grade');
+                gradingQueue = null;
+                closeModal('gradeModal');
+                fetchProfessorDashboard();
+            } else {
+                queue.submissions = data.submissions;
+                openGradeModal(queue.submissions[0].SubmissionID, queue.submissions[0].MaxPoints);
+            }
+        })
+        .catch(error => {
+            console.error('Error:', error);
+            gradingQueue = null;
+        });
+}
+
+function stopGradingQueue() {
+    // Hand the submissions not graded back to the other graders
+    const queue = gradingQueue;
+    gradingQueue = null;
+    queue.submissions.forEach(submission => {
+        fetch(`/grading/leases/${submission.SubmissionID}`, {method: 'DELETE'});
+    });
+    fetchProfessorDashboard();
+}
@@ -0,0 +1,368 @@
+document.addEventListener('DOMContentLoaded', function() {
+    fetchDashboardData();
+    setupEventListeners();
+});
+
+function fetchDashboardData() {
+    fetch('/student-dashboard')
+        .then(response => response.json())
+        .then(data => {
+            console.log('Dashboard data:', data); // Debug line
+            document.getElementById('studentName').textContent = `Welcome, ${data.student_name}`;
+            displayEnrolledCourses(data.enrolled_courses);
+            displayAvailableCourses(data.available_courses);
+            displayUpcomingAssignments(data.upcoming_assignments);
+        })
+        .catch(error => console.error('Error:', error));
+}
+
+function displayEnrolledCourses(courses) {
+    const container = document.getElementById('enrolledCourses');
+    container.innerHTML = courses.map(course => `
+        <div class="course-card">
+            <h3>${course.CourseName}</h3>
+            <p>Instructor: ${course.instructor_name}</p>
+            <p>Code: ${course.CourseCode}</p>
+            <div class="course-actions">
+                <button class="btn btn-danger" onclick="exitCourse(${course.CourseID}, '${course.CourseName}')">
+                    Leave Course
+                </button>
+            </div>
+        </div>
+    `).join('');
+}
+
+function displayAvailableCourses(courses) {
+    const container = document.getElementById('availableCourses');
+    container.innerHTML = courses.length === 0 ? 
+        '<p>No available courses</p>' :
+        courses.map(course => {
+            const buttonHtml = course.enrollment_requested ? 
+                `<button class="btn" disabled>Request Pending</button>` :
+                `<button class="btn btn-primary" onclick="requestEnrollment(${course.CourseID})">
+                    Request Enrollment
+                </button>`;
+
+            return `
+                <div class="course-card">
+                    <h3>${course.CourseName}</h3>
+                    <p>Instructor: ${course.instructor_name}</p>
+                    <p>Code: ${course.CourseCode}</p>
+                    ${buttonHtml}
+                </div>
+            `;
+        }).join('');
+}
+
+function displayUpcomingAssignments(assignments) {
+    const tbody = document.getElementById('assignmentsTable').querySelector('tbody');
+    if (!assignments || assignments.length === 0) {
+        tbody.innerHTML = '<tr><td colspan="5" class="text-center">No assignments available</td></tr>';
+        return;
+    }
+
+    tbody.innerHTML = assignments.map(assignment => {
+        const dueDate = new Date(assignment.DueDate);
+        const statusClasses = {
+            'submitted': 'status-submitted',
+            'late': 'status-late',
+            'pending': 'status-pending'
+        };
+
+        return `
+            <tr>
+                <td>${assignment.CourseCode} - ${assignment.CourseName}</td>
+                <td>${assignment.Title}</td>
+                <td>${dueDate.toLocaleString()}</td>
+                <td><span class="status-badge ${statusClasses[assignment.status]}">${assignment.status}</span></td>
+                <td>
+                    ${assignment.status === 'submitted' 
+                        ? `<span class="grade">${assignment.grade || 'Pending Grade'}</span>`
+                        : `<button class="btn btn-primary" onclick="submitAssignment(${assignment.AssignmentID})">
+                            Submit
+                           </button>`
+                    }
+                </td>
+            </tr>
+        `;
+    }).join('');
+}
+
+function setupEventListeners() {
+    // Dropzone functionality
+    const dropzone = document.getElementById('fileDropzone');
+    const fileInput = document.getElementById('assignmentFile');
+
+    dropzone.addEventListener('click', () => fileInput.click());
+    dropzone.addEventListener('dragover', (e) => {
+        e.preventDefault();
+        dropzone.style.borderColor = '#2ecc71';
+    });
+    dropzone.addEventListener('dragleave', () => {
+        dropzone.style.borderColor = '#3498db';
+    });
+    dropzone.addEventListener('drop', (e) => {
+        e.preventDefault();
+        dropzone.style.borderColor = '#3498db';
+        fileInput.files = e.dataTransfer.files;
+        updateDropzoneText(e.dataTransfer.files[0].name);
+    });
+
+    fileInput.addEventListener('change', () => {
+        if (fileInput.files.length) {
+            updateDropzoneText(fileInput.files[0].name);
+        }
+    });
+}
+
+function updateDropzoneText(filename) {
+    document.querySelector('#fileDropzone p').textContent = `Selected file: ${filename}`;
+}
+
+function requestEnrollment(courseId) {
+    if (!confirm('Are you sure you want to request enrollment in this course?')) {
+        return;
+    }
+
+    fetch(`/student/courses/request/${courseId}`, {
+        method: 'POST'
+    })
+    .then(response => response.json())
+    .then(data => {
+        alert(data.message);
+        if (data.success) {
+            fetchDashboardData();
+        }
+    })
+    .catch(error => console.error('Error:', error));
+}
+
+function exitCourse(courseId, courseName) {
+    if (!confirm(`Are you sure you want to exit from ${courseName}? This action cannot be undone.`)) {
+        return;
+    }
+
+    fetch(`/student/courses/exit/${courseId}`, {
+        method: 'POST'
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            alert(data.message);
+            fetchDashboardData();  // This will refresh both enrolled and available courses
+        } else {
+            alert(data.message || 'Failed to exit course');
+        }
+    })
+    .catch(error => {
+        console.error('Error:', error);
+        alert('An error occurred while trying to exit the course');
+    });
+}
+
+function submitAssignment(assignmentId) {
+    currentAssignmentId = assignmentId;
+    const modal = document.getElementById('submissionModal');
+    const form = document.getElementById('assignmentSubmissionForm');
+    const fileInput = document.getElementById('assignmentFile');
+    const errorMessage = document.getElementById('errorMessage');
+
+    // Reset the form
+    form.reset();
+    errorMessage.style.display = 'none';
+
+    // Show the modal
+    modal.style.display = 'block';
+
+    // Form submission handler
+    form.onsubmit = async function(e) {
+        e.preventDefault();
+
+        const file = fileInput.files[0];
+        if (!file) {
+            errorMessage.textContent = 'Please select a file';
+            errorMessage.style.display = 'block';
+            return;
+        }
+
+        const formData = new FormData();
+        formData.append('file', file);
+
+        try {
+            const response = await fetch(`/assignments/${currentAssignmentId}/submit`, {
+                method: 'POST',
+                body: formData
+            });
+
+            const result = await response.json();
+
+            if (response.ok) {
+                modal.style.display = 'none';
+                alert('Assignment submitted successfully!');
+                fetchDashboardData(); // Refresh the dashboard
+            } else {
+                throw new Error(result.message || 'Failed to submit assignment');
+            }
+        } catch (error) {
+            errorMessage.textContent = error.message;
+            errorMessage.style.display = 'block';
+        }
+    };
+}
+
+// Update dropzone functionality
+function setupFileDropzone() {
+    const dropzone = document.getElementById('fileDropzone');
+    const fileInput = document.getElementById('assignmentFile');
+
+    dropzone.onclick = () => fileInput.click();
+
+    dropzone.ondragover = (e) => {
+        e.preventDefault();
+        dropzone.classList.add('drag-over');
+    };
+
+    dropzone.ondragleave = () => {
+        dropzone.classList.remove('drag-over');
+    };
+
+    dropzone.ondrop = (e) => {
+        e.preventDefault();
+        dropzone.classList.remove('drag-over');
+
+        if (e.dataTransfer.files.length) {
+            fileInput.files = e.dataTransfer.files;
+            document.getElementById('fileName').textContent = e.dataTransfer.files[0].name;
+            document.getElementById('fileInfo').style.display = 'block';
+            document.getElementById('submitButton').disabled = false;
+        }
+    };
+}
+
+document.addEventListener('DOMContentLoaded', setupFileDropzone);
+
+function setupFileUpload() {
+    const dropzone = document.getElementById('fileDropzone');
+    const fileInput = document.getElementById('assignmentFile');
+    const fileInfo = document.getElementById('fileInfo');
+    const fileName = document.getElementById('fileName');
+    const submitButton = document.getElementById('submitButton');
+    const errorMessage = document.getElementById('errorMessage');
+
+    // Add click event to dropzone
+    dropzone.onclick = () => fileInput.click();
+
+    // File input change handler
+    fileInput.onchange = (e) => {
+        if (e.target.files.length) {
+            handleFile(e.target.files[0]);
+        }
+    };
+
+    // Drag and drop handlers
+    dropzone.ondragover = (e) => {
+        e.preventDefault();
+        dropzone.classList.add('drag-over');
+    };
+
+    dropzone.ondragleave = () => {
+        dropzone.classList.remove('drag-over');
+    };
+
+    dropzone.ondrop = (e) => {
+        e.preventDefault();
+        dropzone.classList.remove('drag-over');
+        if (e.dataTransfer.files.length) {
+            handleFile(e.dataTransfer.files[0]);
+        }
+    };
+
+    // Submit button click handler
+    submitButton.onclick = () => {
+        if (!fileInput.files.length) return;
+
+        const formData = new FormData();
+        formData.append('file', fileInput.files[0]);
+
+        // Show progress bar
+        const progress = document.getElementById('uploadProgress');
+        progress.style.width = '0%';
+        fileInfo.style.display = 'block';
+
+        fetch(`/assignments/${currentAssignmentId}/submit`, {
+            method: 'POST',
+            body: formData
+        })
+        .then(response => response.json())
+        .then(data => {
+            if (data.success) {
+                closeModal('submissionModal');
+                fetchDashboardData();
+                alert('Assignment submitted successfully!');
+            } else {
+                throw new Error(data.message || 'Failed to submit assignment');
+            }
+        })
+        .catch(error => {
+            errorMessage.textContent = error.message;
+            errorMessage.style.display = 'block';
+        });
+    };
+
+    function handleFile(file) {
+        // File validation
+        const maxSize = 10 * 1024 * 1024; // 10MB
+        const allowedTypes = [
+            'application/pdf',
+            'application/msword',
+            'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+            'text/plain'
+        ];
+
+        if (file.size > maxSize) {
+            errorMessage.textContent = 'File size exceeds 10MB limit';
+            errorMessage.style.display = 'block';
+            submitButton.disabled = true;
+            return;
+        }
+
+        if (!allowedTypes.includes(file.type)) {
+            errorMessage.textContent = 'Invalid file type. Please upload PDF, DOC, DOCX, or TXT files.';
+            errorMessage.style.display = 'block';
+            submitButton.disabled = true;
+            return;
+        }
+
+        // Update UI for valid file
+        fileInfo.style.display = 'block';
+        fileName.textContent = file.name;
+        submitButton.disabled = false;
+        errorMessage.style.display = 'none';
+        dropzone.querySelector('p').textContent = `Selected: ${file.name}`;
+    }
+}
+
+// Initialize file upload handling when document is ready
+document.addEventListener('DOMContentLoaded', () => {
+    setupFileUpload();
+});
+
+// Close modal function
+function closeModal(modalId) {
+    document.getElementById(modalId).style.display = 'none';
+}
+
+// Close modal when clicking on X or outside
+document.querySelectorAll('.close').forEach(closeBtn => {
+    closeBtn.addEventListener('click', () => {
+        closeBtn.closest('.modal').style.display = 'none';
+    });
+});
+
+window.addEventListener('click', (e) => {
+    if (e.target.classList.contains('modal')) {
+        e.target.style.display = 'none';
+    }
+});
+
+let currentAssignmentId = null;  // To store the current assignment being submitted
@@ -0,0 +1,313 @@
+"""
+University Assignment Portal - File Storage
+
+Uploaded files live either on local disk (under UPLOAD_FOLDER) or in an
+S3-compatible bucket, chosen with STORAGE_BACKEND = 'local' | 's3'. Stored
+paths name their backend: `s3://<bucket>/<key>` for S3 and plain file paths
+for local disk. Rows written before a switch of backend therefore stay
+readable.
+
+Clients can transfer the bytes directly:
+
+1. POST /api/uploads/presign returns a presigned PUT (URL and headers) plus a
+   signed token describing the pending upload
+2. the client PUTs the file to that URL
+3. POST /api/uploads/complete with the token records the metadata
+
+With S3 the PUT goes straight to the bucket, which checks the declared
+SHA-256 itself, and downloads of uncompressed blobs are redirected to
+presigned GET URLs. The web tier then never carries the bytes and needs no
+shared filesystem. The local backend presigns URLs to /storage/upload on the
+app itself, so clients use the same protocol in both setups. For
+development, point STORAGE_S3_ENDPOINT_URL at a local S3 stand-in such as
+MinIO.
+"""
+import base64
+import hashlib
+import os
+import shutil
+import tempfile
+
+from flask import abort, current_app, jsonify, request, url_for
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+
+try:
+    import boto3
+    from botocore.exceptions import ClientError
+except ImportError:  # boto3 not installed; only the local backend is available
+    boto3 = None
+
+S3_SCHEME = 's3://'
+CHUNK_SIZE = 1024 * 1024
+
+
+def is_remote(path):
+    return path is not None and path.startswith(S3_SCHEME)
+
+
+class LocalStorage:
+    """Files on the local filesystem, addressed by absolute path."""
+
+    def __init__(self, root=None):
+        self.root = root
+
+    def path(self, *parts):
+        return os.path.join(self.root, *parts)
+
+    def exists(self, path):
+        return os.path.exists(path)
+
+    def size(self, path):
+        return os.path.getsize(path)
+
+    def open(self, path):
+        return open(path, 'rb')
+
+    def write(self, path, data):
+        """Write bytes atomically, creating parent directories."""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def put_file(self, local_path, path):
+        """Move a finished local file into place."""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        shutil.move(local_path, path)
+
+    def delete(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def delete_tree(self, path):
+        """Delete a directory and everything under it. Returns the number of files deleted."""
+        count = sum(len(files) for _, _, files in os.walk(path))
+        shutil.rmtree(path, ignore_errors=True)
+        return count
+
+    def presign_upload(self, path, size, sha256):
+        token = _serializer().dumps({'path': path, 'size': size, 'sha256': sha256})
+        return {'method': 'PUT', 'url': url_for('storage_upload', token=token, _external=True), 'headers': {}}
+
+    def presign_download(self, path, filename):
+        return None  # served by the app
+
+
+class S3Storage:
+    """Objects in an S3-compatible bucket, addressed as s3://<bucket>/<key>."""
+
+    def __init__(self, bucket, prefix='', endpoint_url=None, region=None, expiry=900):
+        # Kept so worker processes can build their own client
+        self.settings = {'bucket': bucket, 'prefix': prefix, 'endpoint_url': endpoint_url,
+                         'region': region, 'expiry': expiry}
+        self.bucket = bucket
+        self.prefix = prefix.strip('/')
+        self.expiry = expiry
+        self.client = boto3.client('s3', endpoint_url=endpoint_url, region_name=region)
+
+    def path(self, *parts):
+        key = '/'.join(part.strip('/') for part in (self.prefix, *parts) if part)
+        return f"{S3_SCHEME}{self.bucket}/{key}"
+
+    def _key(self, path):
+        return path[len(S3_SCHEME) + len(self.bucket) + 1:]
+
+    def exists(self, path):
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._key(path))
+            return True
+        except ClientError as e:
+            if e.response['Error']['Code'] in ('404', 'NoSuchKey', 'NotFound'):
+                return False
+            raise
+
+    def size(self, path):
+        return self.client.head_object(Bucket=self.bucket, Key=self._key(path))['ContentLength']
+
+    def open(self, path):
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=self._key(path))['Body']
+        except ClientError as e:
+            if e.response['Error']['Code'] in ('404', 'NoSuchKey', 'NotFound'):
+                raise FileNotFoundError(path) from e
+            raise
+
+    def write(self, path, data):
+        self.client.put_object(Bucket=self.bucket, Key=self._key(path), Body=data)
+
+    def put_file(self, local_path, path):
+        """Upload a finished local file (multipart if large) and remove it."""
+        self.client.upload_file(local_path, self.bucket, self._key(path))
+        os.remove(local_path)
+
+    def delete(self, path):
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(path))
+
+    def delete_tree(self, path):
+        """Delete every object under the path prefix. Returns the number deleted."""
+        count = 0
+        paginator = self.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self._key(path).rstrip('/') + '/'):
+            objects = [{'Key': item['Key']} for item in page.get('Contents', [])]
+            if objects:
+                self.client.delete_objects(Bucket=self.bucket, Delete={'Objects': objects, 'Quiet': True})
+                count += len(objects)
+        return count
+
+    def presign_upload(self, path, size, sha256):
+        checksum = base64.b64encode(bytes.fromhex(sha256)).decode('ascii')
+        url = self.client.generate_presigned_url('put_object', Params={
+            'Bucket': self.bucket,
+            'Key': self._key(path),
+            'ContentLength': size,
+            'ChecksumSHA256': checksum
+        }, ExpiresIn=self.expiry)
+        return {'method': 'PUT', 'url': url,
+                'headers': {'Content-Length': str(size), 'x-amz-checksum-sha256': checksum}}
+
+    def presign_download(self, path, filename):
+        return self.client.generate_presigned_url('get_object', Params={
+            'Bucket': self.bucket,
+            'Key': self._key(path),
+            'ResponseContentDisposition': f'attachment; filename="{filename}"'
+        }, ExpiresIn=self.expiry)
+
+    def download_to(self, path, local_path):
+        self.client.download_file(self.bucket, self._key(path), local_path)
+
+    def list(self, path):
+        """Paths of the objects under a directory path."""
+        paginator = self.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self._key(path).rstrip('/') + '/'):
+            for item in page.get('Contents', []):
+                yield f"{S3_SCHEME}{self.bucket}/{item['Key']}"
+
+    def copy(self, source, path):
+        """Copy an object within the bucket without downloading it (multipart if large)."""
+        try:
+            self.client.copy({'Bucket': self.bucket, 'Key': self._key(source)}, self.bucket, self._key(path))
+        except ClientError as e:
+            if e.response['Error']['Code'] in ('404', 'NoSuchKey', 'NotFound'):
+                raise FileNotFoundError(source) from e
+            raise
+
+
+# For code that only ever handles local paths (e.g. without an app)
+local_files = LocalStorage()
+
+
+def default():
+    """Backend that new uploads are written to."""
+    return current_app.extensions['storage']['default']
+
+
+def for_path(path):
+    """Backend holding an existing stored path."""
+    backends = current_app.extensions['storage']
+    if is_remote(path):
+        if backends['s3'] is None:
+            raise FileNotFoundError(f"{path} is in S3 but STORAGE_BACKEND is not configured for it")
+        return backends['s3']
+    return backends['local']
+
+
+def download_url(path, filename):
+    """Presigned URL for downloading a stored file, or None if the app serves it."""
+    if path.endswith('.gz'):
+        return None  # stored compressed; decompressed by the app
+    return for_path(path).presign_download(path, filename)
+
+
+def _serializer(salt='storage'):
+    return URLSafeTimedSerializer(current_app.secret_key, salt=salt)
+
+
+def sign(payload):
+    """Token carrying the details of a pending direct upload."""
+    return _serializer('storage-upload').dumps(payload)
+
+
+def unsign(token, max_age, salt='storage-upload'):
+    """Payload of a token from sign(), or None if it is invalid or expired."""
+    try:
+        return _serializer(salt).loads(token, max_age=max_age)
+    except BadSignature:
+        return None
+
+
+def storage_upload():
+    """Receive a presigned PUT for the local backend, checking size and SHA-256."""
+    upload = unsign(request.args.get('token', ''), current_app.config['STORAGE_PRESIGN_EXPIRY'], salt='storage')
+    if upload is None:
+        abort(403)
+    if request.content_length is not None and request.content_length != upload['size']:
+        return jsonify({'message': 'Content-Length does not match the presigned size'}), 400
+
+    path = upload['path']
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    digest = hashlib.sha256()
+    received = 0
+    with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), delete=False) as tmp:
+        try:
+            while True:
+                chunk = request.stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                received += len(chunk)
+                if received > upload['size']:
+                    break
+                digest.update(chunk)
+                tmp.write(chunk)
+        except BaseException:
+            os.remove(tmp.name)
+            raise
+
+    if received != upload['size'] or digest.hexdigest() != upload['sha256']:
+        os.remove(tmp.name)
+        return jsonify({'message': 'Upload does not match the declared size and SHA-256'}), 400
+    os.replace(tmp.name, path)
+    return '', 204
+
+
+def s3_root(settings):
+    """Root path of the bucket and prefix described by S3Storage keyword arguments."""
+    prefix = settings['prefix'].strip('/')
+    return f"{S3_SCHEME}{settings['bucket']}/" + (f"{prefix}/" if prefix else '')
+
+
+def s3_settings(config):
+    """S3Storage keyword arguments from the settings, or None if S3 is not configured.
+
+    Background jobs pass these on to build their own client.
+    """
+    if config['STORAGE_BACKEND'] != 's3' and not config.get('STORAGE_S3_BUCKET'):
+        return None
+    return {
+        'bucket': config['STORAGE_S3_BUCKET'],
+        'prefix': config['STORAGE_S3_PREFIX'],
+        'endpoint_url': config['STORAGE_S3_ENDPOINT_URL'],
+        'region': config['STORAGE_S3_REGION'],
+        'expiry': config['STORAGE_PRESIGN_EXPIRY']
+    }
+
+
+def init_app(app):
+    backend = app.config['STORAGE_BACKEND']
+    if backend not in ('local', 's3'):
+        raise RuntimeError(f"Unknown STORAGE_BACKEND {backend!r}; use 'local' or 's3'")
+    s3 = None
+    if s3_settings(app.config) is not None:
+        if boto3 is None:
+            raise RuntimeError("The s3 storage backend needs the boto3 package")
+        s3 = S3Storage(**s3_settings(app.config))
+
+    local = LocalStorage(app.config['UPLOAD_FOLDER'])
+    app.extensions['storage'] = {
+        'default': s3 if backend == 's3' else local,
+        'local': local,
+        's3': s3
+    }
+    app.add_url_rule('/storage/upload', 'storage_upload', storage_upload, methods=['PUT'])
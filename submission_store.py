@@ -0,0 +1,216 @@
+"""
+University Assignment Portal - Submission Storage
+
+Stores every uploaded submission version as a content-addressed blob inside
+the student's submission directory:
+
+    <assignment>/student_submissions/student_<id>/<sha256>.<ext>[.gz]
+
+Re-uploading an unchanged file reuses the existing blob, and text-like files
+are gzip-compressed, so keeping history costs far less than full copies.
+A background worker prunes versions beyond the retention limit. Reusing a
+blob and pruning it both hold the blob's named lock (blob_lock), so a blob
+is never removed between an upload finding it and its version row being
+committed.
+"""
+import contextlib
+import gzip
+import hashlib
+import logging
+import os
+import threading
+import time
+
+import mysql.connector
+
+import storage
+
+BLOB_LOCK_TIMEOUT = 10  # seconds to wait for a blob's lock
+
+# Extensions worth compressing; binary formats (pdf, docx, zip, images) are
+# already compressed and are stored as-is.
+TEXT_EXTENSIONS = {
+    'txt', 'md', 'csv', 'json', 'xml', 'html', 'css', 'sql', 'ipynb',
+    'py', 'java', 'c', 'cpp', 'h', 'hpp', 'js', 'ts', 'go', 'rs', 'rb', 'php', 'sh'
+}
+
+log = logging.getLogger(__name__)
+
+
+def file_extension(filename):
+    return filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
+
+
+def blob_name(content_hash, filename, compressed):
+    ext = file_extension(filename)
+    name = f"{content_hash}.{ext}" if ext else content_hash
+    return name + '.gz' if compressed else name
+
+
+@contextlib.contextmanager
+def blob_lock(cursor, content_hash, timeout=BLOB_LOCK_TIMEOUT):
+    """Hold the MySQL named lock for blobs with this content; yields whether it was acquired.
+
+    Uploads hold it from looking for an existing blob until the version
+    referencing it is committed; pruning holds it while checking and
+    removing the blob. Expects a dictionary cursor.
+    """
+    name = f"submission_blob_{content_hash[:40]}"  # lock names are limited to 64 characters
+    cursor.execute("SELECT GET_LOCK(%s, %s) AS acquired", (name, timeout))
+    acquired = cursor.fetchone()['acquired'] == 1
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (name,))
+            cursor.fetchall()
+
+
+def save_version(submission_dir, filename, content, backend=None, content_hash=None):
+    """Store one uploaded version and return its blob metadata.
+
+    If a blob with the same content already exists in the directory it is
+    reused instead of written again; hold blob_lock() until the version is
+    recorded. `backend` is a storage.py backend for
+    the directory; local disk by default. `content_hash` saves hashing the
+    content again when the caller already has it.
+    """
+    backend = backend or storage.local_files
+    content_hash = content_hash or hashlib.sha256(content).hexdigest()
+    ext = file_extension(filename)
+    compressed = ext in TEXT_EXTENSIONS
+    blob_path = os.path.join(submission_dir, blob_name(content_hash, filename, compressed))
+
+    if backend.exists(blob_path):
+        stored_size = backend.size(blob_path)
+    else:
+        data = gzip.compress(content, compresslevel=6) if compressed else content
+        backend.write(blob_path, data)
+        stored_size = len(data)
+
+    return {
+        'path': blob_path,
+        'hash': content_hash,
+        'file_type': ext,
+        'size': len(content),
+        'stored_size': stored_size
+    }
+
+
+def find_blob(submission_dir, filename, content_hash, backend=None):
+    """Path of an existing blob with this content in the directory, or None."""
+    backend = backend or storage.local_files
+    for compressed in (False, True):
+        blob_path = os.path.join(submission_dir, blob_name(content_hash, filename, compressed))
+        if backend.exists(blob_path):
+            return blob_path
+    return None
+
+
+def hash_file(path, chunk_size=1024 * 1024):
+    """SHA-256 of a file already on disk."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def is_compressed(blob_path):
+    return blob_path.endswith('.gz')
+
+
+def open_blob(blob_path):
+    """Open a stored blob for reading, transparently decompressing it."""
+    if is_compressed(blob_path):
+        return gzip.open(blob_path, 'rb')
+    return open(blob_path, 'rb')
+
+
+def prune_versions(db, keep, storage_settings=None):
+    """Delete all but the newest `keep` versions of every submission.
+
+    Blobs are removed from their backend once no remaining version and no
+    Submission row references them; `storage_settings` are the S3Storage
+    arguments, needed for blobs in S3. Blobs packed into a cold archive stay
+    there. Returns the number of versions pruned.
+    """
+    cursor = db.cursor(dictionary=True)
+    cursor.execute("""
+        SELECT v.VersionID, v.BlobPath, v.ContentHash
+        FROM SubmissionVersion v
+        JOIN (
+            SELECT SubmissionID, MAX(VersionNumber) AS latest
+            FROM SubmissionVersion
+            GROUP BY SubmissionID
+        ) m ON v.SubmissionID = m.SubmissionID
+        WHERE v.VersionNumber <= m.latest - %s
+    """, (keep,))
+    expired = cursor.fetchall()
+    if not expired:
+        cursor.close()
+        return 0
+
+    ids = [row['VersionID'] for row in expired]
+    placeholders = ', '.join(['%s'] * len(ids))
+    cursor.execute(f"DELETE FROM SubmissionVersion WHERE VersionID IN ({placeholders})", ids)
+    db.commit()
+
+    s3 = None
+    for blob_path, content_hash in {(row['BlobPath'], row['ContentHash']) for row in expired}:
+        # Under the blob's lock an upload reusing it has either committed its
+        # reference already or will find the blob gone and write it again
+        with blob_lock(cursor, content_hash) as acquired:
+            if not acquired:
+                log.error("Blob %s is busy; leaving it in place", blob_path)
+                continue
+            # A packed blob (cold_storage.py) is a member of an immutable zip; it is kept there
+            cursor.execute("""
+                SELECT 1 FROM SubmissionVersion WHERE BlobPath = %s
+                UNION ALL
+                SELECT 1 FROM Submission WHERE SubmissionPath = %s
+                UNION ALL
+                SELECT 1 FROM ColdArchiveMember WHERE PathHash = SHA2(%s, 256)
+                LIMIT 1
+            """, (blob_path, blob_path, blob_path))
+            referenced = cursor.fetchall()
+            db.commit()  # end the snapshot so the next check sees new references
+            if referenced:
+                continue
+            if storage.is_remote(blob_path) and storage_settings is None:
+                log.error("Pruned submission blob %s is in S3, which is not configured; leaving it", blob_path)
+                continue
+            try:
+                if storage.is_remote(blob_path):
+                    s3 = s3 or storage.S3Storage(**storage_settings)
+                    s3.delete(blob_path)
+                else:
+                    storage.local_files.delete(blob_path)
+            except Exception as e:  # OSError, or botocore's errors for S3
+                log.error("Error removing pruned submission blob %s: %s", blob_path, e)
+
+    cursor.close()
+    return len(ids)
+
+
+def _retention_loop(db_config, keep, interval, storage_settings):
+    while True:
+        time.sleep(interval)
+        try:
+            db = mysql.connector.connect(**db_config)
+            try:
+                pruned = prune_versions(db, keep, storage_settings)
+                if pruned:
+                    log.info("Pruned %s old submission version(s)", pruned)
+            finally:
+                db.close()
+        except mysql.connector.Error as err:
+            log.error("Error pruning submission versions: %s", err)
+
+
+def start_retention_worker(db_config, keep, interval, storage_settings=None):
+    """Start the daemon thread that prunes versions beyond `keep` every `interval` seconds."""
+    worker = threading.Thread(target=_retention_loop, args=(db_config, keep, interval, storage_settings),
+                              name='submission-retention', daemon=True)
+    worker.start()
+    return worker
@@ -0,0 +1,190 @@
+"""
+University Assignment Portal - Term Archive
+
+Moves the data of a closed term (Course.Year/Semester) out of the hot tables
+into their *Archive copies:
+
+    Submission (+ SubmissionVersion, RubricScore)  -> SubmissionArchive, ...
+    Enrollment                                     -> EnrollmentArchive
+    EnrollmentRequest                              -> EnrollmentRequestArchive
+
+and notifications older than NOTIFICATION_ARCHIVE_DAYS into
+NotificationArchive (both settings come from settings.py). Rows are moved
+in chunks of ARCHIVE_BATCH_SIZE, each
+with an INSERT ... SELECT and a DELETE in one transaction, so the job never
+holds long locks and a chunk is either fully moved or not at all. Running
+the job again for the same term picks up whatever is left.
+
+The term's courses are marked Archived; their rows stay reachable read-only
+through the /api/history routes.
+
+    python term_archive.py <year> <semester>
+"""
+import logging
+import sys
+import threading
+
+import mysql.connector
+
+import settings
+
+try:
+    import gradebook
+except ImportError:  # NumPy not installed; there is no gradebook cache to drop
+    gradebook = None
+
+TERM_COURSES = "JOIN Course c ON c.CourseID = {alias}.CourseID AND c.Year = %s AND c.Semester = %s"
+
+# (TermArchive counter, query selecting the next chunk of IDs,
+#  tables whose rows with those IDs are moved, dependents first)
+TERM_MOVES = [
+    ('SubmissionsArchived', """
+        SELECT s.SubmissionID
+        FROM Submission s
+        JOIN Assignment a ON a.AssignmentID = s.AssignmentID
+        """ + TERM_COURSES.format(alias='a') + """
+        ORDER BY s.SubmissionID
+        LIMIT %s
+     """, ['SubmissionVersion', 'RubricScore', 'Submission'], 'SubmissionID'),
+    ('EnrollmentsArchived', """
+        SELECT e.EnrollmentID
+        FROM Enrollment e
+        """ + TERM_COURSES.format(alias='e') + """
+        ORDER BY e.EnrollmentID
+        LIMIT %s
+     """, ['Enrollment'], 'EnrollmentID'),
+    ('RequestsArchived', """
+        SELECT er.RequestID
+        FROM EnrollmentRequest er
+        """ + TERM_COURSES.format(alias='er') + """
+        ORDER BY er.RequestID
+        LIMIT %s
+     """, ['EnrollmentRequest'], 'RequestID'),
+]
+
+NOTIFICATION_MOVE = ('NotificationsArchived', """
+    SELECT NotificationID
+    FROM Notification
+    WHERE Timestamp < NOW() - INTERVAL %s DAY
+    ORDER BY NotificationID
+    LIMIT %s
+""", ['Notification'], 'NotificationID')
+
+log = logging.getLogger(__name__)
+
+
+def _move_chunk(cursor, tables, key, ids):
+    placeholders = ', '.join(['%s'] * len(ids))
+    for table in tables:
+        cursor.execute(f"INSERT INTO {table}Archive SELECT * FROM {table} WHERE {key} IN ({placeholders})", ids)
+    # Dependents were copied above and go with the parent through ON DELETE CASCADE
+    cursor.execute(f"DELETE FROM {tables[-1]} WHERE {key} IN ({placeholders})", ids)
+
+
+def _move(db, cursor, move, params, year, semester, batch_size):
+    counter, select, tables, key = move
+    moved = 0
+    while True:
+        cursor.execute(select, (*params, batch_size))
+        ids = [row[0] for row in cursor.fetchall()]
+        if not ids:
+            return moved
+        _move_chunk(cursor, tables, key, ids)
+        cursor.execute(f"UPDATE TermArchive SET {counter} = {counter} + %s WHERE Year = %s AND Semester = %s",
+                       (len(ids), year, semester))
+        db.commit()
+        moved += len(ids)
+
+
+def archive_term(db_config, year, semester, batch_size, notification_days, created_by=None):
+    """Archive a closed term. Returns False if an archive job is already running.
+
+    Moves `batch_size` rows per transaction, and notifications older than
+    `notification_days` days.
+    """
+    db = mysql.connector.connect(**db_config)
+    cursor = db.cursor()
+    try:
+        cursor.execute("SELECT GET_LOCK('term_archive', 0)")
+        if not cursor.fetchone()[0]:
+            return False
+        try:
+            cursor.execute("""
+                INSERT INTO TermArchive (Year, Semester, CreatedBy) VALUES (%s, %s, %s)
+                ON DUPLICATE KEY UPDATE Status = 'running', Error = NULL, StartedAt = NOW(), FinishedAt = NULL
+            """, (year, semester, created_by))
+            # New enrollments and submissions are refused from here on
+            cursor.execute("UPDATE Course SET Archived = 1 WHERE Year = %s AND Semester = %s", (year, semester))
+            db.commit()
+
+            for move in TERM_MOVES:
+                _move(db, cursor, move, (year, semester), year, semester, batch_size)
+            _move(db, cursor, NOTIFICATION_MOVE, (notification_days,), year, semester, batch_size)
+
+            cursor.execute("""
+                UPDATE TermArchive SET Status = 'done', FinishedAt = NOW()
+                WHERE Year = %s AND Semester = %s
+            """, (year, semester))
+            db.commit()
+            if gradebook is not None:
+                # The submissions are gone from the hot tables the gradebook reads
+                cursor.execute("SELECT CourseID FROM Course WHERE Year = %s AND Semester = %s", (year, semester))
+                for (course_id,) in cursor.fetchall():
+                    gradebook.invalidate(course_id)
+            return True
+        except mysql.connector.Error as err:
+            log.error("Error archiving term %s/%s: %s", year, semester, err)
+            db.rollback()
+            cursor.execute("UPDATE TermArchive SET Status = 'failed', Error = %s WHERE Year = %s AND Semester = %s",
+                           (str(err), year, semester))
+            db.commit()
+            return True
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK('term_archive')")
+            cursor.fetchall()
+    finally:
+        cursor.close()
+        db.close()
+
+
+def _run_in_background(db_config, year, semester, batch_size, notification_days, created_by):
+    try:
+        archive_term(db_config, year, semester, batch_size, notification_days, created_by)
+    except mysql.connector.Error as err:
+        log.error("Error archiving term %s/%s: %s", year, semester, err)
+
+
+def start_archive(db_config, year, semester, batch_size, notification_days, created_by=None):
+    """Archive a term on a daemon thread with its own connection."""
+    worker = threading.Thread(target=_run_in_background,
+                              args=(db_config, year, semester, batch_size, notification_days, created_by),
+                              name=f'term-archive-{year}-{semester}', daemon=True)
+    worker.start()
+    return worker
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3 or not all(arg.isdigit() for arg in sys.argv[1:]):
+        print("Usage: python term_archive.py <year> <semester>")
+        sys.exit(2)
+
+    year, semester = int(sys.argv[1]), int(sys.argv[2])
+    config = settings.load()
+    db_config = settings.database_config(config)
+    try:
+        if not archive_term(db_config, year, semester, config['ARCHIVE_BATCH_SIZE'],
+                            config['NOTIFICATION_ARCHIVE_DAYS']):
+            print("Another term archive job is running")
+            sys.exit(1)
+        db = mysql.connector.connect(**db_config)
+        cursor = db.cursor(dictionary=True)
+        cursor.execute("SELECT * FROM TermArchive WHERE Year = %s AND Semester = %s", (year, semester))
+        result = cursor.fetchone()
+        db.close()
+    except mysql.connector.Error as err:
+        print(f"Database connection failed: {err}")
+        sys.exit(1)
+    print(f"Term {year}/{semester}: {result['Status']} - {result['SubmissionsArchived']} submissions, "
+          f"{result['EnrollmentsArchived']} enrollments, {result['RequestsArchived']} requests, "
+          f"{result['NotificationsArchived']} notifications archived")
+    sys.exit(0 if result['Status'] == 'done' else 1)
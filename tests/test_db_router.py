@@ -0,0 +1,133 @@
+import threading
+import time
+
+import pytest
+from flask import Flask, g, jsonify
+from mysql.connector import pooling
+
+import db_router
+
+
+class FakeRouter:
+    """Stands in for DatabaseRouter; records which connections were handed out."""
+
+    has_replicas = True
+    sticky_seconds = 5
+
+    def __init__(self, replica_gtid='1-10'):
+        self.replica_gtid = replica_gtid  # GTID set the replica has applied
+        self.primary_gtid = '1-10'
+        self.replica_requests = []
+
+    def primary_connection(self):
+        return FakeConnection('primary')
+
+    def replica_connection(self, gtid_set=None):
+        self.replica_requests.append(gtid_set)
+        if gtid_set and gtid_set > self.replica_gtid:
+            return None
+        return FakeConnection('replica')
+
+    def executed_gtid_set(self, conn):
+        return self.primary_gtid
+
+
+class FakeConnection:
+    def __init__(self, name):
+        self.name = name
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def router():
+    return FakeRouter()
+
+
+@pytest.fixture
+def client(router):
+    app = Flask(__name__)
+    app.secret_key = 'test'
+    db_router.init_app(app, router)
+
+    @app.route('/read')
+    @db_router.read_only
+    def read():
+        db_router.get_connection()
+        return jsonify(role=g.db_role)
+
+    @app.route('/write', methods=['POST'])
+    def write():
+        db_router.get_connection()
+        router.primary_gtid = '1-11'
+        return jsonify(role=g.db_role)
+
+    return app.test_client()
+
+
+def test_reads_go_to_a_replica(client, router):
+    assert client.get('/read').json['role'] == 'replica'
+    assert router.replica_requests == [None]
+
+
+def test_writes_go_to_the_primary(client):
+    assert client.post('/write').json['role'] == 'primary'
+
+
+def test_read_after_write_waits_for_the_replica(client, router):
+    client.post('/write')
+    # The replica has not applied 1-11 yet, so the read stays on the primary
+    assert client.get('/read').json['role'] == 'primary'
+    assert router.replica_requests == ['1-11']
+
+    router.replica_gtid = '1-11'
+    assert client.get('/read').json['role'] == 'replica'
+
+
+def test_read_after_write_without_gtids_stays_on_primary(client, router):
+    router.executed_gtid_set = lambda conn: None
+    client.post('/write')
+    assert client.get('/read').json['role'] == 'primary'
+    assert router.replica_requests == []
+
+
+def test_sticky_window_expires(client, router, monkeypatch):
+    client.post('/write')
+    later = time.time() + router.sticky_seconds + 1
+    monkeypatch.setattr(db_router.time, 'time', lambda: later)
+    assert client.get('/read').json['role'] == 'replica'
+    assert router.replica_requests == [None]
+
+
+class ExhaustedPool:
+    """A pool with no free connection until one is released."""
+
+    def __init__(self):
+        self.free = threading.Event()
+
+    def get_connection(self):
+        if not self.free.is_set():
+            raise pooling.PoolError("Failed getting connection; pool exhausted")
+        return FakeConnection('primary')
+
+
+def test_exhausted_pool_waits_for_a_connection():
+    router = db_router.DatabaseRouter({}, pool_timeout=5)
+    pool = ExhaustedPool()
+    threading.Timer(0.1, pool.free.set).start()
+    assert router._get_connection(pool).name == 'primary'
+
+
+def test_exhausted_pool_times_out():
+    router = db_router.DatabaseRouter({}, pool_timeout=0.05)
+    with pytest.raises(pooling.PoolError):
+        router._get_connection(ExhaustedPool())
+
+
+def test_fit_threads_grows_pool_up_to_maximum():
+    router = db_router.DatabaseRouter({}, pool_size=10)
+    router.fit_threads(16)
+    assert router.pool_size == 16
+    router.fit_threads(100)
+    assert router.pool_size == pooling.CNX_POOL_MAXSIZE
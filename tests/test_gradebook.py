@@ -0,0 +1,114 @@
+import datetime
+
+import pytest
+
+gradebook = pytest.importorskip('gradebook')
+
+DUE = datetime.datetime(2025, 3, 1)
+ASSIGNMENTS = [(1, 'Essay', 100, DUE), (2, 'Quiz', 20, DUE)]
+STUDENTS = [(10, 'Ada Lovelace'), (11, 'Alan Turing'), (12, 'Grace Hopper')]
+
+
+def test_compute_mixes_points_letters_and_explicit_points():
+    submissions = [
+        (10, 1, '80', None, 0),
+        (11, 1, 'B', None, 1),      # letter: 85% of 100
+        (12, 1, 'ignored', 60, 0),  # Points wins over Grade
+        (10, 2, 'A', None, 0),      # letter: 95% of 20
+    ]
+    result = gradebook.compute(ASSIGNMENTS, STUDENTS, submissions)
+
+    essay, quiz = result['assignments']
+    assert (essay['submitted'], essay['graded'], essay['missing']) == (3, 3, 0)
+    assert essay['mean'] == pytest.approx((80 + 85 + 60) / 3)
+    assert essay['min'] == 60 and essay['max'] == 85
+    assert essay['late_rate'] == pytest.approx(1 / 3)
+    assert sum(essay['histogram']) == 3
+    assert (quiz['submitted'], quiz['missing']) == (1, 2)
+    assert quiz['mean'] == pytest.approx(95)
+
+    ada = result['students'][0]
+    # Weighted by MaxPoints: (80 + 19) / (100 + 20)
+    assert ada['weighted_total'] == pytest.approx(99 / 120 * 100)
+    assert result['late_rate'] == pytest.approx(1 / 4)
+
+
+def test_compute_skips_ungraded_dropped_and_unknown_rows():
+    submissions = [
+        (10, 1, None, None, 0),   # submitted, not graded
+        (99, 1, '100', None, 0),  # student no longer enrolled
+        (11, 7, '100', None, 0),  # assignment from elsewhere
+    ]
+    result = gradebook.compute(ASSIGNMENTS, STUDENTS, submissions)
+
+    essay = result['assignments'][0]
+    assert (essay['submitted'], essay['graded']) == (1, 0)
+    assert 'mean' not in essay
+    assert all(student['weighted_total'] is None for student in result['students'])
+    assert result['course_mean'] is None
+
+
+def test_compute_flags_outliers():
+    students = [(i, f"Student {i}") for i in range(10)]
+    submissions = [(i, 1, '80', None, 0) for i in range(9)] + [(9, 1, '5', None, 0)]
+    result = gradebook.compute(ASSIGNMENTS[:1], students, submissions)
+
+    flagged = [s['student_id'] for s in result['students'] if s['outlier']]
+    assert flagged == [9]
+    assert result['students'][9]['z_score'] < -gradebook.OUTLIER_Z
+
+
+def test_compute_handles_an_empty_course():
+    result = gradebook.compute([], [], [])
+    assert result['assignments'] == [] and result['students'] == []
+    assert result['course_mean'] is None
+
+
+class FakeCursor:
+    """Returns a fixed version and counts how often the gradebook is loaded."""
+
+    def __init__(self, owner):
+        self.owner = owner
+        self.result = None
+
+    def execute(self, sql, params=()):
+        if 'CONCAT_WS' in sql:
+            self.result = [self.owner.version]
+        else:
+            self.owner.loads += 1
+            self.result = []
+
+    def fetchone(self):
+        return self.result[0]
+
+    def fetchall(self):
+        return self.result
+
+    def close(self):
+        pass
+
+
+class FakeDB:
+    def __init__(self):
+        self.version = ('2025-03-01/3', '2025-02-01/2', '2025-01-01/3')
+        self.loads = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+
+def test_course_analytics_is_cached_until_the_data_changes():
+    db = FakeDB()
+    gradebook.invalidate(42)
+
+    gradebook.course_analytics(db, 42, 300)
+    gradebook.course_analytics(db, 42, 300)
+    assert db.loads == 3  # assignments, students, submissions: loaded once
+
+    db.version = ('2025-03-02/4', '2025-02-01/2', '2025-01-01/3')
+    gradebook.course_analytics(db, 42, 300)
+    assert db.loads == 6
+
+    gradebook.invalidate(42)
+    gradebook.course_analytics(db, 42, 300)
+    assert db.loads == 9
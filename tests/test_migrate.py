@@ -0,0 +1,148 @@
+import pytest
+
+import migrate
+
+
+def test_split_statements_on_semicolons():
+    sql = "CREATE TABLE A (x INT);\n\nALTER TABLE A\n    ADD INDEX i (x);\n"
+    assert migrate.split_statements(sql) == ["CREATE TABLE A (x INT)", "ALTER TABLE A\n    ADD INDEX i (x)"]
+
+
+def test_split_statements_honours_delimiter():
+    sql = """DELIMITER //
+CREATE TRIGGER t BEFORE INSERT ON A
+FOR EACH ROW
+BEGIN
+    SET NEW.x = 1;
+END//
+DELIMITER ;
+SELECT 1;
+"""
+    statements = migrate.split_statements(sql)
+    assert len(statements) == 2
+    assert statements[0].startswith("CREATE TRIGGER t") and statements[0].endswith("END")
+    assert "SET NEW.x = 1;" in statements[0]
+    assert statements[1] == "SELECT 1"
+
+
+def test_split_statements_drops_comment_only_statements():
+    sql = "/*\nMigration 999 - Header\n*/\n\n-- just a note;\nSELECT 1;\n"
+    assert migrate.split_statements(sql) == ["SELECT 1"]
+
+
+def test_split_statements_keeps_unterminated_remainder():
+    assert migrate.split_statements("SELECT 1;\nSELECT 2") == ["SELECT 1", "SELECT 2"]
+
+
+def test_migration_files_split_cleanly():
+    for version, name, path, _ in migrate.load_migrations():
+        with open(path, encoding='utf-8') as f:
+            statements = migrate.split_statements(f.read())
+        assert statements, name
+        assert not any(s.upper().startswith('DELIMITER') for s in statements), name
+
+
+class PlanCursor:
+    """Answers EXPLAIN with a prepared plan per query and records what ran."""
+
+    def __init__(self, plans):
+        self.plans = plans
+        self.executed = []
+
+    def execute(self, sql, params=None):
+        self.executed.append(sql)
+        self.result = self.plans[sql[len("EXPLAIN "):]]
+
+    def fetchall(self):
+        return self.result
+
+    def close(self):
+        pass
+
+
+class PlanDB:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def cursor(self, dictionary=False):
+        return self._cursor
+
+
+def _plan(table, key, type_='ref'):
+    return {'table': table, 'type': type_, 'key': key, 'rows': 1, 'Extra': None}
+
+
+def test_explain_reports_expected_indexes(capsys):
+    plans = {query: [_plan(table, key)] for _, query, table, key in migrate.EXPLAIN_CHECKS}
+    cursor = PlanCursor(plans)
+    assert migrate.explain(PlanDB(cursor)) is True
+    assert cursor.executed == ["EXPLAIN " + query for _, query, _, _ in migrate.EXPLAIN_CHECKS]
+
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == len(migrate.EXPLAIN_CHECKS)
+    assert all(line.startswith('[ok]') for line in lines)
+    assert 'key=idx_user_role_active' in lines[0]
+
+
+def test_explain_flags_missing_index(capsys):
+    plans = {query: [_plan(table, key)] for _, query, table, key in migrate.EXPLAIN_CHECKS}
+    label, query, table, _ = migrate.EXPLAIN_CHECKS[0]
+    plans[query] = [_plan(table, None, 'ALL')]
+    assert migrate.explain(PlanDB(PlanCursor(plans))) is False
+    assert f"[MISS] {label}: type=ALL key=None" in capsys.readouterr().out
+
+
+def test_explain_picks_the_checked_table_from_a_join(capsys):
+    plans = {query: [_plan('other', 'PRIMARY'), _plan(table, key)]
+             for _, query, table, key in migrate.EXPLAIN_CHECKS}
+    assert migrate.explain(PlanDB(PlanCursor(plans))) is True
+
+
+class MigrationCursor:
+    """Records statements; the 002 check returns `blocking` rows."""
+
+    def __init__(self, blocking):
+        self.blocking = blocking
+        self.executed = []
+        self.description = [('SubmissionID',), ('Grade',)]
+
+    def execute(self, sql, params=None):
+        self.executed.append(sql)
+        self.result = []
+        if sql.strip().startswith('SELECT Version'):
+            self.result = [(1, 'checksum')]
+        elif sql is migrate.MIGRATION_CHECKS[2][1]:
+            self.result = self.blocking
+
+    def fetchall(self):
+        return self.result
+
+    def close(self):
+        pass
+
+
+class MigrationDB:
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.commits = 0
+
+    def cursor(self):
+        return self._cursor
+
+    def commit(self):
+        self.commits += 1
+
+
+def test_graded_duplicates_block_migration_002(capsys):
+    cursor = MigrationCursor(blocking=[(4, 'A')])
+    with pytest.raises(migrate.MigrationBlocked) as excinfo:
+        migrate.migrate(MigrationDB(cursor))
+    assert excinfo.value.rows == [(4, 'A')]
+    assert excinfo.value.columns == ['SubmissionID', 'Grade']
+    assert not any('DELETE older' in sql for sql in cursor.executed)
+
+
+def test_migration_002_runs_without_graded_duplicates(capsys):
+    cursor = MigrationCursor(blocking=[])
+    migrate.migrate(MigrationDB(cursor))
+    assert any('DELETE older' in sql for sql in cursor.executed)
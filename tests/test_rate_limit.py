@@ -0,0 +1,131 @@
+import pytest
+from flask import Flask, jsonify
+from werkzeug.middleware.proxy_fix import ProxyFix
+
+import asgi
+import rate_limit
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limit.time, 'monotonic', clock)
+    return clock
+
+
+def test_parse_rate_accepts_plural_periods():
+    assert rate_limit.parse_rate('10/minute') == (10, 60)
+    assert rate_limit.parse_rate('5 / hours') == (5, 3600)
+    with pytest.raises(KeyError):
+        rate_limit.parse_rate('1/fortnight')
+
+
+def test_policy_interval_and_window():
+    policy = rate_limit.Policy('10/minute', burst=5)
+    assert policy.interval == 6
+    assert policy.window == 30
+    assert rate_limit.Policy('3/second').burst == 3
+
+
+def test_gcra_allows_the_burst_then_refills_at_the_rate(clock):
+    store = rate_limit.MemoryStore()
+    policy = rate_limit.Policy('1/second', burst=3)
+
+    results = [store.hit('k', policy.interval, policy.window)[0] for _ in range(4)]
+    assert results == [True, True, True, False]
+
+    clock.now += 1  # one token back
+    assert store.hit('k', policy.interval, policy.window)[0]
+    assert not store.hit('k', policy.interval, policy.window)[0]
+    # Other keys have their own bucket
+    assert store.hit('other', policy.interval, policy.window)[0]
+
+
+def test_rejected_hits_do_not_push_the_bucket_back(clock):
+    store = rate_limit.MemoryStore()
+    for _ in range(10):
+        store.hit('k', 1, 2)
+    clock.now += 1
+    assert store.hit('k', 1, 2)[0]
+
+
+def test_sweep_drops_full_buckets(clock):
+    store = rate_limit.MemoryStore()
+    store.hit('idle', 1, 5)
+    clock.now += rate_limit.SWEEP_INTERVAL + 1
+    store.hit('busy', 1, 5)
+    assert 'idle' not in store._tat and 'busy' in store._tat
+
+
+def test_check_reports_remaining_and_retry_after(clock):
+    limiter = {'store': rate_limit.MemoryStore()}
+    policy = rate_limit.Policy('2/minute', name='test-check')
+
+    assert rate_limit.check(limiter, policy, 'ip:1')[:2] == (True, 1)
+    assert rate_limit.check(limiter, policy, 'ip:1')[:2] == (True, 0)
+    allowed, remaining, full_in, retry_after = rate_limit.check(limiter, policy, 'ip:1')
+    assert (allowed, remaining, full_in, retry_after) == (False, 0, 60, 30)
+    assert rate_limit.headers(policy, remaining, full_in)['X-RateLimit-Reset'] == '60'
+
+
+def test_check_fails_open_when_the_store_breaks():
+    class Broken:
+        def hit(self, key, interval, window):
+            raise ConnectionError("store down")
+
+    assert rate_limit.check({'store': Broken()}, rate_limit.Policy('1/second'), 'ip:1') is None
+
+
+def test_client_key():
+    assert rate_limit.client_key(rate_limit.Policy('1/second'), 7, '1.2.3.4') == 'user:7'
+    assert rate_limit.client_key(rate_limit.Policy('1/second'), None, '1.2.3.4') == 'ip:1.2.3.4'
+    assert rate_limit.client_key(rate_limit.Policy('1/second', key='ip'), 7, '1.2.3.4') == 'ip:1.2.3.4'
+
+
+def _app(hops):
+    app = Flask(__name__)
+    app.secret_key = 'test'
+    app.config.update(RATE_LIMIT_ENABLED=True, RATE_LIMIT_DEFAULT='2/minute')
+    rate_limit.init_app(app)
+    if hops:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops, x_host=hops, x_port=hops)
+
+    @app.route('/ping')
+    def ping():
+        return jsonify(ok=True)
+
+    return app.test_client()
+
+
+def test_clients_behind_a_proxy_get_their_own_buckets():
+    client = _app(hops=1)
+    for _ in range(2):
+        assert client.get('/ping', headers={'X-Forwarded-For': '203.0.113.1'}).status_code == 200
+    response = client.get('/ping', headers={'X-Forwarded-For': '203.0.113.1'})
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) >= 1
+    assert client.get('/ping', headers={'X-Forwarded-For': '203.0.113.2'}).status_code == 200
+
+
+def test_forwarded_header_is_ignored_without_trusted_proxies():
+    client = _app(hops=0)
+    for address in ('203.0.113.1', '203.0.113.2'):
+        client.get('/ping', headers={'X-Forwarded-For': address})
+    assert client.get('/ping', headers={'X-Forwarded-For': '203.0.113.3'}).status_code == 429
+
+
+def test_async_routes_pick_the_same_forwarded_address():
+    header = '198.51.100.9, 203.0.113.1, 10.0.0.2'
+    assert asgi.forwarded_for('10.0.0.1', header, 0) == '10.0.0.1'
+    assert asgi.forwarded_for('10.0.0.1', header, 1) == '10.0.0.2'
+    assert asgi.forwarded_for('10.0.0.1', header, 2) == '203.0.113.1'
+    assert asgi.forwarded_for('10.0.0.1', '203.0.113.1', 2) == '10.0.0.1'
+    assert asgi.forwarded_for('10.0.0.1', None, 1) == '10.0.0.1'
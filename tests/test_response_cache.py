@@ -0,0 +1,131 @@
+import threading
+import time
+
+import pytest
+from flask import Flask, jsonify, session
+
+import json_provider
+import response_cache
+
+
+class RowsCursor:
+    description = [('id',), ('name',)]
+
+    def __init__(self, rows):
+        self.rows = list(rows)
+        self.closed = False
+
+    def fetchmany(self, size):
+        batch, self.rows = self.rows[:size], self.rows[size:]
+        return batch
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def app():
+    response_cache.clear()
+    app = Flask(__name__)
+    app.secret_key = 'test'
+    app.calls = 0
+    app.release = threading.Event()
+    app.release.set()
+
+    @app.route('/login/<int:user_id>')
+    def login(user_id):
+        session['user_id'] = user_id
+        return jsonify(ok=True)
+
+    @app.route('/items')
+    @response_cache.cached(60, topics=('items',))
+    def items():
+        app.calls += 1
+        app.release.wait(5)
+        return jsonify(user=session.get('user_id'), calls=app.calls)
+
+    @app.route('/items', methods=['POST'])
+    @response_cache.invalidates('items')
+    def add_item():
+        return jsonify(ok=True), 201
+
+    @app.route('/broken')
+    @response_cache.cached(60)
+    def broken():
+        app.calls += 1
+        return jsonify(message='nope'), 500
+
+    @app.route('/stream')
+    @response_cache.cached(60, scope='global')
+    def stream():
+        app.calls += 1
+        return json_provider.stream_rows(RowsCursor([(1, 'a'), (2, 'b')]), 'rows')
+
+    return app
+
+
+def test_hits_are_served_from_the_cache_and_revalidate(app):
+    client = app.test_client()
+    first = client.get('/items')
+    assert client.get('/items').get_json() == first.get_json()
+    assert app.calls == 1
+
+    assert first.headers['Cache-Control'] == 'private, no-cache'
+    not_modified = client.get('/items', headers={'If-None-Match': first.headers['ETag']})
+    assert not_modified.status_code == 304
+    assert app.calls == 1
+
+
+def test_writes_invalidate_dependent_entries(app):
+    client = app.test_client()
+    client.get('/items')
+    assert client.post('/items').status_code == 201
+    assert client.get('/items').get_json()['calls'] == 2
+
+
+def test_entries_are_per_user(app):
+    ada, alan = app.test_client(), app.test_client()
+    ada.get('/login/1')
+    alan.get('/login/2')
+    assert ada.get('/items').get_json()['user'] == 1
+    assert alan.get('/items').get_json()['user'] == 2
+    assert app.calls == 2
+
+
+def test_errors_are_not_cached(app):
+    client = app.test_client()
+    assert client.get('/broken').status_code == 500
+    assert client.get('/broken').status_code == 500
+    assert app.calls == 2
+
+
+def test_streamed_bodies_keep_only_their_etag(app):
+    client = app.test_client()
+    first = client.get('/stream')
+    assert first.get_json() == {'rows': [{'id': 1, 'name': 'a'}, {'id': 2, 'name': 'b'}]}
+
+    etag = response_cache._entries[next(iter(response_cache._entries))]['etag']
+    assert client.get('/stream', headers={'If-None-Match': f'W/"{etag}"'}).status_code == 304
+    assert client.get('/stream').get_json() == first.get_json()
+    assert app.calls == 2
+
+
+def test_concurrent_misses_share_one_handler_call(app):
+    app.release.clear()
+    results = []
+
+    def fetch():
+        results.append(app.test_client().get('/items').get_json())
+
+    threads = [threading.Thread(target=fetch) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while not response_cache._inflight and time.monotonic() < deadline:
+        time.sleep(0.001)
+    app.release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(results) == 4
+    assert app.calls == 1
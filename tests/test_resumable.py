@@ -0,0 +1,133 @@
+import asyncio
+import base64
+import hashlib
+import io
+
+import pytest
+from werkzeug.exceptions import ClientDisconnected
+from werkzeug.wsgi import LimitedStream
+
+import resumable
+
+
+class DroppingStream:
+    """Yields `data` and then fails the way werkzeug does when the client goes away."""
+
+    def __init__(self, data):
+        self.data = io.BytesIO(data)
+
+    def read(self, size):
+        data = self.data.read(size)
+        if not data:
+            raise ClientDisconnected()
+        return data
+
+
+def _partial(tmp_path, content=b''):
+    path = tmp_path / 'upload'
+    path.write_bytes(content)
+    return str(path)
+
+
+def test_write_chunk_keeps_a_matching_chunk(tmp_path):
+    path = _partial(tmp_path, b'head')
+    digest = resumable.running_hash('a', path, 4)
+    checksum = hashlib.sha256(b'tail').digest()
+
+    assert resumable.write_chunk(path, 4, io.BytesIO(b'tail'), 10, digest, checksum) == (4, None)
+    assert open(path, 'rb').read() == b'headtail'
+    assert digest.hexdigest() == hashlib.sha256(b'headtail').hexdigest()
+
+
+def test_write_chunk_truncates_a_checksum_mismatch(tmp_path):
+    path = _partial(tmp_path, b'head')
+    checksum = resumable.parse_checksum('sha256 ' + base64.b64encode(hashlib.sha256(b'good').digest()).decode())
+
+    received, error = resumable.write_chunk(path, 4, io.BytesIO(b'evil'), 10, hashlib.sha256(), checksum)
+    assert (received, error) == (0, 'checksum')
+    assert open(path, 'rb').read() == b'head'
+
+
+def test_write_chunk_rejects_bytes_past_the_length(tmp_path):
+    path = _partial(tmp_path)
+    assert resumable.write_chunk(path, 0, io.BytesIO(b'x' * 11), 10, hashlib.sha256()) == (0, 'too_long')
+    assert open(path, 'rb').read() == b''
+
+
+def test_write_chunk_keeps_bytes_before_a_disconnect_only_without_a_checksum(tmp_path):
+    path = _partial(tmp_path)
+    assert resumable.write_chunk(path, 0, DroppingStream(b'half'), 10, hashlib.sha256()) == (4, 'disconnected')
+    assert open(path, 'rb').read() == b'half'
+
+    checksum = hashlib.sha256(b'half and more').digest()
+    received, error = resumable.write_chunk(path, 4, DroppingStream(b' and'), 10, hashlib.sha256(), checksum)
+    assert (received, error) == (0, 'disconnected')
+    assert open(path, 'rb').read() == b'half'
+
+
+def test_running_hash_continues_from_the_remembered_state(tmp_path):
+    path = _partial(tmp_path, b'abcdef')
+    resumable.remember_hash('b', 2, hashlib.sha256(b'ab'))
+    try:
+        # Bytes another process received are read from disk
+        assert resumable.running_hash('b', path, 6).hexdigest() == hashlib.sha256(b'abcdef').hexdigest()
+        # A state past the offset is not trusted
+        resumable.remember_hash('b', 6, hashlib.sha256(b'zzzzzz'))
+        assert resumable.running_hash('b', path, 3).hexdigest() == hashlib.sha256(b'abc').hexdigest()
+    finally:
+        resumable.forget_hash('b')
+
+
+def test_running_hash_notices_a_short_file(tmp_path):
+    path = _partial(tmp_path, b'abc')
+    with pytest.raises(OSError):
+        resumable.running_hash('c', path, 5)
+
+
+class LockCursor:
+    def __init__(self, acquired):
+        self.acquired = acquired
+        self.statements = []
+
+    def execute(self, sql, params=()):
+        self.statements.append((sql, params))
+
+    def fetchone(self):
+        return {'acquired': self.acquired}
+
+    def fetchall(self):
+        return []
+
+
+def test_upload_lock_does_not_wait_and_releases_only_what_it_holds():
+    cursor = LockCursor(acquired=1)
+    with resumable.upload_lock(cursor, 'abc') as acquired:
+        assert acquired
+    assert cursor.statements == [("SELECT GET_LOCK(%s, 0) AS acquired", ('upload_abc',)),
+                                 ("SELECT RELEASE_LOCK(%s)", ('upload_abc',))]
+
+    cursor = LockCursor(acquired=0)
+    with resumable.upload_lock(cursor, 'abc') as acquired:
+        assert not acquired
+    assert len(cursor.statements) == 1
+
+
+def test_asgi_passes_patch_bodies_through_until_the_client_drops(tmp_path):
+    asgi = pytest.importorskip('asgi')
+    messages = [{'type': 'http.request', 'body': b'half', 'more_body': True}, {'type': 'http.disconnect'}]
+
+    async def receive():
+        return messages.pop(0)
+
+    scope = {'method': 'PATCH', 'headers': [(b'content-type', b'application/offset+octet-stream'),
+                                            (b'content-length', b'10')]}
+    assert asgi.streams_body(scope)
+    assert not asgi.streams_body({'method': 'POST', 'headers': scope['headers']})
+
+    async def write():
+        body = LimitedStream(asgi.StreamedBody(receive, asyncio.get_running_loop()), 10)
+        return await asyncio.to_thread(resumable.write_chunk, path, 0, body, 10, hashlib.sha256())
+
+    path = _partial(tmp_path)
+    assert asyncio.run(write()) == (4, 'disconnected')
+    assert open(path, 'rb').read() == b'half'
@@ -0,0 +1,57 @@
+import search
+
+
+class FakeCursor:
+    """Returns `course_ids` for the scope query and records the search statement."""
+
+    def __init__(self, course_ids):
+        self.course_ids = course_ids
+        self.statements = []
+        self.result = []
+
+    def execute(self, sql, params=()):
+        self.statements.append((sql, tuple(params)))
+        if 'UNION ALL' in sql or 'MATCH' in sql:
+            self.result = [('assignment', 1, 2, 'Databases', 'Essay', 1.5)]
+        else:
+            self.result = [(course_id,) for course_id in self.course_ids]
+
+    def fetchall(self):
+        return self.result
+
+
+def test_students_search_their_courses_and_own_submissions():
+    cursor = FakeCursor([2, 3])
+    assert search.search(cursor, 10, 'student', 'normal form', types=['submission']) == cursor.result
+
+    sql, params = cursor.statements[-1]
+    assert 'a.CourseID IN (%s, %s)' in sql
+    assert 's.StudentID = %s' in sql
+    assert params == ('normal form', 'normal form', 2, 3, 10, 20, 0)
+
+
+def test_every_source_gets_its_own_match_and_the_limit_is_capped():
+    cursor = FakeCursor([4])
+    search.search(cursor, 1, 'professor', 'joins', limit=500, offset=20)
+
+    sql, params = cursor.statements[-1]
+    sources = sum(len(statements) for statements in search.SOURCES.values())
+    assert sql.count('UNION ALL') == sources - 1
+    assert 'cm.CourseID IN (%s)' in sql
+    assert 's.StudentID = %s' not in sql
+    assert params[-2:] == (search.MAX_RESULTS, 20)
+
+
+def test_admins_are_not_scoped_and_users_without_courses_get_nothing():
+    cursor = FakeCursor([])
+    search.search(cursor, 1, 'admin', 'joins', types=['assignment'])
+    assert len(cursor.statements) == 1 and 'CourseID IN' not in cursor.statements[0][0]
+
+    cursor = FakeCursor([])
+    assert search.search(cursor, 10, 'student', 'joins') == []
+    assert len(cursor.statements) == 1  # only the scope query ran
+
+
+def test_unknown_types_are_ignored():
+    cursor = FakeCursor([2])
+    assert search.search(cursor, 10, 'student', 'joins', types=['grades']) == []
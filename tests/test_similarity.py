@@ -0,0 +1,116 @@
+import numpy as np
+import pytest
+
+similarity = pytest.importorskip('similarity')
+
+BASE = ' '.join(f"word{i}" for i in range(300))
+
+
+def _edited(text, every):
+    """Replace every n-th word, leaving the rest of the text as it was."""
+    words = text.split()
+    return ' '.join(f"changed{i}" if i % every == 0 else w for i, w in enumerate(words))
+
+
+def test_signature_is_deterministic_and_sized():
+    signature = similarity.minhash_signature(BASE)
+    assert signature.shape == (similarity.NUM_PERM,)
+    assert signature.dtype == np.uint32
+    assert np.array_equal(signature, similarity.minhash_signature(BASE))
+    assert np.array_equal(similarity.signature_from_bytes(similarity.signature_to_bytes(signature)), signature)
+
+
+def test_signature_of_empty_text_is_none():
+    assert similarity.minhash_signature("  ... !! ") is None
+
+
+def test_signature_matches_across_chunks():
+    text = ' '.join(f"t{i}" for i in range(similarity.CHUNK * 2 + 10))
+    shingles = similarity.shingle_hashes(text)
+    assert shingles.size > similarity.CHUNK
+    expected = ((similarity._A * shingles[:, None] + similarity._B) % similarity.PRIME).min(axis=0)
+    assert np.array_equal(similarity.minhash_signature(text), expected.astype(np.uint32))
+
+
+def test_near_duplicates_pair_up_and_unrelated_text_does_not():
+    texts = [BASE, _edited(BASE, 40), ' '.join(f"other{i}" for i in range(300))]
+    signatures = np.vstack([similarity.minhash_signature(t) for t in texts])
+    pairs = similarity.similar_pairs([10, 20, 30], signatures, threshold=0.5)
+    assert [(a, b) for a, b, _ in pairs] == [(10, 20)]
+    assert 0.5 <= pairs[0][2] <= 1.0
+
+
+def test_candidate_pairs_buckets_identical_bands():
+    signatures = np.zeros((3, similarity.NUM_PERM), dtype=np.uint32)
+    signatures[2] = np.arange(similarity.NUM_PERM, dtype=np.uint32) + 1
+    signatures[1, :similarity.ROWS] = 7  # differs only in the first band
+    assert similarity.candidate_pairs(signatures).tolist() == [[0, 1]]
+    assert similarity.candidate_pairs(signatures[:1]).shape == (0, 2)
+
+
+def test_matches_for_agrees_with_pairwise_report():
+    texts = [BASE, _edited(BASE, 25), _edited(BASE, 60), ' '.join(f"x{i}" for i in range(50))]
+    signatures = np.vstack([similarity.minhash_signature(t) for t in texts])
+    ids = [1, 2, 3, 4]
+    incremental = similarity.matches_for(signatures[0], ids[1:], signatures[1:], threshold=0.3)
+    pairwise = [(b, score) for a, b, score in similarity.similar_pairs(ids, signatures, threshold=0.3) if a == 1]
+    assert incremental == pairwise
+    assert similarity.matches_for(signatures[0], [], signatures[:0], 0.5) == []
+
+
+class FakeCursor:
+    def __init__(self, row, stored):
+        self.row = row
+        self.stored = stored
+        self.statements = []
+
+    def execute(self, sql, params=()):
+        self.statements.append((' '.join(sql.split()), params))
+
+    def executemany(self, sql, rows):
+        self.statements.append((' '.join(sql.split()), rows))
+
+    def fetchone(self):
+        return self.row
+
+    def fetchall(self):
+        return self.stored
+
+    def close(self):
+        pass
+
+
+class FakeDB:
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.commits = 0
+
+    def cursor(self):
+        return self._cursor
+
+    def commit(self):
+        self.commits += 1
+
+
+def test_record_submission_replaces_matches_in_both_directions():
+    signature = similarity.minhash_signature(BASE)
+    data = similarity.signature_to_bytes(signature)
+    cursor = FakeCursor((5, data), [(3, data)])
+    db = FakeDB(cursor)
+
+    assert similarity.record_submission(db, 'hash', 9, 0.5) == [(3, 1.0)]
+    delete = next(s for s in cursor.statements if s[0].startswith('DELETE FROM SimilarityMatch'))
+    assert 'SubmissionID = %s OR MatchedSubmissionID = %s' in delete[0]
+    assert delete[1] == (9, 9)
+    assert cursor.statements[-1][1] == [(9, 3, 1.0)]
+    assert db.commits == 1
+
+
+def test_record_submission_ignores_an_analysis_of_replaced_content():
+    # A newer upload replaced the content before this analysis finished
+    cursor = FakeCursor(None, [])
+    assert similarity.record_submission(FakeDB(cursor), 'old-hash', 9, 0.5) == []
+
+    (select, params), = cursor.statements
+    assert 'v.BlobPath = s.SubmissionPath AND v.ContentHash = %s' in select
+    assert params == ('old-hash', 9)
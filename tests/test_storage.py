@@ -0,0 +1,167 @@
+import hashlib
+import os
+
+import pytest
+from flask import Flask
+
+import db_router
+import routes
+import storage
+
+
+class FakeCursor:
+    """Answers the queries of the presign and complete routes for one course and assignment."""
+
+    def __init__(self, db, dictionary=False):
+        self.db = db
+        self.result = []
+        self.lastrowid = None
+
+    def execute(self, sql, params=()):
+        sql = ' '.join(sql.split())
+        self.db.statements.append((sql, params))
+        if sql.startswith('SELECT GET_LOCK'):
+            self.result = [{'acquired': 1}]
+        elif sql.startswith('SELECT a.*, c.CourseID'):
+            self.result = [self.db.assignment]
+        elif sql.startswith('SELECT 1 FROM Enrollment') or sql.startswith('SELECT 1 FROM Course'):
+            self.result = [{'1': 1}]
+        elif sql.startswith('INSERT INTO Submission '):
+            self.lastrowid = 7
+            self.result = []
+        elif sql.startswith('INSERT INTO CourseMaterial'):
+            self.lastrowid = 3
+            self.result = []
+        else:
+            self.result = []
+
+    def fetchone(self):
+        return self.result[0] if self.result else None
+
+    def fetchall(self):
+        return self.result
+
+    def close(self):
+        pass
+
+
+class FakeDB:
+    def __init__(self, assignment):
+        self.assignment = assignment
+        self.statements = []
+        self.commits = 0
+
+    def cursor(self, dictionary=False):
+        return FakeCursor(self, dictionary)
+
+    def commit(self):
+        self.commits += 1
+
+    def close(self):
+        pass
+
+
+class FakeRouter:
+    has_replicas = False
+
+    def __init__(self, db):
+        self.db = db
+
+    def primary_connection(self):
+        return self.db
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__)
+    app.config.update(
+        SECRET_KEY='test',
+        UPLOAD_FOLDER=str(tmp_path),
+        STORAGE_BACKEND='local',
+        STORAGE_S3_BUCKET=None,
+        STORAGE_PRESIGN_EXPIRY=900,
+        MAX_CONTENT_LENGTH=1024 * 1024,
+        ALLOWED_EXTENSIONS={'pdf', 'txt'},
+    )
+    storage.init_app(app)
+    app.db = FakeDB({'AssignmentID': 5, 'CourseID': 2, 'Archived': 0,
+                     'FilePath': str(tmp_path / 'assignments' / 'essay')})
+    db_router.init_app(app, FakeRouter(app.db))
+    app.extensions['audit_log'] = []
+    app.register_blueprint(routes.portal)
+    return app
+
+
+def _login(client, user_id, role):
+    with client.session_transaction() as session:
+        session['user_id'] = user_id
+        session['role'] = role
+
+
+def _upload(client, content, **fields):
+    sha256 = hashlib.sha256(content).hexdigest()
+    presigned = client.post('/api/uploads/presign', json={'size': len(content), 'sha256': sha256, **fields})
+    assert presigned.status_code == 200, presigned.get_json()
+    return presigned.get_json()
+
+
+def test_material_round_trip(app, tmp_path):
+    client = app.test_client()
+    _login(client, 1, 'professor')
+    content = b'%PDF-1.4 lecture notes'
+    presigned = _upload(client, content, kind='material', filename='notes.pdf', course_id=2)
+
+    put = presigned['upload']
+    assert put['method'] == 'PUT'
+    # Not uploaded yet
+    assert client.post('/api/uploads/complete', json={'token': presigned['token']}).status_code == 409
+
+    assert client.put(put['url'], data=content, headers=put['headers']).status_code == 204
+    assert (tmp_path / 'course_2' / 'notes.pdf').read_bytes() == content
+
+    completed = client.post('/api/uploads/complete', json={'token': presigned['token']})
+    assert completed.status_code == 201
+    insert = next(params for sql, params in app.db.statements if sql.startswith('INSERT INTO CourseMaterial'))
+    assert insert[1] == str(tmp_path / 'course_2' / 'notes.pdf')
+
+
+def test_put_rejects_content_not_matching_the_presign(app, tmp_path):
+    client = app.test_client()
+    _login(client, 1, 'professor')
+    presigned = _upload(client, b'expected', kind='material', filename='notes.txt', course_id=2)
+
+    response = client.put(presigned['upload']['url'], data=b'tampered')
+    assert response.status_code == 400
+    assert not (tmp_path / 'course_2' / 'notes.txt').exists()
+    assert os.listdir(tmp_path / 'course_2') == []  # no temporary file left behind
+
+    assert client.put(presigned['upload']['url'].replace('token=', 'token=x')).status_code == 403
+
+
+def test_tokens_are_bound_to_their_user(app):
+    client = app.test_client()
+    _login(client, 1, 'professor')
+    presigned = _upload(client, b'notes', kind='material', filename='notes.txt', course_id=2)
+    client.put(presigned['upload']['url'], data=b'notes')
+
+    _login(client, 99, 'professor')
+    assert client.post('/api/uploads/complete', json={'token': presigned['token']}).status_code == 403
+
+
+def test_submission_reuses_a_stored_blob(app):
+    client = app.test_client()
+    _login(client, 10, 'student')
+    content = b'%PDF-1.4 essay'
+    first = _upload(client, content, kind='submission', filename='essay.pdf', assignment_id=5)
+    client.put(first['upload']['url'], data=content)
+    completed = client.post('/api/uploads/complete', json={'token': first['token']})
+    assert completed.status_code == 200
+    assert completed.get_json()['submission_id'] == 7
+
+    # Identical content: no upload needed, completing records the existing blob
+    second = _upload(client, content, kind='submission', filename='essay.pdf', assignment_id=5)
+    assert second['upload'] is None
+    assert client.post('/api/uploads/complete', json={'token': second['token']}).status_code == 200
+
+    locks = [params[0] for sql, params in app.db.statements if sql.startswith('SELECT GET_LOCK')]
+    assert locks == [f"submission_blob_{hashlib.sha256(content).hexdigest()[:40]}"] * 2
@@ -0,0 +1,134 @@
+import gzip
+
+import submission_store
+
+
+def test_save_version_compresses_text_and_reuses_blobs(tmp_path):
+    first = submission_store.save_version(str(tmp_path), 'main.py', b'print(1)\n' * 100)
+    assert first['path'].endswith('.py.gz')
+    assert first['stored_size'] < first['size']
+    with gzip.open(first['path'], 'rb') as f:
+        assert f.read() == b'print(1)\n' * 100
+
+    again = submission_store.save_version(str(tmp_path), 'renamed.py', b'print(1)\n' * 100)
+    assert again['hash'] == first['hash']
+    assert submission_store.find_blob(str(tmp_path), 'renamed.py', first['hash']) is not None
+
+
+class FakeCursor:
+    """Answers the prune queries; `referenced` paths still have a version, submission or cold archive entry."""
+
+    def __init__(self, expired, referenced, locks=True):
+        self.expired = expired
+        self.referenced = referenced
+        self.locks = locks
+        self.log = []
+        self.result = []
+
+    def execute(self, sql, params=()):
+        sql = ' '.join(sql.split())
+        if sql.startswith('SELECT GET_LOCK'):
+            self.log.append(('lock', params[0]))
+            self.result = [{'acquired': 1 if self.locks else 0}]
+        elif sql.startswith('SELECT RELEASE_LOCK'):
+            self.log.append(('release', params[0]))
+            self.result = [{'released': 1}]
+        elif sql.startswith('SELECT v.VersionID'):
+            self.result = self.expired
+        elif sql.startswith('DELETE'):
+            self.log.append(('delete', tuple(params)))
+        else:
+            self.log.append(('check', params[0]))
+            self.check_sql = sql
+            self.result = [{'1': 1}] if params[0] in self.referenced else []
+
+    def fetchone(self):
+        return self.result[0] if self.result else None
+
+    def fetchall(self):
+        return self.result
+
+    def close(self):
+        pass
+
+
+class FakeDB:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def cursor(self, dictionary=False):
+        return self._cursor
+
+    def commit(self):
+        pass
+
+
+def _blob(tmp_path, name):
+    path = tmp_path / name
+    path.write_bytes(b'x')
+    return str(path)
+
+
+def test_prune_checks_references_under_the_blob_lock(tmp_path):
+    orphan = _blob(tmp_path, 'a' * 64 + '.pdf')
+    shared = _blob(tmp_path, 'b' * 64 + '.pdf')
+    cursor = FakeCursor([
+        {'VersionID': 1, 'BlobPath': orphan, 'ContentHash': 'a' * 64},
+        {'VersionID': 2, 'BlobPath': shared, 'ContentHash': 'b' * 64},
+    ], referenced={shared})
+
+    assert submission_store.prune_versions(FakeDB(cursor), keep=1) == 2
+    assert not (tmp_path / ('a' * 64 + '.pdf')).exists()
+    assert (tmp_path / ('b' * 64 + '.pdf')).exists()
+
+    checks = [entry for entry in cursor.log if entry[0] != 'delete']
+    # Every reference check happens between taking and releasing that blob's lock
+    for i in range(0, len(checks), 3):
+        lock, check, release = checks[i:i + 3]
+        assert lock[0] == 'lock' and check[0] == 'check' and release == ('release', lock[1])
+    assert all(len(entry[1]) <= 64 for entry in checks if entry[0] == 'lock')
+
+
+def test_prune_leaves_busy_blobs_in_place(tmp_path):
+    orphan = _blob(tmp_path, 'c' * 64 + '.pdf')
+    cursor = FakeCursor([{'VersionID': 3, 'BlobPath': orphan, 'ContentHash': 'c' * 64}],
+                        referenced=set(), locks=False)
+
+    assert submission_store.prune_versions(FakeDB(cursor), keep=1) == 1
+    assert (tmp_path / ('c' * 64 + '.pdf')).exists()
+    assert not any(entry[0] in ('check', 'release') for entry in cursor.log)
+
+
+class FakeS3:
+    deleted = []
+
+    def __init__(self, **settings):
+        self.settings = settings
+
+    def delete(self, path):
+        self.deleted.append(path)
+
+
+def test_prune_deletes_unreferenced_s3_blobs(monkeypatch):
+    monkeypatch.setattr(submission_store.storage, 'S3Storage', FakeS3)
+    FakeS3.deleted = []
+    blob = 's3://portal/assignments/essay/' + 'd' * 64 + '.pdf'
+    cursor = FakeCursor([{'VersionID': 4, 'BlobPath': blob, 'ContentHash': 'd' * 64}], referenced=set())
+
+    assert submission_store.prune_versions(FakeDB(cursor), 1, {'bucket': 'portal'}) == 1
+    assert FakeS3.deleted == [blob]
+
+
+def test_prune_keeps_s3_blobs_without_s3_settings_and_packed_blobs(monkeypatch, tmp_path):
+    monkeypatch.setattr(submission_store.storage, 'S3Storage', FakeS3)
+    FakeS3.deleted = []
+    blob = 's3://portal/assignments/essay/' + 'e' * 64 + '.pdf'
+    cursor = FakeCursor([{'VersionID': 5, 'BlobPath': blob, 'ContentHash': 'e' * 64}], referenced=set())
+    assert submission_store.prune_versions(FakeDB(cursor), keep=1) == 1
+    assert FakeS3.deleted == []
+
+    # A blob in a cold archive's catalog counts as referenced
+    packed = str(tmp_path / ('f' * 64 + '.pdf'))
+    cursor = FakeCursor([{'VersionID': 6, 'BlobPath': packed, 'ContentHash': 'f' * 64}], referenced={packed})
+    assert submission_store.prune_versions(FakeDB(cursor), keep=1) == 1
+    assert 'ColdArchiveMember WHERE PathHash = SHA2(%s, 256)' in cursor.check_sql
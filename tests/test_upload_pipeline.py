@@ -0,0 +1,92 @@
+import gzip
+import zipfile
+from concurrent.futures import Future
+
+import upload_pipeline
+
+
+def test_sniff_mime_reads_magic_bytes(tmp_path):
+    docx = tmp_path / 'essay.docx'
+    with zipfile.ZipFile(docx, 'w') as archive:
+        archive.writestr('word/document.xml', '<w:document/>')
+    assert upload_pipeline.sniff_mime(str(docx), docx.read_bytes()[:4096]) == upload_pipeline.OOXML_TYPES['word/']
+    assert upload_pipeline.sniff_mime(None, b'%PDF-1.7') == 'application/pdf'
+    assert upload_pipeline.sniff_mime(None, 'café'.encode('utf-8')[:-1]) == 'text/plain'
+    assert upload_pipeline.sniff_mime(None, b'\xff\xfe\x00\x81\x82\x83\x84') == 'application/octet-stream'
+
+
+def test_analyze_file_rejects_a_mismatched_extension(tmp_path):
+    blob = tmp_path / 'abc.pdf'
+    blob.write_bytes(b'just some text pretending to be a PDF')
+    result = upload_pipeline.analyze_file(str(blob), 'essay.pdf', str(tmp_path / 'previews'))
+    assert result['mime_type'] == 'text/plain'
+    assert not result['valid']
+    assert '.pdf' in result['reason']
+
+
+def test_analyze_file_reads_compressed_text(tmp_path):
+    blob = tmp_path / 'abc.py.gz'
+    blob.write_bytes(gzip.compress(b'print("hello")\n'))
+    result = upload_pipeline.analyze_file(str(blob), 'main.py', str(tmp_path / 'previews'))
+    assert result['valid'] and result['text'] == 'print("hello")\n'
+    assert list((tmp_path / 'previews').iterdir()) == []  # the plain copy is removed
+
+
+class FakeCursor:
+    def __init__(self, db):
+        self.db = db
+
+    def execute(self, sql, params=()):
+        self.db.statements.append(' '.join(sql.split()))
+
+    def close(self):
+        pass
+
+
+class FakeDB:
+    def __init__(self):
+        self.statements = []
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def _pipeline(tmp_path, db):
+    pipeline = upload_pipeline.UploadPipeline(str(tmp_path), {}, 1)
+    pipeline._connect = lambda: db
+    pipeline.hooks.append(lambda db, content_hash, submission_id: pipeline.hooked.append(submission_id))
+    pipeline.hooked = []
+    return pipeline
+
+
+def test_failed_analysis_stores_nothing(tmp_path):
+    db = FakeDB()
+    pipeline = _pipeline(tmp_path, db)
+    pipeline._pending['hash'] = [4]
+    future = Future()
+    future.set_exception(OSError("blob unreadable"))
+
+    pipeline._record(future, 'hash', 'essay.pdf')
+    assert db.statements == []
+    assert pipeline.hooked == []
+    assert 'hash' not in pipeline._pending  # the next upload of the content retries
+
+
+def test_rejected_upload_notifies_the_students_and_runs_hooks(tmp_path):
+    db = FakeDB()
+    pipeline = _pipeline(tmp_path, db)
+    pipeline._pending['hash'] = [4, 5]
+    future = Future()
+    future.set_result({'mime_type': 'text/plain', 'valid': False, 'reason': 'mismatch', 'page_count': None,
+                       'text': None, 'preview_path': None, 'minhash': None})
+
+    pipeline._record(future, 'hash', 'essay.pdf')
+    assert db.statements[0].startswith('INSERT INTO FileAnalysis')
+    assert db.statements[1].startswith('INSERT INTO Notification')
+    assert pipeline.hooked == [4, 5]
@@ -0,0 +1,327 @@
+"""
+University Assignment Portal - Post-upload Validation Pipeline
+
+Uploads are accepted immediately and analysed afterwards in a process pool:
+the real MIME type is sniffed from the file's magic bytes and compared with
+its extension, page count and text are extracted, and a first-page PNG
+preview is rendered with `pdftoppm` (poppler) when it is installed. When
+NumPy is available a MinHash signature of the text is computed as well.
+
+Results are stored in the FileAnalysis table keyed by content hash, so the
+same file is only ever analysed once. If the analysis itself fails (a worker
+crash, an unreadable blob), nothing is stored: the file is never reported as
+rejected because of it, and the next upload of the same content tries again.
+"""
+import logging
+import os
+import re
+import shutil
+import subprocess
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+import mysql.connector
+
+import storage
+import submission_store
+
+try:
+    import similarity
+except ImportError:  # NumPy not installed; similarity detection is disabled
+    similarity = None
+
+MAX_TEXT_LENGTH = 1000000  # characters of extracted text kept per file
+
+# Magic byte signatures, checked in order
+MAGIC_SIGNATURES = [
+    (b'%PDF-', 'application/pdf'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+    (b'PK\x03\x04', 'application/zip'),
+    (b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1', 'application/x-ole-storage'),
+]
+
+# MIME types an extension is allowed to carry
+EXPECTED_MIME = {
+    'pdf': {'application/pdf'},
+    'png': {'image/png'},
+    'jpg': {'image/jpeg'},
+    'jpeg': {'image/jpeg'},
+    'gif': {'image/gif'},
+    'zip': {'application/zip'},
+    'docx': {'application/vnd.openxmlformats-officedocument.wordprocessingml.document'},
+    'pptx': {'application/vnd.openxmlformats-officedocument.presentationml.presentation'},
+    'xlsx': {'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'},
+    'doc': {'application/x-ole-storage'},
+    'ppt': {'application/x-ole-storage'},
+    'xls': {'application/x-ole-storage'},
+}
+
+OOXML_TYPES = {
+    'word/': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    'ppt/': 'application/vnd.openxmlformats-officedocument.presentationml.presentation',
+    'xl/': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+log = logging.getLogger(__name__)
+
+
+def sniff_mime(path, head):
+    """Determine the MIME type from the leading bytes of the file."""
+    for signature, mime in MAGIC_SIGNATURES:
+        if head.startswith(signature):
+            if mime == 'application/zip':
+                return _sniff_zip(path)
+            return mime
+    try:
+        head.decode('utf-8')
+        return 'text/plain'
+    except UnicodeDecodeError:
+        # The sample may end in the middle of a multi-byte character
+        try:
+            head[:-3].decode('utf-8')
+            return 'text/plain'
+        except UnicodeDecodeError:
+            return 'application/octet-stream'
+
+
+def _sniff_zip(path):
+    """Tell Office Open XML documents apart from plain zip archives."""
+    try:
+        with zipfile.ZipFile(path) as archive:
+            names = archive.namelist()
+    except zipfile.BadZipFile:
+        return 'application/octet-stream'
+    for prefix, mime in OOXML_TYPES.items():
+        if any(name.startswith(prefix) for name in names):
+            return mime
+    return 'application/zip'
+
+
+def _pdf_page_count(data):
+    return len(re.findall(rb'/Type\s*/Page(?!s)', data)) or None
+
+
+def _pdf_text(path):
+    if not shutil.which('pdftotext'):
+        return None
+    result = subprocess.run(['pdftotext', '-q', '-enc', 'UTF-8', path, '-'],
+                            capture_output=True, timeout=60)
+    return result.stdout.decode('utf-8', 'replace') if result.returncode == 0 else None
+
+
+def _pdf_preview(path, preview_path):
+    if not shutil.which('pdftoppm'):
+        return None
+    prefix = preview_path[:-len('.png')]
+    result = subprocess.run(['pdftoppm', '-png', '-singlefile', '-f', '1', '-l', '1',
+                             '-scale-to', '480', path, prefix],
+                            capture_output=True, timeout=60)
+    return preview_path if result.returncode == 0 and os.path.exists(preview_path) else None
+
+
+def analyze_file(blob_path, filename, preview_dir):
+    """Analyse one stored upload. Runs inside a worker process."""
+    ext = submission_store.file_extension(filename)
+    with submission_store.open_blob(blob_path) as f:
+        data = f.read()
+
+    # Work on a plain copy when the blob is stored compressed
+    os.makedirs(preview_dir, exist_ok=True)
+    path = blob_path
+    if submission_store.is_compressed(blob_path):
+        path = os.path.join(preview_dir, os.path.basename(blob_path)[:-len('.gz')])
+        with open(path, 'wb') as f:
+            f.write(data)
+
+    try:
+        mime = sniff_mime(path, data[:4096])
+        expected = EXPECTED_MIME.get(ext)
+        if expected is not None:
+            valid = mime in expected
+        else:
+            # Text-like extensions must actually contain text
+            valid = mime == 'text/plain' if ext in submission_store.TEXT_EXTENSIONS else True
+
+        result = {
+            'mime_type': mime,
+            'valid': valid,
+            'reason': None if valid else f'File content ({mime}) does not match .{ext} extension',
+            'page_count': None,
+            'text': None,
+            'preview_path': None,
+            'minhash': None
+        }
+        if not valid:
+            return result
+
+        if mime == 'application/pdf':
+            result['page_count'] = _pdf_page_count(data)
+            result['text'] = _pdf_text(path)
+            content_hash = os.path.basename(blob_path).split('.', 1)[0]
+            result['preview_path'] = _pdf_preview(
+                path, os.path.join(preview_dir, f'{content_hash}.png'))
+        elif mime.startswith('image/'):
+            result['page_count'] = 1
+            result['preview_path'] = path
+        elif mime == 'text/plain':
+            result['text'] = data.decode('utf-8', 'replace')
+            result['page_count'] = 1
+
+        if result['text'] is not None:
+            result['text'] = result['text'][:MAX_TEXT_LENGTH]
+            if similarity is not None:
+                signature = similarity.minhash_signature(result['text'])
+                if signature is not None:
+                    result['minhash'] = similarity.signature_to_bytes(signature)
+        return result
+    finally:
+        if path != blob_path:
+            os.remove(path)
+
+
+def analyze_remote(storage_settings, blob_path, filename, preview_dir):
+    """analyze_file() for a blob in S3, run on a local copy."""
+    os.makedirs(preview_dir, exist_ok=True)
+    local_path = os.path.join(preview_dir, os.path.basename(blob_path))
+    storage.S3Storage(**storage_settings).download_to(blob_path, local_path)
+    try:
+        result = analyze_file(local_path, filename, preview_dir)
+    except BaseException:
+        os.remove(local_path)
+        raise
+    # Images are their own preview
+    if result['preview_path'] != local_path:
+        os.remove(local_path)
+    return result
+
+
+class UploadPipeline:
+    """Dispatches analysis jobs to a process pool and records the results.
+
+    Functions in `hooks` are called as hook(db, content_hash, submission_id)
+    for every submission once the analysis of its file is stored, including
+    uploads whose content was already analysed earlier.
+    """
+
+    def __init__(self, preview_dir, db_config, workers):
+        self.preview_dir = preview_dir
+        self.db_config = db_config
+        self.workers = workers
+        self.hooks = []
+        self.storage_settings = None  # S3Storage settings for blobs stored in S3
+        self._executor = None
+        self._pending = {}  # content hash -> submission IDs waiting on it
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            return self._executor
+
+    def submit(self, db, blob_path, filename, content_hash, submission_id=None):
+        """Queue a stored upload for analysis unless its hash is already known."""
+        cursor = db.cursor()
+        cursor.execute("SELECT 1 FROM FileAnalysis WHERE ContentHash = %s", (content_hash,))
+        known = cursor.fetchone() is not None
+        cursor.close()
+
+        waiting = [submission_id] if submission_id is not None else []
+        with self._lock:
+            if content_hash in self._pending:
+                self._pending[content_hash].extend(waiting)
+                return False
+            if not known:
+                self._pending[content_hash] = waiting
+
+        if known:
+            if waiting and self.hooks:
+                threading.Thread(target=self._run_hooks, args=(content_hash, waiting),
+                                 daemon=True).start()
+            return False
+
+        if storage.is_remote(blob_path):
+            future = self._get_executor().submit(analyze_remote, self.storage_settings, blob_path,
+                                                 filename, self.preview_dir)
+        else:
+            future = self._get_executor().submit(analyze_file, blob_path, filename, self.preview_dir)
+        future.add_done_callback(lambda f: self._record(f, content_hash, filename))
+        return True
+
+    def _connect(self):
+        return mysql.connector.connect(**self.db_config)
+
+    def _run_hooks(self, content_hash, submission_ids, db=None):
+        """Call every hook for each submission, opening a connection if needed."""
+        try:
+            own_db = db is None
+            if own_db:
+                db = self._connect()
+            try:
+                for submission_id in submission_ids:
+                    for hook in self.hooks:
+                        try:
+                            hook(db, content_hash, submission_id)
+                        except Exception as e:
+                            log.exception("Error in upload hook %s: %s", getattr(hook, '__name__', hook), e)
+            finally:
+                if own_db:
+                    db.close()
+        except mysql.connector.Error as err:
+            log.error("Error running upload hooks: %s", err)
+
+    def _record(self, future, content_hash, filename):
+        """Store the analysis result. Runs on the executor's callback thread."""
+        with self._lock:
+            submission_ids = self._pending.pop(content_hash, [])
+        try:
+            result = future.result()
+        except Exception as e:
+            # A failure of the pipeline, not a verdict on the file: store nothing,
+            # so the analysis stays pending and the next upload of it retries
+            log.exception("Error analysing upload %s: %s", filename, e)
+            return
+
+        try:
+            db = self._connect()
+            try:
+                cursor = db.cursor()
+                cursor.execute("""
+                    INSERT INTO FileAnalysis
+                    (ContentHash, MimeType, Valid, Reason, PageCount, PreviewPath, ExtractedText, MinHash, AnalyzedAt)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, NOW())
+                    ON DUPLICATE KEY UPDATE ContentHash = ContentHash
+                """, (content_hash, result['mime_type'], result['valid'], result['reason'],
+                      result['page_count'], result['preview_path'], result['text'], result['minhash']))
+
+                # Let the students know the upload was rejected (its content does not match its type)
+                if not result['valid'] and submission_ids:
+                    placeholders = ', '.join(['%s'] * len(submission_ids))
+                    cursor.execute(f"""
+                        INSERT INTO Notification (UserID, Message, Timestamp)
+                        SELECT s.StudentID,
+                               CONCAT('Your submission for ', a.Title, ' was rejected: ', %s),
+                               NOW()
+                        FROM Submission s
+                        JOIN Assignment a ON s.AssignmentID = a.AssignmentID
+                        WHERE s.SubmissionID IN ({placeholders})
+                    """, (result['reason'], *submission_ids))
+                db.commit()
+                cursor.close()
+
+                if submission_ids:
+                    self._run_hooks(content_hash, submission_ids, db=db)
+            finally:
+                db.close()
+        except mysql.connector.Error as err:
+            log.error("Error recording upload analysis: %s", err)
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)